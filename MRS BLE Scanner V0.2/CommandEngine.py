@@ -0,0 +1,240 @@
+"""
+Command Engine Module for MRS BLE Scanner V0.2
+Request/response on top of the UART notify stream: request() sends a command
+and resolves when the sensor answers (OK, ERROR, the command's documented
+reply or a custom regex), or after a timeout. The script runner uses it to
+move to the next command as soon as the previous one is answered
+"""
+
+import asyncio
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Iterable, List, Optional
+
+# Seconds to wait for an answer
+COMMAND_TIMEOUT = 10.0
+# Commands without a known reply are answered once the sensor goes quiet this long
+IDLE_GAP = 0.5
+
+# Statuses
+OK = "OK"
+ERROR = "ERROR"
+TIMEOUT = "TIMEOUT"
+
+# Modem final result codes (AT commands)
+OK_PATTERN = r"^OK$"
+ERROR_PATTERN = r"^(ERROR|\+CM[ES] ERROR.*)$"
+
+# First line the sensor sends for its own commands (docs/SENSOR_COMMANDS_REFERENCE.md)
+COMMAND_REPLIES = {
+    "NB_SHOW": r"CMD_UART_LOG_MODE",
+    "TEST_PACKET": r"try to send 06 packet",
+    "DISTANCE": r"^distance",
+    "IMU": r"^angle",
+    "ATI": r"^IMEI:",
+}
+
+
+@dataclass
+class Response:
+    """What the sensor answered to one command"""
+    command: str
+    status: str
+    lines: List[str] = field(default_factory=list)
+    terminator: Optional[str] = None   # line that ended the response
+    elapsed: float = 0.0               # seconds from sending to the answer
+
+    @property
+    def ok(self) -> bool:
+        return self.status == OK
+
+
+@dataclass
+class _Pending:
+    command: str
+    patterns: List[re.Pattern]
+    settle: bool                       # no known reply - answered when the sensor goes quiet
+    future: asyncio.Future
+    lines: List[str] = field(default_factory=list)
+    terminator: Optional[str] = None
+    idle_timer: Optional[asyncio.TimerHandle] = None
+
+
+class CommandEngine:
+    """
+    One command in flight at a time (UART replies carry no request id)
+    write(command) -> bool sends the command (BLEScanner.send_command);
+    feed(text) gets every received line. The pending request is registered
+    before the write, so an answer that beats write() back is not lost
+    """
+
+    def __init__(self, write: Callable[[str], Awaitable[bool]], timeout: float = COMMAND_TIMEOUT,
+                 idle: float = IDLE_GAP, clock: Callable = time.monotonic):
+        self.write = write
+        self.timeout = timeout
+        self.idle = idle
+        self.clock = clock
+        self.lock = asyncio.Lock()
+        self.pending: Optional[_Pending] = None
+        self.error = re.compile(ERROR_PATTERN)
+
+        # Stats
+        self.requests = 0
+        self.timeouts = 0
+        self.total_elapsed = 0.0
+
+    @staticmethod
+    def keyword(command: str) -> str:
+        """NB_SHOW / SET_IP=1.2.3.4 -> NB_SHOW / SET_IP"""
+        return command.split("=", 1)[0].strip().upper()
+
+    def terminators(self, command: str, expect: str = None):
+        """(patterns that end the response, settle on silence?) for a command"""
+        if expect:
+            return [re.compile(expect)], False
+        reply = COMMAND_REPLIES.get(self.keyword(command))
+        patterns = [re.compile(OK_PATTERN)] + ([re.compile(reply)] if reply else [])
+        return patterns, reply is None and not command.upper().startswith("AT")
+
+    def feed(self, text: str):
+        """Received text (one notification) - may complete the pending request"""
+        pending = self.pending
+        if pending is None or pending.future.done():
+            return
+        for line in text.splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            pending.lines.append(line)
+            if self.error.match(line):
+                self._resolve(pending, ERROR, line)
+                return
+            if any(pattern.search(line) for pattern in pending.patterns):
+                self._resolve(pending, OK, line)
+                return
+        if pending.settle and pending.lines:
+            if pending.idle_timer is not None:
+                pending.idle_timer.cancel()
+            loop = pending.future.get_loop()
+            pending.idle_timer = loop.call_later(self.idle, self._resolve, pending, OK, None)
+
+    def _resolve(self, pending: _Pending, status: str, terminator: Optional[str]):
+        if not pending.future.done():
+            pending.terminator = terminator
+            pending.future.set_result(status)
+
+    async def request(self, command: str, expect: str = None, timeout: float = None) -> Response:
+        """
+        Send command and wait for its answer - a Response with status OK,
+        ERROR or TIMEOUT (lines received so far are kept either way).
+        Raises ConnectionError if the command could not be written
+        """
+        timeout = self.timeout if timeout is None else timeout
+        async with self.lock:
+            patterns, settle = self.terminators(command, expect)
+            pending = _Pending(command, patterns, settle, asyncio.get_running_loop().create_future())
+            self.pending = pending
+            started = self.clock()
+            try:
+                if not await self.write(command):
+                    raise ConnectionError(f"Could not send {command}")
+                try:
+                    status = await asyncio.wait_for(pending.future, timeout=timeout)
+                except asyncio.TimeoutError:
+                    status = TIMEOUT
+            finally:
+                self.pending = None
+                if pending.idle_timer is not None:
+                    pending.idle_timer.cancel()
+
+        response = Response(command, status, pending.lines, pending.terminator, self.clock() - started)
+        self.requests += 1
+        self.total_elapsed += response.elapsed
+        if status == TIMEOUT:
+            self.timeouts += 1
+        return response
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "timeouts": self.timeouts,
+            "avg_response_s": round(self.total_elapsed / self.requests, 3) if self.requests else None
+        }
+
+
+class ScriptError(Exception):
+    """A script command was answered with ERROR or not at all"""
+
+    def __init__(self, step: "ScriptStep", response: Response):
+        super().__init__(f"line {step.line}: {response.command} -> {response.status}")
+        self.step = step
+        self.response = response
+
+
+@dataclass
+class ScriptStep:
+    """One script line: a command to send, or a pause"""
+    line: int
+    command: Optional[str] = None
+    expect: Optional[str] = None
+    timeout: float = COMMAND_TIMEOUT
+    pause: float = 0.0
+
+
+def parse_script(lines: Iterable[str]) -> List[ScriptStep]:
+    """
+    Script text -> steps. One command per line, plus:
+      # comment          wait 5       (pause 5 s)
+      timeout 90         (answer timeout for the following commands)
+      expect <regex>     (what ends the answer to the next command)
+    Raises ValueError naming the line for a bad directive
+    """
+    steps = []
+    timeout = COMMAND_TIMEOUT
+    expect = None
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        keyword, _, value = line.partition(" ")
+        keyword = keyword.lower()
+        try:
+            if keyword == "wait":
+                steps.append(ScriptStep(number, pause=float(value)))
+            elif keyword == "timeout":
+                timeout = float(value)
+            elif keyword == "expect":
+                expect = re.compile(value.strip()).pattern
+            else:
+                steps.append(ScriptStep(number, command=line, expect=expect, timeout=timeout))
+                expect = None
+        except (ValueError, re.error) as e:
+            raise ValueError(f"line {number}: {line!r} ({e})") from None
+    return steps
+
+
+def load_script(path: str) -> List[ScriptStep]:
+    with open(path, encoding="utf-8") as f:
+        return parse_script(f)
+
+
+async def run_script(engine: CommandEngine, steps: List[ScriptStep], on_response: Callable = None,
+                     stop_on_error: bool = True) -> List[Response]:
+    """
+    Run steps in order - each command as soon as the previous one is answered
+    on_response(step, response) after every command. Raises ScriptError on
+    ERROR/TIMEOUT unless stop_on_error is False
+    """
+    responses = []
+    for step in steps:
+        if step.command is None:
+            await asyncio.sleep(step.pause)
+            continue
+        response = await engine.request(step.command, expect=step.expect, timeout=step.timeout)
+        responses.append(response)
+        if on_response:
+            on_response(step, response)
+        if stop_on_error and not response.ok:
+            raise ScriptError(step, response)
+    return responses
@@ -0,0 +1,132 @@
+"""
+Console Renderer Module for MRS BLE Scanner V0.2
+Draws receive-mode output from its own asyncio task so a chatty sensor
+never makes printing the bottleneck of the BLE callback
+"""
+
+import asyncio
+import sys
+from collections import deque
+from typing import Callable
+
+# Entry levels: quiet mode keeps READING and up, ESSENTIAL is never dropped or collapsed
+LOG = 0
+READING = 1
+ESSENTIAL = 2
+
+
+class ConsoleRenderer:
+    """
+    Bounded, rate-limited console queue
+    post() only stores (render, args); the render task wakes at most every
+    frame_interval seconds and writes one frame with a single write(). When
+    more than max_per_frame entries are waiting, only the newest are drawn
+    and the rest collapse into one summary line ("+37 messages").
+    ESSENTIAL entries (diagnostics) are never dropped or collapsed; quiet
+    mode discards LOG entries at post time.
+    """
+
+    def __init__(self, max_pending: int = 500, frame_interval: float = 0.1, max_per_frame: int = 20,
+                 summary: Callable = None, out=None):
+        self.pending = deque(maxlen=max_pending)  # (seq, render, args) - oldest fall off when full
+        self.essential = []
+        self.frame_interval = frame_interval
+        self.max_per_frame = max_per_frame
+        self.summary = summary or (lambda count: f"  ... +{count} messages\n")
+        self.out = out or sys.stdout
+        self.quiet = False
+
+        self.seq = 0
+        self.overflow = 0          # entries pushed out of a full queue since the last frame
+        self.wakeup = None
+        self.task = None
+
+        # Stats
+        self.rendered = 0
+        self.coalesced = 0
+        self.frames = 0
+
+    @property
+    def started(self) -> bool:
+        return self.task is not None
+
+    def start(self):
+        """Start the render task (needs a running event loop)"""
+        if self.started:
+            return
+        self.wakeup = asyncio.Event()
+        self.task = asyncio.create_task(self._run())
+
+    def post(self, render: Callable, *args, level: int = LOG):
+        """Queue render(*args) -> str for the next frame; cheap enough for the BLE callback"""
+        if self.quiet and level < READING:
+            return
+        self.seq += 1
+        if level >= ESSENTIAL:
+            self.essential.append((self.seq, render, args))
+        else:
+            if len(self.pending) == self.pending.maxlen:
+                self.overflow += 1
+            self.pending.append((self.seq, render, args))
+        if self.wakeup is not None:
+            self.wakeup.set()
+        else:
+            self.flush()  # no task yet - behave like print()
+
+    def frame(self) -> str:
+        """Take everything pending and build one frame of text"""
+        entries = list(self.pending)
+        self.pending.clear()
+        skipped = self.overflow
+        self.overflow = 0
+        if len(entries) > self.max_per_frame:
+            skipped += len(entries) - self.max_per_frame
+            entries = entries[-self.max_per_frame:]
+
+        if self.essential:
+            entries = sorted(entries + self.essential, key=lambda entry: entry[0])
+            self.essential = []
+
+        parts = []
+        if skipped:
+            self.coalesced += skipped
+            parts.append(self.summary(skipped))
+        for _, render, args in entries:
+            try:
+                parts.append(render(*args))
+            except Exception as e:
+                parts.append(f"[render error] {e}\n")
+        self.rendered += len(entries)
+        return ''.join(parts)
+
+    def flush(self):
+        text = self.frame()
+        if text:
+            self.out.write(text)
+            self.out.flush()
+            self.frames += 1
+
+    async def _run(self):
+        while True:
+            await self.wakeup.wait()
+            self.wakeup.clear()
+            self.flush()
+            # Rate limit: everything posted meanwhile goes into the next frame
+            await asyncio.sleep(self.frame_interval)
+
+    async def stop(self):
+        """Stop the task and write what is still pending"""
+        if self.task is not None:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+            self.wakeup = None
+        self.flush()
+
+    def stats(self) -> dict:
+        return {
+            "rendered": self.rendered,
+            "coalesced": self.coalesced,
+            "frames": self.frames,
+            "pending": len(self.pending) + len(self.essential)
+        }
@@ -0,0 +1,200 @@
+"""
+Device Fleet Module for MRS BLE Scanner V0.2
+Keeps several sensor sessions open at once in one event loop
+Each session (a BLEScanner in Scanner.py) has its own BLE client, diagnostics
+buffer, IMEI and forward queue; the fleet only decides who may connect
+(at most max_connections at a time) and tracks where every device stands
+"""
+
+import asyncio
+from typing import Callable, Dict, List
+
+# Windows and BlueZ adapters handle about 7 links; leave headroom for scanning
+MAX_CONNECTIONS = 5
+
+# Session states
+WAITING = "waiting"        # selected, no free connection slot yet
+CONNECTING = "connecting"
+CONNECTED = "connected"
+RECONNECTING = "reconnecting"  # connected before, link dropped (shown in status only)
+FAILED = "failed"
+CLOSED = "closed"
+
+
+def parse_selection(text: str, count: int, marked: List[int] = ()) -> List[int]:
+    """
+    Device numbers (1-based, in order, no repeats) from a selection string
+      ""  -> [1]      "3" -> [3]      "1,3,5" / "1 3 5"      "2-4" -> [2, 3, 4]
+      "all" -> every device     "*" -> the marked (dustbin sensor) devices
+    Raises ValueError for anything out of range or unreadable
+    """
+    text = text.strip().lower()
+    if not text:
+        return [1] if count else []
+    if text == "all":
+        return list(range(1, count + 1))
+    if text == "*":
+        if not marked:
+            raise ValueError("no dustbin sensors (*) found")
+        return list(marked)
+
+    selected = []
+    for part in text.replace(",", " ").split():
+        first, sep, last = part.partition("-")
+        start = int(first)
+        end = int(last) if sep else start
+        if not 1 <= start <= end <= count:
+            raise ValueError(f"{part} is not in 1-{count}")
+        for number in range(start, end + 1):
+            if number not in selected:
+                selected.append(number)
+    return selected
+
+
+class DeviceFleet:
+    """
+    Connection-capped set of device sessions
+    session_factory(device, tag) builds a session with async connect(device),
+    async shutdown(), a CommandEngine as `engine` and the usual BLEScanner
+    counters. start() launches one
+    task per device; each waits for a connection slot, so devices beyond
+    max_connections connect as soon as another session fails or is closed
+    """
+
+    def __init__(self, session_factory: Callable, max_connections: int = MAX_CONNECTIONS,
+                 on_state: Callable = None):
+        self.session_factory = session_factory
+        self.max_connections = max_connections
+        self.on_state = on_state  # on_state(tag, state, detail)
+        self.slots = asyncio.Semaphore(max_connections)
+        self.sessions: Dict[str, object] = {}  # tag -> session, in selection order
+        self.devices: Dict[str, object] = {}
+        self.state: Dict[str, str] = {}
+        self.errors: Dict[str, str] = {}
+        self.holding = set()                   # tags that own a connection slot
+        self.tasks: Dict[str, asyncio.Task] = {}
+
+    def __len__(self):
+        return len(self.sessions)
+
+    def _set_state(self, tag, state, detail=None):
+        self.state[tag] = state
+        if self.on_state:
+            self.on_state(tag, state, detail)
+
+    def add(self, device) -> str:
+        """Register a device and return its tag (B1, B2, ...) - does not connect"""
+        tag = f"B{len(self.sessions) + 1}"
+        self.sessions[tag] = self.session_factory(device, tag)
+        self.devices[tag] = device
+        self._set_state(tag, WAITING)
+        return tag
+
+    def start(self, devices) -> List[str]:
+        """Add devices and connect them in the background (needs a running event loop)"""
+        tags = [self.add(device) for device in devices]
+        for tag in tags:
+            self.tasks[tag] = asyncio.create_task(self.open(tag))
+        return tags
+
+    async def open(self, tag) -> bool:
+        """Wait for a slot, then connect - a failed session gives its slot back"""
+        await self.slots.acquire()
+        self.holding.add(tag)
+        self._set_state(tag, CONNECTING)
+        try:
+            await self.sessions[tag].connect(self.devices[tag])
+        except asyncio.CancelledError:
+            self._release(tag)
+            raise
+        except Exception as e:
+            self.errors[tag] = str(e) or type(e).__name__
+            self._release(tag)
+            self._set_state(tag, FAILED, self.errors[tag])
+            return False
+        self._set_state(tag, CONNECTED)
+        return True
+
+    async def wait_connected(self, timeout: float = None):
+        """Wait until no session is connecting (devices still waiting for a slot are not awaited)"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout if timeout is not None else None
+        await asyncio.sleep(0)  # let freshly started tasks take their slots
+        while CONNECTING in self.state.values():
+            if deadline is not None and loop.time() >= deadline:
+                return
+            await asyncio.sleep(0.05)
+
+    def _release(self, tag):
+        if tag in self.holding:
+            self.holding.discard(tag)
+            self.slots.release()
+
+    def get(self, tag: str):
+        return self.sessions.get(tag.strip().upper())
+
+    def connected(self) -> list:
+        return [session for tag, session in self.sessions.items() if self.state[tag] == CONNECTED]
+
+    async def close(self, tag):
+        """Disconnect one session and hand its slot to the next waiting device"""
+        task = self.tasks.pop(tag, None)
+        if task is not None and not task.done():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        if self.state.get(tag) != CLOSED:
+            try:
+                await self.sessions[tag].shutdown()
+            finally:
+                self._release(tag)
+                self._set_state(tag, CLOSED)
+
+    async def close_all(self):
+        # Cancel devices still waiting first so they do not grab the slots being freed
+        waiting = [tag for tag, state in self.state.items() if state == WAITING]
+        await asyncio.gather(*(self.close(tag) for tag in waiting), return_exceptions=True)
+        await asyncio.gather(*(self.close(tag) for tag in list(self.sessions)), return_exceptions=True)
+
+    async def broadcast(self, command: str, tags: List[str] = None) -> Dict[str, object]:
+        """
+        Send a command to every connected session (or the connected ones in
+        tags) at once - tag -> its Response, or the exception it raised
+        """
+        tags = [tag for tag in (tags or self.sessions) if self.state.get(tag) == CONNECTED]
+        # Every device answers on its own link - wait for all of them at once
+        results = await asyncio.gather(*(self.sessions[tag].engine.request(command) for tag in tags),
+                                       return_exceptions=True)
+        return dict(zip(tags, results))
+
+    def status(self) -> List[dict]:
+        """One row per device for the fleet view"""
+        rows = []
+        for tag, session in self.sessions.items():
+            device = self.devices[tag]
+            queue = getattr(session, "forward_queue", None)
+            link = getattr(session, "link", None)
+            state = self.state[tag]
+            if state == CONNECTED and link is not None and link.reconnecting:
+                state = RECONNECTING
+            rows.append({
+                "tag": tag,
+                "name": getattr(device, "name", None) or "(Unknown)",
+                "address": getattr(device, "address", ""),
+                "imei": session.device_imei,
+                "state": state,
+                "messages": session.message_count,
+                "last": getattr(session, "last_line", ""),
+                "outbox": queue.depth if queue is not None else 0,
+                "error": self.errors.get(tag)
+            })
+        return rows
+
+    def stats(self) -> dict:
+        states = list(self.state.values())
+        return {
+            "devices": len(states),
+            "connected": states.count(CONNECTED),
+            "waiting": states.count(WAITING),
+            "failed": states.count(FAILED),
+            "messages": sum(session.message_count for session in self.sessions.values())
+        }
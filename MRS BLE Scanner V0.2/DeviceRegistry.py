@@ -0,0 +1,145 @@
+"""
+Device Registry Module for MRS BLE Scanner V0.2
+Remembers the sensors we connected to across runs (devices.json): the GATT
+profile resolved on the first connect (UART write characteristic, notify set, their services),
+extracted IMEI, name, last RSSI and when it was last seen - so connects skip
+the service walk and the scan list shows known devices straight away
+"""
+
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass, field, asdict, fields
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class DeviceProfile:
+    """What we know about one device (address as reported by bleak)"""
+    address: str
+    name: Optional[str] = None
+    imei: Optional[str] = None
+    write_char: Optional[str] = None
+    notify_chars: List[str] = field(default_factory=list)
+    services: List[str] = field(default_factory=list)   # services holding write_char/notify_chars
+    last_rssi: Optional[int] = None
+    last_seen: Optional[float] = None                    # epoch seconds
+    connects: int = 0
+
+    @property
+    def has_gatt(self) -> bool:
+        """Enough cached to connect without discovering services"""
+        return bool(self.write_char and self.notify_chars and self.services)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "DeviceProfile":
+        known = {f.name for f in fields(cls)}
+        return cls(**{key: value for key, value in data.items() if key in known})
+
+
+class DeviceRegistry:
+    """
+    devices.json keyed by address
+    seen() only updates memory (it runs for every advertisement); save()
+    writes the file atomically when something changed. Only devices that
+    were connected at least once are written - advertisers we never used
+    (every phone and watch in "all" mode) stay out of the file
+    """
+
+    def __init__(self, path: str = "devices.json"):
+        self.path = path
+        self.devices: Dict[str, DeviceProfile] = {}
+        self.dirty = False
+        self.load()
+
+    @staticmethod
+    def key(address: str) -> str:
+        return address.upper()
+
+    def __len__(self):
+        return len(self.devices)
+
+    def __contains__(self, address):
+        return self.key(address) in self.devices
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+            self.devices = {self.key(item["address"]): DeviceProfile.from_dict(item)
+                            for item in data.get("devices", [])}
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            # A damaged registry only costs a full discovery - never block startup on it
+            logger.warning(f"Device registry {self.path} unreadable ({e}) - starting empty")
+            self.devices = {}
+
+    def save(self):
+        if not self.dirty:
+            return
+        data = {"devices": [asdict(profile) for profile in self.known() if profile.connects]}
+        if not data["devices"] and not os.path.exists(self.path):
+            self.dirty = False  # nothing connected yet - no file
+            return
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_path, self.path)
+        self.dirty = False
+
+    def get(self, address: str) -> Optional[DeviceProfile]:
+        return self.devices.get(self.key(address))
+
+    def profile(self, address: str) -> DeviceProfile:
+        """Existing profile or a new empty one (registered)"""
+        key = self.key(address)
+        if key not in self.devices:
+            self.devices[key] = DeviceProfile(address=address)
+            self.dirty = True
+        return self.devices[key]
+
+    def seen(self, address: str, name: str = None, rssi: int = None, when: float = None):
+        """Advertisement received"""
+        profile = self.profile(address)
+        if name:
+            profile.name = name
+        if rssi is not None:
+            profile.last_rssi = rssi
+        profile.last_seen = when if when is not None else time.time()
+        self.dirty = True
+
+    def remember_gatt(self, address: str, write_char: str, notify_chars: List[str], services: List[str],
+                      imei: str = None, name: str = None):
+        """Resolved characteristics after a successful connect"""
+        profile = self.profile(address)
+        profile.write_char = write_char
+        profile.notify_chars = list(notify_chars)
+        profile.services = list(services)
+        if imei:
+            profile.imei = imei
+        if name:
+            profile.name = name
+        profile.connects += 1
+        profile.last_seen = time.time()
+        self.dirty = True
+
+    def forget_gatt(self, address: str):
+        """Cached profile turned out stale (firmware update) - rediscover next time"""
+        profile = self.get(address)
+        if profile is not None:
+            profile.write_char = None
+            profile.notify_chars = []
+            profile.services = []
+            self.dirty = True
+
+    def known(self, limit: int = None, max_age: float = None) -> List[DeviceProfile]:
+        """Profiles, most recently seen first"""
+        now = time.time()
+        profiles = sorted(self.devices.values(), key=lambda p: p.last_seen or 0, reverse=True)
+        if max_age is not None:
+            profiles = [p for p in profiles if p.last_seen and now - p.last_seen <= max_age]
+        return profiles[:limit] if limit is not None else profiles
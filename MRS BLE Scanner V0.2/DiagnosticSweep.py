@@ -0,0 +1,138 @@
+"""
+Diagnostic Sweep Module for MRS BLE Scanner V0.2
+Unattended diagnostics for every dustbin sensor in range: devices go through
+a DeviceFleet connection pool a few at a time, each one gets the command
+sequence (NB_SHOW, TEST_PACKET), and the sweep collects one DiagnosticResult
+and PDF per device plus a summary table (CSV)
+"""
+
+import asyncio
+import csv
+import os
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, List, Optional
+
+from DeviceFleet import DeviceFleet, MAX_CONNECTIONS
+from NetworkDiagnostics import DiagnosticResult
+
+# Command sequence sent to each sensor (docs/SENSOR_COMMANDS_REFERENCE.md - Run Full Diagnostic)
+SWEEP_COMMANDS = ["NB_SHOW", "TEST_PACKET"]
+# TEST_PACKET takes 30-60 s; give up on a sensor after this many seconds
+SEQUENCE_TIMEOUT = 90
+
+# Sweep statuses besides the diagnostic ones (HEALTHY, PARTIAL, FAILED)
+NOT_CONNECTED = "NOT CONNECTED"
+NO_RESPONSE = "NO RESPONSE"
+ERROR = "ERROR"
+
+SUMMARY_COLUMNS = ["Tag", "Device", "Address", "IMEI", "Status", "Failure layer", "Root cause",
+                   "Sequence complete", "Duration (s)", "Report"]
+
+
+@dataclass
+class SweepResult:
+    """Outcome of the sweep for one device"""
+    tag: str
+    name: str
+    address: str
+    imei: str
+    status: str = NOT_CONNECTED
+    failure_layer: Optional[str] = None
+    root_cause: str = ""
+    completed: bool = False          # end of the TEST_PACKET sequence seen before the timeout
+    duration: float = 0.0            # seconds connected
+    report_path: Optional[str] = None
+    error: Optional[str] = None
+    diagnostic: Optional[DiagnosticResult] = None
+
+    def row(self) -> list:
+        return [self.tag, self.name, self.address, self.imei, self.status, self.failure_layer or "",
+                self.error or self.root_cause, "yes" if self.completed else "no",
+                f"{self.duration:.0f}", self.report_path or ""]
+
+
+class DiagnosticSweep:
+    """
+    Runs the command sequence on many devices, at most max_connections at once
+    Sessions come from session_factory(device, tag) and need connect(),
+    shutdown() and run_diagnostic(commands, timeout) -> (DiagnosticResult,
+    completed). report(result) -> path writes the per-device PDF; it is
+    blocking (reportlab) and runs in a worker thread so the other devices'
+    links keep being served meanwhile
+    """
+
+    def __init__(self, session_factory: Callable, commands: List[str] = None,
+                 max_connections: int = MAX_CONNECTIONS, timeout: float = SEQUENCE_TIMEOUT,
+                 report: Callable = None, on_result: Callable = None, on_state: Callable = None):
+        self.fleet = DeviceFleet(session_factory, max_connections=max_connections, on_state=on_state)
+        self.commands = list(commands or SWEEP_COMMANDS)
+        self.timeout = timeout
+        self.report = report
+        self.on_result = on_result  # on_result(SweepResult) as each device finishes
+        self.results: List[SweepResult] = []
+
+    async def run(self, devices) -> List[SweepResult]:
+        """Sweep all devices; results are in device order"""
+        tags = [self.fleet.add(device) for device in devices]
+        self.results = list(await asyncio.gather(*(self._sweep(tag) for tag in tags)))
+        return self.results
+
+    async def _sweep(self, tag) -> SweepResult:
+        device = self.fleet.devices[tag]
+        session = self.fleet.sessions[tag]
+        result = SweepResult(tag=tag, name=getattr(device, "name", None) or "(Unknown)",
+                             address=getattr(device, "address", ""), imei=session.device_imei)
+        started = None
+        try:
+            if await self.fleet.open(tag):
+                started = time.monotonic()
+                result.imei = session.device_imei
+                await self._diagnose(session, result)
+            else:
+                result.error = self.fleet.errors.get(tag)
+        except Exception as e:
+            result.status = ERROR
+            result.error = str(e) or type(e).__name__
+        finally:
+            if started is not None:
+                result.duration = time.monotonic() - started
+            await self.fleet.close(tag)
+
+        if self.on_result:
+            self.on_result(result)
+        return result
+
+    async def _diagnose(self, session, result: SweepResult):
+        diagnostic, result.completed = await session.run_diagnostic(self.commands, self.timeout)
+        result.diagnostic = diagnostic
+        if not session.message_count:
+            result.status = NO_RESPONSE
+            result.root_cause = "Sensor sent nothing after the command sequence"
+            return
+        result.status = diagnostic.overall_status
+        result.failure_layer = diagnostic.failure_layer
+        result.root_cause = diagnostic.root_cause
+        if self.report:
+            loop = asyncio.get_running_loop()
+            result.report_path = await loop.run_in_executor(None, self.report, diagnostic)
+
+    def counts(self) -> dict:
+        """Number of devices per status, e.g. {'HEALTHY': 7, 'FAILED': 1}"""
+        counts = {}
+        for result in self.results:
+            counts[result.status] = counts.get(result.status, 0) + 1
+        return counts
+
+
+def write_summary(results: List[SweepResult], output_dir: str = "reports") -> str:
+    """Summary table as CSV (opens in Excel) - returns its path"""
+    os.makedirs(output_dir, exist_ok=True)
+    path = os.path.join(output_dir, f"sweep-{datetime.now().strftime('%Y%m%d-%H.%M.%S')}.csv")
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(SUMMARY_COLUMNS)
+        for result in results:
+            writer.writerow(result.row())
+    return path
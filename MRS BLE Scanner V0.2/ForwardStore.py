@@ -0,0 +1,124 @@
+"""
+Forward Store Module for MRS BLE Scanner V0.2
+On-disk outbox for HTTP forwarding - readings are written here before
+they are sent and deleted once the server has accepted them
+"""
+
+import json
+import os
+import sqlite3
+import time
+from typing import Iterable, List, Tuple
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY,
+    payload TEXT NOT NULL,
+    queued REAL NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+
+class ForwardStore:
+    """SQLite outbox (WAL, incremental vacuum) - used from one thread only"""
+
+    def __init__(self, path: str = "outbox.db", compact_pages: int = 256):
+        self.path = path
+        self.compact_pages = compact_pages  # free pages that trigger a compaction
+        self.compactions = 0
+        self.discarded = 0  # unreadable entries removed by peek()
+
+        self.conn = sqlite3.connect(path, timeout=30)
+        # auto_vacuum only takes effect if set before the first table is created
+        self.conn.execute('PRAGMA auto_vacuum=INCREMENTAL')
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(SCHEMA)
+        self.count = self.conn.execute('SELECT COUNT(*) FROM outbox').fetchone()[0]
+
+    def __len__(self):
+        return self.count
+
+    def put(self, payload: dict) -> int:
+        """Persist one payload, returns its id"""
+        with self.conn:
+            cursor = self.conn.execute(
+                'INSERT INTO outbox (payload, queued) VALUES (?, ?)',
+                (json.dumps(payload), time.time())
+            )
+        self.count += 1
+        return cursor.lastrowid
+
+    def put_many(self, payloads: Iterable[dict]) -> int:
+        """Persist several payloads in one transaction"""
+        now = time.time()
+        with self.conn:
+            cursor = self.conn.executemany(
+                'INSERT INTO outbox (payload, queued) VALUES (?, ?)',
+                ((json.dumps(payload), now) for payload in payloads)
+            )
+        self.count += cursor.rowcount
+        return cursor.rowcount
+
+    def peek(self, limit: int) -> List[Tuple[int, dict, float, int]]:
+        """Oldest entries as (id, payload, queued_at, attempts) - unreadable ones are deleted"""
+        rows = self.conn.execute(
+            'SELECT id, payload, queued, attempts FROM outbox ORDER BY id LIMIT ?', (limit,)
+        ).fetchall()
+        entries, unreadable = [], []
+        for row in rows:
+            try:
+                entries.append((row[0], json.loads(row[1]), row[2], row[3]))
+            except ValueError:
+                unreadable.append(row[0])  # could never be sent - don't let it block the outbox
+        if unreadable:
+            self.ack(unreadable)
+            self.discarded += len(unreadable)
+        return entries
+
+    def ack(self, ids: List[int]):
+        """Delete delivered (or permanently rejected) entries"""
+        if not ids:
+            return
+        with self.conn:
+            cursor = self.conn.executemany('DELETE FROM outbox WHERE id = ?', ((i,) for i in ids))
+        self.count -= cursor.rowcount
+        self.compact()
+
+    def mark_failed(self, ids: List[int]):
+        if not ids:
+            return
+        with self.conn:
+            self.conn.executemany('UPDATE outbox SET attempts = attempts + 1 WHERE id = ?', ((i,) for i in ids))
+
+    def compact(self, force: bool = False) -> bool:
+        """Give free pages left by delivered entries back to the file system"""
+        free = self.conn.execute('PRAGMA freelist_count').fetchone()[0]
+        if not free or (free < self.compact_pages and self.count and not force):
+            return False
+        # executescript steps the pragma to completion (execute() frees a single page)
+        self.conn.executescript('PRAGMA incremental_vacuum; PRAGMA wal_checkpoint(TRUNCATE);')
+        self.compactions += 1
+        return True
+
+    def size_bytes(self) -> int:
+        """Database + WAL size on disk"""
+        total = 0
+        for suffix in ('', '-wal'):
+            try:
+                total += os.path.getsize(self.path + suffix)
+            except OSError:
+                pass
+        return total
+
+    def close(self, remove_if_empty: bool = False):
+        """Close the database - with remove_if_empty, an outbox with nothing left to send is deleted"""
+        self.conn.close()
+        if remove_if_empty and not self.count:
+            for suffix in ('', '-wal', '-shm'):
+                try:
+                    os.remove(self.path + suffix)
+                except OSError:
+                    pass
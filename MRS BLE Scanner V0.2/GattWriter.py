@@ -0,0 +1,89 @@
+"""
+GATT Writer Module for MRS BLE Scanner V0.2
+Writes commands and long payloads to a characteristic in chunks that fit the
+negotiated MTU. How to write is decided once from the characteristic's
+properties - no write-without-response attempt that falls back to a second
+write with response (double latency, and the command could arrive twice)
+"""
+
+import time
+from typing import Callable
+
+WITHOUT_RESPONSE = "write-without-response"
+WITH_RESPONSE = "write"
+
+# Chunks written without response before one is written with response: the
+# peer answers a write request only after everything before it on the link,
+# so this keeps a long payload from overrunning the sensor's buffers
+SYNC_EVERY = 8
+# ATT_MTU 23 - 3 byte header, the size every device supports
+DEFAULT_CHUNK = 20
+
+
+class GattWriter:
+    """
+    Chunked writer for one characteristic of one connected client
+    write-without-response characteristics get pipelined chunks (each write
+    returns once the OS has queued it, no ATT round trip); if the
+    characteristic also takes writes with response, every sync_every-th
+    chunk and the last chunk of a multi-chunk payload wait for the peer.
+    Write-only characteristics get one acknowledged write per chunk
+    """
+
+    def __init__(self, client, characteristic, sync_every: int = SYNC_EVERY, clock: Callable = time.monotonic):
+        properties = set(characteristic.properties)
+        self.without_response = WITHOUT_RESPONSE in properties
+        self.with_response = WITH_RESPONSE in properties
+        if not (self.without_response or self.with_response):
+            raise ValueError(f"{characteristic.uuid} is not writable ({', '.join(sorted(properties))})")
+        self.client = client
+        self.characteristic = characteristic
+        self.sync_every = sync_every
+        self.clock = clock
+
+        # Stats
+        self.payloads = 0
+        self.chunks = 0
+        self.acknowledged = 0
+        self.bytes = 0
+        self.elapsed = 0.0
+
+    @property
+    def chunk_size(self) -> int:
+        """Bytes per write - read every time, some stacks report the negotiated MTU late"""
+        return getattr(self.characteristic, "max_write_without_response_size", None) or DEFAULT_CHUNK
+
+    def _acknowledge(self, index: int, count: int) -> bool:
+        """Write chunk index (1-based) of count with response?"""
+        if not self.without_response:
+            return True
+        if not self.with_response or count == 1:
+            return False
+        return index == count or (self.sync_every and index % self.sync_every == 0)
+
+    async def write(self, data: bytes) -> int:
+        """Write data in order, chunk by chunk - returns the number of chunks (raises on a failed write)"""
+        size = self.chunk_size
+        count = max(1, -(-len(data) // size))
+        started = self.clock()
+        for index in range(1, count + 1):
+            chunk = data[(index - 1) * size:index * size]
+            response = self._acknowledge(index, count)
+            await self.client.write_gatt_char(self.characteristic, chunk, response=response)
+            self.acknowledged += response
+        self.elapsed += self.clock() - started
+        self.payloads += 1
+        self.chunks += count
+        self.bytes += len(data)
+        return count
+
+    def stats(self) -> dict:
+        return {
+            "mode": "pipelined" if self.without_response else "acknowledged",
+            "chunk_size": self.chunk_size,
+            "payloads": self.payloads,
+            "chunks": self.chunks,
+            "acknowledged": self.acknowledged,
+            "bytes": self.bytes,
+            "throughput_bps": round(self.bytes / self.elapsed) if self.elapsed else None
+        }
@@ -0,0 +1,482 @@
+"""
+HTTP Forwarder Module for MRS BLE Scanner V0.2
+Posts parsed sensor readings to the NHR API without blocking BLE notifications
+"""
+
+import asyncio
+import gzip
+import json
+import logging
+import random
+import sqlite3
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional
+
+# requests is imported by HTTPForwarder itself - the queues and the outbox work
+# without it, and most sessions never forward (keeps Scanner startup fast)
+
+logger = logging.getLogger(__name__)
+
+
+# NHR API Headers (from documentation)
+NHR_HEADERS = {
+    "Content-Type": "application/json",
+    "Nietzsche-API-KEY": "NHR-IOT-SENSOR",
+    "User-Agent": "NHR-Sensor-Bridge/1.0"
+}
+
+# Status codes meaning "this endpoint does not take a JSON array body"
+ARRAY_REJECTED = (400, 404, 405, 413, 415, 422)
+
+# Client errors worth retrying - any other 4xx means the payload itself is refused
+RETRYABLE_4XX = (408, 425, 429)
+
+
+class CircuitOpen(Exception):
+    """Raised instead of a network attempt while the circuit breaker is open"""
+
+
+class CircuitBreaker:
+    """
+    Closed/open/half-open breaker over a rolling window of POST outcomes
+    Opens when the error rate or the slow-call rate in the window crosses its
+    threshold. While open nothing is sent; after open_time one probe is let
+    through (half-open) - success closes the circuit, failure reopens it for
+    twice as long (up to max_open_time)
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(self, window: int = 20, min_calls: int = 3, error_rate: float = 0.5,
+                 slow_call: float = 3.0, slow_rate: float = 0.8,
+                 open_time: float = 10.0, max_open_time: float = 300.0, clock: Callable = time.monotonic):
+        self.window = window
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.slow_call = slow_call      # seconds
+        self.slow_rate = slow_rate
+        self.open_time = open_time
+        self.max_open_time = max_open_time
+        self.clock = clock
+
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.state = self.CLOSED
+            self.calls = deque(maxlen=self.window)  # (failed, slow)
+            self.opened_at = None
+            self.open_for = self.open_time
+            self.probing = False
+            self.opens = 0
+
+    def allow(self) -> bool:
+        """May a request go out now? Moves open -> half-open once open_for has passed"""
+        with self.lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and self.clock() - self.opened_at >= self.open_for:
+                self.state = self.HALF_OPEN
+                self.probing = False
+            if self.state == self.HALF_OPEN and not self.probing:
+                self.probing = True  # exactly one probe at a time
+                return True
+            return False
+
+    def record(self, success: bool, latency: float):
+        with self.lock:
+            if self.state == self.HALF_OPEN:
+                self.probing = False
+                if success and latency < self.slow_call:
+                    self.state = self.CLOSED
+                    self.calls.clear()
+                    self.open_for = self.open_time
+                else:
+                    self._open(min(self.max_open_time, self.open_for * 2))
+                return
+
+            self.calls.append((not success, latency >= self.slow_call))
+            if self.state != self.CLOSED or len(self.calls) < self.min_calls:
+                return
+            failed = sum(1 for f, _ in self.calls if f) / len(self.calls)
+            slow = sum(1 for _, sl in self.calls if sl) / len(self.calls)
+            if failed >= self.error_rate or slow >= self.slow_rate:
+                self._open(self.open_time)
+
+    def _open(self, open_for):
+        self.state = self.OPEN
+        self.opened_at = self.clock()
+        self.open_for = open_for
+        self.opens += 1
+
+    def retry_in(self) -> float:
+        """Seconds until the next probe is allowed (0 when closed or half-open)"""
+        with self.lock:
+            if self.state != self.OPEN:
+                return 0.0
+            return max(0.0, self.opened_at + self.open_for - self.clock())
+
+
+class HTTPForwarder:
+    """
+    Handle HTTP POST to server over a pooled keep-alive session
+    Thread-safe: in fleet mode every session's DurableForwardQueue posts
+    through the same forwarder from its own executor thread. The session's
+    connection pool is shared by them; counters are updated under lock
+    """
+
+    def __init__(self, api_url, pool_size: int = 4, retries: int = 2, timeout: float = 10):
+        self.api_url = api_url
+        self.timeout = timeout
+        self.success_count = 0
+        self.error_count = 0
+        self.last_status = None
+        self.enabled = True
+        self.lock = threading.Lock()  # counters and batch_supported
+
+        # Reuse TCP/TLS connections across messages instead of one handshake per POST.
+        # Only connection failures are retried - the POST never reached the server,
+        # so a retry cannot create a duplicate reading.
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+        retry = Retry(total=retries, connect=retries, read=0, status=0, backoff_factor=0.2)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.headers.update(NHR_HEADERS)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        # Batch mode (see send_batch)
+        self.compress = False        # gzip request bodies
+        self.batch_supported = True  # cleared once the endpoint rejects an array
+        self.batch_count = 0
+
+        # Stop hitting a dead endpoint (payloads are refused locally while open)
+        self.breaker = CircuitBreaker()
+        self.short_circuited = 0
+
+    def _post(self, body):
+        """POST a JSON-serialisable body, gzipped if compress is on"""
+        if not self.breaker.allow():
+            raise CircuitOpen()
+
+        data = json.dumps(body).encode('utf-8')
+        headers = None
+        if self.compress:
+            data = gzip.compress(data, compresslevel=5)
+            headers = {"Content-Encoding": "gzip"}
+
+        start = time.perf_counter()
+        try:
+            response = self.session.post(self.api_url, data=data, headers=headers, timeout=self.timeout)
+        except Exception:
+            self.breaker.record(False, time.perf_counter() - start)
+            raise
+        # A 4xx still proves the endpoint is up
+        self.breaker.record(response.status_code < 500, time.perf_counter() - start)
+        return response
+
+    def _result(self, response, count=1):
+        """Turn a response into a result dict and update counters for count payloads"""
+        success = response.status_code in [200, 201]
+        with self.lock:
+            self.last_status = response.status_code
+            if success:
+                self.success_count += count
+            else:
+                self.error_count += count
+
+        if success:
+            return {
+                "success": True,
+                "status": response.status_code,
+                "response": response.text[:100]
+            }
+        else:
+            return {
+                "success": False,
+                "status": response.status_code,
+                "error": response.text[:200]
+            }
+
+    def _failure(self, error, count=1):
+        if isinstance(error, CircuitOpen):
+            with self.lock:
+                self.short_circuited += count
+            return {"success": False, "status": 0, "circuit_open": True,
+                    "error": f"Circuit open - server unavailable, next probe in {self.breaker.retry_in():.0f}s"}
+        with self.lock:
+            self.error_count += count
+        import requests
+        if isinstance(error, requests.exceptions.Timeout):
+            return {"success": False, "status": 0, "error": "Connection timeout"}
+        if isinstance(error, requests.exceptions.ConnectionError):
+            return {"success": False, "status": 0, "error": f"Connection failed: {str(error)[:50]}"}
+        return {"success": False, "status": 0, "error": str(error)[:100]}
+
+    def send(self, payload):
+        """Send data to server and return result"""
+        if not self.enabled:
+            return None
+
+        try:
+            return self._result(self._post(payload))
+        except Exception as e:
+            return self._failure(e)
+
+    def send_batch(self, payloads: List[dict]) -> List[Optional[dict]]:
+        """
+        Send several payloads as one POST with a JSON array body
+        Returns one result per payload. Endpoints that reject arrays are
+        remembered and get single POSTs from then on.
+        """
+        if not self.enabled:
+            return [None] * len(payloads)
+        if len(payloads) == 1 or not self.batch_supported:
+            return [self.send(payload) for payload in payloads]
+
+        try:
+            response = self._post(payloads)
+        except Exception as e:
+            return [self._failure(e, len(payloads))] * len(payloads)
+
+        if response.status_code in ARRAY_REJECTED:
+            with self.lock:
+                self.batch_supported = False
+            return [self.send(payload) for payload in payloads]
+
+        with self.lock:
+            self.batch_count += 1
+        return [self._result(response, len(payloads))] * len(payloads)
+
+    def close(self):
+        """Close pooled connections"""
+        self.session.close()
+
+
+class DurableForwardQueue:
+    """
+    Store-and-forward queue in front of HTTPForwarder
+    The BLE callback only calls submit(), which writes the payload to a
+    ForwardStore before anything is sent, so readings survive API outages
+    and restarts. One drain task runs the POSTs in a thread, sends the
+    oldest entries in order, deletes them once accepted, backs off
+    exponentially (with jitter) while the server is unreachable, and caps
+    the send rate so a large backlog does not flood the API on recovery
+    """
+
+    def __init__(self, store, forwarder: HTTPForwarder = None, on_result: Callable = None,
+                 on_retry: Callable = None, batch_size: int = 1, linger: float = 0.5,
+                 max_rate: float = 100.0, base_delay: float = 1.0, max_delay: float = 300.0):
+        self.store = store
+        self.forwarder = forwarder
+        self.on_result = on_result  # on_result(payload, result, latency_seconds)
+        self.on_retry = on_retry    # on_retry(pending, result, delay_seconds)
+        self.batch_size = batch_size
+        self.linger = linger
+        self.max_rate = max_rate    # payloads/second, None for no limit
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+        self.task = None
+        self.wakeup = None
+        self.executor = None
+        self.tokens = 0.0
+        self.token_time = 0.0
+        self.failures = 0           # consecutive failed attempts
+        self.next_retry = None
+
+        # Stats
+        self.enqueued = 0
+        self.forwarded = 0
+        self.dropped = 0            # refused by the server or not storable
+        self.retries = 0
+        self.errors = 0             # outbox / payload errors survived by the drain task
+        self.posts = 0
+        self.max_depth = len(store)
+        self.last_latency = None
+        self.avg_latency = None     # EWMA, seconds (time on disk + POST)
+        self.max_latency = 0.0
+
+    @property
+    def started(self) -> bool:
+        return self.task is not None
+
+    @property
+    def depth(self) -> int:
+        return len(self.store)
+
+    def start(self):
+        """Start the drain task (needs a running event loop) - picks up any backlog on disk"""
+        if self.started:
+            return
+        self.wakeup = asyncio.Event()
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='http-forward')
+        self.token_time = asyncio.get_running_loop().time()
+        self.tokens = self._burst()
+        self.task = asyncio.create_task(self._drain())
+        if len(self.store):
+            self.wakeup.set()
+
+    def submit(self, payload) -> bool:
+        """Persist a payload and wake the drain task"""
+        if not self.started:
+            self.start()
+        try:
+            self.store.put(payload)
+        except sqlite3.Error:
+            self.dropped += 1
+            return False
+        self.enqueued += 1
+        self.max_depth = max(self.max_depth, len(self.store))
+        self.wakeup.set()
+        return True
+
+    def _burst(self) -> float:
+        return max(float(self.batch_size), self.max_rate or 0.0)
+
+    async def _throttle(self, count: int):
+        """Token bucket: at most max_rate payloads/second, bursts up to one second's worth"""
+        if not self.max_rate:
+            return
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        self.tokens = min(self._burst(), self.tokens + (now - self.token_time) * self.max_rate)
+        self.token_time = now
+        if self.tokens < count:
+            await asyncio.sleep((count - self.tokens) / self.max_rate)
+            self.tokens = float(count)
+            self.token_time = loop.time()
+        self.tokens -= count
+
+    def backoff_delay(self) -> float:
+        """Exponential backoff with equal jitter for the current failure streak"""
+        delay = min(self.max_delay, self.base_delay * 2 ** min(self.failures - 1, 30))
+        return random.uniform(delay / 2, delay)
+
+    async def _drain(self):
+        while True:
+            forwarder = self.forwarder
+            if not len(self.store) or forwarder is None or not forwarder.enabled:
+                self.wakeup.clear()
+                try:
+                    # Also polls, so re-enabling the forwarder resumes the backlog
+                    await asyncio.wait_for(self.wakeup.wait(), 1.0)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            try:
+                await self._deliver(forwarder)
+            except Exception as e:
+                # The outbox keeps filling - one database or payload error must not end forwarding
+                self.errors += 1
+                self.failures += 1
+                delay = self.backoff_delay()
+                self.next_retry = time.time() + delay
+                logger.warning(f"Forwarding outbox error: {e} - retrying in {delay:.0f}s")
+                if self.on_retry:
+                    self.on_retry(len(self.store), None, delay)
+                await asyncio.sleep(delay)
+
+    async def _deliver(self, forwarder):
+        """Send the oldest batch, acknowledge what the server took and back off on failure"""
+        loop = asyncio.get_running_loop()
+
+        # While the circuit is open the backlog just stays on disk - no network attempts
+        breaker = getattr(forwarder, 'breaker', None)
+        wait = breaker.retry_in() if breaker else 0.0
+        if wait > 0:
+            self.next_retry = time.time() + wait
+            await asyncio.sleep(wait)
+            return
+
+        # Let a burst build up before sending a partial batch
+        if self.batch_size > 1 and len(self.store) < self.batch_size and self.linger:
+            await asyncio.sleep(self.linger)
+
+        batch = self.store.peek(max(1, self.batch_size))
+        if not batch:
+            return  # only unreadable entries, dropped by peek()
+        await self._throttle(len(batch))
+        payloads = [payload for _, payload, _, _ in batch]
+        if len(payloads) == 1:
+            results = [await loop.run_in_executor(self.executor, forwarder.send, payloads[0])]
+        else:
+            results = await loop.run_in_executor(self.executor, forwarder.send_batch, payloads)
+        self.posts += 1
+
+        done, retry, attempted = [], [], []
+        now = time.time()
+        for (row_id, payload, queued_at, _), result in zip(batch, results):
+            status = result["status"] if result else 0
+            if result and result["success"]:
+                self.forwarded += 1
+                latency = now - queued_at
+                self.last_latency = latency
+                self.max_latency = max(self.max_latency, latency)
+                self.avg_latency = latency if self.avg_latency is None else \
+                    self.avg_latency + 0.1 * (latency - self.avg_latency)
+            elif 400 <= status < 500 and status not in RETRYABLE_4XX:
+                self.dropped += 1  # the server will never take this one
+            else:
+                retry.append(row_id)
+                if not (result and result.get("circuit_open")):
+                    attempted.append(row_id)
+                continue
+            done.append(row_id)
+            if self.on_result and result:
+                self.on_result(payload, result, now - queued_at)
+
+        self.store.ack(done)
+        if not retry:
+            self.failures = 0
+            self.next_retry = None
+            return
+
+        self.store.mark_failed(attempted)
+        self.retries += len(attempted)
+        self.failures += 1
+        delay = max(self.backoff_delay(), breaker.retry_in() if breaker else 0.0)
+        self.next_retry = time.time() + delay
+        if self.on_retry:
+            failed = next(r for r in results if not (r and r["success"]))
+            self.on_retry(len(self.store), failed, delay)
+        await asyncio.sleep(delay)
+
+    async def stop(self, timeout: float = 5.0):
+        """Try to deliver the backlog for up to timeout seconds - the rest stays on disk"""
+        if not self.started:
+            return
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while len(self.store) and self.next_retry is None and self.forwarder and self.forwarder.enabled \
+                and loop.time() < deadline:
+            await asyncio.sleep(0.05)
+        self.task.cancel()
+        await asyncio.gather(self.task, return_exceptions=True)
+        self.executor.shutdown(wait=False)
+        self.task = None
+
+    def stats(self) -> dict:
+        return {
+            "depth": self.depth,
+            "max_depth": self.max_depth,
+            "enqueued": self.enqueued,
+            "forwarded": self.forwarded,
+            "dropped": self.dropped + self.store.discarded,
+            "retries": self.retries,
+            "errors": self.errors,
+            "circuit": self.forwarder.breaker.state if getattr(self.forwarder, 'breaker', None) else None,
+            "next_retry_s": round(max(0.0, self.next_retry - time.time()), 1) if self.next_retry else None,
+            "avg_batch": round(self.forwarded / self.posts, 1) if self.posts else None,
+            "avg_latency_ms": round(self.avg_latency * 1000, 1) if self.avg_latency is not None else None,
+            "max_latency_ms": round(self.max_latency * 1000, 1)
+        }
@@ -0,0 +1,174 @@
+"""
+Keyboard Input Module for MRS BLE Scanner V0.2
+Event-driven key and line input for the asyncio loop - works on Windows
+and Linux, so the loop itself never polls msvcrt.kbhit()
+  Linux/macOS: stdin in cbreak mode (termios) watched with loop.add_reader
+  Windows:     a daemon thread (msvcrt.kbhit() / getwch()) hands keys to the loop
+               and exits soon after stop()
+"""
+
+import asyncio
+import codecs
+import os
+import sys
+import threading
+
+if os.name == 'nt':
+    import msvcrt  # Windows keyboard input
+else:
+    import termios
+    import tty
+
+
+CTRL_C = '\x03'
+CTRL_P = '\x10'
+ENTER = ('\r', '\n')
+BACKSPACE = ('\x08', '\x7f')
+EOF = ''  # read_key() result once stdin is closed
+KEY_POLL = 0.05  # seconds - Windows reader checks for stop() this often while no key is waiting
+
+
+class KeyReader:
+    """Delivers keys from stdin to coroutines; start() needs a running event loop"""
+
+    def __init__(self, stream=None, out=None):
+        self.stream = stream or sys.stdin
+        self.out = out or sys.stdout
+        self.loop = None
+        self.queue = None
+        self.fd = None
+        self.saved_mode = None
+        self.thread = None
+        self.stopping = threading.Event()  # tells the Windows reader thread to exit
+        self.closed = False
+        self.last_key = None
+        self.decoder = codecs.getincrementaldecoder('utf-8')(errors='ignore')
+
+    @property
+    def started(self) -> bool:
+        return self.queue is not None
+
+    def start(self):
+        if self.started:
+            return
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue()
+        self.fd = self.stream.fileno()
+        self.stopping.clear()
+
+        if os.name == 'nt':
+            self.thread = threading.Thread(target=self._windows_reader, name='key-reader', daemon=True)
+            self.thread.start()
+            return
+
+        if os.isatty(self.fd):
+            # cbreak: keys arrive one at a time without echo, Ctrl+C still raises KeyboardInterrupt
+            self.saved_mode = termios.tcgetattr(self.fd)
+            tty.setcbreak(self.fd)
+        self.loop.add_reader(self.fd, self._on_readable)
+
+    def stop(self):
+        """Stop reading and give the terminal back in its original mode"""
+        if not self.started:
+            return
+        self.stopping.set()
+        if os.name != 'nt' and not self.closed:
+            self.loop.remove_reader(self.fd)
+        if self.saved_mode is not None:
+            termios.tcsetattr(self.fd, termios.TCSADRAIN, self.saved_mode)
+            self.saved_mode = None
+        self.queue = None
+
+    def _on_readable(self):
+        try:
+            data = os.read(self.fd, 1024)
+        except OSError:
+            data = b''
+        if not data:
+            self._close()
+            return
+        for key in self.decoder.decode(data):
+            self.queue.put_nowait(key)
+
+    def _close(self):
+        if not self.closed:
+            self.closed = True
+            if os.name != 'nt':
+                self.loop.remove_reader(self.fd)
+            self.queue.put_nowait(EOF)
+
+    def _windows_reader(self):
+        console = os.isatty(self.fd)
+        while not self.stopping.is_set():
+            if console:
+                # Never block in getwch() - a stopped reader would keep the thread and one key
+                if not msvcrt.kbhit():
+                    self.stopping.wait(KEY_POLL)
+                    continue
+                key = msvcrt.getwch()
+            else:
+                key = self.stream.read(1)
+            if not key:
+                self._deliver(self._close)
+                return
+            if key in ('\x00', '\xe0'):  # arrow/function key: skip its second code
+                msvcrt.getwch()
+                continue
+            self._deliver(self._put, key)
+
+    def _deliver(self, callback, *args):
+        """Hand a key to the loop from the reader thread - nothing after stop() or once the loop is closed"""
+        if self.stopping.is_set():
+            return
+        try:
+            self.loop.call_soon_threadsafe(callback, *args)
+        except RuntimeError:  # loop closed
+            self.stopping.set()
+
+    def _put(self, key):
+        if self.queue is not None:  # stop() may have run since the thread read the key
+            self.queue.put_nowait(key)
+
+    async def read_key(self) -> str:
+        """Wait for the next key - EOF ('') once stdin is closed"""
+        if self.closed and self.queue.empty():
+            return EOF
+        key = await self.queue.get()
+        if key == CTRL_C:  # Windows console delivers Ctrl+C as a key
+            raise KeyboardInterrupt
+        return key
+
+    async def wait_for(self, keys) -> str:
+        """Wait until one of keys (or EOF) is pressed"""
+        while True:
+            key = await self.read_key()
+            if key in keys or key == EOF:
+                return key
+
+    async def read_line(self, prompt: str = '') -> str:
+        """input() replacement that lets the event loop keep running while the user types"""
+        self.out.write(prompt)
+        self.out.flush()
+        chars = []
+        while True:
+            key = await self.read_key()
+            previous, self.last_key = self.last_key, key
+            if key == EOF:
+                if chars:
+                    break
+                raise EOFError
+            if key == '\n' and previous == '\r':
+                continue  # second half of CR LF
+            if key in ENTER:
+                break
+            if key in BACKSPACE:
+                if chars:
+                    chars.pop()
+                    self.out.write('\b \b')
+            elif key.isprintable():
+                chars.append(key)
+                self.out.write(key)
+            self.out.flush()
+        self.out.write('\n')
+        self.out.flush()
+        return ''.join(chars)
@@ -0,0 +1,122 @@
+"""
+Line Framer Module for MRS BLE Scanner V0.2
+Reassembles notification fragments into CR/LF-delimited lines: a modem trace
+line longer than the MTU (+CIPSEND: 1,26,26, the 50-digit 06 packet) arrives
+split over several notifications and has to be whole before the diagnostics
+regexes see it
+"""
+
+import asyncio
+import re
+import time
+from typing import Callable
+
+# A partial line is handed on as-is after this much silence (prompts like "> " never get a CR/LF)
+FLUSH_AFTER = 0.2
+# Longest line kept waiting for its end - beyond this the buffer is emitted as a line
+MAX_LINE = 4096
+
+_DELIMITERS = re.compile(rb"[\r\n]+")
+
+
+class LineFramer:
+    """
+    Incremental framer for one characteristic
+    feed() appends to one bytearray, looks for CR/LF only in the new bytes and
+    calls on_line(bytes) for every complete line (blank lines are dropped;
+    CR LF split across two notifications counts once). The remainder stays
+    buffered; with an event loop running, a timer flushes it after
+    flush_after seconds without new data. The timer is armed once and
+    re-armed from itself, not per notification
+    """
+
+    def __init__(self, on_line: Callable[[bytes], None], flush_after: float = FLUSH_AFTER,
+                 max_line: int = MAX_LINE, clock: Callable = time.monotonic):
+        self.on_line = on_line
+        self.flush_after = flush_after
+        self.max_line = max_line
+        self.clock = clock
+        self.buffer = bytearray()
+        self.last_data = 0.0
+        self.timer = None
+
+        # Stats
+        self.fragments = 0
+        self.lines = 0
+        self.flushed = 0          # partial lines emitted by timeout / flush()
+
+    @property
+    def pending(self) -> int:
+        """Bytes waiting for their line end"""
+        return len(self.buffer)
+
+    def feed(self, data: bytes) -> int:
+        """Add one notification - returns the number of lines emitted"""
+        self.fragments += 1
+        buffer = self.buffer
+        buffer += data
+
+        emitted = 0
+        end = max(data.rfind(b"\n"), data.rfind(b"\r"))
+        if end >= 0:
+            # Everything up to the last delimiter is complete lines - split it in one go
+            end += len(buffer) - len(data) + 1
+            on_line = self.on_line
+            for line in _DELIMITERS.split(bytes(buffer[:end])):
+                if line:
+                    on_line(line)
+                    emitted += 1
+            del buffer[:end]
+        if len(buffer) > self.max_line:
+            self.on_line(bytes(buffer))
+            buffer.clear()
+            emitted += 1
+        self.lines += emitted
+
+        if buffer:
+            self.last_data = self.clock()
+            if self.timer is None:
+                self._arm()
+        return emitted
+
+    def _arm(self):
+        if not self.flush_after:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # no event loop (tests, benchmarks) - flush() by hand
+        self.timer = loop.call_later(self.flush_after, self._expire)
+
+    def _expire(self):
+        self.timer = None
+        if not self.buffer:
+            return
+        quiet = self.clock() - self.last_data
+        if quiet >= self.flush_after:
+            self.flush()
+        else:
+            self.timer = asyncio.get_running_loop().call_later(self.flush_after - quiet, self._expire)
+
+    def flush(self) -> bool:
+        """Emit the buffered partial line now - True if there was one"""
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        if not self.buffer:
+            return False
+        line = bytes(self.buffer)
+        self.buffer.clear()
+        self.flushed += 1
+        self.lines += 1
+        self.on_line(line)
+        return True
+
+    def stats(self) -> dict:
+        return {
+            "fragments": self.fragments,
+            "lines": self.lines,
+            "flushed": self.flushed,
+            "pending": self.pending
+        }
+
@@ -0,0 +1,110 @@
+"""
+Link Supervisor Module for MRS BLE Scanner V0.2
+Brings a dropped BLE link back without restarting the tool: retries with
+jittered exponential backoff and measures how long each outage and each
+link setup took
+"""
+
+import asyncio
+import random
+import time
+from typing import Awaitable, Callable
+
+# Event names passed to on_event
+LOST = "lost"                # on_event(LOST, drops)
+RETRY = "retry"              # on_event(RETRY, attempt, delay, error)
+RECONNECTED = "reconnected"  # on_event(RECONNECTED, attempts, downtime, setup_time)
+
+
+class LinkSupervisor:
+    """
+    Reconnect loop for one link
+    link_lost() (from the BLE disconnect callback) starts a task that calls
+    resume() until it succeeds: the first attempt right away, then after
+    base_delay, 2x, 4x ... up to max_delay, each with equal jitter so a row
+    of sensors dropped together does not reconnect in lockstep
+    """
+
+    def __init__(self, resume: Callable[[], Awaitable], on_event: Callable = None,
+                 base_delay: float = 1.0, max_delay: float = 60.0, clock: Callable = time.monotonic):
+        self.resume = resume
+        self.on_event = on_event
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.clock = clock
+        self.task = None
+        self.closing = False
+        self.lost_at = None
+
+        # Stats
+        self.drops = 0
+        self.reconnects = 0
+        self.attempts = 0
+        self.last_downtime = None   # seconds from link loss to notifications flowing again
+        self.last_setup = None      # seconds of the successful resume() itself
+        self.total_downtime = 0.0
+
+    @property
+    def reconnecting(self) -> bool:
+        return self.task is not None
+
+    def _event(self, *args):
+        if self.on_event:
+            self.on_event(*args)
+
+    def link_lost(self):
+        """Start reconnecting (needs a running event loop) - ignored while closing or already at it"""
+        if self.closing or self.reconnecting:
+            return
+        self.drops += 1
+        self.lost_at = self.clock()
+        self._event(LOST, self.drops)
+        self.task = asyncio.create_task(self._run())
+
+    def backoff_delay(self, failures: int) -> float:
+        """Exponential backoff with equal jitter after `failures` failed attempts"""
+        delay = min(self.max_delay, self.base_delay * 2 ** min(failures - 1, 30))
+        return random.uniform(delay / 2, delay)
+
+    async def _run(self):
+        failures = 0
+        try:
+            while True:
+                self.attempts += 1
+                started = self.clock()
+                try:
+                    await self.resume()
+                except Exception as e:
+                    failures += 1
+                    delay = self.backoff_delay(failures)
+                    self._event(RETRY, failures, delay, e)
+                    await asyncio.sleep(delay)
+                    continue
+
+                now = self.clock()
+                self.reconnects += 1
+                self.last_setup = now - started
+                self.last_downtime = now - self.lost_at
+                self.total_downtime += self.last_downtime
+                self._event(RECONNECTED, failures + 1, self.last_downtime, self.last_setup)
+                return
+        finally:
+            self.task = None
+
+    async def stop(self):
+        """No more reconnects - call before an intentional disconnect"""
+        self.closing = True
+        if self.task is not None:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {
+            "drops": self.drops,
+            "reconnects": self.reconnects,
+            "attempts": self.attempts,
+            "reconnecting": self.reconnecting,
+            "last_downtime_s": round(self.last_downtime, 2) if self.last_downtime is not None else None,
+            "last_setup_s": round(self.last_setup, 2) if self.last_setup is not None else None,
+            "avg_downtime_s": round(self.total_downtime / self.reconnects, 2) if self.reconnects else None
+        }
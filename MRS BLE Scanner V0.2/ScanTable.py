@@ -0,0 +1,132 @@
+"""
+Scan Table Module for MRS BLE Scanner V0.2
+What the live scan knows about the devices around it: an advertisement
+filter (name prefix / service UUID) applied before anything else, RSSI
+smoothed per device and ranked strongest first, and the conditions that end
+a scan early (expected number of sensors found, a sensor close enough)
+"""
+
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional
+
+# Weight of the newest advertisement in the smoothed RSSI (exponential moving average)
+RSSI_SMOOTHING = 0.3
+# Adverts needed before a device's smoothed RSSI may end the scan (one strong packet is noise)
+MIN_ADVERTS_FOR_STOP = 3
+
+
+class AdvertFilter:
+    """
+    Which advertisements are worth keeping
+    A device passes if its name starts with one of name_prefixes or it
+    advertises one of service_uuids. No prefixes and no UUIDs = everything
+    """
+
+    def __init__(self, name_prefixes: Iterable[str] = (), service_uuids: Iterable[str] = ()):
+        self.name_prefixes = tuple(name_prefixes)
+        self.service_uuids = [uuid.lower() for uuid in service_uuids]
+
+    @property
+    def accepts_all(self) -> bool:
+        return not self.name_prefixes and not self.service_uuids
+
+    @property
+    def scanner_uuids(self) -> Optional[List[str]]:
+        """UUIDs the OS can filter on (BleakScanner service_uuids) - only safe when no name rule is set"""
+        return self.service_uuids if self.service_uuids and not self.name_prefixes else None
+
+    def matches(self, name: Optional[str], service_uuids: Iterable[str] = ()) -> bool:
+        if self.accepts_all:
+            return True
+        if name and name.startswith(self.name_prefixes):
+            return True
+        return any(uuid.lower() in self.service_uuids for uuid in service_uuids or ())
+
+
+@dataclass
+class ScanEntry:
+    """One device in the scan table"""
+    address: str
+    device: object
+    name: Optional[str]
+    rssi: float               # smoothed
+    last_rssi: int
+    adverts: int = 1
+    first_seen: float = 0.0   # seconds since the scan started
+
+
+class ScanTable:
+    """
+    Devices that passed the filter, keyed by address
+    update() runs for every advertisement, so it does one dict lookup and a
+    little arithmetic; ranking only happens when the table is drawn.
+    stop_reason is set once expected sensors are in the table or a sensor's
+    smoothed RSSI reaches stop_rssi
+    """
+
+    def __init__(self, advert_filter: AdvertFilter = None, expected: int = None, stop_rssi: int = None,
+                 alpha: float = RSSI_SMOOTHING, clock: Callable = time.monotonic):
+        self.filter = advert_filter or AdvertFilter()
+        self.expected = expected
+        self.stop_rssi = stop_rssi
+        self.alpha = alpha
+        self.clock = clock
+        self.started = clock()
+        self.entries: Dict[str, ScanEntry] = {}
+        self.stop_reason = None
+
+        # Stats
+        self.adverts = 0
+        self.filtered = 0
+        self.first_match = None   # seconds from scan start to the first device kept
+
+    def __len__(self):
+        return len(self.entries)
+
+    def update(self, address: str, device, name: Optional[str], rssi: int,
+               service_uuids: Iterable[str] = ()) -> Optional[ScanEntry]:
+        """Record an advertisement - returns the entry, or None if the filter rejected it"""
+        self.adverts += 1
+        key = address.upper()
+        entry = self.entries.get(key)
+        if entry is None:
+            if not self.filter.matches(name, service_uuids):
+                self.filtered += 1
+                return None
+            elapsed = self.clock() - self.started
+            entry = ScanEntry(address=address, device=device, name=name, rssi=float(rssi), last_rssi=rssi,
+                              first_seen=elapsed)
+            self.entries[key] = entry
+            if self.first_match is None:
+                self.first_match = elapsed
+        else:
+            entry.device = device
+            entry.name = name or entry.name
+            entry.rssi += self.alpha * (rssi - entry.rssi)
+            entry.last_rssi = rssi
+            entry.adverts += 1
+        self._check_stop(entry)
+        return entry
+
+    def _check_stop(self, entry: ScanEntry):
+        if self.stop_reason:
+            return
+        if self.expected and len(self.entries) >= self.expected:
+            self.stop_reason = f"{len(self.entries)} of {self.expected} expected device(s) found"
+        elif (self.stop_rssi is not None and entry.adverts >= MIN_ADVERTS_FOR_STOP
+              and entry.rssi >= self.stop_rssi):
+            self.stop_reason = f"{entry.name or entry.address} within range ({entry.rssi:.0f} dBm)"
+
+    def ranked(self) -> List[ScanEntry]:
+        """Strongest (smoothed) signal first"""
+        return sorted(self.entries.values(), key=lambda entry: entry.rssi, reverse=True)
+
+    def stats(self) -> dict:
+        return {
+            "devices": len(self.entries),
+            "adverts": self.adverts,
+            "filtered": self.filtered,
+            "first_match_s": round(self.first_match, 2) if self.first_match is not None else None,
+            "stop_reason": self.stop_reason
+        }
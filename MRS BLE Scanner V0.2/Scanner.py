@@ -1,29 +1,52 @@
 import subprocess
 import sys
 import os
+import importlib.util
+
+# --simulate / MRS_SIMULATOR: simulated sensors stand in for Bluetooth (SensorSimulator.py)
+SIMULATE = bool(os.environ.get("MRS_SIMULATOR")) or any(arg.split("=", 1)[0] == "--simulate" for arg in sys.argv[1:])
 
 # Auto-install required packages
 def install_packages():
-    required = ['bleak', 'requests', 'reportlab']
+    # find_spec only looks for the package - importing reportlab/requests here
+    # would cost most of the startup time even when nothing is missing
+    required = ['requests', 'reportlab'] if SIMULATE else ['bleak', 'requests', 'reportlab']
     for package in required:
-        try:
-            __import__(package)
-        except ImportError:
+        if importlib.util.find_spec(package) is None:
             print(f"[SETUP] Installing {package}...")
             subprocess.check_call([sys.executable, '-m', 'pip', 'install', package, '-q'])
             print(f"[SETUP] {package} installed!")
 
-install_packages()
+# --no-install: packages are managed by the deployment (service installs)
+if "--no-install" not in sys.argv:
+    install_packages()
 
+import argparse
 import asyncio
 import re
-import requests
-from bleak import BleakClient, BleakScanner
-from datetime import datetime
+import signal
+import time
+if SIMULATE:
+    from SensorSimulator import BleakClient, BleakScanner
+else:
+    from bleak import BleakClient, BleakScanner
+from datetime import datetime, timedelta
 import logging
-import msvcrt  # Windows keyboard input
 from NetworkDiagnostics import NetworkDiagnostics, DiagnosticResult
-from PDFReportGenerator import PDFReportGenerator
+from HTTPForwarder import HTTPForwarder, DurableForwardQueue, NHR_HEADERS
+from ForwardStore import ForwardStore
+from SensorParser import WastebinDataParser
+from ConsoleRenderer import ConsoleRenderer, LOG, READING, ESSENTIAL
+from KeyboardInput import KeyReader, CTRL_P, ENTER, EOF
+from DeviceFleet import DeviceFleet, parse_selection, MAX_CONNECTIONS, CONNECTED, FAILED
+from DiagnosticSweep import DiagnosticSweep, SWEEP_COMMANDS, SEQUENCE_TIMEOUT, write_summary
+from LinkSupervisor import LinkSupervisor, LOST, RETRY, RECONNECTED
+from DeviceRegistry import DeviceRegistry, DeviceProfile
+from ScanTable import AdvertFilter, ScanTable
+from CommandEngine import CommandEngine, load_script, run_script, TIMEOUT
+from GattWriter import GattWriter
+from LineFramer import LineFramer
+from SessionCapture import CaptureWriter, CaptureReader, play, RX, TX, LINK
 
 # Setup logging
 logging.basicConfig(level=logging.WARNING)
@@ -32,12 +55,44 @@ logger = logging.getLogger(__name__)
 # Nordic UART Service UUIDs (preferred for commands)
 UART_RX_CHAR_UUID = "6e400002-b5a3-f393-e0a9-e50e24dcca9e"
 
-# NHR API Headers (from documentation)
-NHR_HEADERS = {
-    "Content-Type": "application/json",
-    "Nietzsche-API-KEY": "NHR-IOT-SENSOR",
-    "User-Agent": "NHR-Sensor-Bridge/1.0"
-}
+# Dustbin sensors advertise with this in their name
+DUSTBIN_NAME = "N_01E1_N6BR1"
+
+# Per-attempt connect timeout when bringing a dropped link back (backoff runs between attempts)
+RECONNECT_TIMEOUT = 10.0
+
+# Sensors seen before: GATT profile, IMEI, last RSSI/seen - listed at the top of every scan
+REGISTRY_PATH = "devices.json"
+KNOWN_DEVICES_SHOWN = 20
+KNOWN_DEVICE_AGE = 30 * 24 * 3600  # seconds
+
+# Scan length, and the limit when waiting for a number of sensors or one held close
+SCAN_SECONDS = 5
+SCAN_SECONDS_WAITING = 30
+NEAR_RSSI = -50             # dBm (smoothed) - "near" scan stops at the first sensor this strong
+LIVE_ROWS = 15              # devices drawn in the live table (the final list has all)
+SCAN_REDRAW_INTERVAL = 0.25
+
+# Headless mode: how long to look for --address/--name-match
+HEADLESS_SCAN_SECONDS = 30
+
+# HTTP batch mode: readings per POST and max wait after the first one (seconds)
+BATCH_SIZE = 20
+BATCH_LINGER = 0.5
+
+# Readings waiting for the HTTP server are kept here across outages and restarts
+OUTBOX_PATH = "outbox.db"
+
+
+def imei_from_name(name):
+    """IMEI from a sensor name ending in its last 6 digits (N_XXXX_XXXXX_XXXXXX), else None"""
+    match = re.search(r'_(\d{6})$', name or "")
+    return "351469520" + match.group(1) if match else None
+
+
+def fleet_outbox_path(address):
+    """Fleet mode: one outbox per device, so each session has its own queue"""
+    return f"outbox-{address.replace(':', '').replace('-', '').lower()}.db"
 
 # ANSI Colors for professional output
 class Colors:
@@ -71,123 +126,20 @@ def print_header():
     print()
 
 
-class WastebinDataParser:
-    """Parse wastebin sensor data and convert to NHR API format"""
-    
-    @staticmethod
-    def parse_sensor_string(raw_str, device_imei="000000000000000"):
-        """
-        Parse sensor data string and return JSON payload for HTTP POST
-        Expected format: temp:24.25 ,fill:76 ,batt:3.2
-        Or fallback: temp:24.25 ,x:0.29 ,y:-88.43 ,z=-0.01
-        """
-        payload = {
-            "cmd": "RP",
-            "device": device_imei,
-            "battery": "0",
-            "time": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-            "dIndex": "0410",
-            "data": "0"
-        }
-        
-        try:
-            # Try to parse fill level
-            fill_match = re.search(r'fill[:\s]*(\d+)', raw_str, re.IGNORECASE)
-            if fill_match:
-                payload["data"] = fill_match.group(1)
-            
-            # Try to parse temperature
-            temp_match = re.search(r'temp[:\s]*([\d.]+)', raw_str, re.IGNORECASE)
-            if temp_match:
-                payload["temperature"] = temp_match.group(1)
-            
-            # Try to parse battery
-            batt_match = re.search(r'batt[:\s]*([\d.]+)', raw_str, re.IGNORECASE)
-            if batt_match:
-                payload["battery"] = batt_match.group(1)
-            
-            # For tilt sensors (x, y, z) - calculate fill level from tilt
-            x_match = re.search(r'x[:\s]*([-\d.]+)', raw_str, re.IGNORECASE)
-            y_match = re.search(r'y[:\s]*([-\d.]+)', raw_str, re.IGNORECASE)
-            z_match = re.search(r'z[:\s]*([-\d.]+)', raw_str, re.IGNORECASE)
-            
-            if y_match and not fill_match:
-                # Y-axis close to -90 means upright/empty, close to 0 means tilted/full
-                y_val = abs(float(y_match.group(1)))
-                # Convert tilt to fill percentage (rough estimate)
-                if y_val > 80:
-                    fill_pct = min(100, int((90 - y_val) * 10))
-                else:
-                    fill_pct = min(100, int(100 - y_val))
-                payload["data"] = str(max(0, fill_pct))
-                payload["tilt_y"] = y_match.group(1)
-            
-            if x_match:
-                payload["tilt_x"] = x_match.group(1)
-            if z_match:
-                payload["tilt_z"] = z_match.group(1)
-                
-        except Exception as e:
-            logger.warning(f"Parse error: {e}")
-        
-        return payload
-
-
-class HTTPForwarder:
-    """Handle HTTP POST to server"""
-    
-    def __init__(self, api_url):
-        self.api_url = api_url
-        self.success_count = 0
-        self.error_count = 0
-        self.last_status = None
-        self.enabled = True
-        
-    def send(self, payload):
-        """Send data to server and return result"""
-        if not self.enabled:
-            return None
-            
-        try:
-            response = requests.post(
-                self.api_url,
-                json=payload,
-                headers=NHR_HEADERS,
-                timeout=10
-            )
-            
-            self.last_status = response.status_code
-            
-            if response.status_code in [200, 201]:
-                self.success_count += 1
-                return {
-                    "success": True,
-                    "status": response.status_code,
-                    "response": response.text[:100]
-                }
-            else:
-                self.error_count += 1
-                return {
-                    "success": False,
-                    "status": response.status_code,
-                    "error": response.text[:200]
-                }
-                
-        except requests.exceptions.Timeout:
-            self.error_count += 1
-            return {"success": False, "status": 0, "error": "Connection timeout"}
-        except requests.exceptions.ConnectionError as e:
-            self.error_count += 1
-            return {"success": False, "status": 0, "error": f"Connection failed: {str(e)[:50]}"}
-        except Exception as e:
-            self.error_count += 1
-            return {"success": False, "status": 0, "error": str(e)[:100]}
+class StaleProfile(Exception):
+    """The link came up but a saved characteristic could not be used - the GATT profile is out of date"""
 
 
 class BLEScanner:
     """Main BLE Scanner Tool with Auto Diagnostics"""
     
-    def __init__(self):
+    # Fleet mode: one color per session tag in the shared console
+    TAG_COLORS = [Colors.CYAN, Colors.GREEN, Colors.YELLOW, Colors.BLUE, Colors.HEADER]
+    
+    def __init__(self, keys=None, console=None, outbox_path=OUTBOX_PATH, tag=None, registry=None):
+        self.tag = tag  # "B1", "B2", ... in fleet mode - compact output into a shared console
+        self.tag_color = self.TAG_COLORS[(int(tag[1:]) - 1) % len(self.TAG_COLORS)] if tag else ""
+        self.last_line = ""
         self.client = None
         self.device = None
         self.message_count = 0
@@ -196,74 +148,220 @@ class BLEScanner:
         self.write_chars = []
         self.notify_chars = []
         self.primary_write_char = None
+        # Resolved on the first connect and reused when the link comes back
+        self.subscribed = []        # notify characteristics that were enabled
+        self.resume_services = []   # services holding them and the write characteristic
+        self.registry = registry    # DeviceRegistry - GATT profiles saved across runs
+        self.link_ready = False     # reconnect only links that were fully set up
         self.add_crlf = True
         
-        # HTTP forwarding
+        # HTTP forwarding (readings go to the on-disk outbox, POSTs run off the BLE callback)
         self.http_forwarder = None
+        self.outbox_path = outbox_path
+        self.forward_queue = None   # opened by enable_forwarding() - no outbox file without forwarding
+        self.batch_size = 1
         self.device_imei = "000000000000000"
         self.parser = WastebinDataParser()
         
+        # Receive-mode output is drawn by a rate-limited render task, not the BLE callback
+        self.console = console or ConsoleRenderer(summary=self.render_skipped)
+        # Keys and menu input arrive as events on the loop (Windows and Linux)
+        self.keys = keys or KeyReader()
+        
         # Network Diagnostics
         self.diagnostics = NetworkDiagnostics()
-        self.pdf_generator = PDFReportGenerator()
+        self._pdf_generator = None  # created with the first report (reportlab is slow to import)
         self.test_packet_active = False
         self.test_packet_start_time = None
         self.auto_report_enabled = True  # Auto-generate reports after TEST_PACKET
+        self.sequence_done = asyncio.Event()  # set at the end of each TEST_PACKET sequence
+        self.report_task = None               # latest auto-report
+        
+        # Commands that wait for the sensor's answer (fed every received line)
+        self.engine = CommandEngine(self.send_command)
+        # Chunked writer per write characteristic (rebuilt for each new client)
+        self.writers = {}
+        # Notification fragments -> whole lines, per notify characteristic
+        self.framers = {}
+        # Binary record of the session (--capture) and the clock for receive timestamps (a replay uses the capture's)
+        self.capture = None
+        self.clock = datetime.now
         
+        # Dropped links are brought back with backoff instead of silently going quiet
+        self.link = LinkSupervisor(self.resume, on_event=self.on_link_event)
+        
+    @property
+    def pdf_generator(self):
+        if self._pdf_generator is None:
+            from PDFReportGenerator import PDFReportGenerator
+            self._pdf_generator = PDFReportGenerator()
+        return self._pdf_generator
+    
     def notification_handler(self, sender, data):
-        """Handle incoming BLE data"""
+        """Handle incoming BLE data - fragments are reassembled into lines first"""
         if not data:
             return
-        
+        key = getattr(sender, "uuid", sender)
+        if self.capture:
+            self.capture.rx(key, data)
+        framer = self.framers.get(key)
+        if framer is None:
+            framer = self.framers[key] = LineFramer(self.handle_line)
+        framer.feed(data)
+    
+    def handle_line(self, data):
+        """Handle one received line"""
         self.message_count += 1
-        timestamp = datetime.now().strftime('%H:%M:%S.%f')[:-3]
+        now = self.clock()
+        timestamp = now.strftime('%H:%M:%S.%f')[:-3]
         raw_str = data.decode('utf-8', errors='ignore').strip()
+        if raw_str:
+            self.last_line = raw_str
         
         # Add to diagnostics log buffer
         self.diagnostics.add_log(timestamp, raw_str)
+        self.engine.feed(raw_str)
         
         # Detect TEST_PACKET command
         if 'TEST_PACKET' in raw_str or 'try to send 06 packet' in raw_str:
             self.test_packet_active = True
-            self.test_packet_start_time = datetime.now()
+            self.test_packet_start_time = now
             if not self.command_mode:
-                print(f"\n{Colors.YELLOW}[DIAGNOSTIC] TEST_PACKET detected - monitoring sequence...{Colors.RESET}")
+                self.console.post(self.render_notice, f"\n{self.label}[DIAGNOSTIC] TEST_PACKET detected - monitoring sequence...",
+                                  Colors.YELLOW, level=ESSENTIAL)
         
         # Detect end of TEST_PACKET sequence
         if self.test_packet_active and self.diagnostics.detect_test_packet_end(raw_str):
             if not self.command_mode:
-                print(f"{Colors.YELLOW}[DIAGNOSTIC] Sequence complete - analyzing logs...{Colors.RESET}")
+                self.console.post(self.render_notice, f"{self.label}[DIAGNOSTIC] Sequence complete - analyzing logs...",
+                                  Colors.YELLOW, level=ESSENTIAL)
             
             # Generate report automatically
             if self.auto_report_enabled:
-                asyncio.create_task(self.generate_diagnostic_report())
+                self.report_task = asyncio.create_task(self.generate_diagnostic_report())
             
             self.test_packet_active = False
+            self.sequence_done.set()
         
         if not self.command_mode:
-            print(f"\n{Colors.CYAN}{'=' * 72}{Colors.RESET}")
-            print(f"{Colors.GREEN}[RX #{self.message_count:04d}]{Colors.RESET} | {Colors.DIM}{timestamp}{Colors.RESET}")
-            print(f"{Colors.CYAN}{'-' * 72}{Colors.RESET}")
-            
-            if raw_str:
-                print(f"  {Colors.YELLOW}DATA:{Colors.RESET} {raw_str[:60]}")
-            print(f"  {Colors.YELLOW}HEX: {Colors.RESET} {data.hex()[:50]}")
+            reading = self.parser.read(raw_str, self.device_imei)
+            if self.tag:
+                self.console.post(self.render_fleet_rx, self.tag, self.tag_color, timestamp, raw_str,
+                                  level=READING if reading else LOG)
+            else:
+                self.console.post(self.render_rx, self.message_count, timestamp, raw_str, data,
+                                  level=READING if reading else LOG)
             
-            # HTTP POST if enabled
+            # HTTP POST if enabled (queued - result is printed by on_forward_result)
             if self.http_forwarder and self.http_forwarder.enabled:
-                payload = self.parser.parse_sensor_string(raw_str, self.device_imei)
-                result = self.http_forwarder.send(payload)
-                
-                if result:
-                    if result["success"]:
-                        print(f"\n  {Colors.GREEN}[HTTP 200]{Colors.RESET} Sent to server")
-                        print(f"  {Colors.DIM}Payload: {payload}{Colors.RESET}")
-                    else:
-                        print(f"\n  {Colors.RED}[HTTP {result['status']}]{Colors.RESET} {result['error']}")
+                payload = self.parser.to_payload(reading, self.device_imei)
+                if not self.forward_queue.submit(payload):
+                    self.console.post(self.render_notice, f"  {self.label}[HTTP] Could not queue reading (outbox write failed)",
+                                      Colors.RED, level=ESSENTIAL)
                         
         else:
             # Compact mode
-            print(f"{Colors.DIM}[{timestamp}] {raw_str[:50]}{Colors.RESET}")
+            self.console.post(self.render_compact, timestamp, raw_str)
+    
+    @staticmethod
+    def render_rx(count, timestamp, raw_str, data):
+        lines = [
+            f"\n{Colors.CYAN}{'=' * 72}{Colors.RESET}",
+            f"{Colors.GREEN}[RX #{count:04d}]{Colors.RESET} | {Colors.DIM}{timestamp}{Colors.RESET}",
+            f"{Colors.CYAN}{'-' * 72}{Colors.RESET}"
+        ]
+        if raw_str:
+            lines.append(f"  {Colors.YELLOW}DATA:{Colors.RESET} {raw_str[:60]}")
+        lines.append(f"  {Colors.YELLOW}HEX: {Colors.RESET} {data[:25].hex()}")
+        return '\n'.join(lines) + '\n'
+    
+    @staticmethod
+    def render_fleet_rx(tag, color, timestamp, raw_str):
+        return f"{color}{tag:<3}{Colors.RESET} {Colors.DIM}{timestamp}{Colors.RESET} | {raw_str[:60]}\n"
+    
+    @property
+    def label(self):
+        """Prefix for messages from this session ("[B2] " in fleet mode)"""
+        return f"[{self.tag}] " if self.tag else ""
+    
+    @staticmethod
+    def render_compact(timestamp, raw_str):
+        return f"{Colors.DIM}[{timestamp}] {raw_str[:50]}{Colors.RESET}\n"
+    
+    @staticmethod
+    def render_notice(text, color):
+        return f"{color}{text}{Colors.RESET}\n"
+    
+    @staticmethod
+    def render_skipped(count):
+        return f"\n{Colors.DIM}  ... +{count} messages (console catching up){Colors.RESET}\n"
+    
+    def enable_forwarding(self, forwarder):
+        """Use forwarder for HTTP POSTs - opens the outbox (with any backlog) and starts its drain task"""
+        if self.forward_queue is None:
+            self.forward_queue = DurableForwardQueue(ForwardStore(self.outbox_path), on_result=self.on_forward_result,
+                                                     on_retry=self.on_forward_retry, batch_size=self.batch_size,
+                                                     linger=BATCH_LINGER)
+        self.http_forwarder = forwarder
+        self.http_forwarder.compress = self.batch_size > 1
+        self.forward_queue.forwarder = forwarder
+        self.forward_queue.start()
+    
+    def set_batch_mode(self, enabled):
+        """Coalesce bursts into JSON-array POSTs (falls back to single POSTs if rejected)"""
+        self.batch_size = BATCH_SIZE if enabled else 1
+        if self.forward_queue:
+            self.forward_queue.batch_size = self.batch_size
+        if self.http_forwarder:
+            self.http_forwarder.compress = enabled
+    
+    def on_forward_result(self, payload, result, latency):
+        """Called by a forward worker when a POST finishes"""
+        if self.command_mode:
+            return
+        if result["success"]:
+            if self.tag:
+                self.console.post(self.render_notice, f"{self.tag:<3} [HTTP {result['status']}] sent "
+                                  f"({latency * 1000:.0f} ms)", Colors.DIM)
+            else:
+                self.console.post(self.render_forward_ok, payload, result["status"], latency)
+        else:
+            self.console.post(self.render_notice, f"\n  {self.label}[HTTP {result['status']}] {result['error']}",
+                              Colors.RED, level=ESSENTIAL)
+    
+    @staticmethod
+    def render_forward_ok(payload, status, latency):
+        return (f"\n  {Colors.GREEN}[HTTP {status}]{Colors.RESET} Sent to server "
+                f"{Colors.DIM}({latency * 1000:.0f} ms){Colors.RESET}\n"
+                f"  {Colors.DIM}Payload: {payload}{Colors.RESET}\n")
+    
+    def on_forward_retry(self, pending, result, delay):
+        """Called by the drain task when a POST fails - readings stay in the outbox"""
+        if self.command_mode:
+            return
+        self.console.post(self.render_notice,
+                          f"\n  {self.label}[HTTP {result['status'] if result else 0}] "
+                          f"{result['error'] if result else 'Not sent'} - {pending} reading(s) kept, "
+                          f"retry in {delay:.0f}s", Colors.YELLOW, level=ESSENTIAL)
+    
+    def print_forward_stats(self, indent="  "):
+        """Print HTTP forwarding counters and queue stats"""
+        stats = self.forward_queue.stats()
+        print(f"{indent}Success: {self.http_forwarder.success_count}")
+        print(f"{indent}Errors: {self.http_forwarder.error_count}")
+        print(f"{indent}Outbox: {stats['depth']} waiting (max {stats['max_depth']}), {stats['dropped']} dropped")
+        if stats['errors']:
+            print(f"{indent}Outbox errors: {Colors.RED}{stats['errors']}{Colors.RESET} (forwarding retried)")
+        if stats['circuit'] not in (None, "closed"):
+            print(f"{indent}Circuit: {Colors.RED}{stats['circuit'].upper()}{Colors.RESET} - "
+                  f"{self.http_forwarder.short_circuited} readings held back without a network attempt")
+        if stats['next_retry_s'] is not None:
+            print(f"{indent}Retrying: {stats['retries']} failed sends, next attempt in {stats['next_retry_s']}s")
+        if self.batch_size > 1 and stats['avg_batch'] is not None:
+            fallback = '' if self.http_forwarder.batch_supported else ' (endpoint rejects arrays - single POSTs)'
+            print(f"{indent}Batching: {stats['avg_batch']} readings/POST{fallback}")
+        if stats['avg_latency_ms'] is not None:
+            print(f"{indent}Latency: {stats['avg_latency_ms']} ms avg, {stats['max_latency_ms']} ms max")
     
     async def generate_diagnostic_report(self):
         """Generate PDF diagnostic report"""
@@ -292,7 +390,7 @@ class BLEScanner:
             
             # Print notification
             print(f"\n{Colors.GREEN}{'=' * 72}{Colors.RESET}")
-            print(f"{Colors.GREEN}[REPORT GENERATED] {report_id}{Colors.RESET}")
+            print(f"{Colors.GREEN}{self.label}[REPORT GENERATED] {report_id}{Colors.RESET}")
             print(f"{Colors.CYAN}{'=' * 72}{Colors.RESET}")
             print(f"  Status: {result.overall_status}")
             if result.failure_layer:
@@ -308,10 +406,42 @@ class BLEScanner:
             traceback.print_exc()
             print()
             
+    async def run_diagnostic(self, commands=SWEEP_COMMANDS, timeout=SEQUENCE_TIMEOUT):
+        """
+        Send commands (each once the previous one is answered), wait for the TEST_PACKET sequence to end
+        Returns (DiagnosticResult, completed) - completed is False after a timeout;
+        the caller writes the report
+        """
+        self.auto_report_enabled = False
+        self.sequence_done.clear()
+        for command in commands:
+            await self.engine.request(command)  # an unanswered command still runs into the sequence timeout
+        
+        try:
+            await asyncio.wait_for(self.sequence_done.wait(), timeout=timeout)
+            completed = True
+        except asyncio.TimeoutError:
+            completed = False
+        
+        # Small delay to ensure all logs are captured (as for the auto-report)
+        await asyncio.sleep(2)
+        return self.diagnostics.analyze_logs(self.device_imei), completed
+    
+    def print_response(self, response):
+        """One line for the answer to a command sent with the engine"""
+        if response.status == TIMEOUT:
+            print(f"{Colors.YELLOW}{self.label}[NO RESPONSE] {response.command} - nothing conclusive within "
+                  f"{self.engine.timeout:.0f}s ({len(response.lines)} line(s)){Colors.RESET}")
+            return
+        color = Colors.GREEN if response.ok else Colors.RED
+        answer = f" - {response.terminator}" if response.terminator else ""
+        print(f"{color}{self.label}[RESPONSE] {response.command}: {response.status} in {response.elapsed:.2f}s"
+              f"{answer}{Colors.RESET}")
+    
     async def send_command(self, command, char_uuid=None):
         """Send command to BLE device"""
         if not self.client or not self.client.is_connected:
-            print(f"{Colors.RED}[ERROR] Not connected{Colors.RESET}")
+            print(f"{Colors.RED}{self.label}[ERROR] Not connected{Colors.RESET}")
             return False
         
         target_char = char_uuid or self.primary_write_char
@@ -326,48 +456,89 @@ class BLEScanner:
             else:
                 cmd_bytes = command.encode('utf-8')
             
-            try:
-                await self.client.write_gatt_char(target_char, cmd_bytes, response=False)
-            except:
-                await self.client.write_gatt_char(target_char, cmd_bytes, response=True)
+            await self.writer_for(target_char).write(cmd_bytes)
+            if self.capture:
+                self.capture.tx(target_char, cmd_bytes)
             
-            print(f"{Colors.GREEN}[TX] {command}{Colors.RESET}")
+            print(f"{Colors.GREEN}{self.label}[TX] {command}{Colors.RESET}")
             return True
         except Exception as e:
-            print(f"{Colors.RED}[ERROR] Send failed: {e}{Colors.RESET}")
+            print(f"{Colors.RED}{self.label}[ERROR] Send failed: {e}{Colors.RESET}")
             return False
     
+    def writer_for(self, char_uuid):
+        """GattWriter for a characteristic of the current client - write mode taken from its properties once"""
+        writer = self.writers.get(char_uuid)
+        if writer is None or writer.client is not self.client:
+            characteristic = self.client.services.get_characteristic(char_uuid)
+            if characteristic is None:
+                raise ValueError(f"Characteristic {char_uuid} not found")
+            writer = GattWriter(self.client, characteristic)
+            self.writers[char_uuid] = writer
+        return writer
+    
     async def connect(self, device_info):
         """Connect to selected BLE device"""
         address = device_info.address
         name = device_info.name or "Unknown"
         
-        print(f"\n{Colors.YELLOW}[CONNECTING] {name} ({address})...{Colors.RESET}")
+        verbose = self.tag is None  # fleet sessions print one line per device
+        
+        print(f"\n{Colors.YELLOW}{self.label}[CONNECTING] {name} ({address})...{Colors.RESET}")
         
-        self.client = BleakClient(address, timeout=30.0)
+        profile = self.registry.get(address) if self.registry is not None else None
+        if profile and profile.has_gatt:
+            try:
+                await self.connect_cached(device_info, profile)
+                self.record_link("connected")
+                return
+            except StaleProfile as e:
+                # The link came up but the saved characteristics are gone (firmware update etc.)
+                print(f"{Colors.YELLOW}{self.label}[PROFILE] Saved GATT profile did not work ({e}) - "
+                      f"discovering services{Colors.RESET}")
+                self.registry.forget_gatt(address)
+            except Exception as e:
+                # Connect failed (timeout, out of range) - says nothing about the profile, keep it
+                print(f"{Colors.YELLOW}{self.label}[PROFILE] Connect failed ({str(e) or type(e).__name__}) - "
+                      f"retrying with service discovery{Colors.RESET}")
+            if self.client and self.client.is_connected:
+                await self.client.disconnect()
+        
+        self.write_chars = []
+        self.notify_chars = []
+        self.subscribed = []
+        self.primary_write_char = None
+        
+        self.client = BleakClient(address, disconnected_callback=self.on_link_lost, timeout=30.0)
         await self.client.connect()
         
-        print(f"{Colors.GREEN}[CONNECTED] Successfully connected{Colors.RESET}")
+        if verbose:
+            print(f"{Colors.GREEN}[CONNECTED] Successfully connected{Colors.RESET}")
         
         # Try to extract IMEI from device name (format: N_XXXX_XXXXX_XXXXXX)
-        if name:
-            imei_match = re.search(r'_(\d{6})$', name)
-            if imei_match:
-                self.device_imei = "351469520" + imei_match.group(1)
+        imei = imei_from_name(name)
+        if imei:
+            self.device_imei = imei
+            if verbose:
                 print(f"{Colors.DIM}  Extracted IMEI: {self.device_imei}{Colors.RESET}")
         
         # Discover services
-        print(f"\n{Colors.CYAN}[SERVICES] Discovering...{Colors.RESET}")
-        print(f"{'-' * 72}")
+        if verbose:
+            print(f"\n{Colors.CYAN}[SERVICES] Discovering...{Colors.RESET}")
+            print(f"{'-' * 72}")
         
+        char_services = {}
         for service in self.client.services:
-            print(f"\n  {Colors.BOLD}Service: {service.uuid}{Colors.RESET}")
-            if service.description:
-                print(f"  {Colors.DIM}{service.description}{Colors.RESET}")
+            if verbose:
+                print(f"\n  {Colors.BOLD}Service: {service.uuid}{Colors.RESET}")
+                if service.description:
+                    print(f"  {Colors.DIM}{service.description}{Colors.RESET}")
             
             for char in service.characteristics:
-                props = ', '.join(char.properties)
-                print(f"    {Colors.DIM}|-- {char.uuid} ({props}){Colors.RESET}")
+                char_services[char.uuid] = service.uuid
+                if verbose:
+                    props = ', '.join(char.properties)
+                    print(f"    {Colors.DIM}|-- {char.uuid} ({props}){Colors.RESET}")
                 
                 if 'notify' in char.properties or 'indicate' in char.properties:
                     self.notify_chars.append(char.uuid)
@@ -384,29 +555,152 @@ class BLEScanner:
                     self.primary_write_char = char
                     break
         
-        print(f"{'-' * 72}")
-        
-        # Enable notifications
-        print(f"\n{Colors.YELLOW}[NOTIFICATIONS] Enabling...{Colors.RESET}")
+        if verbose:
+            print(f"{'-' * 72}")
+            
+            # Enable notifications
+            print(f"\n{Colors.YELLOW}[NOTIFICATIONS] Enabling...{Colors.RESET}")
         enabled_count = 0
         
         for char_uuid in self.notify_chars:
             try:
                 await self.client.start_notify(char_uuid, self.notification_handler)
-                print(f"  {Colors.GREEN}[OK]{Colors.RESET} {char_uuid}")
+                if verbose:
+                    print(f"  {Colors.GREEN}[OK]{Colors.RESET} {char_uuid}")
                 enabled_count += 1
+                self.subscribed.append(char_uuid)
             except Exception as e:
-                print(f"  {Colors.RED}[FAIL]{Colors.RESET} {char_uuid}")
+                print(f"  {Colors.RED}{self.label}[FAIL]{Colors.RESET} {char_uuid}")
         
-        print(f"\n{Colors.GREEN}[READY] {enabled_count} notification(s) active{Colors.RESET}")
+        if verbose:
+            print(f"\n{Colors.GREEN}[READY] {enabled_count} notification(s) active{Colors.RESET}")
+        else:
+            print(f"{self.tag_color}{self.tag:<3}{Colors.RESET} {Colors.GREEN}[CONNECTED]{Colors.RESET} {name} "
+                  f"IMEI {self.device_imei} - {enabled_count} notification(s)")
         
+        self.resume_services = sorted({char_services[char] for char in self.subscribed + [self.primary_write_char]
+                                       if char in char_services})
+        self.device = device_info
+        self.link_ready = True
+        self.remember_profile()
+        self.record_link("connected")
+    
+    async def connect_cached(self, device_info, profile):
+        """Connect with the GATT profile saved in the registry - no service walk"""
+        started = time.monotonic()
+        self.primary_write_char = profile.write_char
+        self.write_chars = [profile.write_char]
+        self.notify_chars = list(profile.notify_chars)
+        self.subscribed = list(profile.notify_chars)
+        self.resume_services = list(profile.services)
         self.device = device_info
+        await self.resume()  # same fast path as a reconnect
+        if self.client.services.get_characteristic(profile.write_char) is None:
+            await self.client.disconnect()
+            raise StaleProfile(f"write characteristic {profile.write_char} not found")
+        
+        self.device_imei = imei_from_name(device_info.name) or profile.imei or self.device_imei
+        self.link_ready = True
+        self.remember_profile()
+        
+        elapsed = time.monotonic() - started
+        if self.tag is None:
+            print(f"{Colors.GREEN}[CONNECTED] Saved GATT profile - service discovery skipped "
+                  f"({elapsed:.2f}s){Colors.RESET}")
+            print(f"{Colors.DIM}  IMEI: {self.device_imei}  Write: {self.primary_write_char}{Colors.RESET}")
+            print(f"\n{Colors.GREEN}[READY] {len(self.subscribed)} notification(s) active{Colors.RESET}")
+        else:
+            print(f"{self.tag_color}{self.tag:<3}{Colors.RESET} {Colors.GREEN}[CONNECTED]{Colors.RESET} "
+                  f"{device_info.name or 'Unknown'} IMEI {self.device_imei} - saved profile, {elapsed:.2f}s")
+    
+    def remember_profile(self):
+        """Save the resolved characteristics so the next connect can skip discovery"""
+        if self.registry is None or not self.device:
+            return
+        self.registry.remember_gatt(self.device.address, self.primary_write_char, self.subscribed,
+                                    self.resume_services, imei=self.device_imei, name=self.device.name)
+        try:
+            self.registry.save()
+        except OSError as e:
+            logger.warning(f"Could not save device registry: {e}")
+    
+    def start_capture(self, path, device_info):
+        """Record the session about to start to path (RX/TX/link events - play back with --replay)"""
+        self.capture = CaptureWriter(path, {"name": device_info.name, "address": device_info.address,
+                                            "imei": imei_from_name(device_info.name)})
+    
+    def record_link(self, event):
+        if self.capture:
+            self.capture.link(event, imei=self.device_imei)
+    
+    def on_link_lost(self, client):
+        """BleakClient disconnected callback - also fires for our own disconnects, which stop the supervisor first"""
+        if client is self.client and self.link_ready:
+            self.link.link_lost()
+    
+    async def resume(self):
+        """Reconnect with the characteristics resolved by connect() - no service walk"""
+        # Discovery limited to the services we use; Windows may answer from its GATT cache
+        client = BleakClient(self.device.address, disconnected_callback=self.on_link_lost,
+                             services=self.resume_services or None, timeout=RECONNECT_TIMEOUT,
+                             winrt=dict(use_cached_services=True))
+        self.client = client
+        for framer in self.framers.values():
+            framer.flush()  # a line cut off by the drop is handed on as it is
+        await client.connect()
+        for char_uuid in self.subscribed:
+            try:
+                await client.start_notify(char_uuid, self.notification_handler)
+            except Exception as e:
+                await client.disconnect()
+                raise StaleProfile(f"notify {char_uuid}: {str(e) or type(e).__name__}") from e
+    
+    def on_link_event(self, event, *args):
+        """LinkSupervisor events -> console"""
+        if event in (LOST, RECONNECTED):
+            self.record_link(event)
+        if event == LOST:
+            self.console.post(self.render_notice, f"\n{self.label}[LINK LOST] Sensor disconnected - reconnecting...",
+                              Colors.RED, level=ESSENTIAL)
+        elif event == RETRY:
+            attempt, delay, error = args
+            self.console.post(self.render_notice, f"{self.label}[RECONNECT] Attempt {attempt} failed "
+                              f"({error or type(error).__name__}) - retry in {delay:.1f}s", Colors.YELLOW, level=ESSENTIAL)
+        elif event == RECONNECTED:
+            attempts, downtime, setup = args
+            self.console.post(self.render_notice, f"{self.label}[RECONNECTED] Receiving again after {downtime:.1f}s "
+                              f"({attempts} attempt(s), link setup {setup:.2f}s)", Colors.GREEN, level=ESSENTIAL)
+    
+    def link_summary(self):
+        """One-line reconnect stats, or '' if the link never dropped"""
+        stats = self.link.stats()
+        if not stats['drops']:
+            return ""
+        text = f"{stats['drops']} drop(s), {stats['reconnects']} reconnect(s)"
+        if stats['avg_downtime_s'] is not None:
+            text += f", avg downtime {stats['avg_downtime_s']}s, last link setup {stats['last_setup_s']}s"
+        return text
     
     async def disconnect(self):
         """Disconnect from device"""
+        await self.link.stop()
         if self.client and self.client.is_connected:
             await self.client.disconnect()
-            print(f"\n{Colors.YELLOW}[DISCONNECTED]{Colors.RESET}")
+            self.record_link("disconnected")
+            print(f"\n{Colors.YELLOW}{self.label}[DISCONNECTED]{Colors.RESET}")
+        for framer in self.framers.values():
+            framer.flush()
+    
+    async def shutdown(self):
+        """Disconnect, give queued POSTs a bounded chance to finish, close the outbox"""
+        try:
+            await self.disconnect()
+        finally:
+            if self.forward_queue:
+                await self.forward_queue.stop(timeout=5)
+                self.forward_queue.store.close(remove_if_empty=True)
+            if self.capture:
+                self.capture.close()
     
     async def setup_http_mode(self):
         """Setup HTTP forwarding mode"""
@@ -417,28 +711,36 @@ class BLEScanner:
         if self.http_forwarder and self.http_forwarder.enabled:
             print(f"\n{Colors.YELLOW}HTTP forwarding is currently ENABLED{Colors.RESET}")
             print(f"  URL: {self.http_forwarder.api_url}")
-            print(f"  Success: {self.http_forwarder.success_count}")
-            print(f"  Errors: {self.http_forwarder.error_count}")
+            self.print_forward_stats()
+            batching = self.batch_size > 1
             print(f"\n  1. Disable HTTP forwarding")
             print(f"  2. Change URL")
-            print(f"  3. Back to receive mode")
+            print(f"  3. Batch mode {'[ON]' if batching else '[OFF]'} - "
+                  f"up to {BATCH_SIZE} readings per gzip POST")
+            print(f"  4. Back to receive mode")
             
-            choice = input(f"\n{Colors.YELLOW}Choice [1-3]: {Colors.RESET}").strip()
+            choice = (await self.keys.read_line(f"\n{Colors.YELLOW}Choice [1-4]: {Colors.RESET}")).strip()
             
             if choice == "1":
                 self.http_forwarder.enabled = False
                 print(f"{Colors.GREEN}[DISABLED] HTTP forwarding disabled{Colors.RESET}")
             elif choice == "2":
-                url = input(f"{Colors.YELLOW}Enter new API URL: {Colors.RESET}").strip()
+                url = (await self.keys.read_line(f"{Colors.YELLOW}Enter new API URL: {Colors.RESET}")).strip()
                 if url:
                     self.http_forwarder.api_url = url
+                    self.http_forwarder.batch_supported = True
+                    self.http_forwarder.breaker.reset()
                     print(f"{Colors.GREEN}[UPDATED] URL changed to: {url}{Colors.RESET}")
+            elif choice == "3":
+                self.set_batch_mode(not batching)
+                state = 'ON' if not batching else 'OFF'
+                print(f"{Colors.GREEN}[UPDATED] Batch mode {state}{Colors.RESET}")
         else:
             print(f"\n{Colors.YELLOW}Enable HTTP forwarding?{Colors.RESET}")
             print(f"{Colors.DIM}Data will be POSTed to your server in NHR API format{Colors.RESET}")
             print(f"\nExample URL: http://192.168.1.111:5000/api/sensor")
             
-            url = input(f"\n{Colors.YELLOW}Enter API URL (or blank to cancel): {Colors.RESET}").strip()
+            url = (await self.keys.read_line(f"\n{Colors.YELLOW}Enter API URL (or blank to cancel): {Colors.RESET}")).strip()
             
             if url:
                 # Test connection first
@@ -453,27 +755,28 @@ class BLEScanner:
                     "data": "0"
                 }
                 
+                import requests
                 try:
                     response = requests.post(url, json=test_payload, headers=NHR_HEADERS, timeout=5)
                     
                     if response.status_code in [200, 201]:
                         print(f"{Colors.GREEN}[SUCCESS] Server responded: {response.status_code}{Colors.RESET}")
-                        self.http_forwarder = HTTPForwarder(url)
+                        self.enable_forwarding(HTTPForwarder(url))
                         print(f"{Colors.GREEN}[ENABLED] HTTP forwarding is now active{Colors.RESET}")
                     else:
                         print(f"{Colors.YELLOW}[WARNING] Server returned: {response.status_code}{Colors.RESET}")
                         print(f"  Response: {response.text[:100]}")
-                        enable = input(f"\n{Colors.YELLOW}Enable anyway? [y/N]: {Colors.RESET}").strip().lower()
+                        enable = (await self.keys.read_line(f"\n{Colors.YELLOW}Enable anyway? [y/N]: {Colors.RESET}")).strip().lower()
                         if enable == 'y':
-                            self.http_forwarder = HTTPForwarder(url)
+                            self.enable_forwarding(HTTPForwarder(url))
                             print(f"{Colors.GREEN}[ENABLED] HTTP forwarding is now active{Colors.RESET}")
                             
                 except requests.exceptions.ConnectionError:
                     print(f"{Colors.RED}[ERROR] Cannot connect to {url}{Colors.RESET}")
                     print(f"{Colors.DIM}Make sure the server is running and accessible{Colors.RESET}")
-                    enable = input(f"\n{Colors.YELLOW}Enable anyway? [y/N]: {Colors.RESET}").strip().lower()
+                    enable = (await self.keys.read_line(f"\n{Colors.YELLOW}Enable anyway? [y/N]: {Colors.RESET}")).strip().lower()
                     if enable == 'y':
-                        self.http_forwarder = HTTPForwarder(url)
+                        self.enable_forwarding(HTTPForwarder(url))
                         print(f"{Colors.GREEN}[ENABLED] HTTP forwarding enabled (will retry on data){Colors.RESET}")
                 except Exception as e:
                     print(f"{Colors.RED}[ERROR] {e}{Colors.RESET}")
@@ -490,18 +793,22 @@ class BLEScanner:
         print(f"  3. Toggle CR+LF (currently: {'ON' if self.add_crlf else 'OFF'})")
         print(f"  4. Generate diagnostic report NOW")
         print(f"  5. Toggle auto-report (currently: {'ON' if self.auto_report_enabled else 'OFF'})")
-        print(f"  6. Back to receive mode")
-        print(f"  7. Quit")
+        print(f"  6. Toggle quiet console (currently: {'ON' if self.console.quiet else 'OFF'}) - "
+              f"only parsed readings and diagnostics")
+        print(f"  7. Back to receive mode")
+        print(f"  8. Quit")
         
-        choice = input(f"\n{Colors.YELLOW}Choice [1-7]: {Colors.RESET}").strip()
+        choice = (await self.keys.read_line(f"\n{Colors.YELLOW}Choice [1-8]: {Colors.RESET}")).strip()
         
         if choice == "1":
             # Command mode
             print(f"\n{Colors.DIM}Type command to send (blank to cancel):{Colors.RESET}")
-            cmd = input(f"{Colors.YELLOW}> {Colors.RESET}").strip()
+            cmd = (await self.keys.read_line(f"{Colors.YELLOW}> {Colors.RESET}")).strip()
             if cmd:
-                await self.send_command(cmd)
-                await asyncio.sleep(0.5)
+                try:
+                    self.print_response(await self.engine.request(cmd))
+                except ConnectionError:
+                    pass  # send_command printed why
                 
         elif choice == "2":
             await self.setup_http_mode()
@@ -518,7 +825,11 @@ class BLEScanner:
             self.auto_report_enabled = not self.auto_report_enabled
             print(f"{Colors.GREEN}[CONFIG] Auto-report {'enabled' if self.auto_report_enabled else 'disabled'}{Colors.RESET}")
             
-        elif choice == "7":
+        elif choice == "6":
+            self.console.quiet = not self.console.quiet
+            print(f"{Colors.GREEN}[CONFIG] Quiet console {'enabled' if self.console.quiet else 'disabled'}{Colors.RESET}")
+            
+        elif choice == "8":
             self.running = False
             return
         
@@ -534,98 +845,412 @@ class BLEScanner:
         if self.auto_report_enabled:
             print(f"{Colors.GREEN}   AUTO-REPORT: Enabled (PDF after each TEST_PACKET){Colors.RESET}")
         print(f"{Colors.CYAN}{'=' * 72}{Colors.RESET}")
+        self.console.start()
+        self.keys.start()
         
         try:
+            # Sleeps until a key arrives - notifications and forwarding run as their own callbacks/tasks
             while self.running:
-                if msvcrt.kbhit():
-                    key = msvcrt.getch()
-                    if key == b'\x10':  # Ctrl+P
-                        self.command_mode = True
-                        await self.command_mode_handler()
-                        # Reprint header after menu
-                        print(f"\n{Colors.CYAN}{'=' * 72}{Colors.RESET}")
-                        print(f"{Colors.BOLD}RECEIVE MODE{Colors.RESET}")
-                        if self.http_forwarder and self.http_forwarder.enabled:
-                            print(f"{Colors.GREEN}   HTTP POST: {self.http_forwarder.api_url}{Colors.RESET}")
-                        if self.auto_report_enabled:
-                            print(f"{Colors.GREEN}   AUTO-REPORT: Enabled{Colors.RESET}")
-                        print(f"{Colors.CYAN}{'=' * 72}{Colors.RESET}")
-                
-                await asyncio.sleep(0.1)
+                key = await self.keys.read_key()
+                if key == CTRL_P:
+                    self.command_mode = True
+                    await self.command_mode_handler()
+                    # Reprint header after menu
+                    print(f"\n{Colors.CYAN}{'=' * 72}{Colors.RESET}")
+                    print(f"{Colors.BOLD}RECEIVE MODE{Colors.RESET}")
+                    if self.http_forwarder and self.http_forwarder.enabled:
+                        print(f"{Colors.GREEN}   HTTP POST: {self.http_forwarder.api_url}{Colors.RESET}")
+                    if self.auto_report_enabled:
+                        print(f"{Colors.GREEN}   AUTO-REPORT: Enabled{Colors.RESET}")
+                    print(f"{Colors.CYAN}{'=' * 72}{Colors.RESET}")
+                elif key == EOF:
+                    # stdin closed (e.g. started from a service) - keep receiving until Ctrl+C
+                    print(f"{Colors.DIM}[INPUT] stdin closed - menu unavailable, Ctrl+C to exit{Colors.RESET}")
+                    await asyncio.Event().wait()
                 
         except KeyboardInterrupt:
             print(f"\n{Colors.YELLOW}[STOPPING]...{Colors.RESET}")
 
 
-async def scan_devices():
-    """Live scan for BLE devices - shows devices as they appear"""
-    print(f"\n{Colors.YELLOW}[SCANNING] Live scan - devices appear as discovered{Colors.RESET}")
+def age_text(seconds):
+    if seconds < 90:
+        return f"{seconds:.0f}s"
+    if seconds < 90 * 60:
+        return f"{seconds / 60:.0f}m"
+    if seconds < 48 * 3600:
+        return f"{seconds / 3600:.0f}h"
+    return f"{seconds / 86400:.0f}d"
+
+
+def scan_row(number, entry, is_known):
+    """One table line: rank, marker, name, address, smoothed signal"""
+    is_dustbin_sensor = bool(entry.name) and DUSTBIN_NAME in entry.name
+    marker = f"{Colors.GREEN}*{Colors.RESET}" if is_dustbin_sensor else " "
+    name_color = Colors.GREEN if is_dustbin_sensor else Colors.RESET
+    rssi = round(entry.rssi)
+    signal_bars = min(10, max(1, (rssi + 100) // 10))
+    signal = '#' * signal_bars + '-' * (10 - signal_bars)
+    note = f" {Colors.DIM}(known){Colors.RESET}" if is_known else ""
+    return (f"  {number:3d}. {marker} {name_color}{(entry.name or '(Unknown)'):<25}{Colors.RESET} "
+            f"{entry.address:<20} [{signal}] {rssi}dBm{note}")
+
+
+def known_row(number, profile, now):
+    """Known device not advertising (yet) in this scan"""
+    marker = f"{Colors.GREEN}*{Colors.RESET}" if profile.name and DUSTBIN_NAME in profile.name else " "
+    rssi = f", {profile.last_rssi}dBm" if profile.last_rssi is not None else ""
+    return (f"  {number:3d}. {marker} {Colors.DIM}{(profile.name or '(Unknown)'):<25} "
+            f"{profile.address:<20} known - seen {age_text(now - profile.last_seen)} ago{rssi}{Colors.RESET}")
+
+
+def scan_lines(table, known, limit=None):
+    """Ranked table (strongest first) followed by known devices not seen yet"""
+    now = time.time()
+    ranked = table.ranked()
+    shown = ranked[:limit] if limit is not None else ranked
+    lines = [scan_row(number, entry, entry.address.upper() in known) for number, entry in enumerate(shown, 1)]
+    if len(ranked) > len(shown):
+        lines.append(f"  {Colors.DIM}... {len(ranked) - len(shown)} more{Colors.RESET}")
+    missing = [profile for key, profile in known.items() if key not in table.entries]
+    lines += [known_row(number, profile, now) for number, profile in enumerate(missing, len(ranked) + 1)]
+    return lines
+
+
+async def scan_devices(keys, registry=None, advert_filter=None, expected=None, stop_rssi=None):
+    """
+    Live scan - devices that pass advert_filter are ranked by smoothed RSSI
+    Ends after SCAN_SECONDS (SCAN_SECONDS_WAITING when waiting for `expected`
+    sensors or one within stop_rssi), on ENTER, or as soon as a stop condition
+    is met. Known devices are listed (and selectable) before they advertise
+    """
+    advert_filter = advert_filter or AdvertFilter()
+    waiting = expected is not None or stop_rssi is not None
+    duration = SCAN_SECONDS_WAITING if waiting else SCAN_SECONDS
+    
+    if advert_filter.accepts_all:
+        print(f"\n{Colors.YELLOW}[SCANNING] Live scan - all BLE devices, strongest signal first{Colors.RESET}")
+    else:
+        print(f"\n{Colors.YELLOW}[SCANNING] Live scan - dustbin sensors only, strongest signal first{Colors.RESET}")
+    if expected:
+        print(f"{Colors.DIM}   Stops when {expected} sensor(s) are found (max {duration}s){Colors.RESET}")
+    elif stop_rssi is not None:
+        print(f"{Colors.DIM}   Stops when a sensor is within range ({stop_rssi} dBm, max {duration}s){Colors.RESET}")
     print(f"{Colors.DIM}   Press ENTER to stop scanning early...{Colors.RESET}\n")
     print(f"{'-' * 72}")
     print(f"  {'#':>3}  {'':2} {'Name':<25} {'Address':<20} {'Signal'}")
     print(f"{'-' * 72}")
     
-    discovered_list = []  # Keep order of discovery
-    discovered_addresses = set()  # For deduplication
-    nhr_count = 0
+    # Known devices (address -> profile) are listed before their advertisements arrive
+    known = {}
+    if registry is not None:
+        for profile in registry.known(limit=KNOWN_DEVICES_SHOWN, max_age=KNOWN_DEVICE_AGE):
+            if advert_filter.matches(profile.name, ()):
+                known[profile.address.upper()] = profile
+    
+    table = ScanTable(advert_filter, expected=expected, stop_rssi=stop_rssi)
+    stop = asyncio.Event()
     
     def detection_callback(device, advertisement_data):
-        nonlocal nhr_count
-        
-        # Skip if already seen
-        if device.address in discovered_addresses:
+        name = device.name or advertisement_data.local_name
+        profile = known.get(device.address.upper()) if not name else None
+        entry = table.update(device.address, device, name or (profile.name if profile else None),
+                             advertisement_data.rssi, advertisement_data.service_uuids)
+        if entry is None:
             return
-        
-        discovered_addresses.add(device.address)
-        rssi = advertisement_data.rssi if advertisement_data else -100
-        discovered_list.append((device, rssi))
-        device_count = len(discovered_list)
-        
-        name = device.name if device.name else "(Unknown)"
-        signal_bars = max(1, (rssi + 100) // 10)
-        signal = '#' * signal_bars + '-' * (10 - signal_bars)
-        
-        # Detect dustbin sensors by their naming pattern
-        is_dustbin_sensor = device.name and "N_01E1_N6BR1" in device.name
-        if is_dustbin_sensor:
-            nhr_count += 1
-            
-        marker = f"{Colors.GREEN}*{Colors.RESET}" if is_dustbin_sensor else " "
-        name_color = Colors.GREEN if is_dustbin_sensor else Colors.RESET
-        
-        # Print device immediately with its index
-        print(f"  {device_count:3d}. {marker} {name_color}{name:<25}{Colors.RESET} {device.address:<20} [{signal}] {rssi}dBm")
+        if registry is not None and device.address in registry:
+            registry.seen(device.address, name, advertisement_data.rssi)  # refresh known devices only
+        if table.stop_reason:
+            stop.set()
     
-    # Start scanner with callback
-    scanner = BleakScanner(detection_callback=detection_callback)
+    # On a terminal the table is redrawn in place by a timer, never from the BLE
+    # callback; otherwise (output redirected) only the final table is printed
+    live = sys.stdout.isatty()
+    drawn = 0
+    
+    async def redraw():
+        nonlocal drawn
+        while True:
+            lines = scan_lines(table, known, limit=LIVE_ROWS)
+            clear = f"\033[{drawn}F\033[J" if drawn else ""
+            sys.stdout.write(clear + "".join(line + "\n" for line in lines))
+            sys.stdout.flush()
+            drawn = len(lines)
+            await asyncio.sleep(SCAN_REDRAW_INTERVAL)
+    
+    scanner = BleakScanner(detection_callback=detection_callback, service_uuids=advert_filter.scanner_uuids)
     await scanner.start()
+    drawer = asyncio.create_task(redraw() if live else asyncio.Event().wait())
+    
+    async def enter_pressed():
+        if await keys.wait_for(ENTER) == EOF:
+            await asyncio.Event().wait()  # no keyboard - scan for the full time
     
-    # Scan for up to 5 seconds, but allow early stop
+    key_task = asyncio.create_task(enter_pressed())
+    stop_task = asyncio.create_task(stop.wait())
     try:
-        for i in range(50):  # 5 seconds (50 x 0.1s)
-            if msvcrt.kbhit():
-                key = msvcrt.getch()
-                if key == b'\r':  # Enter key
-                    print(f"\n{Colors.YELLOW}[STOPPED] Scan stopped by user{Colors.RESET}")
-                    break
-            await asyncio.sleep(0.1)
-    except:
-        pass
+        await asyncio.wait([key_task, stop_task], timeout=duration, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        await scanner.stop()
+        for task in (key_task, stop_task, drawer):
+            task.cancel()
+        await asyncio.gather(key_task, stop_task, drawer, return_exceptions=True)
     
-    await scanner.stop()
+    # Final table - these numbers are the ones to select
+    if drawn:
+        sys.stdout.write(f"\033[{drawn}F\033[J")
+    for line in scan_lines(table, known):
+        print(line)
+    if key_task.done() and not key_task.cancelled():
+        print(f"\n{Colors.YELLOW}[STOPPED] Scan stopped by user{Colors.RESET}")
+    elif table.stop_reason:
+        print(f"\n{Colors.GREEN}[STOPPED] {table.stop_reason}{Colors.RESET}")
+    
+    if registry is not None:
+        try:
+            registry.save()
+        except OSError as e:
+            logger.warning(f"Could not save device registry: {e}")
     
     print(f"{'-' * 72}")
     
-    if len(discovered_list) == 0:
+    devices = [(entry.device, round(entry.rssi)) for entry in table.ranked()]
+    devices += [(profile, profile.last_rssi if profile.last_rssi is not None else -100)
+                for key, profile in known.items() if key not in table.entries]
+    
+    if not devices:
         print(f"{Colors.RED}[ERROR] No devices found!{Colors.RESET}")
         return []
     
-    print(f"\n{Colors.GREEN}[FOUND] {len(discovered_list)} devices{Colors.RESET}")
+    elapsed = time.monotonic() - table.started
+    print(f"\n{Colors.GREEN}[FOUND] {len(table)} device(s) in {elapsed:.1f}s{Colors.RESET}", end="")
+    if table.first_match is not None:
+        print(f"{Colors.DIM} - first after {table.first_match:.2f}s{Colors.RESET}", end="")
+    print()
+    if table.filtered:
+        print(f"{Colors.DIM}[INFO] {table.filtered} advertisement(s) from other devices ignored{Colors.RESET}")
+    not_seen = len(devices) - len(table)
+    if not_seen:
+        print(f"{Colors.DIM}[INFO] {not_seen} known device(s) not seen in this scan - still selectable{Colors.RESET}")
+    nhr_count = sum(1 for device, _ in devices if device.name and DUSTBIN_NAME in device.name)
     if nhr_count > 0:
         print(f"{Colors.GREEN}[INFO] {nhr_count} dustbin sensor(s) found (marked with *){Colors.RESET}")
     
-    # Return in discovery order (same as displayed)
-    return discovered_list
+    # Same order as the final table
+    return devices
+
+
+def print_fleet_status(fleet):
+    """One row per device: state, messages, outbox backlog, last line"""
+    print(f"\n  {'Tag':<4} {'Name':<22} {'IMEI':<16} {'State':<11} {'RX':>6} {'Outbox':>6}  Last line")
+    print(f"  {'-' * 96}")
+    for row in fleet.status():
+        state_color = Colors.GREEN if row['state'] == CONNECTED else \
+            Colors.RED if row['state'] == FAILED else Colors.YELLOW
+        detail = row['error'] if row['error'] else row['last']
+        print(f"  {row['tag']:<4} {row['name'][:22]:<22} {row['imei']:<16} "
+              f"{state_color}{row['state']:<11}{Colors.RESET} {row['messages']:>6} {row['outbox']:>6}  "
+              f"{Colors.DIM}{detail[:36]}{Colors.RESET}")
+
+
+def print_fleet_state(tag, state, detail):
+    """DeviceFleet state callback - connects print their own line"""
+    if state == FAILED:
+        print(f"{Colors.RED}{tag:<3} [FAILED] {detail}{Colors.RESET}")
+
+
+async def fleet_menu(fleet, keys, console):
+    """Fleet-mode menu - returns False to quit"""
+    print(f"\n{Colors.CYAN}{'=' * 72}{Colors.RESET}")
+    print(f"{Colors.BOLD}FLEET MENU{Colors.RESET} - {len(fleet.connected())}/{len(fleet)} connected")
+    print(f"{Colors.CYAN}{'=' * 72}{Colors.RESET}")
+    print(f"\n  1. Send command (one device or all)")
+    print(f"  2. Fleet status")
+    print(f"  3. Toggle quiet console (currently: {'ON' if console.quiet else 'OFF'})")
+    print(f"  4. Back to receive mode")
+    print(f"  5. Quit")
+    
+    choice = (await keys.read_line(f"\n{Colors.YELLOW}Choice [1-5]: {Colors.RESET}")).strip()
+    
+    if choice == "1":
+        target = (await keys.read_line(f"{Colors.YELLOW}Device (e.g. B2, blank for all): {Colors.RESET}")).strip()
+        session = fleet.get(target) if target else None
+        if target and session is None:
+            print(f"{Colors.RED}[ERROR] No device {target}{Colors.RESET}")
+            return True
+        if session is not None and session not in fleet.connected():
+            print(f"{Colors.RED}[ERROR] {session.tag} is not connected{Colors.RESET}")
+            return True
+        print(f"\n{Colors.DIM}Type command to send (blank to cancel):{Colors.RESET}")
+        cmd = (await keys.read_line(f"{Colors.YELLOW}> {Colors.RESET}")).strip()
+        if cmd:
+            responses = await fleet.broadcast(cmd, [session.tag] if session else None)
+            for tag, response in responses.items():
+                if not isinstance(response, Exception):
+                    fleet.sessions[tag].print_response(response)
+            answered = sum(1 for response in responses.values()
+                           if not isinstance(response, Exception) and response.ok)
+            print(f"{Colors.GREEN}[TX] {cmd}: answered by {answered}/{len(responses)} device(s){Colors.RESET}")
+    
+    elif choice == "2":
+        print_fleet_status(fleet)
+    
+    elif choice == "3":
+        console.quiet = not console.quiet
+        print(f"{Colors.GREEN}[CONFIG] Quiet console {'enabled' if console.quiet else 'disabled'}{Colors.RESET}")
+    
+    elif choice == "5":
+        return False
+    
+    return True
+
+
+async def run_fleet(keys, devices, http_forwarder, registry=None):
+    """Fleet mode - several sensors in one process, one multiplexed receive view"""
+    console = ConsoleRenderer(summary=BLEScanner.render_skipped)
+    
+    def new_session(device, tag):
+        # Own diagnostics, IMEI and outbox/queue per device; console and HTTP pool are shared
+        session = BLEScanner(keys, console=console, outbox_path=fleet_outbox_path(device.address), tag=tag,
+                             registry=registry)
+        if http_forwarder:
+            session.enable_forwarding(http_forwarder)
+        return session
+    
+    fleet = DeviceFleet(new_session, max_connections=MAX_CONNECTIONS, on_state=print_fleet_state)
+    
+    print(f"\n{Colors.CYAN}{'=' * 72}{Colors.RESET}")
+    print(f"{Colors.BOLD}FLEET MODE{Colors.RESET} - {len(devices)} devices, "
+          f"up to {MAX_CONNECTIONS} connected at a time")
+    if len(devices) > MAX_CONNECTIONS:
+        print(f"{Colors.YELLOW}   {len(devices) - MAX_CONNECTIONS} device(s) wait for a free connection slot{Colors.RESET}")
+    print(f"{Colors.CYAN}{'=' * 72}{Colors.RESET}")
+    
+    fleet.start(devices)
+    
+    try:
+        await fleet.wait_connected()
+        print_fleet_status(fleet)
+        
+        print(f"\n{Colors.CYAN}{'=' * 72}{Colors.RESET}")
+        print(f"{Colors.BOLD}RECEIVE MODE{Colors.RESET} - {len(fleet.connected())} device(s), one line per message")
+        print(f"{Colors.DIM}   Press Ctrl+P for menu, Ctrl+C to exit{Colors.RESET}")
+        if http_forwarder:
+            print(f"{Colors.GREEN}   HTTP POST: {http_forwarder.api_url}{Colors.RESET}")
+        print(f"{Colors.CYAN}{'=' * 72}{Colors.RESET}")
+        console.start()
+        keys.start()
+        
+        running = True
+        while running:
+            key = await keys.read_key()
+            if key == CTRL_P:
+                for session in fleet.sessions.values():
+                    session.command_mode = True
+                running = await fleet_menu(fleet, keys, console)
+                for session in fleet.sessions.values():
+                    session.command_mode = False
+                if running:
+                    print(f"\n{Colors.CYAN}{'=' * 72}{Colors.RESET}")
+                    print(f"{Colors.BOLD}RECEIVE MODE{Colors.RESET} - {len(fleet.connected())} device(s)")
+                    print(f"{Colors.CYAN}{'=' * 72}{Colors.RESET}")
+            elif key == EOF:
+                print(f"{Colors.DIM}[INPUT] stdin closed - menu unavailable, Ctrl+C to exit{Colors.RESET}")
+                await asyncio.Event().wait()
+    
+    except KeyboardInterrupt:
+        print(f"\n{Colors.YELLOW}[STOPPING]...{Colors.RESET}")
+    finally:
+        await fleet.close_all()
+        await console.stop()
+        if http_forwarder:
+            http_forwarder.close()
+    
+    # Print stats
+    print(f"\n{Colors.CYAN}[STATS]{Colors.RESET}")
+    for row in fleet.status():
+        session = fleet.sessions[row['tag']]
+        kept = f", {row['outbox']} reading(s) kept in {session.outbox_path}" if row['outbox'] else ""
+        link = session.link_summary()
+        print(f"  {row['tag']:<3} {row['name']}: {row['messages']} messages{kept}{f' - link: {link}' if link else ''}")
+    if console.coalesced:
+        print(f"  Console: {console.coalesced} messages summarised while output was catching up")
+    if http_forwarder:
+        print(f"  HTTP Success: {http_forwarder.success_count}")
+        print(f"  HTTP Errors: {http_forwarder.error_count}")
+    print(f"\n{Colors.GREEN}[EXIT] Goodbye{Colors.RESET}")
+
+
+STATUS_COLORS = {"HEALTHY": Colors.GREEN, "PARTIAL": Colors.YELLOW}
+
+
+def print_sweep_result(result):
+    """DiagnosticSweep callback - one line as each device finishes"""
+    color = STATUS_COLORS.get(result.status, Colors.RED)
+    detail = result.report_path or result.error or result.root_cause
+    timeout = "" if result.completed or result.diagnostic is None else " (timeout)"
+    print(f"{Colors.BOLD}{result.tag:<3}{Colors.RESET} {result.name[:22]:<22} {color}{result.status:<13}{Colors.RESET} "
+          f"{result.duration:4.0f}s{timeout}  {Colors.DIM}{detail}{Colors.RESET}")
+
+
+def print_sweep_summary(sweep, elapsed, summary_path):
+    print(f"\n{Colors.CYAN}{'=' * 72}{Colors.RESET}")
+    print(f"{Colors.BOLD}SWEEP SUMMARY{Colors.RESET} - {len(sweep.results)} sensor(s) in {elapsed / 60:.1f} min")
+    print(f"{Colors.CYAN}{'=' * 72}{Colors.RESET}")
+    print(f"\n  {'Tag':<4} {'Device':<22} {'IMEI':<16} {'Status':<13} {'Issue'}")
+    print(f"  {'-' * 96}")
+    for result in sweep.results:
+        color = STATUS_COLORS.get(result.status, Colors.RED)
+        issue = result.error or result.failure_layer or ""
+        print(f"  {result.tag:<4} {result.name[:22]:<22} {result.imei:<16} {color}{result.status:<13}{Colors.RESET} "
+              f"{issue[:40]}")
+    counts = ', '.join(f"{count} {status}" for status, count in sweep.counts().items())
+    print(f"\n  {counts}")
+    print(f"  Summary table: {summary_path}")
+
+
+async def run_sweep(keys, devices, http_forwarder, registry=None):
+    """Diagnostic sweep - command sequence on every dustbin sensor, a few connections at a time"""
+    if not devices:
+        print(f"{Colors.RED}[ERROR] No dustbin sensors (*) in range{Colors.RESET}")
+        return
+    
+    text = await keys.read_line(f"{Colors.YELLOW}Command sequence [{', '.join(SWEEP_COMMANDS)}]: {Colors.RESET}")
+    commands = [command.strip() for command in text.split(',') if command.strip()] or SWEEP_COMMANDS
+    
+    # Only diagnostics and progress lines - a few sensors' AT traces at once are unreadable
+    console = ConsoleRenderer(summary=BLEScanner.render_skipped)
+    console.quiet = True
+    from PDFReportGenerator import PDFReportGenerator
+    pdf_generator = PDFReportGenerator()
+    
+    def new_session(device, tag):
+        session = BLEScanner(keys, console=console, outbox_path=fleet_outbox_path(device.address), tag=tag,
+                             registry=registry)
+        if http_forwarder:
+            session.enable_forwarding(http_forwarder)
+        return session
+    
+    sweep = DiagnosticSweep(new_session, commands=commands, max_connections=MAX_CONNECTIONS,
+                            report=pdf_generator.generate_report, on_result=print_sweep_result,
+                            on_state=print_fleet_state)
+    
+    print(f"\n{Colors.CYAN}{'=' * 72}{Colors.RESET}")
+    print(f"{Colors.BOLD}DIAGNOSTIC SWEEP{Colors.RESET} - {len(devices)} sensor(s), up to {MAX_CONNECTIONS} at a time")
+    print(f"{Colors.DIM}   Sequence: {' -> '.join(commands)} (up to {SEQUENCE_TIMEOUT}s per sensor), "
+          f"Ctrl+C to abort{Colors.RESET}")
+    print(f"{Colors.CYAN}{'=' * 72}{Colors.RESET}")
+    
+    console.start()
+    started = time.monotonic()
+    try:
+        await sweep.run(devices)
+    finally:
+        await console.stop()
+        if http_forwarder:
+            http_forwarder.close()
+    
+    print_sweep_summary(sweep, time.monotonic() - started, write_summary(sweep.results, pdf_generator.output_dir))
+    print(f"\n{Colors.GREEN}[EXIT] Goodbye{Colors.RESET}")
 
 
 def show_agreement():
@@ -656,8 +1281,274 @@ def show_agreement():
         return False
 
 
-async def main():
+def ask_scan_mode():
+    """Scan settings for scan_devices() - dustbin sensors only unless 'all' is chosen"""
+    print(f"\n{Colors.YELLOW}Which devices should the scan look for?{Colors.RESET}")
+    print(f"{Colors.DIM}  ENTER = dustbin sensors   3 = stop when 3 sensors are found{Colors.RESET}")
+    print(f"{Colors.DIM}  near  = stop at the first sensor held close   all = every BLE device{Colors.RESET}")
+    try:
+        choice = input(f"{Colors.YELLOW}Scan: {Colors.RESET}").strip().lower()
+    except (EOFError, KeyboardInterrupt):
+        choice = ""
+    
+    if choice == "all":
+        return {}
+    sensors = {"advert_filter": AdvertFilter(name_prefixes=[DUSTBIN_NAME])}
+    if choice == "near":
+        return dict(sensors, stop_rssi=NEAR_RSSI)
+    if choice.isdigit() and int(choice) > 0:
+        return dict(sensors, expected=int(choice))
+    if choice:
+        print(f"{Colors.RED}[ERROR] Unknown scan choice - scanning for dustbin sensors{Colors.RESET}")
+    return sensors
+
+
+async def find_device(registry, address=None, name_match=None, timeout=HEADLESS_SCAN_SECONDS):
+    """First device advertising this address / a name containing name_match - None if not found in time"""
+    target = address or f"name containing '{name_match}'"
+    print(f"{Colors.YELLOW}[SCANNING] Looking for {target} (up to {timeout:.0f}s)...{Colors.RESET}")
+    started = time.monotonic()
+    if address:
+        device = await BleakScanner.find_device_by_address(address, timeout=timeout)
+    else:
+        pattern = name_match.lower()
+        device = await BleakScanner.find_device_by_filter(
+            lambda d, advertisement: pattern in (d.name or advertisement.local_name or "").lower(), timeout=timeout)
+    if device is None:
+        return None
+    print(f"{Colors.GREEN}[FOUND] {device.name or '(Unknown)'} ({device.address}) after "
+          f"{time.monotonic() - started:.2f}s{Colors.RESET}")
+    registry.seen(device.address, device.name)
+    return device
+
+
+def cancel_on_signals():
+    """SIGTERM from the service manager (and Ctrl+C) cancel the running session - it ends through the normal shutdown"""
+    loop = asyncio.get_running_loop()
+    session = asyncio.current_task()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, session.cancel)
+        except (NotImplementedError, RuntimeError):
+            pass  # Windows: Ctrl+C still arrives as KeyboardInterrupt
+
+
+async def run_headless(args):
+    """No prompts: find the device, connect, run the script, receive until SIGTERM / Ctrl+C"""
+    print(f"{Colors.BOLD}MRS BLE Scanner V0.2{Colors.RESET} - headless mode "
+          f"(use implies acceptance of the user agreement)")
+    try:
+        steps = load_script(args.script) if args.script else []
+    except (OSError, ValueError) as e:
+        print(f"{Colors.RED}[ERROR] Script {args.script}: {e}{Colors.RESET}")
+        return 1
+    registry = DeviceRegistry(REGISTRY_PATH)
+    
+    device = await find_device(registry, args.address, args.name_match, args.scan_timeout)
+    if device is None:
+        print(f"{Colors.RED}[ERROR] Device not found within {args.scan_timeout:.0f}s{Colors.RESET}")
+        return 1
+    
+    scanner = BLEScanner(registry=registry)
+    scanner.auto_report_enabled = args.auto_report
+    if args.forward_url:
+        scanner.enable_forwarding(HTTPForwarder(args.forward_url))
+    
+    cancel_on_signals()
+    
+    exit_code = 0
+    try:
+        if args.capture:
+            scanner.start_capture(args.capture, device)
+        await scanner.connect(device)
+        scanner.console.start()
+        print(f"{Colors.BOLD}RECEIVE MODE{Colors.RESET}" +
+              (f" - HTTP POST: {args.forward_url}" if args.forward_url else "") +
+              (" - AUTO-REPORT" if args.auto_report else ""))
+        if steps:
+            print(f"{Colors.CYAN}[SCRIPT] {args.script}: {len(steps)} step(s){Colors.RESET}")
+            started = time.monotonic()
+            await run_script(scanner.engine, steps, on_response=lambda step, response: scanner.print_response(response))
+            print(f"{Colors.CYAN}[SCRIPT] Done in {time.monotonic() - started:.1f}s{Colors.RESET}")
+        if not (steps and args.exit_after_script):
+            await asyncio.Event().wait()
+        elif any(step.command and scanner.engine.keyword(step.command) == "TEST_PACKET" for step in steps):
+            # Stay for the end of the sequence (and its report) before disconnecting
+            try:
+                await asyncio.wait_for(scanner.sequence_done.wait(), timeout=SEQUENCE_TIMEOUT)
+            except asyncio.TimeoutError:
+                print(f"{Colors.YELLOW}[SCRIPT] TEST_PACKET sequence did not finish within "
+                      f"{SEQUENCE_TIMEOUT}s{Colors.RESET}")
+            if scanner.report_task:
+                await scanner.report_task
+    except asyncio.CancelledError:
+        print(f"\n{Colors.YELLOW}[STOPPING]...{Colors.RESET}")
+    except Exception as e:
+        print(f"{Colors.RED}[ERROR] {e}{Colors.RESET}")
+        exit_code = 1
+    finally:
+        await scanner.shutdown()
+        await scanner.console.stop()
+        if scanner.http_forwarder:
+            scanner.http_forwarder.close()
+        try:
+            registry.save()
+        except OSError as e:
+            logger.warning(f"Could not save device registry: {e}")
+    
+    print_session_stats(scanner)
+    return exit_code
+
+
+async def replay_capture(scanner, reader, speed=1.0, progress=None):
+    """
+    Feed a capture to scanner as if it came over the link - receive timestamps (logs, report) are the capture's
+    progress (dict) is kept current: notifications, commands, position (seconds into the capture)
+    """
+    progress = {} if progress is None else progress
+    progress.update(notifications=0, commands=0, position=0.0)
+    origin = datetime.fromtimestamp(reader.meta.get("started", time.time()))
+    scanner.clock = lambda: origin + timedelta(seconds=progress["position"])
+    last_rx = {}
+    
+    async for record in play(reader, speed):
+        progress["position"] = record.time
+        if record.kind == RX:
+            # A pause in which the live framer flushed a partial line does so at any replay speed
+            framer = scanner.framers.get(record.channel)
+            if framer and record.time - last_rx[record.channel] >= framer.flush_after:
+                framer.flush()
+            last_rx[record.channel] = record.time
+            progress["notifications"] += 1
+            scanner.notification_handler(record.channel, record.data)
+        elif record.kind == TX:
+            progress["commands"] += 1
+            scanner.console.post(scanner.render_notice,
+                                 f"[TX] {record.data.decode('utf-8', errors='ignore').strip()}", Colors.GREEN)
+        elif record.kind == LINK:
+            details = record.details
+            scanner.device_imei = details.get("imei") or scanner.device_imei
+            if details["event"] != "connected":
+                for framer in scanner.framers.values():
+                    framer.flush()
+            scanner.console.post(scanner.render_notice, f"[LINK] {details['event']}", Colors.YELLOW,
+                                 level=ESSENTIAL)
+    for framer in scanner.framers.values():
+        framer.flush()
+    return progress
+
+
+async def run_replay(args):
+    """Play a capture through the receive pipeline (diagnostics, parser, forwarding, reports) - no Bluetooth"""
+    try:
+        reader = CaptureReader(args.replay)
+    except (OSError, ValueError) as e:
+        print(f"{Colors.RED}[ERROR] Capture {args.replay}: {e}{Colors.RESET}")
+        return 1
+    meta = reader.meta
+    pace = f"{args.speed:g}x" if args.speed else "as fast as possible"
+    print(f"{Colors.BOLD}MRS BLE Scanner V0.2{Colors.RESET} - replay of {args.replay} ({pace})")
+    print(f"{Colors.DIM}  {meta.get('name') or 'Unknown'} ({meta.get('address') or '?'}), recorded "
+          f"{datetime.fromtimestamp(meta.get('started', 0)):%Y-%m-%d %H:%M:%S}{Colors.RESET}")
+    
+    scanner = BLEScanner()
+    scanner.auto_report_enabled = args.auto_report
+    scanner.device_imei = meta.get("imei") or scanner.device_imei
+    if args.forward_url:
+        scanner.enable_forwarding(HTTPForwarder(args.forward_url))
+    cancel_on_signals()
+    
+    progress = {}
+    exit_code = 0
+    started = time.monotonic()
+    elapsed = None
+    try:
+        scanner.console.start()
+        await replay_capture(scanner, reader, args.speed, progress)
+        elapsed = time.monotonic() - started  # the pipeline, not the report written afterwards
+        if scanner.report_task:
+            await scanner.report_task
+    except asyncio.CancelledError:
+        print(f"\n{Colors.YELLOW}[STOPPING]...{Colors.RESET}")
+    except Exception as e:
+        print(f"{Colors.RED}[ERROR] {e}{Colors.RESET}")
+        exit_code = 1
+    finally:
+        elapsed = elapsed or time.monotonic() - started
+        await scanner.shutdown()
+        await scanner.console.stop()
+        if scanner.http_forwarder:
+            scanner.http_forwarder.close()
+    
+    notifications = progress.get("notifications", 0)
+    print(f"\n{Colors.CYAN}[REPLAY]{Colors.RESET} {notifications} notification(s), {progress.get('commands', 0)} "
+          f"command(s) - {progress.get('position', 0):.1f}s of capture in {elapsed:.2f}s "
+          f"({notifications / max(elapsed, 1e-9):.0f} notifications/s)")
+    if reader.truncated:
+        print(f"{Colors.YELLOW}  Capture ends mid-record (recording was interrupted) - "
+              f"played up to the last complete record{Colors.RESET}")
+    print_session_stats(scanner)
+    return exit_code
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="MRS BLE Scanner V0.2 - without --address/--name-match it runs interactively",
+        epilog="Headless example: python Scanner.py --name-match 123456 --forward-url http://server/api "
+               "--script setup.txt --no-install")
+    headless = parser.add_argument_group("headless mode (no prompts, for service managers)")
+    headless.add_argument("--address", help="connect to the device with this BLE address")
+    headless.add_argument("--name-match", metavar="TEXT",
+                          help="connect to the first device whose name contains TEXT (e.g. the IMEI digits)")
+    headless.add_argument("--script", metavar="FILE",
+                          help="commands to send after connecting (one per line, # comments, 'wait <s>')")
+    headless.add_argument("--exit-after-script", action="store_true",
+                          help="disconnect when the script is done instead of receiving until stopped")
+    headless.add_argument("--auto-report", action="store_true",
+                          help="write a PDF report after each TEST_PACKET sequence")
+    headless.add_argument("--scan-timeout", type=float, default=HEADLESS_SCAN_SECONDS, metavar="SECONDS",
+                          help=f"give up if the device is not found (default {HEADLESS_SCAN_SECONDS})")
+    parser.add_argument("--forward-url", metavar="URL", help="forward sensor readings to this HTTP API")
+    parser.add_argument("--capture", metavar="FILE",
+                        help="record the session (notifications, commands, link events) to a binary capture file")
+    replay = parser.add_argument_group("replay (no Bluetooth)")
+    replay.add_argument("--replay", metavar="FILE",
+                        help="play a capture through diagnostics, parser, forwarding and reports")
+    replay.add_argument("--speed", type=float, default=1.0, metavar="FACTOR",
+                        help="replay speed (default 1 = as recorded, 10 = ten times faster, 0 = as fast as possible)")
+    parser.add_argument("--simulate", nargs="?", const="", metavar="SPEC",
+                        help="simulated sensors instead of Bluetooth, e.g. sensors=3,faults=ok/no-ack,speed=20 "
+                             "(also set by the MRS_SIMULATOR environment variable; see SensorSimulator.py)")
+    parser.add_argument("--no-install", action="store_true",
+                        help="do not check for / pip install missing packages at startup")
+    args = parser.parse_args(argv)
+    if args.simulate:
+        from SensorSimulator import SimulatorConfig
+        try:
+            SimulatorConfig.parse(args.simulate)
+        except ValueError as e:
+            parser.error(f"--simulate: {e}")
+    if args.address and args.name_match:
+        parser.error("use either --address or --name-match")
+    if args.replay and (args.address or args.name_match or args.script or args.exit_after_script or args.capture):
+        parser.error("--replay cannot be combined with --address, --name-match, --script, "
+                     "--exit-after-script or --capture")
+    if (args.script or args.exit_after_script) and not (args.address or args.name_match):
+        parser.error("--script and --exit-after-script need --address or --name-match")
+    if args.auto_report and not (args.address or args.name_match or args.replay):
+        parser.error("--auto-report needs --address, --name-match or --replay")
+    if args.speed < 0:
+        parser.error("--speed must be 0 or more")
+    return args
+
+
+async def main(args):
     """Main function"""
+    if args.replay:
+        return await run_replay(args)
+    if args.address or args.name_match:
+        return await run_headless(args)
+    
     print_header()
     
     # Show agreement
@@ -666,46 +1557,84 @@ async def main():
     
     print()
     
-    # Ask about HTTP mode at startup
-    print(f"{Colors.YELLOW}Do you want to enable HTTP forwarding at startup?{Colors.RESET}")
-    print(f"{Colors.DIM}(You can also enable this later with Ctrl+P){Colors.RESET}")
-    
-    try:
-        enable_http = input(f"\n{Colors.YELLOW}Enter API URL (or press ENTER to skip): {Colors.RESET}").strip()
-    except (EOFError, KeyboardInterrupt):
-        enable_http = ""
+    # Ask about HTTP mode at startup (unless given with --forward-url)
+    enable_http = args.forward_url
+    if not enable_http:
+        print(f"{Colors.YELLOW}Do you want to enable HTTP forwarding at startup?{Colors.RESET}")
+        print(f"{Colors.DIM}(You can also enable this later with Ctrl+P){Colors.RESET}")
+        
+        try:
+            enable_http = input(f"\n{Colors.YELLOW}Enter API URL (or press ENTER to skip): {Colors.RESET}").strip()
+        except (EOFError, KeyboardInterrupt):
+            enable_http = ""
     
     http_forwarder = None
     if enable_http:
         http_forwarder = HTTPForwarder(enable_http)
         print(f"{Colors.GREEN}[ENABLED] HTTP forwarding to: {enable_http}{Colors.RESET}")
     
-    # Scan
-    devices = await scan_devices()
+    scan = ask_scan_mode()
+    
+    # From here on keys are read by the event loop (cbreak mode on Linux terminals)
+    keys = KeyReader()
+    keys.start()
+    try:
+        await connect_and_run(keys, http_forwarder, DeviceRegistry(REGISTRY_PATH), scan, args.capture)
+    finally:
+        keys.stop()
+
+
+async def connect_and_run(keys, http_forwarder, registry=None, scan=None, capture=None):
+    """
+    Scan (scan = scan_devices() settings), let the user pick a device, then stay in receive mode until exit
+    capture: file to record a single-device session to
+    """
+    devices = await scan_devices(keys, registry, **(scan or {}))
     
     if not devices:
         return
     
-    print(f"\n{Colors.YELLOW}Select device number (or ENTER for 1): {Colors.RESET}", end="", flush=True)
+    marked = [i for i, (device, _) in enumerate(devices, 1) if device.name and DUSTBIN_NAME in device.name]
+    print(f"\n{Colors.DIM}Fleet mode: select several devices - 1,3,5 / 2-6 / all / * (all dustbin sensors){Colors.RESET}")
+    print(f"{Colors.DIM}Diagnostic sweep: type sweep to run TEST_PACKET on every dustbin sensor (*){Colors.RESET}")
     try:
-        device_input = input().strip()
-        device_num = int(device_input) if device_input else 1
-    except (ValueError, EOFError, KeyboardInterrupt):
-        device_num = 1
+        choice = await keys.read_line(f"{Colors.YELLOW}Select device number (or ENTER for 1): {Colors.RESET}")
+    except (EOFError, KeyboardInterrupt):
+        choice = ""
         print(f"{Colors.DIM}(using device 1){Colors.RESET}")
     
-    if device_num < 1 or device_num > len(devices):
-        print(f"{Colors.RED}[ERROR] Invalid selection! Using device 1{Colors.RESET}")
-        device_num = 1
+    sweep = choice.strip().lower() == "sweep"
+    if not sweep:
+        try:
+            selection = parse_selection(choice, len(devices), marked)
+        except ValueError as e:
+            print(f"{Colors.RED}[ERROR] Invalid selection ({e})! Using device 1{Colors.RESET}")
+            selection = [1]
+    
+    if capture and (sweep or len(selection) > 1):
+        print(f"{Colors.DIM}[CAPTURE] Only single-device sessions are recorded - {capture} not written{Colors.RESET}")
+    
+    if sweep:
+        # Only sensors advertising right now - known ones out of range would just time out
+        in_range = [devices[number - 1][0] for number in marked
+                    if not isinstance(devices[number - 1][0], DeviceProfile)]
+        await run_sweep(keys, in_range, http_forwarder, registry)
+        return
+    
+    if len(selection) > 1:
+        await run_fleet(keys, [devices[number - 1][0] for number in selection], http_forwarder, registry)
+        return
     
-    selected_device, selected_rssi = devices[device_num - 1]
+    selected_device, selected_rssi = devices[selection[0] - 1]
     print(f"\n{Colors.GREEN}[SELECTED] {selected_device.name} ({selected_device.address}){Colors.RESET}")
     
-    scanner = BLEScanner()
+    scanner = BLEScanner(keys, registry=registry)
     if http_forwarder:
-        scanner.http_forwarder = http_forwarder
+        scanner.enable_forwarding(http_forwarder)
     
     try:
+        if capture:
+            scanner.start_capture(capture, selected_device)
         await scanner.connect(selected_device)
         await asyncio.sleep(1)
         await scanner.run()
@@ -715,26 +1644,66 @@ async def main():
     except Exception as e:
         print(f"\n{Colors.RED}[ERROR] {e}{Colors.RESET}")
     finally:
-        await scanner.disconnect()
+        # Let queued POSTs finish (bounded wait)
+        await scanner.shutdown()
+        await scanner.console.stop()
+        if scanner.http_forwarder:
+            scanner.http_forwarder.close()
     
-    # Print stats
+    print_session_stats(scanner)
+    print(f"\n{Colors.GREEN}[EXIT] Goodbye{Colors.RESET}")
+
+
+def print_session_stats(scanner):
     print(f"\n{Colors.CYAN}[STATS]{Colors.RESET}")
     print(f"  Messages received: {scanner.message_count}")
+    if scanner.link_summary():
+        print(f"  Link: {scanner.link_summary()}")
+    if scanner.engine.requests:
+        stats = scanner.engine.stats()
+        unanswered = f", {stats['timeouts']} unanswered" if stats['timeouts'] else ""
+        print(f"  Commands: {stats['requests']} sent, answered in {stats['avg_response_s']}s on average{unanswered}")
+    fragments = sum(framer.fragments for framer in scanner.framers.values())
+    if fragments > scanner.message_count:
+        print(f"  Reassembly: {fragments} notifications -> {scanner.message_count} lines")
+    writer = scanner.writers.get(scanner.primary_write_char)
+    if writer and writer.payloads:
+        stats = writer.stats()
+        print(f"  Writes: {stats['payloads']} command(s) in {stats['chunks']} chunk(s) of up to "
+              f"{stats['chunk_size']} bytes ({stats['mode']})")
+    if scanner.capture:
+        stats = scanner.capture.stats()
+        print(f"  Capture: {stats['records']} records ({stats['bytes'] / 1024:.1f} KB) -> {scanner.capture.path}")
+    if scanner.console.coalesced:
+        print(f"  Console: {scanner.console.coalesced} messages summarised while output was catching up")
     if scanner.http_forwarder:
-        print(f"  HTTP Success: {scanner.http_forwarder.success_count}")
-        print(f"  HTTP Errors: {scanner.http_forwarder.error_count}")
-    print(f"\n{Colors.GREEN}[EXIT] Goodbye{Colors.RESET}")
+        scanner.print_forward_stats(indent="  HTTP ")
+    if scanner.forward_queue and scanner.forward_queue.depth:
+        print(f"  {Colors.YELLOW}{scanner.forward_queue.depth} reading(s) kept in {scanner.outbox_path} - "
+              f"sent on next run with HTTP forwarding{Colors.RESET}")
 
 
 if __name__ == "__main__":
     os.system('')  # Enable ANSI colors on Windows
+    args = parse_args()
+    if SIMULATE:
+        import SensorSimulator
+        try:
+            config = SensorSimulator.install(args.simulate or None)
+        except ValueError as e:
+            print(f"{Colors.RED}[ERROR] {SensorSimulator.ENV_VAR}: {e}{Colors.RESET}")
+            sys.exit(2)
+        print(f"{Colors.YELLOW}[SIMULATOR] {config.describe()} - no Bluetooth{Colors.RESET}")
     
+    exit_code = 0
     try:
-        asyncio.run(main())
+        exit_code = asyncio.run(main(args)) or 0
     except KeyboardInterrupt:
         print(f"\n{Colors.YELLOW}[EXIT] Goodbye{Colors.RESET}")
     except EOFError:
         print(f"\n{Colors.YELLOW}[EXIT] Goodbye{Colors.RESET}")
     except Exception:
         print(f"\n{Colors.YELLOW}[EXIT] Goodbye{Colors.RESET}")
+        exit_code = 1
+    sys.exit(exit_code)
 
@@ -0,0 +1,345 @@
+"""
+Sensor Parser Module for MRS BLE Scanner V0.2
+Turns sensor lines into typed readings and NHR API payloads:
+  temp:24.25 ,fill:76 ,batt:3.2             WastebinReading
+  angle : x=89 ,y=0 ,z=0                    WastebinReading (tilt)
+  s1:2 cm(3%) ,s2:2 cm(3%) => [lv1] , ...   UltrasonicReading
+  distance: s1 20 mm ,s2 20 mm              DistanceReading
+"""
+
+import logging
+import re
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+# Sensor key -> (payload field, value kind)
+#   int      leading digits              fill:76
+#   decimal  leading digits and dots     temp:24.25  batt:3.2
+#   signed   digits, dots and minus      x:0.29  y:-88.43  z=-0.01
+SENSOR_FIELDS = {
+    'fill': ('data', 'int'),
+    'temp': ('temperature', 'decimal'),
+    'batt': ('battery', 'decimal'),
+    'x': ('tilt_x', 'signed'),
+    'y': ('tilt_y', 'signed'),
+    'z': ('tilt_z', 'signed'),
+}
+
+# The token pattern captures [-\d.]+ for every key; cut it down to the part the kind allows
+TRIM = {
+    'int': lambda value: value.split('-', 1)[0].split('.', 1)[0],
+    'decimal': lambda value: value.split('-', 1)[0],
+    'signed': lambda value: value,
+}
+FIELD_TRIM = {key: TRIM[kind] for key, (_, kind) in SENSOR_FIELDS.items()}
+
+# Single pass over the line: a known key that is not the tail of a longer word,
+# optional ':', '=' or whitespace, then a numeric value
+TOKEN_RE = re.compile(
+    r'(?<![A-Za-z0-9])(' + '|'.join(sorted(SENSOR_FIELDS, key=len, reverse=True)) + r')[:=\s]*([-\d.]+)',
+    re.IGNORECASE
+)
+
+_clock = {'second': None, 'text': ''}
+
+
+def timestamp() -> str:
+    """Local time as 'YYYY-MM-DD HH:MM:SS', formatted once per second"""
+    second = int(time.time())
+    if second != _clock['second']:
+        _clock['second'] = second
+        _clock['text'] = datetime.fromtimestamp(second).strftime('%Y-%m-%d %H:%M:%S')
+    return _clock['text']
+
+
+def tokenize(raw_str: str) -> dict:
+    """First valid value of every known key, e.g. {'temp': '24.25', 'fill': '76'}"""
+    values = {}
+    for key, value in TOKEN_RE.findall(raw_str):
+        key = key.lower()
+        if key not in values:
+            value = FIELD_TRIM[key](value)
+            if value:
+                values[key] = value
+    return values
+
+
+def base_payload(device_imei: str) -> dict:
+    """NHR payload with no sensor values filled in"""
+    return {
+        "cmd": "RP",
+        "device": device_imei,
+        "battery": "0",
+        "time": timestamp(),
+        "dIndex": "0410",
+        "data": "0"
+    }
+
+
+def format_number(value: float) -> str:
+    return f"{value:g}"
+
+
+@dataclass
+class WastebinReading:
+    """key:value line - fill/temperature/battery and/or x/y/z tilt"""
+    fill: Optional[str] = None
+    temperature: Optional[str] = None
+    battery: Optional[str] = None
+    tilt_x: Optional[str] = None
+    tilt_y: Optional[str] = None
+    tilt_z: Optional[str] = None
+
+    kind = "wastebin"
+
+    def to_payload(self, device_imei: str) -> dict:
+        payload = base_payload(device_imei)
+        if self.fill is not None:
+            payload["data"] = self.fill
+        if self.temperature is not None:
+            payload["temperature"] = self.temperature
+        if self.battery is not None:
+            payload["battery"] = self.battery
+
+        # For tilt sensors (x, y, z) - calculate fill level from tilt
+        if self.tilt_y is not None and self.fill is None:
+            try:
+                # Y-axis close to -90 means upright/empty, close to 0 means tilted/full
+                y_val = abs(float(self.tilt_y))
+            except ValueError:
+                logger.warning(f"Parse error: bad tilt value {self.tilt_y!r}")
+            else:
+                # Convert tilt to fill percentage (rough estimate)
+                if y_val > 80:
+                    fill_pct = min(100, int((90 - y_val) * 10))
+                else:
+                    fill_pct = min(100, int(100 - y_val))
+                payload["data"] = str(max(0, fill_pct))
+                payload["tilt_y"] = self.tilt_y
+
+        if self.tilt_x is not None:
+            payload["tilt_x"] = self.tilt_x
+        if self.tilt_z is not None:
+            payload["tilt_z"] = self.tilt_z
+        return payload
+
+
+@dataclass
+class UltrasonicReading:
+    """s1:2 cm(3%) ,s2:2 cm(3%) => [lv1] , cnt:0/10 min"""
+    s1_cm: Optional[float] = None
+    s2_cm: Optional[float] = None
+    s1_percent: Optional[int] = None
+    s2_percent: Optional[int] = None
+    level: Optional[int] = None     # 1=low, 2=medium, 3=high
+    events: Optional[int] = None    # events per 10 minutes
+
+    kind = "ultrasonic"
+
+    def to_payload(self, device_imei: str) -> dict:
+        payload = base_payload(device_imei)
+        percents = [p for p in (self.s1_percent, self.s2_percent) if p is not None]
+        if percents:
+            payload["data"] = str(min(100, max(percents)))
+        if self.s1_cm is not None:
+            payload["distance_s1"] = format_number(self.s1_cm)
+        if self.s2_cm is not None:
+            payload["distance_s2"] = format_number(self.s2_cm)
+        if self.level is not None:
+            payload["level"] = str(self.level)
+        return payload
+
+
+@dataclass
+class DistanceReading:
+    """distance: s1 20 mm ,s2 20 mm  /  distance: 2 cm ,2 cm"""
+    s1_cm: Optional[float] = None
+    s2_cm: Optional[float] = None
+
+    kind = "distance"
+
+    def to_payload(self, device_imei: str) -> dict:
+        payload = base_payload(device_imei)
+        if self.s1_cm is not None:
+            payload["distance_s1"] = format_number(self.s1_cm)
+        if self.s2_cm is not None:
+            payload["distance_s2"] = format_number(self.s2_cm)
+        return payload
+
+
+# Format parsers: line -> reading, or None if the line is not in that format
+
+def parse_wastebin(line: str) -> Optional[WastebinReading]:
+    values = tokenize(line)
+    if not values:
+        return None
+    return WastebinReading(
+        fill=values.get('fill'),
+        temperature=values.get('temp'),
+        battery=values.get('batt'),
+        tilt_x=values.get('x'),
+        tilt_y=values.get('y'),
+        tilt_z=values.get('z')
+    )
+
+
+ULTRASONIC_RE = re.compile(r'\bs([12])\s*:\s*([\d.]+)\s*(cm|mm)?\s*(?:\(\s*(\d+)\s*%\s*\))?', re.IGNORECASE)
+LEVEL_RE = re.compile(r'\[\s*lv\s*(\d)\s*\]', re.IGNORECASE)
+COUNT_RE = re.compile(r'\bcnt\s*:\s*(\d+)', re.IGNORECASE)
+
+
+def to_cm(value: str, unit: str) -> float:
+    return float(value) / 10 if unit and unit.lower() == 'mm' else float(value)
+
+
+def parse_ultrasonic(line: str) -> Optional[UltrasonicReading]:
+    reading = UltrasonicReading()
+    found = False
+    for sensor, value, unit, percent in ULTRASONIC_RE.findall(line):
+        try:
+            cm = to_cm(value, unit)
+        except ValueError:
+            continue
+        found = True
+        setattr(reading, f"s{sensor}_cm", cm)
+        if percent:
+            setattr(reading, f"s{sensor}_percent", int(percent))
+    if not found:
+        return None
+    level = LEVEL_RE.search(line)
+    if level:
+        reading.level = int(level.group(1))
+    count = COUNT_RE.search(line)
+    if count:
+        reading.events = int(count.group(1))
+    return reading
+
+
+DISTANCE_RE = re.compile(r'(?:\bs([12])\s*)?([\d.]+)\s*(cm|mm)\b', re.IGNORECASE)
+
+
+def parse_distance(line: str) -> Optional[DistanceReading]:
+    head, sep, rest = line.partition(':')
+    if not sep or head.strip().lower() != 'distance':
+        return None
+    reading = DistanceReading()
+    position = 0
+    for sensor, value, unit in DISTANCE_RE.findall(rest):
+        position += 1
+        try:
+            cm = to_cm(value, unit)
+        except ValueError:
+            continue
+        setattr(reading, f"s{sensor or position}_cm", cm)
+    if reading.s1_cm is None and reading.s2_cm is None:
+        return None
+    return reading
+
+
+class ParserRegistry:
+    """
+    Format parsers keyed by the first token of a line
+    Dispatch walks a character trie over the start of the line (case-insensitive,
+    longest registered prefix that ends at a word boundary). The parser that
+    worked for a device is cached and tried first next time, so steady-state
+    lines skip the sniffing; lines no prefix matches go to the fallback parser
+    """
+
+    def __init__(self, fallback: Callable = None):
+        self.trie: Dict[str, dict] = {}
+        self.fallback = fallback
+        self.device_parsers: Dict[str, Callable] = {}
+        self.cache_hits = 0
+        self.sniffs = 0
+
+    def register(self, prefixes: Iterable[str], parser: Callable):
+        for prefix in prefixes:
+            node = self.trie
+            for char in prefix.lower():
+                node = node.setdefault(char, {})
+            node[None] = parser  # None key marks the end of a prefix
+
+    def lookup(self, line: str) -> Optional[Callable]:
+        """Parser registered for the line's first token, if any"""
+        node = self.trie
+        found = None
+        text = line.lstrip()
+        for i, char in enumerate(text):
+            node = node.get(char.lower())
+            if node is None:
+                break
+            if None in node and (i + 1 == len(text) or not text[i + 1].isalnum()):
+                found = node[None]
+        return found
+
+    def parse(self, line: str, device: str = None):
+        """Typed reading for line, or None if no parser understands it"""
+        cached = self.device_parsers.get(device)
+        if cached is not None:
+            reading = cached(line)
+            if reading is not None:
+                self.cache_hits += 1
+                return reading
+
+        self.sniffs += 1
+        parser = self.lookup(line)
+        if parser is not None and parser is not cached:
+            reading = parser(line)
+            if reading is not None:
+                if device is not None:
+                    self.device_parsers[device] = parser
+                return reading
+
+        if self.fallback is not None and self.fallback is not cached:
+            return self.fallback(line)
+        return None
+
+    def forget(self, device: str):
+        self.device_parsers.pop(device, None)
+
+
+def default_registry() -> ParserRegistry:
+    registry = ParserRegistry(fallback=parse_wastebin)
+    registry.register(('temp', 'fill', 'batt', 'x', 'y', 'z', 'angle', 'read'), parse_wastebin)
+    registry.register(('s1', 's2'), parse_ultrasonic)
+    registry.register(('distance',), parse_distance)
+    return registry
+
+
+class WastebinDataParser:
+    """Parse wastebin sensor data and convert to NHR API format"""
+
+    def __init__(self, registry: ParserRegistry = None):
+        self.registry = registry or default_registry()
+
+    def read(self, raw_str, device_imei="000000000000000"):
+        """Typed reading for any known sensor format (format last seen from this device first)"""
+        return self.registry.parse(raw_str, device_imei)
+
+    @staticmethod
+    def to_payload(reading, device_imei="000000000000000"):
+        """NHR payload for a reading - the default payload if there is none"""
+        if reading is None:
+            return base_payload(device_imei)
+        return reading.to_payload(device_imei)
+
+    def parse(self, raw_str, device_imei="000000000000000"):
+        """Any known sensor format -> NHR payload. Unknown lines give the default payload"""
+        return self.to_payload(self.read(raw_str, device_imei), device_imei)
+
+    @staticmethod
+    def parse_sensor_string(raw_str, device_imei="000000000000000"):
+        """
+        Parse sensor data string and return JSON payload for HTTP POST
+        Expected format: temp:24.25 ,fill:76 ,batt:3.2
+        Or fallback: temp:24.25 ,x:0.29 ,y:-88.43 ,z=-0.01
+        """
+        reading = parse_wastebin(raw_str)
+        if reading is None:
+            return base_payload(device_imei)
+        return reading.to_payload(device_imei)
@@ -0,0 +1,965 @@
+"""
+Sensor Simulator Module for MRS BLE Scanner V0.2
+Stand-ins for bleak's BleakScanner/BleakClient backed by simulated MRS M06
+NB-IoT dustbin sensors: they advertise as N_01E1_N6BR1_<IMEI tail>, expose
+the Nordic UART service, answer the custom and AT commands and run the
+TEST_PACKET modem sequence with its usual timing - or with an injected fault.
+Event loops can run on a scaled clock, so sleeps, timeouts and the sensors'
+own timing all pass faster than real time.
+
+Selected with --simulate [SPEC] (Scanner.py) or the MRS_SIMULATOR environment
+variable; other tools (V0.1, Firmware Cracker) are started through this file:
+  python SensorSimulator.py --spec "sensors=3,faults=ok/no-ack,speed=20" ../Firmware\ Cracker/CrackFirmware.py
+"""
+
+import argparse
+import asyncio
+import importlib.machinery
+import importlib.util
+import logging
+import os
+import random
+import re
+import runpy
+import select
+import selectors
+import sys
+import types
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+ENV_VAR = "MRS_SIMULATOR"
+
+# Faults a sensor's TEST_PACKET sequence can be given
+OK = "ok"
+CEREG_LOOP = "cereg-loop"       # never registers (+CEREG: 2,2 until the modem gives up)
+CIPSEND_FAIL = "cipsend-fail"   # socket opens, the packet is not sent
+NO_ACK = "no-ack"               # packet sent, the server never answers
+FAULTS = (OK, CEREG_LOOP, CIPSEND_FAIL, NO_ACK)
+
+SPEC_HELP = ("comma-separated key=value: sensors=N, faults=ok/cereg-loop/cipsend-fail/no-ack "
+             "(one per sensor, repeated), speed=FACTOR, mtu=23..517, seed=N, others=N (non-sensor "
+             "devices advertising), readings=SECONDS (0 = none)")
+
+# Nordic UART Service - RX is written by the central, TX notifies
+UART_SERVICE_UUID = "6e400001-b5a3-f393-e0a9-e50e24dcca9e"
+UART_RX_CHAR_UUID = "6e400002-b5a3-f393-e0a9-e50e24dcca9e"
+UART_TX_CHAR_UUID = "6e400003-b5a3-f393-e0a9-e50e24dcca9e"
+GENERIC_ACCESS_UUID = "00001800-0000-1000-8000-00805f9b34fb"
+DEVICE_NAME_UUID = "00002a00-0000-1000-8000-00805f9b34fb"
+APPEARANCE_UUID = "00002a01-0000-1000-8000-00805f9b34fb"
+GENERIC_ATTRIBUTE_UUID = "00001801-0000-1000-8000-00805f9b34fb"
+SERVICE_CHANGED_UUID = "00002a05-0000-1000-8000-00805f9b34fb"
+
+DUSTBIN_NAME = "N_01E1_N6BR1"
+IMEI_PREFIX = "351469520"
+SERVER_IP = "47.245.56.17"
+SERVER_PORT = 8080
+APN = "m2mxnbiot"
+
+# Link timing (seconds, simulated clock)
+ADVERT_INTERVAL = 0.5           # every advertiser once per interval, staggered
+CONNECT_SECONDS = 0.8           # connection + service discovery
+CONNECT_CACHED_SECONDS = 0.3    # services= given (reconnect with known services)
+CONNECTION_INTERVAL = 0.0075    # between the notifications of one line, and for a write with response
+REBOOT_SECONDS = 3.0            # SYS_RESET until the sensor advertises again
+COMMAND_IDLE = 0.05             # a write without CR/LF is taken as a command after this
+
+# Sensor timing: UART lines, modem answers, network registration
+LINE_GAP = 0.02
+COMMAND_GAP = 0.2               # between the modem commands of the TEST_PACKET sequence
+AT_DELAY = 0.15                 # modem answer after the command
+CEREG_POLL_INTERVAL = 2.0
+CEREG_POLLS = 30                # searching polls before the modem gives up (cereg-loop)
+ACK_DELAY = 1.2
+ACK_WAIT = 5.0                  # how long the sequence waits for an ACK that does not come
+
+OTHER_NAMES = [None, "Galaxy Watch5 (3F2A)", "LE-Bose QC45", "[TV] Samsung 7 Series", "Mi Smart Band 6", None]
+
+HELP_COMMANDS = ["?", "CMD_1 through CMD_9", "CMD_LIST", "SYS_RESET", "SYS_INFO", "SENSOR_SHOW", "READ_SET",
+                 "TIMESTAMP?", "UART_SHOW", "UART_SEND=", "FORCE_ALIVE", "FIFO_SHOW", "FORCE_ATTACH", "COTA_CFG",
+                 "DATE:", "TIME:", "NOW", "SET_IP", "SET_PORT", "SET_ALIVE", "SET_SENSOR", "S1_DEPTH", "S2_DEPTH",
+                 "SET_S_MON", "SET_S_RCNT", "PD_START", "PD_6AXIS", "PD_TX", "PD_SLEEP", "SYS_OPEN", "SYS_SLEEP",
+                 "DISTANCE", "6AXIS_RESET", "SENSOR_RESET", "LORA_SHOW", "NB_SHOW", "VOLTAGE", "DIS_KEEP",
+                 "VOL_RECORD", "VOL_CLEAR", "SEND_VREC", "TEST_PACKET", "RP_FG", "REPORT", "S1_DIS_LV", "S2_DIS_LV",
+                 "DETECT_MODE", "KEEP_DETECT", "BL_NAME", "COVER_CHK", "COVER_ALARM", "SELECT_DETECT"]
+
+
+class BleakError(Exception):
+    """Raised where bleak raises BleakError"""
+
+
+@dataclass
+class SimulatorConfig:
+    """What to simulate - parsed from the --simulate / MRS_SIMULATOR spec"""
+    sensors: int = 1
+    faults: Tuple[str, ...] = (OK,)
+    speed: float = 1.0
+    mtu: int = 247
+    seed: int = 0
+    others: int = 2
+    readings: float = 30.0
+
+    @classmethod
+    def parse(cls, spec: Optional[str]) -> "SimulatorConfig":
+        """'sensors=3,faults=ok/no-ack,speed=20' - empty (or 1/on) for the defaults; ValueError if invalid"""
+        config = cls()
+        for item in (spec or "").split(","):
+            item = item.strip()
+            if item.lower() in ("", "1", "on", "yes", "true"):
+                continue
+            key, sep, value = item.partition("=")
+            key, value = key.strip().lower(), value.strip()
+            if not sep or key not in PARSERS:
+                raise ValueError(f"'{item}' - expected key=value with key one of {', '.join(PARSERS)}")
+            try:
+                setattr(config, key, PARSERS[key](value))
+            except ValueError as e:
+                raise ValueError(f"{key}: {e}") from None
+        return config
+
+    def fault_for(self, index: int) -> str:
+        return self.faults[index % len(self.faults)]
+
+    def describe(self) -> str:
+        return (f"{self.sensors} simulated sensor(s), faults {'/'.join(self.faults)}, MTU {self.mtu}, "
+                f"{self.speed:g}x speed")
+
+
+def _bounded(kind: Callable, low, high=None):
+    def parse(value: str):
+        number = kind(value)
+        if number < low or (high is not None and number > high):
+            raise ValueError(f"{value} is out of range ({low}..{high if high is not None else ''})")
+        return number
+    return parse
+
+
+def _faults(value: str) -> Tuple[str, ...]:
+    faults = tuple(fault.strip().lower() for fault in value.split("/") if fault.strip())
+    unknown = [fault for fault in faults if fault not in FAULTS]
+    if not faults or unknown:
+        raise ValueError(f"'{value}' - use {'/'.join(FAULTS)}")
+    return faults
+
+
+def _speed(value: str) -> float:
+    speed = float(value)
+    if not speed > 0:
+        raise ValueError("must be more than 0")
+    return speed
+
+
+PARSERS = {
+    "sensors": _bounded(int, 1, 50),
+    "faults": _faults,
+    "speed": _speed,
+    "mtu": _bounded(int, 23, 517),
+    "seed": int,
+    "others": _bounded(int, 0, 20),
+    "readings": _bounded(float, 0),
+}
+
+
+# ---------------------------------------------------------------------------
+# bleak data types
+# ---------------------------------------------------------------------------
+
+@dataclass
+class BLEDevice:
+    address: str
+    name: Optional[str]
+    details: object = None
+
+
+@dataclass
+class AdvertisementData:
+    local_name: Optional[str]
+    manufacturer_data: Dict[int, bytes]
+    service_data: Dict[str, bytes]
+    service_uuids: List[str]
+    tx_power: Optional[int]
+    rssi: int
+    platform_data: tuple = ()
+
+
+@dataclass
+class GattCharacteristic:
+    uuid: str
+    properties: List[str]
+    handle: int
+    service_uuid: str
+    description: str = ""
+    max_write_without_response_size: int = 20
+    descriptors: list = field(default_factory=list)
+
+
+@dataclass
+class GattService:
+    uuid: str
+    description: str
+    characteristics: List[GattCharacteristic]
+    handle: int
+
+
+class GattServices:
+    """BleakGATTServiceCollection: iterate the services, look up characteristics"""
+
+    def __init__(self, services: List[GattService]):
+        self.services = {service.handle: service for service in services}
+        self.characteristics = {char.handle: char for service in services for char in service.characteristics}
+
+    def __iter__(self):
+        return iter(self.services.values())
+
+    def get_service(self, specifier) -> Optional[GattService]:
+        if isinstance(specifier, int):
+            return self.services.get(specifier)
+        return next((service for service in self if service.uuid == str(specifier).lower()), None)
+
+    def get_characteristic(self, specifier) -> Optional[GattCharacteristic]:
+        if isinstance(specifier, GattCharacteristic):
+            return specifier
+        if isinstance(specifier, int):
+            return self.characteristics.get(specifier)
+        uuid = str(specifier).lower()
+        return next((char for char in self.characteristics.values() if char.uuid == uuid), None)
+
+    def only(self, service_uuids) -> "GattServices":
+        """The services= subset a reconnect asks for"""
+        wanted = {str(uuid).lower() for uuid in service_uuids}
+        return GattServices([service for service in self if service.uuid in wanted])
+
+
+def sensor_services(mtu: int) -> GattServices:
+    """GATT table of an MRS sensor: GAP, GATT and the Nordic UART service"""
+    layout = [
+        (GENERIC_ACCESS_UUID, "Generic Access Profile", [(DEVICE_NAME_UUID, ["read"]), (APPEARANCE_UUID, ["read"])]),
+        (GENERIC_ATTRIBUTE_UUID, "Generic Attribute Profile", [(SERVICE_CHANGED_UUID, ["indicate"])]),
+        (UART_SERVICE_UUID, "Nordic UART Service", [(UART_RX_CHAR_UUID, ["write-without-response", "write"]),
+                                                    (UART_TX_CHAR_UUID, ["notify"])]),
+    ]
+    services = []
+    handle = 1
+    for uuid, description, chars in layout:
+        service = GattService(uuid, description, [], handle)
+        for char_uuid, properties in chars:
+            handle += 2
+            service.characteristics.append(GattCharacteristic(char_uuid, properties, handle, uuid,
+                                                              max_write_without_response_size=mtu - 3))
+        services.append(service)
+        handle += 2
+    return GattServices(services)
+
+
+# ---------------------------------------------------------------------------
+# Simulated devices
+# ---------------------------------------------------------------------------
+
+class Advertiser:
+    """A device in range: non-sensors only advertise (connecting to them fails)"""
+
+    connectable = False
+
+    def __init__(self, address: str, name: Optional[str], rssi: int, rng: random.Random):
+        self.address = address
+        self.name = name
+        self.base_rssi = rssi
+        self.rng = rng
+        self.service_uuids: List[str] = []
+        self.client = None
+        self.rebooting = False
+
+    @property
+    def advertising(self) -> bool:
+        """Connected or rebooting devices do not advertise"""
+        return self.client is None and not self.rebooting
+
+    def advertise(self) -> Tuple[BLEDevice, AdvertisementData]:
+        rssi = max(-100, min(-30, round(self.rng.gauss(self.base_rssi, 3))))
+        advertisement = AdvertisementData(self.name, {}, {}, list(self.service_uuids), None, rssi)
+        return BLEDevice(self.address, self.name), advertisement
+
+
+class SimulatedSensor(Advertiser):
+    """
+    One MRS dustbin sensor. Commands arrive as UART RX writes and are handled
+    one at a time; answers go out as TX notifications of at most MTU - 3
+    bytes. TEST_PACKET runs the modem sequence in the background - its AT
+    trace is only forwarded in UART log mode (NB_SHOW), as on the device
+    """
+
+    connectable = True
+
+    def __init__(self, index: int, config: SimulatorConfig, rng: random.Random):
+        tail = f"{rng.randrange(10 ** 6):06d}"
+        address = "C4:64:E3:" + ":".join(f"{rng.randrange(256):02X}" for _ in range(3))
+        super().__init__(address, f"{DUSTBIN_NAME}_{tail}", rng.randint(-85, -45), rng)
+        self.index = index
+        self.config = config
+        self.fault = config.fault_for(index)
+        self.service_uuids = [UART_SERVICE_UUID]
+        self.services = sensor_services(config.mtu)
+
+        self.imei = IMEI_PREFIX + tail
+        self.imsi = "502120" + "".join(str(rng.randrange(10)) for _ in range(9))
+        self.iccid = "89601" + "".join(str(rng.randrange(10)) for _ in range(14))
+        self.local_ip = f"10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(1, 255)}"
+        self.rsrp = rng.randint(-110, -80)
+        self.snr = rng.randint(-2, 15)
+        self.server_ip = SERVER_IP
+        self.server_port = SERVER_PORT
+        self.apn = APN
+        self.log_mode = False
+        self.echo = True
+        self.fill_cm = [rng.uniform(20, 110), rng.uniform(20, 110)]
+        self.count = 0
+
+        self.rx_buffer = b""
+        self.commands = None
+        self.tasks: List[asyncio.Task] = []
+        self.sequence: Optional[asyncio.Task] = None
+        self.tx_lock = None
+        self.idle_timer = None
+
+    # Link
+
+    def attach(self, client):
+        loop = asyncio.get_running_loop()
+        self.client = client
+        self.rx_buffer = b""
+        self.tx_lock = asyncio.Lock()
+        self.commands = asyncio.Queue()
+        self.tasks = [loop.create_task(self._command_worker())]
+        if self.config.readings:
+            self.tasks.append(loop.create_task(self._report_readings()))
+
+    def detach(self):
+        self.client = None
+        for task in self.tasks:
+            task.cancel()
+        self.tasks = []
+        if self.idle_timer:
+            self.idle_timer.cancel()
+
+    def reboot(self):
+        """SYS_RESET: the link drops, the sensor is back (log mode off) after REBOOT_SECONDS"""
+        client = self.client
+        self.detach()
+        if self.sequence:
+            self.sequence.cancel()
+        self.log_mode = False
+        self.rebooting = True
+        asyncio.get_running_loop().call_later(REBOOT_SECONDS, setattr, self, "rebooting", False)
+        if client:
+            client._link_lost()
+
+    def receive(self, data: bytes):
+        """Bytes written to UART RX - CR/LF ends a command, so does a short pause"""
+        if self.idle_timer:
+            self.idle_timer.cancel()
+            self.idle_timer = None
+        *commands, self.rx_buffer = re.split(rb"[\r\n]", self.rx_buffer + data)
+        for command in commands:
+            self._queue(command)
+        if self.rx_buffer:
+            self.idle_timer = asyncio.get_running_loop().call_later(COMMAND_IDLE, self._flush_input)
+
+    def _flush_input(self):
+        self.idle_timer = None
+        command, self.rx_buffer = self.rx_buffer, b""
+        self._queue(command)
+
+    def _queue(self, command: bytes):
+        text = command.decode("utf-8", errors="ignore").strip()
+        if text and self.commands is not None:
+            self.commands.put_nowait(text)
+
+    async def _command_worker(self):
+        while True:
+            await self.handle(await self.commands.get())
+
+    async def emit(self, line: str):
+        """One UART line out as TX notifications (MTU - 3 bytes each, one per connection interval)"""
+        client = self.client
+        if client is None:
+            return
+        data = (line + "\r\n").encode()
+        size = self.config.mtu - 3
+        async with self.tx_lock:
+            for start in range(0, len(data), size):
+                if start:
+                    await asyncio.sleep(CONNECTION_INTERVAL)
+                if self.client is not client:
+                    return
+                client._deliver(UART_TX_CHAR_UUID, data[start:start + size])
+
+    async def say(self, *lines: str, delay: float = LINE_GAP):
+        for line in lines:
+            await asyncio.sleep(delay)
+            await self.emit(line)
+            delay = LINE_GAP
+
+    # Commands
+
+    async def handle(self, command: str):
+        keyword = command.upper()
+        if keyword == "TEST_PACKET":
+            await self.say("try to send 06 packet", delay=AT_DELAY)
+            if self.sequence is None or self.sequence.done():
+                self.sequence = asyncio.get_running_loop().create_task(self.run_sequence())
+            return
+        if keyword == "SYS_RESET":
+            await self.say("SYS_RESET", delay=AT_DELAY)
+            self.reboot()
+            return
+        answer = self.answer(command)
+        if answer is None:
+            return  # unknown custom command - the firmware says nothing
+        if keyword.startswith("AT") and self.echo:
+            await self.say(command)
+        await self.say(*answer, delay=AT_DELAY)
+
+    def answer(self, command: str) -> Optional[List[str]]:
+        """Lines the sensor answers command with (no echo) - None for no answer at all"""
+        keyword, _, value = command.strip().partition("=")
+        keyword = keyword.strip().upper()
+        value = value.strip()
+        if keyword.startswith("AT"):
+            return self.at_answer(command.strip().upper(), keyword, value)
+        if keyword == "?":
+            return [f"{number}. {name}" for number, name in enumerate(HELP_COMMANDS)]
+        if keyword == "NB_SHOW":
+            self.log_mode = True
+            return ["CMD_UART_LOG_MODE ENABLE.", f"Server: {self.server_ip}:{self.server_port}", f"APN: {self.apn}",
+                    f"Status: {'Connected' if self.fault != CEREG_LOOP else 'Searching'}"]
+        if keyword == "SET_IP":
+            if not re.fullmatch(r"(\d{1,3}\.){3}\d{1,3}", value) or any(int(part) > 255 for part in value.split(".")):
+                return ["ERROR"]
+            self.server_ip = value
+            return [f"Server: {self.server_ip}:{self.server_port}", "OK"]
+        if keyword == "SET_PORT":
+            if not value.isdigit() or not 0 < int(value) < 65536:
+                return ["ERROR"]
+            self.server_port = int(value)
+            return [f"Server: {self.server_ip}:{self.server_port}", "OK"]
+        if keyword in ("DISTANCE", "ANGLE"):
+            return [f"distance: {self.fill_cm[0]:.0f} cm ,{self.fill_cm[1]:.0f} cm"]
+        if keyword == "IMU":
+            return [f"angle : x={88 + self.rng.randint(-1, 1)} ,y={self.rng.randint(-2, 1)} ,z=0"]
+        if keyword == "VOLTAGE":
+            return [f"batt:{self.rng.uniform(3.55, 3.65):.2f}"]
+        if keyword == "SENSOR_SHOW":
+            return [f"temp:{self.rng.uniform(24, 33):.2f} ,fill:{self.fill_percent():.0f} ,batt:3.6"]
+        if keyword == "SYS_INFO":
+            return ["Manufacturer: NHR", "Model: M06", "Revision: V1.0.01", f"IMEI: {self.imei}"]
+        return None
+
+    def at_answer(self, command: str, keyword: str, value: str) -> List[str]:
+        registered = self.fault != CEREG_LOOP
+        answers = {
+            "AT": [],
+            "ATI": ["Manufacturer: NHR", "Model: M06", "Revision: V1.0.01", f"IMEI: {self.imei}"],
+            "AT+CGMI": ["NHR"],
+            "AT+CGMM": ["M06"],
+            "AT+CGMR": ["V1.0.01"],
+            "AT+CGSN": [self.imei],
+            "AT+CGSN=1": [f'+CGSN: "{self.imei}"'],
+            "AT+CIMI": [self.imsi],
+            "AT+CCID": [f"+ICCID: {self.iccid}"],
+            "AT+ICCID": [f"+ICCID: {self.iccid}"],
+            "AT+CSQ": [f"+CSQ: {max(0, (self.rsrp + 113) // 2) if registered else 99},99"],
+            "AT+CEREG?": [f"+CEREG: 2,{1 if registered else 2}"],
+            "AT+COPS?": ['+COPS: 0,2,"50212",9'] if registered else ["+COPS: 0"],
+            "AT+CGDCONT?": [f'+CGDCONT: 1,"IP","{self.apn}","0.0.0.0",0,0'],
+            "AT+CGACT?": [f"+CGACT: 1,{1 if registered else 0}"],
+            "AT+CGPADDR": [f'+CGPADDR: 1,"{self.local_ip}"'] if registered else ["+CGPADDR: 1"],
+            "AT+CIPOPEN?": ["+CIPOPEN: 1"],
+            "AT+CFUN?": ["+CFUN: 0"],
+            "AT+CPSMS?": ['+CPSMS: 0,,,"00111000","00000101"'],
+            "AT+CEDRXS?": ['+CEDRXS: 5,"0101"'],
+            "AT+CMEE?": ["+CMEE: 1"],
+            "AT+QCBAND?": ["+QCBAND: 8,28"],
+            "AT&V": ["&C: 1; &D: 2; &F: 0; E: 1; Q: 0; V: 1; X: 0; S0: 0; S3: 13; S4: 10; S5: 8"],
+        }
+        answers["AT+CGPADDR=1"] = answers["AT+CGPADDR"]
+        if command == "ATI":
+            return answers[command]  # ends at the IMEI line, no OK
+        if command in answers:
+            return answers[command] + ["OK"]
+        if keyword in ("ATE0", "ATE1"):
+            self.echo = keyword == "ATE1"
+            return ["OK"]
+        # Settings are accepted as they are
+        if value and keyword in ("AT+CFUN", "AT+CEREG", "AT+CPSMS", "AT+QCSLEEP", "AT+QCBAND", "AT+CGDCONT",
+                                 "AT+CMEE", "AT+CIPTIMEOUT", "AT+QCLEDMODE", "AT+QCPMUCFG"):
+            return ["OK"]
+        return ["ERROR"]
+
+    def fill_percent(self) -> float:
+        return max(0.0, min(100.0, 100 - min(self.fill_cm) / 1.2))
+
+    async def _report_readings(self):
+        """The periodic ultrasonic reading"""
+        while True:
+            await asyncio.sleep(self.config.readings)
+            self.fill_cm = [max(2.0, cm - self.rng.uniform(0, 3)) for cm in self.fill_cm]
+            s1, s2 = self.fill_cm
+            percent = [max(0, min(100, round(100 - cm / 1.2))) for cm in self.fill_cm]
+            level = 1 + min(3, int(self.fill_percent() // 25))
+            await self.emit(f"s1:{s1:.0f} cm({percent[0]}%) ,s2:{s2:.0f} cm({percent[1]}%) => [lv{level}] , "
+                            f"cnt:{self.count}/10 min")
+            self.count = (self.count + 1) % 10
+
+    # TEST_PACKET
+
+    async def trace(self, delay: float, *lines: str):
+        """Modem UART traffic - forwarded over BLE only in log mode"""
+        for line in lines:
+            await asyncio.sleep(delay)
+            if self.log_mode:
+                await self.emit(line)
+            delay = LINE_GAP
+
+    async def modem(self, command: str, *answer: str, pause: float = COMMAND_GAP, wait: float = AT_DELAY):
+        await self.trace(pause, command)
+        await self.trace(wait, *answer)
+
+    def packet(self) -> str:
+        """The 25-byte 06 packet as the modem is given it (50 digits)"""
+        digits = f"06{self.imei}{self.fill_percent():03.0f}{self.count:02d}"
+        return digits + "".join(str(self.rng.randrange(10)) for _ in range(50 - len(digits)))
+
+    async def run_sequence(self):
+        """The TEST_PACKET modem sequence: attach, register, open a UDP socket, send the 06 packet, shut down"""
+        await self.modem("AT+CFUN=1", "OK", wait=0.5)
+        await self.trace(1.0, "SIM Ready")
+        await self.modem("AT+CGSN=1", f'+CGSN: "{self.imei}"', "OK")
+        await self.modem("AT+CIMI", self.imsi, "OK")
+        await self.modem("AT+QCBAND=0,8,28", "OK")
+        await self.modem(f'AT+CGDCONT=1,"IP","{self.apn}"', "OK")
+        await self.modem("AT+CEREG=2", "OK")
+        searching = CEREG_POLLS if self.fault == CEREG_LOOP else self.rng.randint(1, 4)
+        for _ in range(searching):
+            await self.modem("AT+CEREG?", "+CEREG: 2,2", "OK", pause=CEREG_POLL_INTERVAL)
+        if self.fault == CEREG_LOOP:
+            await self.modem("AT+CFUN=0", "OK")  # gave up - modem off until the next attempt
+            return
+        await self.modem("AT+CEREG?", "+CEREG: 2,1", "OK", pause=CEREG_POLL_INTERVAL)
+        rsrp = self.rsrp + self.rng.randint(-3, 3)
+        snr = self.snr + self.rng.randint(-2, 2)
+        await self.trace(COMMAND_GAP, f"RSRP:{rsrp} ,RSRQ:{self.rng.randint(-14, -8)} ,SNR:{snr}")
+        await self.modem("AT+CGPADDR=1", f'+CGPADDR: 1,"{self.local_ip}"', "OK")
+        await self.modem("AT+NETOPEN", "OK", "+NETOPEN: 0", wait=0.8)
+        await self.modem(f'AT+CIPOPEN=1,"UDP","{self.server_ip}",{self.server_port}', "OK", "+CIPOPEN: 1,0",
+                         wait=0.6)
+        packet = self.packet()
+        size = len(packet) // 2
+        await self.modem(f"AT+CIPSEND=1,{size}", ">")
+        sent = 0 if self.fault == CIPSEND_FAIL else size
+        await self.modem(packet, "OK", f"+CIPSEND: 1,{size},{sent}", pause=LINE_GAP, wait=0.4)
+        if self.fault == OK:
+            await self.trace(ACK_DELAY, "+CIPRXGET: 1 ACK")
+        else:
+            await asyncio.sleep(ACK_WAIT)
+        await self.modem("AT+CIPCLOSE=1", "+CIPCLOSE: 1,0", "OK")
+        await self.modem("AT+NETCLOSE", "+NETCLOSE: 0", "OK")
+        await self.modem("AT+CFUN=0", "OK")
+
+
+class Simulation:
+    """The devices in range - sensors first, then the other advertisers"""
+
+    def __init__(self, config: SimulatorConfig):
+        self.config = config
+        rng = random.Random(config.seed)
+        self.sensors = [SimulatedSensor(index, config, random.Random(rng.random())) for index in range(config.sensors)]
+        self.others = []
+        for index in range(config.others):
+            address = ":".join(f"{rng.randrange(256):02X}" for _ in range(6))
+            self.others.append(Advertiser(address, OTHER_NAMES[index % len(OTHER_NAMES)], rng.randint(-95, -60),
+                                          random.Random(rng.random())))
+        self.devices = {device.address.upper(): device for device in self.sensors + self.others}
+
+    def device(self, address: str) -> Optional[Advertiser]:
+        return self.devices.get(str(address).upper())
+
+
+_simulation: Optional[Simulation] = None
+
+
+def simulation() -> Simulation:
+    """The current simulation (configured from MRS_SIMULATOR on first use)"""
+    if _simulation is None:
+        configure(os.environ.get(ENV_VAR))
+    return _simulation
+
+
+def configure(spec: Optional[str] = None) -> SimulatorConfig:
+    """Start a fresh simulation from spec - ValueError if the spec is invalid"""
+    global _simulation
+    config = SimulatorConfig.parse(spec)
+    _simulation = Simulation(config)
+    return config
+
+
+# ---------------------------------------------------------------------------
+# bleak stand-ins
+# ---------------------------------------------------------------------------
+
+class BleakScanner:
+    """Scanner over the simulated devices: detection callbacks, discover() and the find_device_by_* helpers"""
+
+    def __init__(self, detection_callback: Callable = None, service_uuids: List[str] = None, **kwargs):
+        self.detection_callback = detection_callback
+        self.service_uuids = {uuid.lower() for uuid in service_uuids} if service_uuids else None
+        self.seen: Dict[str, Tuple[BLEDevice, AdvertisementData]] = {}
+        self.task = None
+
+    async def start(self):
+        self.seen = {}
+        self.task = asyncio.get_running_loop().create_task(self._listen())
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.stop()
+
+    @property
+    def discovered_devices(self) -> List[BLEDevice]:
+        return [device for device, _ in self.seen.values()]
+
+    @property
+    def discovered_devices_and_advertisement_data(self) -> Dict[str, Tuple[BLEDevice, AdvertisementData]]:
+        return dict(self.seen)
+
+    async def _listen(self):
+        devices = list(simulation().devices.values())
+        while True:
+            for device in devices:
+                await asyncio.sleep(ADVERT_INTERVAL / len(devices))
+                if not device.advertising:
+                    continue
+                ble_device, advertisement = device.advertise()
+                if self.service_uuids and not self.service_uuids & set(advertisement.service_uuids):
+                    continue
+                self.seen[ble_device.address] = (ble_device, advertisement)
+                if self.detection_callback:
+                    self.detection_callback(ble_device, advertisement)
+
+    @classmethod
+    async def discover(cls, timeout: float = 5.0, *, return_adv: bool = False, **kwargs):
+        async with cls(**kwargs) as scanner:
+            await asyncio.sleep(timeout)
+        if return_adv:
+            return scanner.discovered_devices_and_advertisement_data
+        return scanner.discovered_devices
+
+    @classmethod
+    async def find_device_by_filter(cls, filterfunc: Callable, timeout: float = 10.0, **kwargs) -> Optional[BLEDevice]:
+        found = asyncio.get_running_loop().create_future()
+
+        def detected(device, advertisement):
+            if not found.done() and filterfunc(device, advertisement):
+                found.set_result(device)
+
+        async with cls(detection_callback=detected, **kwargs):
+            try:
+                return await asyncio.wait_for(found, timeout)
+            except asyncio.TimeoutError:
+                return None
+
+    @classmethod
+    async def find_device_by_address(cls, device_identifier: str, timeout: float = 10.0, **kwargs):
+        address = device_identifier.upper()
+        return await cls.find_device_by_filter(lambda device, _: device.address.upper() == address, timeout, **kwargs)
+
+    @classmethod
+    async def find_device_by_name(cls, name: str, timeout: float = 10.0, **kwargs):
+        return await cls.find_device_by_filter(lambda device, adv: (device.name or adv.local_name) == name,
+                                               timeout, **kwargs)
+
+
+class BleakClient:
+    """
+    Connection to a simulated device. Writes to UART RX reach the sensor's
+    command handling; its answers arrive through start_notify callbacks.
+    Write without response is limited to MTU - 3 bytes, as on a real link
+    """
+
+    def __init__(self, address_or_ble_device, disconnected_callback: Callable = None, services=None,
+                 *, timeout: float = 10.0, **kwargs):
+        self.address = getattr(address_or_ble_device, "address", address_or_ble_device)
+        self.disconnected_callback = disconnected_callback
+        self.service_filter = list(services) if services else None
+        self.timeout = timeout
+        self.sensor = None
+        self.notify_callbacks: Dict[str, Callable] = {}
+        self._services = None
+
+    @property
+    def is_connected(self) -> bool:
+        return self.sensor is not None
+
+    @property
+    def mtu_size(self) -> int:
+        return simulation().config.mtu
+
+    @property
+    def services(self) -> GattServices:
+        if self._services is None:
+            raise BleakError("Service Discovery has not been performed yet")
+        return self._services
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.disconnect()
+
+    async def connect(self, **kwargs) -> bool:
+        """Waits (up to timeout) for the device to be in range and free - a rebooting sensor comes back"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + kwargs.get("timeout", self.timeout)
+        device = simulation().device(self.address)
+        while device is None or not device.advertising:
+            if loop.time() >= deadline:
+                raise BleakError(f"Device with address {self.address} was not found.")
+            await asyncio.sleep(ADVERT_INTERVAL)
+        if not device.connectable:
+            await asyncio.sleep(CONNECT_SECONDS)
+            raise BleakError(f"Device {self.address} does not accept connections")
+        await asyncio.sleep(CONNECT_CACHED_SECONDS if self.service_filter else CONNECT_SECONDS)
+        if not device.advertising:
+            raise BleakError(f"Device {self.address} disconnected during connection setup")
+        self._services = device.services.only(self.service_filter) if self.service_filter else device.services
+        self.notify_callbacks = {}
+        self.sensor = device
+        device.attach(self)
+        return True
+
+    async def disconnect(self) -> bool:
+        if self.sensor is not None:
+            self.sensor.detach()
+            self._link_lost()
+        return True
+
+    def _link_lost(self):
+        if self.sensor is None:
+            return
+        self.sensor = None
+        self.notify_callbacks = {}
+        if self.disconnected_callback:
+            self.disconnected_callback(self)
+
+    def _characteristic(self, specifier) -> GattCharacteristic:
+        if self.sensor is None:
+            raise BleakError("Not connected")
+        characteristic = self.services.get_characteristic(specifier)
+        if characteristic is None:
+            raise BleakError(f"Characteristic {specifier} was not found!")
+        return characteristic
+
+    async def start_notify(self, char_specifier, callback: Callable, **kwargs):
+        characteristic = self._characteristic(char_specifier)
+        if not {"notify", "indicate"} & set(characteristic.properties):
+            raise BleakError(f"Characteristic {characteristic.uuid} does not support notifications")
+        await asyncio.sleep(CONNECTION_INTERVAL * 2)
+        self.notify_callbacks[characteristic.uuid] = (characteristic, callback)
+
+    async def stop_notify(self, char_specifier):
+        self.notify_callbacks.pop(self._characteristic(char_specifier).uuid, None)
+
+    async def write_gatt_char(self, char_specifier, data, response: bool = None):
+        characteristic = self._characteristic(char_specifier)
+        if response is None:
+            response = "write" in characteristic.properties
+        mode = "write" if response else "write-without-response"
+        if mode not in characteristic.properties:
+            raise BleakError(f"Characteristic {characteristic.uuid} does not support {mode}")
+        limit = 512 if response else characteristic.max_write_without_response_size
+        if len(data) > limit:
+            raise BleakError(f"{len(data)} bytes is more than {mode} allows ({limit})")
+        await asyncio.sleep(CONNECTION_INTERVAL * 2 if response else 0)
+        if self.sensor is None:
+            raise BleakError("Not connected")
+        if characteristic.uuid == UART_RX_CHAR_UUID:
+            self.sensor.receive(bytes(data))
+
+    async def read_gatt_char(self, char_specifier, **kwargs) -> bytearray:
+        characteristic = self._characteristic(char_specifier)
+        if "read" not in characteristic.properties:
+            raise BleakError(f"Characteristic {characteristic.uuid} is not readable")
+        await asyncio.sleep(CONNECTION_INTERVAL * 2)
+        if characteristic.uuid == DEVICE_NAME_UUID:
+            return bytearray(self.sensor.name.encode())
+        return bytearray(2)
+
+    def _deliver(self, uuid: str, data: bytes):
+        subscription = self.notify_callbacks.get(uuid)
+        if subscription is None:
+            return
+        characteristic, callback = subscription
+        try:
+            result = callback(characteristic, bytearray(data))
+            if asyncio.iscoroutine(result):
+                asyncio.get_running_loop().create_task(result)
+        except Exception:
+            logger.exception(f"Notification callback for {uuid} failed")
+
+
+# ---------------------------------------------------------------------------
+# Scaled clock
+# ---------------------------------------------------------------------------
+
+class ScaledEventLoop(asyncio.SelectorEventLoop):
+    """
+    Event loop whose clock runs speed times faster than real time: sleeps,
+    timeouts and call_later delays all shrink by the same factor, so a tool
+    with fixed waits runs faster without changes. I/O is still real
+    """
+
+    def __init__(self, speed: float):
+        self.speed = speed
+        self.origin = None
+        selector_class = selectors.DefaultSelector
+
+        class ScaledSelector(selector_class):
+            def select(self, timeout=None):
+                return super().select(None if timeout is None else timeout / speed)
+
+        super().__init__(ScaledSelector())
+        self.origin = super().time()
+
+    def time(self) -> float:
+        now = super().time()
+        if self.origin is None:
+            return now
+        return self.origin + (now - self.origin) * self.speed
+
+
+class ScaledTimePolicy(asyncio.DefaultEventLoopPolicy):
+    """New event loops (asyncio.run) are ScaledEventLoops"""
+
+    def __init__(self, speed: float):
+        super().__init__()
+        self.speed = speed
+
+    def new_event_loop(self):
+        return ScaledEventLoop(self.speed)
+
+
+def run(main, speed: float = 1.0):
+    """asyncio.run(main) on a ScaledEventLoop"""
+    policy = asyncio.get_event_loop_policy()
+    asyncio.set_event_loop_policy(ScaledTimePolicy(speed))
+    try:
+        return asyncio.run(main)
+    finally:
+        asyncio.set_event_loop_policy(policy)
+
+
+# ---------------------------------------------------------------------------
+# Installing the stand-ins
+# ---------------------------------------------------------------------------
+
+def bleak_module() -> types.ModuleType:
+    """A 'bleak' module made of the stand-ins ('from bleak import BleakClient' gets the simulated one)"""
+    module = types.ModuleType("bleak")
+    module.__spec__ = importlib.machinery.ModuleSpec("bleak", None)
+    module.__file__ = __file__
+    for name in ("BleakClient", "BleakScanner", "BleakError", "BLEDevice", "AdvertisementData"):
+        setattr(module, name, globals()[name])
+    return module
+
+
+def install(spec: Optional[str] = None) -> SimulatorConfig:
+    """
+    Simulate from here on: configure (spec, or MRS_SIMULATOR if None), make
+    `import bleak` return the stand-ins - so the package check does not
+    install bleak either - and run new event loops at the configured speed
+    """
+    config = configure(os.environ.get(ENV_VAR) if spec is None else spec)
+    sys.modules["bleak"] = bleak_module()
+    if config.speed != 1:
+        asyncio.set_event_loop_policy(ScaledTimePolicy(config.speed))
+    return config
+
+
+class _Keys:
+    """msvcrt.kbhit()/getch() off Windows, for tools that poll the keyboard (V0.1): keys are read from stdin"""
+
+    def __init__(self):
+        self.pending = ""
+        self.eof = False
+
+    def kbhit(self) -> bool:
+        if self.pending:
+            return True
+        if self.eof:
+            return False
+        try:
+            if not select.select([sys.stdin], [], [], 0)[0]:
+                return False
+        except (OSError, ValueError):
+            return False
+        self.pending = sys.stdin.read(1)
+        self.eof = not self.pending
+        return bool(self.pending)
+
+    def getch(self) -> bytes:
+        if not self.kbhit():
+            return b""
+        key, self.pending = self.pending, ""
+        return b"\r" if key == "\n" else key.encode()
+
+
+def keyboard_module() -> types.ModuleType:
+    module = types.ModuleType("msvcrt")
+    keys = _Keys()
+    module.kbhit = keys.kbhit
+    module.getch = keys.getch
+    return module
+
+
+def main(argv=None):
+    """Run another MRS tool (V0.1 Scanner, Firmware Cracker, ...) against simulated sensors"""
+    parser = argparse.ArgumentParser(
+        description="Run an MRS BLE tool against simulated sensors instead of Bluetooth",
+        epilog='Example: python SensorSimulator.py --spec "sensors=2,faults=ok/no-ack,speed=20" '
+               '"../Firmware Cracker/CrackFirmware.py"')
+    parser.add_argument("--spec", help=f"what to simulate (default: ${ENV_VAR}) - {SPEC_HELP}")
+    parser.add_argument("script", help="the tool's Python file")
+    parser.add_argument("script_args", nargs=argparse.REMAINDER, help="arguments for the tool")
+    args = parser.parse_args(argv)
+    try:
+        config = install(args.spec)
+    except ValueError as e:
+        parser.error(f"--spec: {e}")
+    # Tools that look for the simulator themselves (Scanner V0.2) find it switched on
+    os.environ[ENV_VAR] = (args.spec if args.spec is not None else os.environ.get(ENV_VAR)) or "1"
+    if importlib.util.find_spec("msvcrt") is None:
+        sys.modules["msvcrt"] = keyboard_module()
+
+    path = os.path.abspath(args.script)
+    sys.argv = [path] + args.script_args
+    sys.path.insert(0, os.path.dirname(path))
+    print(f"[SIMULATOR] {config.describe()} - running {os.path.basename(path)}")
+    runpy.run_path(path, run_name="__main__")
+
+
+if __name__ == "__main__":
+    # The launched tool imports SensorSimulator by name - run in that module so both share one simulation
+    import SensorSimulator
+    SensorSimulator.main()
@@ -0,0 +1,216 @@
+"""
+Session Capture Module for MRS BLE Scanner V0.2
+Records what went over the link - notifications as received, commands as
+written, link events - with monotonic timestamps to a compact binary file,
+and plays a capture back at real or accelerated speed so a field session
+can be run through the receive pipeline again without Bluetooth
+"""
+
+import asyncio
+import json
+import logging
+import struct
+import time
+from dataclasses import dataclass
+from typing import Callable, Iterable, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"MRSCAP"
+VERSION = 1
+
+# Record kinds
+GAP = 0       # only advances the clock (a pause longer than one record can hold)
+RX = 1        # notification bytes as received, before line framing
+TX = 2        # payload written to the sensor, before MTU chunking
+LINK = 3      # link event, JSON: {"event": "connected", "imei": ...}
+CHANNEL = 4   # characteristic UUID for a new channel number
+
+# Written data reaches the disk at least this often (and with every link event)
+FLUSH_INTERVAL = 1.0
+
+_HEADER = struct.Struct("<6sBH")     # magic, version, metadata length (JSON follows)
+_RECORD = struct.Struct("<IBBH")     # microseconds since previous record, kind, channel, payload length
+_MAX_DELTA = 0xFFFFFFFF
+_MAX_PAYLOAD = 0xFFFF
+
+
+@dataclass
+class Record:
+    """One captured record - time in seconds since the capture started"""
+    time: float
+    kind: int
+    channel: Optional[str]   # characteristic UUID (RX/TX)
+    data: bytes
+
+    @property
+    def details(self) -> dict:
+        """LINK record payload"""
+        return json.loads(self.data)
+
+
+class CaptureWriter:
+    """
+    Appends records to a capture file: an 8-byte header per record (time
+    delta in microseconds, kind, channel, length) followed by the payload.
+    Characteristic UUIDs are written once, as CHANNEL records, and referred
+    to by number after that. A write error closes the capture with a
+    warning - recording never takes the session down
+    """
+
+    def __init__(self, path: str, meta: dict = None, clock: Callable = time.monotonic,
+                 flush_interval: float = FLUSH_INTERVAL):
+        self.path = path
+        self.clock = clock
+        self.flush_interval = flush_interval
+        self.channels = {}
+
+        meta = dict(meta or {})
+        meta.setdefault("started", time.time())
+        blob = json.dumps(meta).encode()
+        self.file = open(path, "wb")
+        self.file.write(_HEADER.pack(MAGIC, VERSION, len(blob)) + blob)
+        self.last = self.clock()      # time of the previous record (advanced by whole microseconds)
+        self.last_flush = self.last
+
+        # Stats
+        self.records = 0
+        self.bytes = _HEADER.size + len(blob)
+
+    @property
+    def closed(self) -> bool:
+        return self.file is None
+
+    def rx(self, channel, data: bytes):
+        """Notification received on characteristic channel"""
+        self._write(RX, channel, data)
+
+    def tx(self, channel, data: bytes):
+        """Payload written to characteristic channel"""
+        self._write(TX, channel, data)
+
+    def link(self, event: str, **details):
+        """Link event (connected / lost / reconnected / disconnected) - flushed right away"""
+        self._write(LINK, None, json.dumps(dict(event=event, **details)).encode())
+        self.flush()
+
+    def _channel(self, uuid) -> int:
+        number = self.channels.get(uuid)
+        if number is None:
+            if len(self.channels) > 0xFF:
+                raise ValueError("more than 256 characteristics in one capture")
+            number = self.channels[uuid] = len(self.channels)
+            self._append(CHANNEL, number, str(uuid).encode())
+        return number
+
+    def _write(self, kind: int, channel, payload: bytes):
+        if self.file is None:
+            return
+        try:
+            number = 0 if channel is None else self._channel(channel)
+            self._append(kind, number, payload)
+            if self.last - self.last_flush >= self.flush_interval:
+                self.flush()
+        except (OSError, ValueError) as e:
+            logger.warning(f"Capture {self.path} stopped: {e}")
+            self.close()
+
+    def _append(self, kind: int, channel: int, payload: bytes):
+        delta = max(0, round((self.clock() - self.last) * 1e6))
+        self.last += delta / 1e6
+        write = self.file.write
+        while delta > _MAX_DELTA:
+            write(_RECORD.pack(_MAX_DELTA, GAP, 0, 0))
+            delta -= _MAX_DELTA
+            self.bytes += _RECORD.size
+        # Longer payloads continue in records 0 µs later
+        for start in range(0, max(len(payload), 1), _MAX_PAYLOAD):
+            part = payload[start:start + _MAX_PAYLOAD]
+            write(_RECORD.pack(delta, kind, channel, len(part)))
+            write(part)
+            delta = 0
+            self.records += 1
+            self.bytes += _RECORD.size + len(part)
+
+    def flush(self):
+        if self.file is not None:
+            self.file.flush()
+            self.last_flush = self.last
+
+    def close(self):
+        if self.file is None:
+            return
+        file, self.file = self.file, None
+        try:
+            file.close()
+        except OSError as e:
+            logger.warning(f"Capture {self.path}: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "records": self.records,
+            "bytes": self.bytes,
+            "channels": len(self.channels),
+            "closed": self.closed
+        }
+
+
+class CaptureReader:
+    """
+    Reads a capture file into memory; iterating yields its Records in order
+    (CHANNEL and GAP records are resolved, not yielded). A file cut off
+    mid-record - the scanner was killed - ends at the last complete record
+    and sets truncated
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self.data = f.read()
+        if len(self.data) < _HEADER.size:
+            raise ValueError("not a capture file (too short)")
+        magic, version, meta_length = _HEADER.unpack_from(self.data)
+        if magic != MAGIC:
+            raise ValueError("not a capture file")
+        if version != VERSION:
+            raise ValueError(f"capture version {version} not supported (expected {VERSION})")
+        self.offset = _HEADER.size + meta_length
+        self.meta = json.loads(self.data[_HEADER.size:self.offset])
+        self.truncated = False
+
+    def __iter__(self) -> Iterator[Record]:
+        data = self.data
+        end = len(data)
+        offset = self.offset
+        unpack = _RECORD.unpack_from
+        size = _RECORD.size
+        channels = {}
+        elapsed = 0   # microseconds
+        while offset + size <= end:
+            delta, kind, channel, length = unpack(data, offset)
+            offset += size
+            if offset + length > end:
+                break
+            payload = data[offset:offset + length]
+            offset += length
+            elapsed += delta
+            if kind == CHANNEL:
+                channels[channel] = payload.decode()
+            elif kind != GAP:
+                yield Record(elapsed / 1e6, kind, channels.get(channel) if kind != LINK else None, payload)
+        self.truncated = offset < end
+
+
+async def play(records: Iterable[Record], speed: float = 1.0, clock: Callable = time.monotonic,
+               sleep: Callable = asyncio.sleep):
+    """
+    Yield records paced as they were captured (speed 2 = twice as fast,
+    0 = as fast as possible). Every record goes through the event loop once,
+    like a notification callback, so render/forward tasks and timers run
+    in between
+    """
+    start = clock()
+    for record in records:
+        delay = start + record.time / speed - clock() if speed > 0 else 0
+        await sleep(max(delay, 0))
+        yield record
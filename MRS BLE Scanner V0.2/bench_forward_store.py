@@ -0,0 +1,84 @@
+"""
+Store-and-Forward Replay Benchmark
+==================================
+Simulates an API outage that left a large backlog in the outbox:
+  1. queue N payloads one at a time (the BLE callback path)
+  2. replay them to a local HTTP stub - unbounded, single and batched POSTs
+  3. replay a slice with the recovery rate limit on, to check the cap holds
+and reports outbox size before and after compaction
+
+Usage: python bench_forward_store.py [payloads]
+"""
+
+import sys
+import os
+import asyncio
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from HTTPForwarder import HTTPForwarder, DurableForwardQueue
+from ForwardStore import ForwardStore
+from bench_http_forwarder import StubServer, sample_payload
+
+
+async def replay(store, forwarder, batch_size, max_rate=None):
+    queue = DurableForwardQueue(store, forwarder, batch_size=batch_size, linger=0, max_rate=max_rate)
+    start = time.perf_counter()
+    queue.start()
+    while queue.depth:
+        await asyncio.sleep(0.01)
+    elapsed = time.perf_counter() - start
+    await queue.stop(timeout=1)
+    return elapsed, queue.stats()
+
+
+def main():
+    payloads = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    path = os.path.join(tempfile.mkdtemp(), "outbox.db")
+
+    print("=" * 100)
+    print(f"STORE-AND-FORWARD REPLAY BENCHMARK - {payloads:,} payloads")
+    print("=" * 100)
+
+    with StubServer() as stub:
+        forwarder = HTTPForwarder(stub.url)
+        forwarder.compress = True
+
+        for label, batch_size, count in (("single POSTs", 1, min(payloads, 5000)),
+                                         ("batched gzip POSTs (100)", 100, payloads)):
+            store = ForwardStore(path)
+            start = time.perf_counter()
+            for i in range(count):
+                store.put(sample_payload(i))
+            put_s = time.perf_counter() - start
+            backlog_size = store.size_bytes()
+
+            elapsed, stats = asyncio.run(replay(store, forwarder, batch_size))
+            print(f"  queue  {count:>7,} x put()            {put_s / count * 1e6:7.1f} us/payload   "
+                  f"outbox {backlog_size / 1e6:6.1f} MB")
+            print(f"  replay {label:<26} {elapsed:7.2f} s   {count / elapsed:8.0f} msg/s   "
+                  f"{stats['avg_batch']} msg/POST")
+            print(f"         after compaction              outbox {store.size_bytes() / 1e6:6.2f} MB "
+                  f"({store.compactions} compactions)")
+            assert stats['forwarded'] == count and len(store) == 0
+            store.close()
+            print("-" * 100)
+
+        # Recovery cap: a 2 s budget at max_rate
+        max_rate = 2000
+        count = max_rate * 2
+        store = ForwardStore(path)
+        store.put_many(sample_payload(i) for i in range(count))
+        elapsed, stats = asyncio.run(replay(store, forwarder, 100, max_rate=max_rate))
+        print(f"  replay {count:,} with max_rate={max_rate}/s   {elapsed:7.2f} s   "
+              f"{count / elapsed:8.0f} msg/s (cap {max_rate}, first second is burst allowance)")
+        store.close()
+        forwarder.close()
+
+    print("=" * 100)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+GATT Write Benchmark
+====================
+Time to deliver commands and long configuration payloads over the UART RX
+characteristic: the previous send_command() write (one write without
+response, on failure the same bytes again with response - a long write)
+vs GattWriter (MTU-sized chunks pipelined without response, every 8th and
+the last one acknowledged)
+
+There is no radio here: times come from a link model on a virtual clock -
+15 ms connection interval, 4 packets per connection event, a write request
+answered one interval later, a long write as one prepare request per
+segment plus the execute request. It compares how many link round trips
+each strategy costs; real numbers depend on adapter and sensor
+
+Usage: python bench_gatt_writer.py [connection interval ms]
+"""
+
+import sys
+import os
+import asyncio
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from GattWriter import GattWriter
+
+
+class LinkModel:
+    """Stands in for BleakClient - write_gatt_char advances a virtual clock"""
+
+    def __init__(self, mtu: int, interval: float = 0.015, packets_per_event: int = 4):
+        self.mtu = mtu
+        self.interval = interval
+        self.packets_per_event = packets_per_event
+        self.now = 0.0
+        self.delivered = 0    # bytes the sensor received (counts duplicates)
+
+    def clock(self):
+        return self.now
+
+    async def write_gatt_char(self, characteristic, data, response=False):
+        size = len(data)
+        if not response:
+            if size > self.mtu - 3:
+                self.now += 0.001   # rejected by the local stack (invalid length)
+                raise OSError("Invalid Length")
+            self.now += self.interval / self.packets_per_event
+        elif size <= self.mtu - 3:
+            self.now += 2 * self.interval                    # request + response
+        else:
+            segments = -(-size // (self.mtu - 5))            # prepare write: 2 byte offset header
+            self.now += 2 * self.interval * (segments + 1)   # prepares + execute
+        self.delivered += size
+
+
+async def legacy_write(client, characteristic, data):
+    """send_command() before GattWriter"""
+    try:
+        await client.write_gatt_char(characteristic, data, response=False)
+    except Exception:
+        await client.write_gatt_char(characteristic, data, response=True)
+
+
+async def measure(mtu, interval, payload, chunked, repeat=20):
+    client = LinkModel(mtu, interval)
+    characteristic = SimpleNamespace(uuid="6e400002-b5a3-f393-e0a9-e50e24dcca9e",
+                                     properties=["write", "write-without-response"],
+                                     max_write_without_response_size=mtu - 3)
+    writer = GattWriter(client, characteristic, clock=client.clock)
+    for _ in range(repeat):
+        if chunked:
+            await writer.write(payload)
+        else:
+            await legacy_write(client, characteristic, payload)
+    return client.now / repeat
+
+
+def main():
+    interval = float(sys.argv[1]) / 1000 if len(sys.argv) > 1 else 0.015
+    payloads = [
+        ("command (17 B)", b"SET_IP=10.0.0.1\r\n"),
+        ("config line (120 B)", b"SET_CFG=" + b"0123456789" * 11 + b"\r\n"),
+        ("config block (512 B)", b"C" * 510 + b"\r\n"),
+        ("config file (2 KB)", b"F" * 2046 + b"\r\n"),
+    ]
+    print("=" * 80)
+    print(f"GATT WRITE BENCHMARK - link model, {interval * 1000:.1f} ms connection interval")
+    print("=" * 80)
+    for mtu in (23, 247):
+        print(f"\n  ATT MTU {mtu} ({mtu - 3} bytes per write)")
+        print(f"  {'payload':<22} {'before':>10} {'after':>10} {'speedup':>8} {'after throughput':>18}")
+        for label, payload in payloads:
+            before = asyncio.run(measure(mtu, interval, payload, chunked=False))
+            after = asyncio.run(measure(mtu, interval, payload, chunked=True))
+            print(f"  {label:<22} {before * 1000:8.1f}ms {after * 1000:8.1f}ms {before / after:7.1f}x "
+                  f"{len(payload) / after / 1024:13.1f} KB/s")
+    print("\n" + "=" * 80)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""
+HTTP Forwarder Benchmark
+========================
+Per-message latency and messages/sec against a local HTTP stub:
+  before - module-level requests.post (new TCP connection per message)
+  after  - HTTPForwarder with a pooled keep-alive session
+  burst  - DurableForwardQueue draining a burst, single POSTs vs batched gzip POSTs
+
+Usage: python bench_http_forwarder.py [messages]
+"""
+
+import sys
+import os
+import asyncio
+import gzip
+import json
+import statistics
+import tempfile
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import requests
+from HTTPForwarder import HTTPForwarder, DurableForwardQueue, NHR_HEADERS
+from ForwardStore import ForwardStore
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Accepts any POST (single payload, JSON array, optionally gzipped) and answers 200"""
+
+    protocol_version = 'HTTP/1.1'
+    # Headers and body go out in two writes; with Nagle on, a keep-alive
+    # client waits ~40 ms for the delayed ACK on every response
+    disable_nagle_algorithm = True
+
+    accept_arrays = True
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if self.headers.get('Content-Encoding') == 'gzip':
+            body = gzip.decompress(body)
+        data = json.loads(body)
+
+        if isinstance(data, list) and not self.accept_arrays:
+            self.send_error(400, 'Expected a JSON object')
+            return
+        self.server.posts += 1
+        self.server.received.extend(data if isinstance(data, list) else [data])
+
+        reply = b'{"code":0,"msg":"OK"}'
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(reply)))
+        self.end_headers()
+        self.wfile.write(reply)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubServer:
+    """Local HTTP stub on a free port, served from a background thread"""
+
+    def __init__(self, handler=StubHandler):
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        self.httpd.daemon_threads = True
+        self.httpd.received = []
+        self.httpd.posts = 0
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}/api/sensor"
+
+    @property
+    def received(self):
+        return self.httpd.received
+
+    @property
+    def posts(self):
+        return self.httpd.posts
+
+    def __enter__(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def sample_payload(i):
+    return {
+        "cmd": "RP",
+        "device": "351469520520687",
+        "battery": "3.6",
+        "time": "2026-02-13 17:59:00",
+        "dIndex": "0410",
+        "data": str(i % 100),
+        "temperature": "24.25"
+    }
+
+
+def run(label, send, messages):
+    latencies = []
+    start = time.perf_counter()
+    for i in range(messages):
+        t0 = time.perf_counter()
+        send(sample_payload(i))
+        latencies.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    result = {
+        'label': label,
+        'mean_ms': statistics.mean(latencies) * 1000,
+        'p50_ms': latencies[len(latencies) // 2] * 1000,
+        'p95_ms': latencies[int(len(latencies) * 0.95)] * 1000,
+        'msg_per_s': messages / elapsed
+    }
+    print(f"  {label:<34} mean {result['mean_ms']:6.2f} ms   p50 {result['p50_ms']:6.2f} ms   "
+          f"p95 {result['p95_ms']:6.2f} ms   {result['msg_per_s']:8.0f} msg/s")
+    return result
+
+
+async def run_burst(label, forwarder, messages, batch_size):
+    """Submit a burst at once and time until the outbox has drained (no rate cap)"""
+    with tempfile.TemporaryDirectory() as folder:
+        store = ForwardStore(os.path.join(folder, "outbox.db"))
+        queue = DurableForwardQueue(store, forwarder, batch_size=batch_size, linger=0.05, max_rate=None)
+        queue.start()
+        start = time.perf_counter()
+        for i in range(messages):
+            queue.submit(sample_payload(i))
+        while queue.depth:
+            await asyncio.sleep(0.001)
+        elapsed = time.perf_counter() - start
+        stats = queue.stats()
+        await queue.stop()
+        store.close()
+
+    print(f"  {label:<34} {elapsed * 1000:8.1f} ms total   avg latency {stats['avg_latency_ms']:7.1f} ms   "
+          f"{messages / elapsed:8.0f} msg/s   {stats['avg_batch']} msg/POST")
+    return messages / elapsed
+
+
+def main():
+    messages = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+
+    print("=" * 100)
+    print(f"HTTP FORWARDER BENCHMARK - {messages} messages, local stub")
+    print("=" * 100)
+
+    with StubServer() as stub:
+        before = run("before: requests.post per message",
+                     lambda p: requests.post(stub.url, json=p, headers=NHR_HEADERS, timeout=10), messages)
+
+        forwarder = HTTPForwarder(stub.url)
+        after = run("after: pooled HTTPForwarder", forwarder.send, messages)
+        forwarder.close()
+
+        assert forwarder.success_count == messages
+        assert len(stub.received) == 2 * messages
+
+        print("-" * 100)
+        print(f"  Speed-up: {after['msg_per_s'] / before['msg_per_s']:.1f}x messages/sec, "
+              f"{before['mean_ms'] / after['mean_ms']:.1f}x lower mean latency")
+        print("-" * 100)
+
+        forwarder = HTTPForwarder(stub.url)
+        single = asyncio.run(run_burst("burst: single POSTs", forwarder, messages, batch_size=1))
+        forwarder.compress = True
+        batched = asyncio.run(run_burst("burst: batched gzip POSTs (20)", forwarder, messages, batch_size=20))
+        forwarder.close()
+
+        assert forwarder.success_count == 2 * messages
+        assert len(stub.received) == 4 * messages
+
+    print("-" * 100)
+    print(f"  Batching: {batched / single:.1f}x messages/sec on a burst")
+    print("  (Real NHR API over TLS saves a full TCP + TLS handshake per message on top of this)")
+
+
+if __name__ == "__main__":
+    main()
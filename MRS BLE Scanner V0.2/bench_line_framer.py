@@ -0,0 +1,95 @@
+"""
+Line Framer Benchmark
+=====================
+A TEST_PACKET modem trace cut into notification-sized fragments (20 bytes
+for ATT MTU 23, 244 for MTU 247), fed as fast as possible:
+  before - every notification taken as a message (no reassembly): how many
+           +CIPSEND / 06-packet lines the diagnostics regexes still find
+  naive  - bytes concatenation and split on LF per fragment (no lone-CR
+           delimiters, no flush of a trailing prompt)
+  framer - LineFramer (one bytearray, delimiters looked up in the new bytes
+           only, quiet-period flush timer)
+For scale: a BLE link delivers at most a few thousand notifications per
+second (7.5 ms connection interval, a handful of packets per event)
+
+Usage: python bench_line_framer.py [trace repeats]
+"""
+
+import sys
+import os
+import re
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from LineFramer import LineFramer
+
+PACKET = "06" + "0123456789" * 4 + "35146952"
+TRACE = ["try to send 06 packet", "SIM Ready", "AT+CGSN=1", '+CGSN: "351469520162464"', "OK",
+         "AT+CEREG?", "+CEREG: 2,1", "OK", "AT+NETOPEN", "+NETOPEN: 0",
+         'AT+CIPOPEN=1,"TCP","203.0.113.10",5000', "+CIPOPEN: 1,0", "AT+CIPSEND=1,26", PACKET,
+         "+CIPSEND: 1,26,26", "+CIPRXGET: 1 ACK", "AT+CIPCLOSE", "OK"]
+PATTERNS = [re.compile(r"\+CIPSEND:\s*1,(\d+),(\d+)"), re.compile(r"(06\d{48,52})")]
+
+
+def fragment(data: bytes, size: int):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+def matches(lines):
+    return sum(1 for line in lines for pattern in PATTERNS if pattern.search(line.decode("utf-8", "ignore")))
+
+
+def before(notifications):
+    return list(notifications)
+
+
+def naive(notifications):
+    lines = []
+    buffer = b""
+    for data in notifications:
+        buffer = buffer + data
+        while b"\n" in buffer:
+            line, buffer = buffer.split(b"\n", 1)
+            line = line.strip()
+            if line:
+                lines.append(line)
+    return lines
+
+
+def framer(notifications):
+    lines = []
+    line_framer = LineFramer(lines.append)
+    for data in notifications:
+        line_framer.feed(data)
+    line_framer.flush()
+    return lines
+
+
+def run(label, handler, notifications, expected_matches):
+    total = sum(len(data) for data in notifications)
+    start = time.perf_counter()
+    lines = handler(notifications)
+    elapsed = time.perf_counter() - start
+    rate = "" if handler is before else f"{len(notifications) / elapsed / 1000:8.0f}k notif/s {total / elapsed / 1e6:6.1f} MB/s"
+    print(f"    {label:<8} {rate:<29} {len(lines):>8} lines {matches(lines):>8}/{expected_matches} matches")
+
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    trace = ("\r\n".join(TRACE * repeats) + "\r\n").encode()
+    expected = matches(line.encode() for line in TRACE * repeats)
+
+    print("=" * 80)
+    print(f"LINE FRAMER BENCHMARK - {len(TRACE) * repeats} trace lines ({len(trace) / 1e6:.1f} MB)")
+    print("=" * 80)
+    for size in (20, 244):
+        notifications = fragment(trace, size)
+        print(f"\n  Modem trace, {size}-byte notifications ({len(notifications)})")
+        for label, handler in (("before", before), ("naive", naive), ("framer", framer)):
+            run(label, handler, notifications, expected)
+    print("\n" + "=" * 80)
+
+
+if __name__ == "__main__":
+    main()
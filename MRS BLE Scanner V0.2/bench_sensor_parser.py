@@ -0,0 +1,136 @@
+"""
+Sensor Parser Benchmark
+=======================
+parse_sensor_string per-line cost: the previous six-re.search parser
+(kept here as legacy_parse_sensor_string, the reference for
+test_sensor_parser.py) vs the single-pass tokenizer in SensorParser.py,
+and the format registry on the documented ultrasonic/distance/tilt lines
+
+Usage: python bench_sensor_parser.py [lines]
+"""
+
+import sys
+import os
+import random
+import re
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from SensorParser import WastebinDataParser
+
+
+def legacy_parse_sensor_string(raw_str, device_imei="000000000000000"):
+    """WastebinDataParser.parse_sensor_string before the tokenizer (unchanged)"""
+    payload = {
+        "cmd": "RP",
+        "device": device_imei,
+        "battery": "0",
+        "time": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        "dIndex": "0410",
+        "data": "0"
+    }
+
+    try:
+        fill_match = re.search(r'fill[:\s]*(\d+)', raw_str, re.IGNORECASE)
+        if fill_match:
+            payload["data"] = fill_match.group(1)
+
+        temp_match = re.search(r'temp[:\s]*([\d.]+)', raw_str, re.IGNORECASE)
+        if temp_match:
+            payload["temperature"] = temp_match.group(1)
+
+        batt_match = re.search(r'batt[:\s]*([\d.]+)', raw_str, re.IGNORECASE)
+        if batt_match:
+            payload["battery"] = batt_match.group(1)
+
+        x_match = re.search(r'x[:\s]*([-\d.]+)', raw_str, re.IGNORECASE)
+        y_match = re.search(r'y[:\s]*([-\d.]+)', raw_str, re.IGNORECASE)
+        z_match = re.search(r'z[:\s]*([-\d.]+)', raw_str, re.IGNORECASE)
+
+        if y_match and not fill_match:
+            y_val = abs(float(y_match.group(1)))
+            if y_val > 80:
+                fill_pct = min(100, int((90 - y_val) * 10))
+            else:
+                fill_pct = min(100, int(100 - y_val))
+            payload["data"] = str(max(0, fill_pct))
+            payload["tilt_y"] = y_match.group(1)
+
+        if x_match:
+            payload["tilt_x"] = x_match.group(1)
+        if z_match:
+            payload["tilt_z"] = z_match.group(1)
+
+    except Exception:
+        pass
+
+    return payload
+
+
+# Noise tokens free of the letters the legacy patterns match inside words
+NOISE = ["rssi:-71", "seq:12", "mode:2", "ok", "adc:1023", "v:1.02", "ERR", "cnt 5"]
+SEPARATORS = [":", ": ", " :", " ", ":  "]
+DELIMITERS = [" ,", ",", " ", ";", " | ", ", "]
+
+
+def random_value(rng, key):
+    if key == 'fill':
+        return str(rng.randint(0, 100))
+    if key == 'temp':
+        return f"{rng.uniform(-10, 60):.{rng.randint(0, 3)}f}"
+    if key == 'batt':
+        return f"{rng.uniform(2.5, 4.2):.{rng.randint(1, 3)}f}"
+    return rng.choice([f"{rng.uniform(-90, 90):.2f}", str(rng.randint(-90, 90)), "0.00"])
+
+
+def random_line(rng):
+    """A sensor line in any of the formats the bins send, in random order and case"""
+    keys = rng.sample(['fill', 'temp', 'batt', 'x', 'y', 'z'], rng.randint(0, 6))
+    if keys and rng.random() < 0.1:
+        keys.append(rng.choice(keys))  # repeated key - first one wins
+    tokens = []
+    for key in keys:
+        name = rng.choice([key, key.upper(), key.capitalize()])
+        tokens.append(f"{name}{rng.choice(SEPARATORS)}{random_value(rng, key)}")
+    for _ in range(rng.randint(0, 2)):
+        tokens.insert(rng.randint(0, len(tokens)), rng.choice(NOISE))
+    return rng.choice(DELIMITERS).join(tokens)
+
+
+def run(label, parse, lines):
+    start = time.perf_counter()
+    for line in lines:
+        parse(line, "351469520520687")
+    elapsed = time.perf_counter() - start
+    per_line = elapsed / len(lines) * 1e6
+    print(f"  {label:<36} {per_line:6.2f} us/line   {len(lines) / elapsed:10.0f} lines/s")
+    return per_line
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    rng = random.Random(42)
+    lines = [random_line(rng) for _ in range(count)]
+
+    print("=" * 100)
+    print(f"SENSOR PARSER BENCHMARK - {count:,} random sensor lines")
+    print("=" * 100)
+    before = run("before: six re.search + strftime", legacy_parse_sensor_string, lines)
+    after = run("after: single-pass tokenizer", WastebinDataParser.parse_sensor_string, lines)
+    print("-" * 100)
+    print(f"  Speed-up: {before / after:.1f}x")
+    print("-" * 100)
+
+    documented = ["s1:2 cm(3%) ,s2:2 cm(3%) => [lv1] , cnt:0/10 min",
+                  "distance: s1 20 mm ,s2 20 mm",
+                  "angle : x=89 ,y=0 ,z=0"]
+    mixed = [documented[i % 3] for i in range(count)]
+    single = [documented[0]] * count
+    run("registry: one format per device", WastebinDataParser().parse, single)
+    run("registry: formats interleaved", WastebinDataParser().parse, mixed)
+
+
+if __name__ == "__main__":
+    main()
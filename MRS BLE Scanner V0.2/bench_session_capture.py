@@ -0,0 +1,99 @@
+"""
+Session Capture Benchmark
+=========================
+A synthetic field session - TEST_PACKET sequences plus sensor readings,
+cut into 20-byte notifications 10 ms apart - is recorded with
+CaptureWriter and then replayed as fast as possible through the full
+receive pipeline of BLEScanner (line framing, diagnostics, parser, console
+queue; forwarding off, console output discarded). Shows what recording
+costs per notification, how much a capture adds to the bytes received,
+and how much faster than real time the pipeline runs here
+
+Usage: python bench_session_capture.py [sequences]
+"""
+
+import sys
+import os
+import io
+import asyncio
+import tempfile
+import time
+
+sys.argv.append("--no-install")
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from Scanner import BLEScanner, replay_capture
+from ConsoleRenderer import ConsoleRenderer
+from SessionCapture import CaptureWriter, CaptureReader
+
+UART_TX = "6e400003-b5a3-f393-e0a9-e50e24dcca9e"
+PACKET = "06" + "0123456789" * 4 + "35146952"
+SEQUENCE = ["TEST_PACKET", "try to send 06 packet", "SIM Ready", "AT+CGSN=1", '+CGSN: "351469520162464"', "OK",
+            "AT+CEREG?", "+CEREG: 2,1", "OK", "AT+NETOPEN", "+NETOPEN: 0",
+            'AT+CIPOPEN=1,"TCP","203.0.113.10",5000', "+CIPOPEN: 1,0", "AT+CIPSEND=1,26", PACKET,
+            "+CIPSEND: 1,26,26", "+CIPRXGET: 1 ACK", "AT+CIPCLOSE", "OK",
+            "Distance: 125 cm", "Temperature: 21.5 C", "Battery: 3.92 V"]
+
+
+class VirtualClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def record(path, sequences):
+    """Write the synthetic session - returns (notifications, lines, bytes received, seconds in CaptureWriter)"""
+    clock = VirtualClock()
+    writer = CaptureWriter(path, {"name": "N_01E1_N6BR1_162464", "imei": "351469520162464"}, clock=clock)
+    data = ("\r\n".join(SEQUENCE) + "\r\n").encode()
+    notifications = [data[i:i + 20] for i in range(0, len(data), 20)]
+    spent = 0.0
+    writer.link("connected", imei="351469520162464")
+    for _ in range(sequences):
+        start = time.perf_counter()
+        for notification in notifications:
+            clock.now += 0.01
+            writer.rx(UART_TX, notification)
+        spent += time.perf_counter() - start
+        clock.now += 5.0   # pause between sequences
+    writer.link("disconnected", imei="351469520162464")
+    writer.close()
+    return sequences * len(notifications), sequences * len(SEQUENCE), len(data) * sequences, spent
+
+
+async def replay(path):
+    scanner = BLEScanner(console=ConsoleRenderer(out=io.StringIO()))
+    scanner.auto_report_enabled = False
+    scanner.console.start()
+    start = time.perf_counter()
+    progress = await replay_capture(scanner, CaptureReader(path), speed=0)
+    elapsed = time.perf_counter() - start
+    await scanner.console.stop()
+    return progress, scanner.message_count, elapsed
+
+
+def main():
+    sequences = int(sys.argv[1]) if len(sys.argv) > 1 and sys.argv[1].isdigit() else 2000
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "bench.cap")
+        notifications, lines, text_bytes, spent = record(path, sequences)
+        size = os.path.getsize(path)
+        progress, messages, elapsed = asyncio.run(replay(path))
+
+    print("=" * 80)
+    print(f"SESSION CAPTURE BENCHMARK - {sequences} sequences, {notifications} notifications, {lines} lines")
+    print("=" * 80)
+    print(f"\n  Recording:  {spent / notifications * 1e6:6.2f} µs per notification")
+    print(f"  Capture:    {size / 1024:8.1f} KB - {text_bytes / 1024:.1f} KB received + "
+          f"{(size - text_bytes) / notifications:.1f} bytes per notification (header, timing)")
+    print(f"\n  Replay through the pipeline (speed 0):")
+    print(f"    {progress['notifications']} notifications -> {messages} lines in {elapsed:.2f}s")
+    print(f"    {progress['notifications'] / elapsed:8.0f} notifications/s, {messages / elapsed:8.0f} lines/s")
+    print(f"    {progress['position'] / elapsed:8.0f}x real time ({progress['position'] / 60:.0f} min of capture)")
+    print("\n" + "=" * 80)
+
+
+if __name__ == "__main__":
+    main()
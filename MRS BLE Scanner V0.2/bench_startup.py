@@ -0,0 +1,56 @@
+"""
+Startup Benchmark
+=================
+Time from process start until Scanner.py is imported (fresh interpreter
+each run): the previous startup - install_packages() importing bleak,
+requests and reportlab to see if they exist, and PDFReportGenerator /
+requests imported at module level - vs find_spec probing and lazy
+reportlab/requests, and vs --no-install (no probe at all)
+
+Usage: python bench_startup.py [runs]
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# The old import-time work, done before importing the current module
+BEFORE = ("import sys; sys.argv.append('--no-install'); "
+          "[__import__(p) for p in ('bleak', 'requests', 'reportlab')]; "
+          "import requests, PDFReportGenerator; import Scanner")
+AFTER = "import Scanner"
+AFTER_NO_INSTALL = "import sys; sys.argv.append('--no-install'); import Scanner"
+
+
+def startup_time(code: str) -> float:
+    """Seconds for a fresh interpreter to run code (interpreter start included)"""
+    script = f"import time; t = time.perf_counter(); {code}; print(time.perf_counter() - t)"
+    output = subprocess.run([sys.executable, "-c", script], cwd=HERE, capture_output=True, text=True, check=True)
+    return float(output.stdout.strip().splitlines()[-1])
+
+
+def run(label: str, code: str, runs: int) -> float:
+    startup_time(code)  # warm the OS file cache and __pycache__
+    times = sorted(startup_time(code) for _ in range(runs))
+    median = statistics.median(times)
+    print(f"  {label:<48} median {median * 1000:7.1f} ms   min {times[0] * 1000:7.1f} ms")
+    return median
+
+
+if __name__ == "__main__":
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    print("=" * 80)
+    print(f"STARTUP BENCHMARK - import Scanner, {runs} fresh interpreters each")
+    print("=" * 80)
+
+    before = run("before: import probe + eager reportlab/requests", BEFORE, runs)
+    after = run("after: find_spec probe, lazy imports", AFTER, runs)
+    no_install = run("after: --no-install", AFTER_NO_INSTALL, runs)
+
+    print("-" * 80)
+    print(f"  Import time: {before * 1000:.0f} ms -> {after * 1000:.0f} ms ({before / after:.1f}x faster), "
+          f"{no_install * 1000:.0f} ms with --no-install")
+    print("=" * 80)
@@ -0,0 +1,134 @@
+"""
+Test Circuit Breaker
+====================
+Checks the closed/open/half-open transitions, that an open circuit makes
+no network attempts, and that a probe closes it again once the endpoint
+recovers - with the outbox holding readings in the meantime
+"""
+
+import sys
+import os
+import asyncio
+import socket
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from HTTPForwarder import HTTPForwarder, CircuitBreaker, DurableForwardQueue
+from ForwardStore import ForwardStore
+from bench_http_forwarder import StubServer, StubHandler
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class SwitchableHandler(StubHandler):
+    """503 while the server-wide `down` flag is set"""
+
+    def do_POST(self):
+        if self.server.down:
+            self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            self.server.attempts_while_down += 1
+            self.send_error(503, 'Maintenance')
+            return
+        super().do_POST()
+
+
+def switchable_stub():
+    stub = StubServer(SwitchableHandler)
+    stub.httpd.down = True
+    stub.httpd.attempts_while_down = 0
+    return stub
+
+
+def test_opens_on_error_rate_and_probes():
+    clock = FakeClock()
+    breaker = CircuitBreaker(min_calls=3, error_rate=0.5, open_time=10, clock=clock)
+
+    breaker.record(True, 0.1)
+    breaker.record(False, 0.1)
+    assert breaker.state == "closed"  # below min_calls
+    breaker.record(False, 0.1)
+    assert breaker.state == "open" and not breaker.allow()
+    assert breaker.retry_in() == 10
+
+    clock.now = 10
+    assert breaker.allow() and breaker.state == "half-open"
+    assert not breaker.allow()  # only one probe at a time
+
+    # Failed probe: open again for twice as long
+    breaker.record(False, 0.1)
+    assert breaker.state == "open" and breaker.retry_in() == 20
+
+    clock.now = 30
+    assert breaker.allow()
+    breaker.record(True, 0.1)
+    assert breaker.state == "closed" and breaker.allow()
+    assert breaker.opens == 2
+
+
+def test_opens_on_slow_calls():
+    breaker = CircuitBreaker(min_calls=5, slow_call=1.0, slow_rate=0.8, clock=FakeClock())
+    for _ in range(4):
+        breaker.record(True, 2.0)
+    assert breaker.state == "closed"
+    breaker.record(True, 2.0)
+    assert breaker.state == "open"
+
+
+def test_open_circuit_skips_network():
+    # Nothing listens on this port
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        url = f"http://127.0.0.1:{sock.getsockname()[1]}/api/sensor"
+
+    forwarder = HTTPForwarder(url, retries=0)
+    for _ in range(3):
+        assert forwarder.send({"data": "1"})["status"] == 0
+    assert forwarder.breaker.state == "open" and forwarder.error_count == 3
+
+    start = time.perf_counter()
+    results = [forwarder.send({"data": "1"}) for _ in range(100)]
+    elapsed = time.perf_counter() - start
+    forwarder.close()
+
+    assert all(r["circuit_open"] for r in results)
+    assert forwarder.short_circuited == 100 and forwarder.error_count == 3
+    assert elapsed < 0.05
+
+
+async def run_backlog_held_then_probe_recovers():
+    with switchable_stub() as stub:
+        forwarder = HTTPForwarder(stub.url)
+        forwarder.breaker = CircuitBreaker(open_time=0.3)
+        store = ForwardStore(os.path.join(tempfile.mkdtemp(), "outbox.db"))
+        queue = DurableForwardQueue(store, forwarder, base_delay=0.01, max_delay=0.02, max_rate=None)
+
+        for i in range(20):
+            queue.submit({"data": str(i)})
+            await asyncio.sleep(0.01)
+
+        # Three failed POSTs opened the circuit; everything else waits on disk
+        assert forwarder.breaker.state == "open"
+        assert stub.httpd.attempts_while_down == 3
+        assert queue.depth == 20
+
+        stub.httpd.down = False
+        deadline = time.perf_counter() + 5
+        while queue.depth and time.perf_counter() < deadline:
+            await asyncio.sleep(0.02)
+
+        assert forwarder.breaker.state == "closed"
+        assert stub.received == [{"data": str(i)} for i in range(20)]
+        await queue.stop(timeout=1)
+        forwarder.close()
+
+
+def test_backlog_held_then_probe_recovers():
+    asyncio.run(run_backlog_held_then_probe_recovers())
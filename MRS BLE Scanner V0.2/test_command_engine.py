@@ -0,0 +1,151 @@
+"""
+Test Command Engine
+===================
+Commands resolve on OK / ERROR / the documented sensor reply / a custom
+regex, on silence for commands without a known reply, or time out; a
+script advances as soon as each command is answered
+"""
+
+import sys
+import os
+import asyncio
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from CommandEngine import (CommandEngine, ScriptError, parse_script, run_script,
+                           OK, ERROR, TIMEOUT, COMMAND_TIMEOUT)
+
+
+class FakeSensor:
+    """write() for the engine - answers arrive later through engine.feed()"""
+
+    def __init__(self, replies, delay=0.01, connected=True):
+        self.replies = replies          # command -> list of lines (missing = silent)
+        self.delay = delay
+        self.connected = connected
+        self.sent = []
+        self.engine = None
+
+    async def write(self, command):
+        if not self.connected:
+            return False
+        self.sent.append(command)
+        loop = asyncio.get_running_loop()
+        for i, line in enumerate(self.replies.get(command, []), 1):
+            loop.call_later(self.delay * i, self.engine.feed, line)
+        return True
+
+
+def engine_for(replies, **kwargs):
+    sensor = FakeSensor(replies)
+    sensor.engine = CommandEngine(sensor.write, **kwargs)
+    return sensor, sensor.engine
+
+
+def test_terminators():
+    async def scenario():
+        sensor, engine = engine_for({
+            "AT+CEREG?": ["+CEREG: 2,1", "OK"],
+            "AT+BAD": ["+CME ERROR: 50"],
+            "NB_SHOW": ["CMD_UART_LOG_MODE ENABLE."],
+            "TEST_PACKET": ["try to send 06 packet", "SIM Ready"],
+            "AT+CIPSEND=1,26": ["> ", "+CIPSEND: 1,26,26"],
+        })
+        response = await engine.request("AT+CEREG?")
+        assert response.status == OK and response.lines == ["+CEREG: 2,1", "OK"] and response.terminator == "OK"
+        assert response.elapsed < 1
+
+        response = await engine.request("AT+BAD")
+        assert response.status == ERROR and not response.ok
+
+        response = await engine.request("NB_SHOW")
+        assert response.ok and response.terminator == "CMD_UART_LOG_MODE ENABLE."
+
+        # Resolves on the first reply line, the sequence keeps streaming afterwards
+        response = await engine.request("TEST_PACKET")
+        assert response.ok and response.lines == ["try to send 06 packet"]
+
+        response = await engine.request("AT+CIPSEND=1,26", expect=r"\+CIPSEND: \d+,\d+,\d+")
+        assert response.ok and response.terminator == "+CIPSEND: 1,26,26"
+
+    asyncio.run(scenario())
+
+
+def test_unknown_reply_settles_and_timeout():
+    async def scenario():
+        sensor, engine = engine_for({"VOLTAGE": ["batt: 3.6V", "charging: no"]}, idle=0.05, timeout=0.3)
+        response = await engine.request("VOLTAGE")
+        assert response.ok and response.terminator is None and len(response.lines) == 2
+        assert response.elapsed < 0.25
+
+        response = await engine.request("SYS_INFO")   # silent sensor
+        assert response.status == TIMEOUT and response.lines == []
+        response = await engine.request("AT+CSQ", timeout=0.1)   # AT commands wait for OK/ERROR
+        assert response.status == TIMEOUT
+        assert engine.stats()["requests"] == 3 and engine.stats()["timeouts"] == 2
+
+        sensor.connected = False
+        try:
+            await engine.request("VOLTAGE")
+            assert False, "expected ConnectionError"
+        except ConnectionError:
+            pass
+
+    asyncio.run(scenario())
+
+
+def test_requests_run_one_at_a_time():
+    async def scenario():
+        sensor, engine = engine_for({"AT": ["OK"], "ATI": ["Manufacturer: NHR", "IMEI: 351469520162464"]})
+        first, second = await asyncio.gather(engine.request("ATI"), engine.request("AT"))
+        assert sensor.sent == ["ATI", "AT"]
+        assert first.lines == ["Manufacturer: NHR", "IMEI: 351469520162464"] and second.lines == ["OK"]
+        # Lines arriving with nothing pending are ignored
+        engine.feed("OK")
+        assert engine.pending is None
+
+    asyncio.run(scenario())
+
+
+def test_parse_script():
+    steps = parse_script(["# setup", "NB_SHOW", "", "timeout 90", "expect AT\\+CFUN=0", "TEST_PACKET",
+                          "wait 2.5", "SET_IP=10.0.0.1"])
+    assert [(s.line, s.command, s.expect, s.timeout, s.pause) for s in steps] == [
+        (2, "NB_SHOW", None, COMMAND_TIMEOUT, 0.0),
+        (6, "TEST_PACKET", "AT\\+CFUN=0", 90.0, 0.0),
+        (7, None, None, COMMAND_TIMEOUT, 2.5),
+        (8, "SET_IP=10.0.0.1", None, 90.0, 0.0),
+    ]
+    for bad in (["wait soon"], ["expect ("]):
+        try:
+            parse_script(bad)
+            assert False, "expected ValueError"
+        except ValueError as e:
+            assert "line 1" in str(e)
+
+
+def test_script_advances_on_answers():
+    async def scenario():
+        replies = {f"AT+CMD{i}": ["OK"] for i in range(10)}
+        replies["AT+FAIL"] = ["ERROR"]
+        sensor, engine = engine_for(replies)
+        seen = []
+        steps = parse_script([f"AT+CMD{i}" for i in range(10)])
+        started = time.monotonic()
+        responses = await run_script(engine, steps, on_response=lambda step, response: seen.append(step.line))
+        # 10 commands in roughly 10 reply delays - a fixed 1 s gap would take 10 s
+        assert time.monotonic() - started < 1
+        assert all(response.ok for response in responses) and seen == list(range(1, 11))
+
+        try:
+            await run_script(engine, parse_script(["AT+CMD1", "AT+FAIL", "AT+CMD2"]))
+            assert False, "expected ScriptError"
+        except ScriptError as e:
+            assert e.step.line == 2 and e.response.status == ERROR
+        assert sensor.sent[-1] == "AT+FAIL"
+
+        responses = await run_script(engine, parse_script(["AT+FAIL", "AT+CMD2"]), stop_on_error=False)
+        assert [response.status for response in responses] == [ERROR, OK]
+
+    asyncio.run(scenario())
@@ -0,0 +1,105 @@
+"""
+Test Console Renderer
+=====================
+Checks that posting from the BLE callback is cheap, that a burst collapses
+into a summary line instead of flooding the console, that diagnostics are
+never dropped, and that quiet mode keeps only readings and diagnostics
+"""
+
+import sys
+import os
+import asyncio
+import io
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from ConsoleRenderer import ConsoleRenderer, LOG, READING, ESSENTIAL
+
+
+def line(text):
+    return f"{text}\n"
+
+
+async def run_burst_is_coalesced():
+    out = io.StringIO()
+    console = ConsoleRenderer(max_per_frame=20, frame_interval=0.05, out=out)
+    console.start()
+
+    start = time.perf_counter()
+    for i in range(1000):
+        console.post(line, f"msg {i}")
+    post_us = (time.perf_counter() - start) / 1000 * 1e6
+    await console.stop()
+    print(f"  post: {post_us:.2f} us/message")
+
+    text = out.getvalue()
+    assert post_us < 50
+    # 500 fell off the bounded queue, 480 more were collapsed, the newest 20 are drawn
+    assert "+980 messages" in text
+    assert "msg 999" in text and "msg 980" in text and "msg 979" not in text
+    assert console.stats()["coalesced"] == 980 and console.frames == 1
+
+
+async def run_essential_never_dropped():
+    out = io.StringIO()
+    console = ConsoleRenderer(max_pending=10, max_per_frame=5, out=out)
+    console.start()
+    for i in range(100):
+        console.post(line, f"msg {i}")
+        if i % 25 == 0:
+            console.post(line, f"DIAG {i}", level=ESSENTIAL)
+    await console.stop()
+
+    text = out.getvalue()
+    for i in (0, 25, 50, 75):
+        assert f"DIAG {i}" in text
+    # In posting order
+    assert text.index("DIAG 75") < text.index("msg 99")
+
+
+async def run_frames_are_rate_limited():
+    out = io.StringIO()
+    console = ConsoleRenderer(frame_interval=0.1, out=out)
+    console.start()
+    deadline = time.perf_counter() + 0.5
+    count = 0
+    while time.perf_counter() < deadline:
+        console.post(line, f"msg {count}")
+        count += 1
+        await asyncio.sleep(0.001)
+    await console.stop()
+
+    # ~500 posts in 0.5 s become at most one frame per 100 ms (+ the final flush)
+    assert count > 100
+    assert console.frames <= 7
+    assert f"msg {count - 1}" in out.getvalue()
+
+
+def test_quiet_mode():
+    out = io.StringIO()
+    console = ConsoleRenderer(out=out)
+    console.quiet = True
+    console.post(line, "AT+CFUN=0")
+    console.post(line, "fill:76", level=READING)
+    console.post(line, "TEST_PACKET detected", level=ESSENTIAL)
+    assert out.getvalue() == "fill:76\nTEST_PACKET detected\n"
+
+
+def test_without_task_behaves_like_print():
+    out = io.StringIO()
+    console = ConsoleRenderer(out=out)
+    console.post(line, "hello", level=LOG)
+    assert out.getvalue() == "hello\n"
+
+
+def test_burst_is_coalesced():
+    asyncio.run(run_burst_is_coalesced())
+
+
+def test_essential_never_dropped():
+    asyncio.run(run_essential_never_dropped())
+
+
+def test_frames_are_rate_limited():
+    asyncio.run(run_frames_are_rate_limited())
@@ -0,0 +1,157 @@
+"""
+Test Device Fleet
+=================
+Selection parsing, the connection cap (devices beyond it wait and take
+the slot of a failed or closed session), per-session state, broadcast
+and shutdown - with fake sessions instead of BLE clients
+"""
+
+import sys
+import os
+import asyncio
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from DeviceFleet import DeviceFleet, parse_selection, WAITING, CONNECTED, FAILED, CLOSED
+
+
+class FakeSession:
+    """Stands in for BLEScanner - connect takes `delay` seconds, names containing FAIL fail"""
+
+    live = 0
+    peak = 0
+
+    def __init__(self, device, tag, delay=0.02):
+        self.device = device
+        self.tag = tag
+        self.delay = delay
+        self.device_imei = "351469520" + device.address.replace(":", "")[-6:]
+        self.message_count = 0
+        self.commands = []
+        self.connected = False
+        self.shut_down = False
+
+    async def connect(self, device):
+        await asyncio.sleep(self.delay)
+        if "FAIL" in device.name:
+            raise OSError("Device not found")
+        self.connected = True
+        FakeSession.live += 1
+        FakeSession.peak = max(FakeSession.peak, FakeSession.live)
+
+    @property
+    def engine(self):
+        return self
+
+    async def request(self, command):
+        self.commands.append(command)
+        if "FAIL" in command:
+            raise ConnectionError("write failed")
+        return SimpleNamespace(command=command, ok=True)
+
+    async def shutdown(self):
+        if self.connected:
+            self.connected = False
+            FakeSession.live -= 1
+        self.shut_down = True
+
+
+def device(i, name="N_01E1_N6BR1"):
+    return SimpleNamespace(name=name, address=f"AA:BB:CC:00:00:{i:02d}")
+
+
+def fresh_counts():
+    FakeSession.live = 0
+    FakeSession.peak = 0
+
+
+def test_parse_selection():
+    assert parse_selection("", 5) == [1]
+    assert parse_selection("3", 5) == [3]
+    assert parse_selection("1,3, 5", 5) == [1, 3, 5]
+    assert parse_selection("2-4 1 3", 5) == [2, 3, 4, 1]
+    assert parse_selection(" ALL ", 3) == [1, 2, 3]
+    assert parse_selection("*", 5, marked=[2, 4]) == [2, 4]
+    for bad in ("0", "6", "4-2", "x", "1,,7"):
+        try:
+            parse_selection(bad, 5)
+        except ValueError:
+            continue
+        raise AssertionError(f"{bad!r} accepted")
+    try:
+        parse_selection("*", 5, marked=[])
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("* without dustbin sensors accepted")
+
+
+def test_connection_cap():
+    async def scenario():
+        fresh_counts()
+        fleet = DeviceFleet(FakeSession, max_connections=2)
+        tags = fleet.start([device(i) for i in range(1, 6)])
+        assert tags == ["B1", "B2", "B3", "B4", "B5"]
+
+        await fleet.wait_connected()
+        assert [fleet.state[tag] for tag in tags] == [CONNECTED, CONNECTED, WAITING, WAITING, WAITING]
+        assert FakeSession.peak == 2
+
+        # Closing a session hands its slot to the next waiting device
+        await fleet.close("B1")
+        await fleet.wait_connected()
+        assert fleet.state["B1"] == CLOSED and fleet.state["B3"] == CONNECTED
+        assert fleet.state["B4"] == WAITING and FakeSession.peak == 2
+
+        await fleet.close_all()
+        assert set(fleet.state.values()) == {CLOSED}
+        assert all(session.shut_down for session in fleet.sessions.values())
+        assert FakeSession.live == 0 and not fleet.holding
+
+    asyncio.run(scenario())
+
+
+def test_failed_connect_frees_slot():
+    async def scenario():
+        fresh_counts()
+        states = []
+        fleet = DeviceFleet(FakeSession, max_connections=1,
+                            on_state=lambda tag, state, detail: states.append((tag, state, detail)))
+        fleet.start([device(1, "N_01E1_N6BR1_FAIL"), device(2)])
+        await fleet.wait_connected()
+
+        assert fleet.state == {"B1": FAILED, "B2": CONNECTED}
+        assert fleet.errors["B1"] == "Device not found"
+        assert ("B1", FAILED, "Device not found") in states
+        assert [session.tag for session in fleet.connected()] == ["B2"]
+        await fleet.close_all()
+
+    asyncio.run(scenario())
+
+
+def test_sessions_are_independent():
+    async def scenario():
+        fresh_counts()
+        fleet = DeviceFleet(FakeSession, max_connections=3)
+        fleet.start([device(1), device(2), device(3, "N_01E1_N6BR1_FAIL")])
+        await fleet.wait_connected()
+
+        fleet.get("b1").message_count = 7
+        assert fleet.get("B2").message_count == 0
+        assert fleet.get("B9") is None
+
+        results = await fleet.broadcast("AT+CSQ")
+        assert sorted(results) == ["B1", "B2"] and all(response.ok for response in results.values())
+        assert fleet.get("B3").commands == []
+        assert list(await fleet.broadcast("ATI", ["B2", "B3"])) == ["B2"]   # B3 never connected
+        assert isinstance((await fleet.broadcast("AT+FAIL", ["B1"]))["B1"], ConnectionError)
+        assert fleet.get("B1").commands == ["AT+CSQ", "AT+FAIL"]
+
+        rows = {row["tag"]: row for row in fleet.status()}
+        assert rows["B1"]["messages"] == 7 and rows["B1"]["imei"] != rows["B2"]["imei"]
+        assert rows["B3"]["error"] == "Device not found"
+        assert fleet.stats() == {"devices": 3, "connected": 2, "waiting": 0, "failed": 1, "messages": 7}
+        await fleet.close_all()
+
+    asyncio.run(scenario())
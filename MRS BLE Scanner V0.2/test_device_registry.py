@@ -0,0 +1,180 @@
+"""
+Test Device Registry
+====================
+devices.json round trip, advertisement updates that are only written on
+save(), GATT profiles (remember / forget), ordering by last seen, a
+damaged file that must not stop the scanner from starting, only connected
+devices written to the file, and a saved
+profile that is only forgotten when its characteristics stop working - not
+when the sensor is out of reach
+"""
+
+import sys
+import os
+import asyncio
+import io
+import json
+import tempfile
+import time
+from contextlib import redirect_stdout
+from types import SimpleNamespace
+
+if "--no-install" not in sys.argv:
+    sys.argv.append("--no-install")
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import Scanner
+from ConsoleRenderer import ConsoleRenderer
+from DeviceRegistry import DeviceRegistry, DeviceProfile
+
+UART_SERVICE = "6e400001-b5a3-f393-e0a9-e50e24dcca9e"
+UART_WRITE = "6e400002-b5a3-f393-e0a9-e50e24dcca9e"
+UART_NOTIFY = "6e400003-b5a3-f393-e0a9-e50e24dcca9e"
+NEW_NOTIFY = "6e400004-b5a3-f393-e0a9-e50e24dcca9e"
+
+
+class FakeClient:
+    """Stands in for BleakClient - a sensor with UART write + NEW_NOTIFY, or out of reach"""
+    reachable = True
+    characteristics = {UART_WRITE: ["write-without-response"], NEW_NOTIFY: ["notify"]}
+
+    def __init__(self, address, disconnected_callback=None, timeout=30.0, **kwargs):
+        self.is_connected = False
+        chars = [SimpleNamespace(uuid=uuid, properties=props) for uuid, props in self.characteristics.items()]
+        self.services = FakeServices([SimpleNamespace(uuid=UART_SERVICE, description="", characteristics=chars)])
+
+    async def connect(self):
+        if not FakeClient.reachable:
+            raise asyncio.TimeoutError()
+        self.is_connected = True
+
+    async def disconnect(self):
+        self.is_connected = False
+
+    async def start_notify(self, char_uuid, handler):
+        if self.services.get_characteristic(char_uuid) is None:
+            raise ValueError(f"Characteristic {char_uuid} not found")
+
+
+class FakeServices(list):
+    def get_characteristic(self, uuid):
+        return next((char for service in self for char in service.characteristics if char.uuid == uuid), None)
+
+
+def test_round_trip():
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "devices.json")
+        registry = DeviceRegistry(path)
+        assert len(registry) == 0
+
+        registry.seen("aa:bb:cc:dd:ee:01", "N_01E1_N6BR1_520687", -71)
+        assert not os.path.exists(path)  # advertisements only touch memory
+        registry.remember_gatt("AA:BB:CC:DD:EE:01", UART_WRITE, [UART_NOTIFY], [UART_SERVICE],
+                               imei="351469520520687")
+        registry.save()
+        assert not registry.dirty and not os.path.exists(path + ".tmp")
+
+        loaded = DeviceRegistry(path)
+        profile = loaded.get("aa:bb:cc:dd:ee:01")
+        assert "AA:BB:CC:DD:EE:01" in loaded and len(loaded) == 1
+        assert profile.name == "N_01E1_N6BR1_520687" and profile.imei == "351469520520687"
+        assert profile.write_char == UART_WRITE and profile.notify_chars == [UART_NOTIFY]
+        assert profile.services == [UART_SERVICE] and profile.has_gatt
+        assert profile.last_rssi == -71 and profile.connects == 1
+
+
+def test_seen_keeps_profile_and_name():
+    registry = DeviceRegistry(os.path.join(tempfile.gettempdir(), "no-such-dir", "devices.json"))
+    registry.remember_gatt("AA:01", UART_WRITE, [UART_NOTIFY], [UART_SERVICE], name="N_01E1_N6BR1_000001")
+    registry.seen("AA:01", None, -80)  # advertisement without a name
+    profile = registry.get("AA:01")
+    assert profile.name == "N_01E1_N6BR1_000001" and profile.last_rssi == -80 and profile.has_gatt
+
+    registry.forget_gatt("AA:01")
+    assert not registry.get("AA:01").has_gatt and registry.get("AA:01").imei is None
+    registry.forget_gatt("FF:FF")  # unknown address is fine
+
+
+def test_only_connected_devices_are_saved():
+    """Advertisers that were never connected (phones, watches in "all" mode) stay out of devices.json"""
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "devices.json")
+        registry = DeviceRegistry(path)
+        for i in range(100):
+            registry.seen(f"AA:{i:02X}", f"phone-{i}", -80)
+        registry.save()
+        assert not os.path.exists(path)
+
+        registry.remember_gatt("AA:01", UART_WRITE, [UART_NOTIFY], [UART_SERVICE], name="N_01E1_N6BR1_000001")
+        registry.save()
+        loaded = DeviceRegistry(path)
+        assert len(loaded) == 1 and "AA:01" in loaded
+
+        # An older file full of advertisers is trimmed on the next save
+        with open(path, "w") as f:
+            json.dump({"devices": [{"address": f"BB:{i:02X}", "name": "watch"} for i in range(50)] +
+                                  [{"address": "AA:01", "connects": 3}]}, f)
+        loaded = DeviceRegistry(path)
+        loaded.seen("BB:01", "watch", -60)
+        loaded.save()
+        assert [p.address for p in DeviceRegistry(path).known()] == ["AA:01"]
+
+
+def test_known_order_and_age():
+    registry = DeviceRegistry(os.path.join(tempfile.gettempdir(), "no-such-dir", "devices.json"))
+    now = time.time()
+    registry.seen("AA:01", "old", -90, when=now - 40 * 86400)
+    registry.seen("AA:02", "recent", -60, when=now - 60)
+    registry.seen("AA:03", "yesterday", -70, when=now - 86400)
+    assert [p.name for p in registry.known()] == ["recent", "yesterday", "old"]
+    assert [p.name for p in registry.known(max_age=30 * 86400)] == ["recent", "yesterday"]
+    assert [p.name for p in registry.known(limit=1)] == ["recent"]
+
+
+def test_damaged_file_starts_empty():
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "devices.json")
+        with open(path, "w") as f:
+            f.write('{"devices": [{"address": "AA:01", "name": "x"')  # cut off mid-write
+        registry = DeviceRegistry(path)
+        assert len(registry) == 0
+
+        # Unknown fields from a newer version are ignored
+        with open(path, "w") as f:
+            json.dump({"devices": [{"address": "AA:01", "name": "x", "firmware": "2.1"}]}, f)
+        assert DeviceRegistry(path).get("AA:01") == DeviceProfile(address="AA:01", name="x")
+
+
+async def run_saved_profile_fallback(path):
+    registry = DeviceRegistry(path)
+    registry.remember_gatt("AA:01", UART_WRITE, [UART_NOTIFY], [UART_SERVICE], name="N_01E1_N6BR1_000001")
+    device = SimpleNamespace(address="AA:01", name="N_01E1_N6BR1_000001")
+    scanner = Scanner.BLEScanner(console=ConsoleRenderer(out=io.StringIO()), registry=registry)
+
+    # Out of reach: both attempts time out, the saved profile is still good
+    FakeClient.reachable = False
+    try:
+        await scanner.connect(device)
+        assert False, "expected TimeoutError"
+    except asyncio.TimeoutError:
+        pass
+    assert registry.get("AA:01").has_gatt and registry.get("AA:01").notify_chars == [UART_NOTIFY]
+
+    # Link up but the saved notify characteristic is gone: forgotten, services discovered again
+    FakeClient.reachable = True
+    await scanner.connect(device)
+    assert registry.get("AA:01").notify_chars == [NEW_NOTIFY] and scanner.subscribed == [NEW_NOTIFY]
+    assert scanner.client.is_connected
+
+
+def test_saved_profile_kept_on_connect_timeout():
+    saved = Scanner.BleakClient
+    Scanner.BleakClient = FakeClient
+    try:
+        with tempfile.TemporaryDirectory() as folder, redirect_stdout(io.StringIO()) as out:
+            asyncio.run(run_saved_profile_fallback(os.path.join(folder, "devices.json")))
+    finally:
+        Scanner.BleakClient = saved
+        FakeClient.reachable = True
+    assert "Connect failed (TimeoutError)" in out.getvalue()
+    assert "Saved GATT profile did not work (notify " + UART_NOTIFY in out.getvalue()
@@ -0,0 +1,155 @@
+"""
+Test Diagnostic Sweep
+=====================
+Sweep over fake sensor sessions: connections stay within the pool size,
+every device gets one result (healthy, failed, silent, unreachable,
+broken link), reports are written per analysed device without blocking
+the event loop, and the summary CSV has one row per device
+"""
+
+import sys
+import os
+import asyncio
+import csv
+import tempfile
+import threading
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from NetworkDiagnostics import NetworkDiagnostics
+from DiagnosticSweep import DiagnosticSweep, write_summary, SUMMARY_COLUMNS, NOT_CONNECTED, NO_RESPONSE, ERROR
+
+HEALTHY_LOG = ["try to send 06 packet", "SIM Ready", "+CEREG: 2,1", "+NETOPEN: 0", "+CIPOPEN: 1,0",
+               "+CIPSEND: 1,26,26", "+CIPRXGET: 1 ACK", "AT+CIPCLOSE"]
+FAILED_LOG = ["try to send 06 packet", "SIM Ready", "+CEREG: 2,2", "+CEREG: 2,2", "AT+CFUN=0"]
+
+
+class FakeSensorSession:
+    """Stands in for BLEScanner - the device name picks what the sensor does"""
+
+    live = 0
+    peak = 0
+
+    def __init__(self, device, tag):
+        self.device = device
+        self.tag = tag
+        self.device_imei = "000000000000000"
+        self.message_count = 0
+        self.diagnostics = NetworkDiagnostics()
+        self.connected = False
+        self.commands = []
+
+    async def connect(self, device):
+        await asyncio.sleep(0.01)
+        if device.name.endswith("GONE"):
+            raise OSError("Device not found")
+        self.connected = True
+        self.device_imei = "351469520" + device.address.replace(":", "")[-6:]
+        FakeSensorSession.live += 1
+        FakeSensorSession.peak = max(FakeSensorSession.peak, FakeSensorSession.live)
+
+    async def run_diagnostic(self, commands, timeout):
+        self.commands = list(commands)
+        if self.device.name.endswith("DROP"):
+            raise ConnectionError("Could not send NB_SHOW")
+        log = {"OK": HEALTHY_LOG, "BAD": FAILED_LOG}.get(self.device.name.rsplit("_", 1)[-1], [])
+        for line in log:
+            await asyncio.sleep(0.005)
+            self.message_count += 1
+            self.diagnostics.add_log("12:00:00.000", line)
+        completed = bool(log)
+        if not completed:
+            await asyncio.sleep(timeout)
+        return self.diagnostics.analyze_logs(self.device_imei), completed
+
+    async def shutdown(self):
+        if self.connected:
+            self.connected = False
+            FakeSensorSession.live -= 1
+
+
+def sensor(i, behaviour):
+    return SimpleNamespace(name=f"N_01E1_N6BR1_{behaviour}", address=f"AA:BB:CC:00:00:{i:02d}")
+
+
+def test_sweep_results_and_pool_bound():
+    async def scenario():
+        FakeSensorSession.live = FakeSensorSession.peak = 0
+        finished = []
+        reports = []
+        behaviours = ["OK", "BAD", "OK", "SILENT", "GONE", "DROP", "OK", "OK"]
+        sweep = DiagnosticSweep(FakeSensorSession, commands=["NB_SHOW", "TEST_PACKET"], max_connections=3,
+                                timeout=0.05, report=lambda result: reports.append(result) or f"R{len(reports)}.pdf",
+                                on_result=finished.append)
+        results = await sweep.run([sensor(i, b) for i, b in enumerate(behaviours, 1)])
+
+        assert FakeSensorSession.peak == 3 and FakeSensorSession.live == 0
+        assert [r.tag for r in results] == [f"B{i}" for i in range(1, 9)]
+        assert len(finished) == 8
+
+        statuses = [r.status for r in results]
+        assert statuses[0] == "HEALTHY" and statuses[6] == "HEALTHY" and statuses[7] == "HEALTHY"
+        assert statuses[1] == "FAILED" and results[1].completed
+        assert statuses[3] == NO_RESPONSE and not results[3].completed
+        assert statuses[4] == NOT_CONNECTED and results[4].error == "Device not found"
+        assert statuses[5] == ERROR and "NB_SHOW" in results[5].error
+
+        # One PDF per analysed device, with that device's IMEI
+        assert len(reports) == 5
+        assert results[0].report_path and results[0].imei == "351469520000001"
+        assert results[4].report_path is None and results[4].duration == 0
+        assert sweep.counts() == {"HEALTHY": 4, "FAILED": 1, NO_RESPONSE: 1, NOT_CONNECTED: 1, ERROR: 1}
+        assert sweep.fleet.stats()["connected"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_reports_do_not_block_the_loop():
+    """PDF rendering runs in a worker thread while the other sessions keep receiving"""
+    async def scenario():
+        loop_thread = threading.get_ident()
+        report_threads = []
+
+        def slow_report(result):
+            report_threads.append(threading.get_ident())
+            time.sleep(0.3)   # reportlab rendering a page
+            return "R.pdf"
+
+        gaps = []
+
+        async def ticker():
+            last = time.perf_counter()
+            while True:
+                await asyncio.sleep(0.01)
+                now = time.perf_counter()
+                gaps.append(now - last)
+                last = now
+
+        tick = asyncio.create_task(ticker())
+        sweep = DiagnosticSweep(FakeSensorSession, max_connections=2, timeout=0.05, report=slow_report)
+        results = await sweep.run([sensor(1, "OK"), sensor(2, "OK")])
+        tick.cancel()
+
+        assert [r.report_path for r in results] == ["R.pdf", "R.pdf"]
+        assert len(report_threads) == 2 and loop_thread not in report_threads
+        assert max(gaps) < 0.2
+
+    asyncio.run(scenario())
+
+
+def test_summary_csv():
+    async def scenario():
+        sweep = DiagnosticSweep(FakeSensorSession, max_connections=2, timeout=0.05)
+        return await sweep.run([sensor(1, "OK"), sensor(2, "GONE")])
+
+    results = asyncio.run(scenario())
+    assert results[0].diagnostic is not None and results[0].report_path is None
+    with tempfile.TemporaryDirectory() as folder:
+        path = write_summary(results, folder)
+        with open(path, newline="", encoding="utf-8") as f:
+            rows = list(csv.reader(f))
+    assert rows[0] == SUMMARY_COLUMNS and len(rows) == 3
+    assert rows[1][0] == "B1" and rows[1][4] == "HEALTHY" and rows[1][7] == "yes"
+    assert rows[2][4] == NOT_CONNECTED and rows[2][6] == "Device not found"
@@ -0,0 +1,369 @@
+"""
+Test Store-and-Forward
+======================
+Checks that submitting from the BLE callback never waits on the server,
+that readings are kept on disk through an API outage and a restart,
+delivered in order with backoff while the server is down, compacted once
+delivered, sent no faster than max_rate when a backlog drains, that a
+session only has an outbox file while readings wait in it, and that
+batch mode coalesces bursts into gzip POSTs (with a single-POST fallback),
+and that one forwarder shared by several sessions' threads counts every POST
+"""
+
+import sys
+import os
+import asyncio
+import io
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import redirect_stdout
+
+if "--no-install" not in sys.argv:
+    sys.argv.append("--no-install")
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from Scanner import BLEScanner, print_session_stats
+from ConsoleRenderer import ConsoleRenderer
+from HTTPForwarder import HTTPForwarder, DurableForwardQueue
+from ForwardStore import ForwardStore
+from bench_http_forwarder import StubServer, StubHandler
+
+
+class FlakyForwarder:
+    """Stands in for HTTPForwarder - fails with status 0 while `down` is set, every POST takes `delay` seconds"""
+
+    def __init__(self, delay: float = 0.0):
+        self.enabled = True
+        self.down = False
+        self.status = 200
+        self.delay = delay
+        self.sent = []
+        self.batches = []
+        self.attempts = 0
+        # HTTPForwarder counters read by the session stats
+        self.success_count = self.error_count = self.short_circuited = 0
+        self.batch_supported = True
+
+    def send(self, payload):
+        return self.send_batch([payload])[0]
+
+    def send_batch(self, payloads):
+        self.attempts += 1
+        self.batches.append(len(payloads))
+        time.sleep(self.delay)
+        if self.down:
+            return [{"success": False, "status": 0, "error": "Connection failed"}] * len(payloads)
+        if self.status != 200:
+            return [{"success": False, "status": self.status, "error": "Bad payload"}] * len(payloads)
+        self.sent.extend(payloads)
+        return [{"success": True, "status": 200, "response": "OK"}] * len(payloads)
+
+
+def temp_store():
+    return ForwardStore(os.path.join(tempfile.mkdtemp(), "outbox.db"), compact_pages=16)
+
+
+async def wait_for(condition, timeout=5.0):
+    deadline = time.perf_counter() + timeout
+    while not condition():
+        assert time.perf_counter() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+
+def test_store_put_peek_ack():
+    store = temp_store()
+    store.put_many({"data": str(i)} for i in range(5))
+    store.put({"data": "5"})
+    assert len(store) == 6
+
+    rows = store.peek(4)
+    assert [payload["data"] for _, payload, _, _ in rows] == ["0", "1", "2", "3"]
+    store.mark_failed([rows[0][0]])
+    store.ack([row[0] for row in rows[1:]])
+    assert len(store) == 3
+    assert [(payload["data"], attempts) for _, payload, _, attempts in store.peek(10)] == \
+        [("0", 1), ("4", 0), ("5", 0)]
+    store.close()
+
+
+def test_store_compacts_after_delivery():
+    store = temp_store()
+    store.put_many({"data": "x" * 200, "n": i} for i in range(5000))
+    full_size = store.size_bytes()
+
+    while len(store):
+        store.ack([row[0] for row in store.peek(500)])
+    assert store.compactions > 0
+    assert store.size_bytes() < full_size / 4
+
+    # Reopening sees an empty outbox
+    path = store.path
+    store.close()
+    assert len(ForwardStore(path)) == 0
+
+
+async def run_submit_is_non_blocking():
+    forwarder = FlakyForwarder(delay=0.05)
+    latencies = []
+    queue = DurableForwardQueue(temp_store(), forwarder, max_rate=None,
+                                on_result=lambda p, r, latency: latencies.append(latency))
+    queue.start()
+
+    start = time.perf_counter()
+    for i in range(20):
+        queue.submit({"data": str(i)})
+    submit_us = (time.perf_counter() - start) / 20 * 1e6
+    print(f"  submit: {submit_us:.1f} us/message (server takes 50 ms)")
+    assert submit_us < 5000   # one SQLite insert, never a POST
+
+    await wait_for(lambda: queue.depth == 0)
+    assert forwarder.sent == [{"data": str(i)} for i in range(20)] and len(latencies) == 20
+    assert queue.stats()["avg_latency_ms"] >= 50
+    await queue.stop(timeout=1)
+
+
+async def run_batch_coalesces_burst():
+    forwarder = FlakyForwarder(delay=0.01)
+    queue = DurableForwardQueue(temp_store(), forwarder, batch_size=10, linger=0.2, max_rate=None)
+    for i in range(25):
+        queue.submit({"data": str(i)})
+    await wait_for(lambda: queue.depth == 0)
+
+    # 25 payloads -> 10 + 10 + 5 (the last one flushed by linger)
+    assert forwarder.batches == [10, 10, 5]
+    assert forwarder.sent == [{"data": str(i)} for i in range(25)]
+    assert queue.stats()["avg_batch"] == 8.3
+
+    # A lone reading is not held back longer than linger
+    queue.submit({"data": "25"})
+    await asyncio.sleep(0.4)
+    assert forwarder.batches[-1] == 1 and queue.depth == 0
+    await queue.stop(timeout=1)
+
+
+async def run_outage_then_recovery():
+    store = temp_store()
+    forwarder = FlakyForwarder()
+    forwarder.down = True
+    retries = []
+    queue = DurableForwardQueue(store, forwarder, base_delay=0.02, max_delay=0.1, max_rate=None,
+                                on_retry=lambda pending, result, delay: retries.append(delay))
+
+    for i in range(10):
+        queue.submit({"data": str(i)})
+    await wait_for(lambda: len(retries) >= 3)
+
+    # Nothing lost while the server is down, backoff grows
+    assert len(store) == 10 and forwarder.sent == []
+    # 1st delay in [10, 20] ms, 3rd in [40, 80] ms, never above max_delay
+    assert retries[2] > retries[0] and max(retries) <= 0.1
+    assert queue.stats()["retries"] >= 3
+
+    forwarder.down = False
+    await wait_for(lambda: len(store) == 0)
+    assert forwarder.sent == [{"data": str(i)} for i in range(10)]
+    assert queue.failures == 0 and queue.stats()["forwarded"] == 10
+    await queue.stop(timeout=1)
+
+
+async def run_backlog_survives_restart():
+    store = temp_store()
+    forwarder = FlakyForwarder()
+    forwarder.enabled = False
+    queue = DurableForwardQueue(store, forwarder)
+    for i in range(3):
+        queue.submit({"data": str(i)})
+    await queue.stop(timeout=0.1)
+    path = store.path
+    store.close()
+
+    # Next run: the backlog is picked up without any new submit
+    forwarder.enabled = True
+    queue = DurableForwardQueue(ForwardStore(path), forwarder, max_rate=None)
+    assert queue.depth == 3
+    queue.start()
+    await wait_for(lambda: queue.depth == 0)
+    assert [p["data"] for p in forwarder.sent] == ["0", "1", "2"]
+    await queue.stop(timeout=1)
+
+
+async def run_refused_payload_dropped():
+    store = temp_store()
+    forwarder = FlakyForwarder()
+    forwarder.status = 422
+    queue = DurableForwardQueue(store, forwarder, max_rate=None)
+    queue.submit({"data": "bad"})
+    await wait_for(lambda: queue.depth == 0)
+    # A 4xx refusal is final - it must not block the outbox forever
+    assert queue.stats()["dropped"] == 1 and queue.retries == 0
+    await queue.stop(timeout=1)
+
+
+async def run_recovery_rate_is_bounded():
+    store = temp_store()
+    store.put_many({"data": str(i)} for i in range(60))
+    forwarder = FlakyForwarder()
+    queue = DurableForwardQueue(store, forwarder, batch_size=10, max_rate=100)
+
+    start = time.perf_counter()
+    queue.start()
+    await wait_for(lambda: queue.depth == 0)
+    elapsed = time.perf_counter() - start
+
+    # 60 payloads at 100/s with a 100-payload burst allowance: no sleep needed yet,
+    # 300 would need >= 2 s
+    assert len(forwarder.sent) == 60 and elapsed < 1.0
+    store.put_many({"data": str(i)} for i in range(300))
+    queue.wakeup.set()
+    start = time.perf_counter()
+    await wait_for(lambda: queue.depth == 0)
+    assert time.perf_counter() - start >= 1.9
+    await queue.stop(timeout=1)
+
+
+async def run_drain_survives_store_errors():
+    store = temp_store()
+    forwarder = FlakyForwarder()
+    retries = []
+    queue = DurableForwardQueue(store, forwarder, base_delay=0.02, max_delay=0.1, max_rate=None,
+                                on_retry=lambda pending, result, delay: retries.append(result))
+
+    # One database error, then a row that is no longer valid JSON
+    peek = store.peek
+    failures = [sqlite3.OperationalError("disk I/O error")]
+
+    def flaky_peek(limit):
+        if failures:
+            raise failures.pop()
+        return peek(limit)
+
+    store.peek = flaky_peek
+    queue.submit({"data": "0"})
+    with store.conn:
+        store.conn.execute("INSERT INTO outbox (payload, queued) VALUES ('{broken', 0)")
+    store.count += 1
+    queue.submit({"data": "2"})
+
+    await wait_for(lambda: queue.depth == 0)
+    assert not queue.task.done()
+    assert forwarder.sent == [{"data": "0"}, {"data": "2"}]
+    assert retries == [None]
+    stats = queue.stats()
+    assert stats["errors"] == 1 and stats["dropped"] == 1 and stats["forwarded"] == 2
+    await queue.stop(timeout=1)
+
+
+async def run_outbox_file_only_when_needed():
+    path = os.path.join(tempfile.mkdtemp(), "outbox.db")
+
+    async def session(forwarder=None, readings=0):
+        scanner = BLEScanner(console=ConsoleRenderer(out=io.StringIO()), outbox_path=path)
+        if forwarder:
+            scanner.enable_forwarding(forwarder)
+            for i in range(readings):
+                scanner.forward_queue.submit({"data": str(i)})
+            await wait_for(lambda: forwarder.attempts)
+        await scanner.shutdown()
+        return scanner
+
+    # No forwarding: no outbox at all
+    assert (await session()).forward_queue is None and not os.path.exists(path)
+
+    # Server down: the readings stay on disk for the next run
+    forwarder = FlakyForwarder()
+    forwarder.down = True
+    scanner = await session(forwarder, readings=3)
+    with redirect_stdout(io.StringIO()) as out:
+        print_session_stats(scanner)
+    assert f"3 reading(s) kept in {path}" in out.getvalue()   # the scanner's own outbox, not outbox.db
+    store = ForwardStore(path)
+    assert len(store) == 3
+    store.close()
+
+    # Next run delivers the backlog and removes the empty outbox
+    forwarder.down = False
+    await session(forwarder)
+    assert forwarder.sent == [{"data": str(i)} for i in range(3)]
+    assert not any(os.path.exists(path + suffix) for suffix in ('', '-wal', '-shm'))
+
+
+def test_outage_then_recovery():
+    asyncio.run(run_outage_then_recovery())
+
+
+def test_backlog_survives_restart():
+    asyncio.run(run_backlog_survives_restart())
+
+
+def test_refused_payload_dropped():
+    asyncio.run(run_refused_payload_dropped())
+
+
+def test_recovery_rate_is_bounded():
+    asyncio.run(run_recovery_rate_is_bounded())
+
+
+def test_drain_survives_store_errors():
+    asyncio.run(run_drain_survives_store_errors())
+
+
+def test_submit_is_non_blocking():
+    asyncio.run(run_submit_is_non_blocking())
+
+
+def test_batch_coalesces_burst():
+    asyncio.run(run_batch_coalesces_burst())
+
+
+def test_batch_gzip_post():
+    with StubServer() as stub:
+        forwarder = HTTPForwarder(stub.url)
+        forwarder.compress = True
+        results = forwarder.send_batch([{"data": str(i)} for i in range(5)])
+        forwarder.close()
+
+    assert all(r["success"] for r in results) and len(results) == 5
+    assert stub.posts == 1 and len(stub.received) == 5
+    assert forwarder.success_count == 5 and forwarder.batch_count == 1
+
+
+def test_batch_falls_back_when_array_rejected():
+    class ObjectOnlyHandler(StubHandler):
+        accept_arrays = False
+
+    with StubServer(ObjectOnlyHandler) as stub:
+        forwarder = HTTPForwarder(stub.url)
+        first = forwarder.send_batch([{"data": "1"}, {"data": "2"}])
+        second = forwarder.send_batch([{"data": "3"}, {"data": "4"}])
+        forwarder.close()
+
+    assert all(r["success"] for r in first + second)
+    assert forwarder.batch_supported is False
+    assert stub.received == [{"data": str(i)} for i in range(1, 5)]
+    # Rejected array + 2 singles, then straight to singles
+    assert stub.posts == 4 and forwarder.error_count == 0
+
+
+def test_outbox_file_only_when_needed():
+    asyncio.run(run_outbox_file_only_when_needed())
+
+
+def test_shared_forwarder_counts_across_threads():
+    """Fleet sessions post through one HTTPForwarder from their own executor threads"""
+    with StubServer() as stub:
+        forwarder = HTTPForwarder(stub.url)
+
+        def session(index):
+            for i in range(25):
+                forwarder.send({"data": f"{index}-{i}"})
+
+        threads = [threading.Thread(target=session, args=(index,)) for index in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        forwarder.close()
+
+    assert forwarder.success_count == 200 and forwarder.error_count == 0 and len(stub.received) == 200
@@ -0,0 +1,87 @@
+"""
+Test GATT Writer
+================
+Payloads are split at the characteristic's write size, pipelined without
+response with periodic acknowledged writes, written with response only when
+that is all the characteristic supports, and never retried in another mode
+"""
+
+import sys
+import os
+import asyncio
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from GattWriter import GattWriter, SYNC_EVERY
+
+
+class FakeClient:
+    def __init__(self, fail_at=None):
+        self.writes = []      # (data, response)
+        self.fail_at = fail_at
+
+    async def write_gatt_char(self, characteristic, data, response=False):
+        if self.fail_at is not None and len(self.writes) == self.fail_at:
+            raise OSError("write failed")
+        self.writes.append((bytes(data), response))
+
+
+def uart_rx(properties=("write", "write-without-response"), size=20):
+    return SimpleNamespace(uuid="6e400002-b5a3-f393-e0a9-e50e24dcca9e", properties=list(properties),
+                           max_write_without_response_size=size)
+
+
+def test_short_command_is_one_unacknowledged_write():
+    client = FakeClient()
+    writer = GattWriter(client, uart_rx(size=244))
+    assert asyncio.run(writer.write(b"NB_SHOW\r\n")) == 1
+    assert client.writes == [(b"NB_SHOW\r\n", False)]
+
+
+def test_long_payload_chunked_and_pipelined():
+    client = FakeClient()
+    writer = GattWriter(client, uart_rx(size=20))
+    payload = bytes(range(256)) * 2     # 512 bytes -> 26 chunks
+    assert asyncio.run(writer.write(payload)) == 26
+
+    assert b"".join(data for data, _ in client.writes) == payload
+    assert all(len(data) <= 20 for data, _ in client.writes)
+    acknowledged = [i for i, (_, response) in enumerate(client.writes, 1) if response]
+    assert acknowledged == [SYNC_EVERY, 2 * SYNC_EVERY, 3 * SYNC_EVERY, 26]
+
+    stats = writer.stats()
+    assert stats["mode"] == "pipelined" and stats["chunks"] == 26 and stats["acknowledged"] == 4
+    assert stats["bytes"] == 512
+
+
+def test_write_modes_from_properties():
+    only_with = FakeClient()
+    asyncio.run(GattWriter(only_with, uart_rx(properties=["write"], size=20)).write(b"x" * 50))
+    assert [response for _, response in only_with.writes] == [True, True, True]
+
+    only_without = FakeClient()
+    asyncio.run(GattWriter(only_without, uart_rx(properties=["write-without-response"], size=20)).write(b"x" * 50))
+    assert [response for _, response in only_without.writes] == [False, False, False]
+
+    try:
+        GattWriter(FakeClient(), uart_rx(properties=["read", "notify"]))
+        assert False, "expected ValueError"
+    except ValueError as e:
+        assert "not writable" in str(e)
+
+
+def test_mtu_update_and_no_retry():
+    client = FakeClient()
+    characteristic = uart_rx(size=20)
+    writer = GattWriter(client, characteristic)
+    characteristic.max_write_without_response_size = 244   # MTU exchange finished later
+    assert asyncio.run(writer.write(b"x" * 300)) == 2
+
+    failing = FakeClient(fail_at=0)
+    try:
+        asyncio.run(GattWriter(failing, uart_rx()).write(b"SET_IP=10.0.0.1\r\n"))
+        assert False, "expected OSError"
+    except OSError:
+        pass
+    assert failing.writes == []   # nothing written a second time with response
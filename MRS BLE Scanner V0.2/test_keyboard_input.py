@@ -0,0 +1,167 @@
+"""
+Test Keyboard Input
+===================
+KeyReader on a pipe (keys, line editing, CR LF, EOF, waiting without
+polling) and on a pseudo-terminal (cbreak while reading, restored after);
+the Windows reader thread runs against a fake msvcrt and must exit after
+stop() without handing on another key
+"""
+
+import sys
+import os
+import io
+import asyncio
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import KeyboardInput
+from KeyboardInput import KeyReader, CTRL_P, ENTER, EOF
+
+
+def pipe_reader():
+    read_fd, write_fd = os.pipe()
+    out = io.StringIO()
+    return KeyReader(stream=open(read_fd, 'rb', buffering=0), out=out), write_fd, out
+
+
+def test_keys_and_lines():
+    async def scenario():
+        keys, write_fd, out = pipe_reader()
+        keys.start()
+        os.write(write_fd, b'\x10ab\x7fc\r\nsecond\n')
+        assert await keys.read_key() == CTRL_P
+        assert await keys.read_line("> ") == "ac"
+        # The LF of CR LF does not end an empty line
+        assert await keys.read_line() == "second"
+        assert out.getvalue() == "> ab\b \bc\nsecond\n"
+
+        os.close(write_fd)
+        assert await keys.read_key() == EOF
+        assert await keys.read_key() == EOF
+        keys.stop()
+
+    asyncio.run(scenario())
+
+
+def test_line_at_eof():
+    async def scenario():
+        keys, write_fd, _ = pipe_reader()
+        keys.start()
+        os.write(write_fd, 'wert ü'.encode('utf-8'))
+        os.close(write_fd)
+        assert await keys.read_line() == "wert ü"
+        try:
+            await keys.read_line()
+        except EOFError:
+            pass
+        else:
+            raise AssertionError("EOFError expected")
+        keys.stop()
+
+    asyncio.run(scenario())
+
+
+def test_wakes_on_key_not_timer():
+    async def scenario():
+        keys, write_fd, _ = pipe_reader()
+        keys.start()
+        loop = asyncio.get_running_loop()
+        loop.call_later(0.05, os.write, write_fd, b'xyz\r')
+
+        start = time.perf_counter()
+        assert await asyncio.wait_for(keys.wait_for(ENTER), timeout=2) == '\r'
+        assert time.perf_counter() - start < 0.5
+
+        # Nothing pressed: the timeout wins and the reader is still usable
+        try:
+            await asyncio.wait_for(keys.wait_for(ENTER), timeout=0.05)
+        except asyncio.TimeoutError:
+            pass
+        os.write(write_fd, b'q')
+        assert await keys.read_key() == 'q'
+        os.close(write_fd)
+        keys.stop()
+
+    asyncio.run(scenario())
+
+
+def test_terminal_mode_restored():
+    import pty
+    import termios
+
+    async def scenario(tty_stream):
+        keys = KeyReader(stream=tty_stream, out=io.StringIO())
+        keys.start()
+        mode = termios.tcgetattr(tty_stream.fileno())
+        assert not mode[3] & termios.ICANON and not mode[3] & termios.ECHO
+        assert mode[3] & termios.ISIG  # Ctrl+C still interrupts
+        keys.stop()
+
+    master, slave = pty.openpty()
+    tty_stream = open(slave, 'rb', buffering=0)
+    before = termios.tcgetattr(slave)
+    asyncio.run(scenario(tty_stream))
+    assert termios.tcgetattr(slave) == before
+    tty_stream.close()
+    os.close(master)
+
+
+class FakeMsvcrt:
+    """Console keys for the Windows reader thread: kbhit() / getwch() over a list"""
+
+    def __init__(self):
+        self.keys = []
+        self.lock = threading.Lock()
+
+    def press(self, text):
+        with self.lock:
+            self.keys.extend(text)
+
+    def kbhit(self):
+        with self.lock:
+            return bool(self.keys)
+
+    def getwch(self):
+        while True:
+            with self.lock:
+                if self.keys:
+                    return self.keys.pop(0)
+            time.sleep(0.001)
+
+
+def test_windows_reader_exits_after_stop():
+    import pty
+
+    async def scenario(tty_stream, console):
+        keys = KeyReader(stream=tty_stream, out=io.StringIO())
+        keys.loop = asyncio.get_running_loop()
+        keys.queue = asyncio.Queue()
+        keys.fd = tty_stream.fileno()
+        keys.thread = threading.Thread(target=keys._windows_reader, daemon=True)
+        keys.thread.start()
+
+        console.press("a\x00Hb\r")   # the arrow key's two codes are skipped
+        assert await asyncio.wait_for(keys.read_line(), 2) == "ab"
+        keys.stop()
+        keys.thread.join(1)
+        assert not keys.thread.is_alive()   # not stuck in getwch()
+        console.press("z")
+        await asyncio.sleep(0.1)
+
+    console = FakeMsvcrt()
+    saved = getattr(KeyboardInput, 'msvcrt', None)
+    KeyboardInput.msvcrt = console
+    master, slave = pty.openpty()
+    tty_stream = open(slave, 'rb', buffering=0)
+    try:
+        asyncio.run(scenario(tty_stream, console))
+    finally:
+        if saved is None:
+            del KeyboardInput.msvcrt
+        else:
+            KeyboardInput.msvcrt = saved
+        tty_stream.close()
+        os.close(master)
+    assert console.keys == ["z"]   # left for whoever reads the console next
@@ -0,0 +1,97 @@
+"""
+Test Line Framer
+================
+Fragments split anywhere (including inside CR LF) come back as the original
+lines, partial lines are flushed after a quiet period, and a modem trace cut
+at a 20-byte MTU gives the same diagnosis as the whole trace
+"""
+
+import sys
+import os
+import asyncio
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from LineFramer import LineFramer
+from NetworkDiagnostics import NetworkDiagnostics
+
+PACKET = "06" + "0123456789" * 4 + "35146952"
+TRACE = ["try to send 06 packet", "SIM Ready", "AT+CEREG?", "+CEREG: 2,1", "OK", "+NETOPEN: 0",
+         "+CIPOPEN: 1,0", "AT+CIPSEND=1,26", PACKET, "+CIPSEND: 1,26,26", "+CIPRXGET: 1 ACK", "AT+CIPCLOSE"]
+
+
+def fragments(data, sizes):
+    offset = 0
+    for size in sizes:
+        if offset >= len(data):
+            break
+        yield data[offset:offset + size]
+        offset += size
+    if offset < len(data):
+        yield data[offset:]
+
+
+def test_every_split_point():
+    data = "\r\n".join(TRACE).encode() + b"\r\n"
+    for cut in range(1, len(data)):
+        lines = []
+        framer = LineFramer(lines.append)
+        framer.feed(data[:cut])
+        framer.feed(data[cut:])
+        assert [line.decode() for line in lines] == TRACE, cut
+        assert framer.pending == 0
+
+
+def test_random_fragments_and_delimiters():
+    rng = random.Random(7)
+    text = "".join(line + rng.choice(["\r\n", "\n", "\r", "\r\n\r\n"]) for line in TRACE * 20).encode()
+    lines = []
+    framer = LineFramer(lines.append)
+    for chunk in fragments(text, (rng.randint(1, 20) for _ in range(len(text)))):
+        framer.feed(chunk)
+    assert [line.decode() for line in lines] == TRACE * 20
+    stats = framer.stats()
+    assert stats["lines"] == len(TRACE) * 20 and stats["flushed"] == 0 and stats["fragments"] > stats["lines"]
+
+
+def test_partial_line_flushed_after_quiet_period():
+    async def scenario():
+        lines = []
+        framer = LineFramer(lines.append, flush_after=0.05)
+        framer.feed(b"AT+CIPSEND=1,26\r\n> ")
+        assert lines == [b"AT+CIPSEND=1,26"] and framer.pending == 2
+        # Data still trickling in keeps the line open
+        for part in (b"06012", b"34567"):
+            await asyncio.sleep(0.03)
+            framer.feed(part)
+        assert len(lines) == 1
+        await asyncio.sleep(0.1)
+        assert lines == [b"AT+CIPSEND=1,26", b"> 0601234567"] and framer.flushed == 1
+
+        # Explicit flush (disconnect) and the runaway-line cap
+        framer.feed(b"partial")
+        assert framer.flush() and lines[-1] == b"partial" and not framer.flush()
+        capped = []
+        framer = LineFramer(capped.append, max_line=32)
+        framer.feed(b"x" * 40)
+        assert capped == [b"x" * 40] and framer.pending == 0
+
+    asyncio.run(scenario())
+
+
+def test_fragmented_trace_diagnosis():
+    def diagnose(notifications):
+        diagnostics = NetworkDiagnostics()
+        framer = LineFramer(lambda line: diagnostics.add_log("12:00:00.000", line.decode()))
+        for notification in notifications:
+            framer.feed(notification)
+        framer.flush()
+        return diagnostics.analyze_logs("351469520162464")
+
+    data = "\r\n".join(TRACE).encode() + b"\r\n"
+    whole = diagnose([line.encode() + b"\r\n" for line in TRACE])
+    split = diagnose(fragments(data, [20] * len(data)))
+    assert whole.overall_status == split.overall_status == "HEALTHY"
+    assert split.packet_sent == PACKET and split.packet_bytes == 26 and split.ack_received
+    assert split.raw_logs == whole.raw_logs
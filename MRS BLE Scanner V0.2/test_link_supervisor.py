@@ -0,0 +1,101 @@
+"""
+Test Link Supervisor
+====================
+Reconnect loop: immediate first attempt, jittered exponential backoff
+between failures, one loop per outage, downtime/setup measurement, and
+no reconnects after stop()
+"""
+
+import sys
+import os
+import asyncio
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from LinkSupervisor import LinkSupervisor, LOST, RETRY, RECONNECTED
+
+
+class FlakyLink:
+    """resume() fails `failures` times, then succeeds after `setup` seconds"""
+
+    def __init__(self, failures=0, setup=0.0):
+        self.failures = failures
+        self.setup = setup
+        self.calls = 0
+
+    async def resume(self):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise OSError("Device not found")
+        await asyncio.sleep(self.setup)
+
+
+def test_backoff_delay_bounds():
+    supervisor = LinkSupervisor(None, base_delay=1.0, max_delay=60.0)
+    for failures, cap in [(1, 1.0), (2, 2.0), (3, 4.0), (7, 60.0), (500, 60.0)]:
+        for _ in range(200):
+            delay = supervisor.backoff_delay(failures)
+            assert cap / 2 <= delay <= cap, (failures, delay)
+
+
+def test_reconnects_after_failures():
+    async def scenario():
+        link = FlakyLink(failures=3, setup=0.02)
+        events = []
+        supervisor = LinkSupervisor(link.resume, on_event=lambda *args: events.append(args),
+                                    base_delay=0.01, max_delay=0.02)
+        supervisor.link_lost()
+        supervisor.link_lost()  # second callback for the same outage
+        assert supervisor.reconnecting and supervisor.drops == 1
+
+        await supervisor.task
+        assert not supervisor.reconnecting and link.calls == 4
+
+        assert events[0] == (LOST, 1)
+        retries = [event for event in events if event[0] == RETRY]
+        assert [event[1] for event in retries] == [1, 2, 3]
+        assert all(str(event[3]) == "Device not found" for event in retries)
+        assert 0.005 <= retries[0][2] <= 0.01 and all(event[2] <= 0.02 for event in retries)
+
+        event, attempts, downtime, setup = events[-1]
+        assert event == RECONNECTED and attempts == 4
+        assert 0.02 <= setup < downtime
+        stats = supervisor.stats()
+        assert stats["reconnects"] == 1 and stats["attempts"] == 4
+        assert stats["last_downtime_s"] == round(downtime, 2)
+
+    asyncio.run(scenario())
+
+
+def test_first_attempt_is_immediate():
+    async def scenario():
+        link = FlakyLink()
+        supervisor = LinkSupervisor(link.resume, base_delay=10)
+        supervisor.link_lost()
+        await asyncio.wait_for(supervisor.task, timeout=1)
+        assert supervisor.last_downtime < 0.5
+
+        # A later drop starts a new loop
+        supervisor.link_lost()
+        await asyncio.wait_for(supervisor.task, timeout=1)
+        assert supervisor.stats()["drops"] == 2 and supervisor.reconnects == 2
+
+    asyncio.run(scenario())
+
+
+def test_stop_cancels_and_ignores_drops():
+    async def scenario():
+        link = FlakyLink(failures=1000)
+        supervisor = LinkSupervisor(link.resume, base_delay=0.01, max_delay=0.01)
+        supervisor.link_lost()
+        await asyncio.sleep(0.05)
+        assert supervisor.reconnecting
+
+        await supervisor.stop()
+        assert not supervisor.reconnecting
+        calls = link.calls
+        supervisor.link_lost()  # our own disconnect fires the callback too
+        await asyncio.sleep(0.03)
+        assert not supervisor.reconnecting and link.calls == calls and supervisor.drops == 1
+
+    asyncio.run(scenario())
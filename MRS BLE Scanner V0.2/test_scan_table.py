@@ -0,0 +1,83 @@
+"""
+Test Scan Table
+===============
+Advertisement filter (name prefix / service UUID), smoothed RSSI ranking,
+early stop on expected count or a sensor within range, and the
+time-to-first-device stat
+"""
+
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from ScanTable import AdvertFilter, ScanTable, MIN_ADVERTS_FOR_STOP
+
+SENSOR = "N_01E1_N6BR1"
+UART_SERVICE = "6E400001-B5A3-F393-E0A9-E50E24DCCA9E"
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_advert_filter():
+    sensors = AdvertFilter(name_prefixes=[SENSOR])
+    assert sensors.matches("N_01E1_N6BR1_123456")
+    assert not sensors.matches("Galaxy Buds") and not sensors.matches(None)
+    assert sensors.scanner_uuids is None
+
+    by_service = AdvertFilter(service_uuids=[UART_SERVICE])
+    assert by_service.matches(None, [UART_SERVICE.lower()])
+    assert not by_service.matches("N_01E1_N6BR1_123456", [])
+    assert by_service.scanner_uuids == [UART_SERVICE.lower()]
+
+    everything = AdvertFilter()
+    assert everything.accepts_all and everything.matches(None)
+
+
+def test_filtering_smoothing_and_ranking():
+    clock = FakeClock()
+    table = ScanTable(AdvertFilter(name_prefixes=[SENSOR]), clock=clock)
+
+    assert table.update("11:22:33:44:55:66", "phone", "Phone", -40) is None
+    clock.now += 0.7
+    table.update("AA:00:00:00:00:01", "s1", f"{SENSOR}_000001", -80)
+    clock.now += 0.3
+    table.update("AA:00:00:00:00:02", "s2", f"{SENSOR}_000002", -70)
+
+    # One strong packet moves the smoothed value only part of the way
+    entry = table.update("aa:00:00:00:00:01", "s1-new", None, -40)
+    assert entry.adverts == 2 and entry.last_rssi == -40 and entry.device == "s1-new"
+    assert entry.name == f"{SENSOR}_000001"
+    assert abs(entry.rssi - (-80 + 0.3 * 40)) < 1e-9
+    assert [e.address for e in table.ranked()] == ["AA:00:00:00:00:01", "AA:00:00:00:00:02"]
+
+    stats = table.stats()
+    assert stats["devices"] == 2 and stats["adverts"] == 4 and stats["filtered"] == 1
+    assert stats["first_match_s"] == 0.7 and stats["stop_reason"] is None
+
+
+def test_stop_when_expected_found():
+    table = ScanTable(AdvertFilter(name_prefixes=[SENSOR]), expected=2)
+    table.update("AA:00:00:00:00:01", None, f"{SENSOR}_000001", -80)
+    table.update("11:22:33:44:55:66", None, "Phone", -40)
+    assert table.stop_reason is None
+    table.update("AA:00:00:00:00:02", None, f"{SENSOR}_000002", -90)
+    assert "2 of 2" in table.stop_reason
+
+
+def test_stop_when_sensor_within_range():
+    table = ScanTable(AdvertFilter(name_prefixes=[SENSOR]), stop_rssi=-50)
+    table.update("AA:00:00:00:00:01", None, f"{SENSOR}_000001", -30)
+    assert table.stop_reason is None  # a single strong packet is not enough
+    for _ in range(20):
+        table.update("AA:00:00:00:00:01", None, f"{SENSOR}_000001", -45)
+        if table.stop_reason:
+            break
+    assert table.entries["AA:00:00:00:00:01"].adverts >= MIN_ADVERTS_FOR_STOP
+    assert f"{SENSOR}_000001 within range" in table.stop_reason
@@ -0,0 +1,142 @@
+"""
+Test Sensor Parser
+==================
+Fuzz-style check that the single-pass tokenizer produces the same NHR
+payload as the previous six-regex parser on random sensor lines, plus the
+cases where the old loose patterns were wrong and the new parser is not,
+and the format registry (prefix dispatch, per-device parser cache)
+"""
+
+import sys
+import os
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from SensorParser import (WastebinDataParser, tokenize, timestamp, default_registry,
+                          parse_ultrasonic, parse_distance, parse_wastebin,
+                          WastebinReading, UltrasonicReading, DistanceReading)
+from bench_sensor_parser import legacy_parse_sensor_string, random_line
+
+IMEI = "351469520520687"
+
+
+def parse(line):
+    payload = WastebinDataParser.parse_sensor_string(line, IMEI)
+    payload.pop("time")
+    return payload
+
+
+def legacy(line):
+    payload = legacy_parse_sensor_string(line, IMEI)
+    payload.pop("time")
+    return payload
+
+
+def test_fuzz_matches_legacy_parser():
+    rng = random.Random(2026)
+    parser = WastebinDataParser()
+    for _ in range(20000):
+        line = random_line(rng)
+        # Same fields, same values, same key order in the JSON body
+        expected = list(legacy(line).items())
+        assert list(parse(line).items()) == expected, line
+
+        # The registry path gives the same payload for these lines
+        payload = parser.parse(line, IMEI)
+        payload.pop("time")
+        assert list(payload.items()) == expected, line
+
+
+def test_documented_formats():
+    assert parse("temp:24.25 ,fill:76 ,batt:3.2") == {
+        "cmd": "RP", "device": IMEI, "battery": "3.2", "dIndex": "0410",
+        "data": "76", "temperature": "24.25"
+    }
+    payload = parse("temp:24.25 ,x:0.29 ,y:-88.43 ,z=-0.01")
+    assert payload["data"] == "15" and payload["tilt_y"] == "-88.43"
+    assert payload["tilt_x"] == "0.29"
+    # The docstring's z=... form was never matched by the old parser
+    assert payload["tilt_z"] == "-0.01" and "tilt_z" not in legacy("z=-0.01")
+
+
+def test_keys_inside_words_ignored():
+    # Old patterns found y in "battery", x in "max", z in "freeze"
+    line = "battery:3.6 ,max:12 ,freeze:1"
+    assert legacy(line)["tilt_y"] == "3.6" and legacy(line)["tilt_x"] == "12"
+    assert tokenize(line) == {}
+    assert parse(line)["data"] == "0"
+
+
+def test_value_kinds():
+    assert tokenize("fill:76.5 temp:-3 batt:3.6-") == {"fill": "76", "batt": "3.6"}
+    assert tokenize("FILL 40 Temp:  21.5 x:-0.5") == {"fill": "40", "temp": "21.5", "x": "-0.5"}
+    assert tokenize("y:abc y:-10") == {"y": "-10"}
+
+
+def test_bad_tilt_value_keeps_other_fields():
+    payload = parse("y:- ,x:1.5 ,temp:20")
+    assert "tilt_y" not in payload and payload["tilt_x"] == "1.5"
+    assert payload["temperature"] == "20"
+
+
+def test_ultrasonic_format():
+    reading = parse_ultrasonic("s1:2 cm(3%) ,s2:2 cm(3%) => [lv1] , cnt:0/10 min")
+    assert reading == UltrasonicReading(s1_cm=2.0, s2_cm=2.0, s1_percent=3, s2_percent=3, level=1, events=0)
+
+    payload = reading.to_payload(IMEI)
+    assert payload["data"] == "3" and payload["distance_s1"] == "2" and payload["level"] == "1"
+    assert parse_ultrasonic("s1:120") == UltrasonicReading(s1_cm=120.0)
+    assert parse_ultrasonic("temp:24") is None
+
+
+def test_distance_format():
+    assert parse_distance("distance: s1 20 mm ,s2 25 mm") == DistanceReading(s1_cm=2.0, s2_cm=2.5)
+    assert parse_distance("distance: 2 cm ,3 cm") == DistanceReading(s1_cm=2.0, s2_cm=3.0)
+    assert parse_distance("s1:2 cm(3%)") is None
+    assert parse_distance("distance: n/a") is None
+
+
+def test_prefix_dispatch():
+    registry = default_registry()
+    assert registry.lookup("s1:2 cm(3%) ,s2:2 cm(3%)") is parse_ultrasonic
+    assert registry.lookup("  Distance: 2 cm ,2 cm") is parse_distance
+    assert registry.lookup("angle : x=89 ,y=0 ,z=0") is parse_wastebin
+    assert registry.lookup("x=1") is parse_wastebin
+    # Prefix must end at a word boundary
+    assert registry.lookup("temperature:24") is None
+    assert registry.lookup("s12:4") is None
+    assert registry.lookup("xyz") is None
+
+    reading = registry.parse("angle : x=89 ,y=0 ,z=0")
+    assert reading == WastebinReading(tilt_x="89", tilt_y="0", tilt_z="0")
+    # Unknown first token: the key:value scan still runs
+    assert registry.parse("rssi:-71 ,temp:20").temperature == "20"
+    assert registry.parse("Open -> Open") is None
+
+
+def test_device_parser_cache():
+    registry = default_registry()
+    line = "s1:2 cm(3%) ,s2:2 cm(3%) => [lv1] , cnt:0/10 min"
+    registry.parse(line, "dev-a")
+    assert registry.device_parsers["dev-a"] is parse_ultrasonic and registry.sniffs == 1
+
+    for _ in range(10):
+        assert registry.parse(line, "dev-a").kind == "ultrasonic"
+    assert registry.sniffs == 1 and registry.cache_hits == 10
+
+    # A different format from the same device is sniffed and becomes the cached one
+    assert registry.parse("distance: 2 cm ,2 cm", "dev-a").kind == "distance"
+    assert registry.device_parsers["dev-a"] is parse_distance and registry.sniffs == 2
+
+    registry.forget("dev-a")
+    assert "dev-a" not in registry.device_parsers
+
+
+def test_parse_unknown_line_gives_default_payload():
+    payload = WastebinDataParser().parse("AT+CFUN=0", IMEI)
+    assert payload["data"] == "0" and payload["device"] == IMEI
+
+
+def test_timestamp_format():
+    assert len(timestamp()) == 19 and timestamp()[4] == "-" and timestamp()[13] == ":"
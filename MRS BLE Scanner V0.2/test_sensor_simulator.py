@@ -0,0 +1,243 @@
+"""
+Test Sensor Simulator
+=====================
+Simulated sensors advertise as dustbin sensors with the Nordic UART service,
+answer commands in MTU-sized notifications, give each injected TEST_PACKET
+fault its diagnosis and drop the link on SYS_RESET; the scaled clock runs
+sleeps and timeouts faster than real time
+"""
+
+import sys
+import os
+import re
+import asyncio
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from SensorSimulator import (SimulatorConfig, BleakClient, BleakScanner, BleakError, ScaledTimePolicy, configure,
+                             simulation, install, run, UART_SERVICE_UUID, UART_RX_CHAR_UUID, UART_TX_CHAR_UUID,
+                             OK, NO_ACK)
+from LineFramer import LineFramer
+from NetworkDiagnostics import NetworkDiagnostics
+
+
+class Session:
+    """Client connected to a simulated sensor, collecting the lines it sends"""
+
+    def __init__(self, address, **kwargs):
+        self.client = BleakClient(address, **kwargs)
+        self.lines = []
+        self.notifications = []
+        self.framer = None
+
+    async def connect(self):
+        self.framer = LineFramer(lambda line: self.lines.append(line.decode()))
+        await self.client.connect()
+        await self.client.start_notify(UART_TX_CHAR_UUID, self.on_notification)
+        return self
+
+    def on_notification(self, sender, data):
+        assert sender.uuid == UART_TX_CHAR_UUID
+        self.notifications.append(bytes(data))
+        self.framer.feed(data)
+
+    async def send(self, command, wait=2.0):
+        data = (command + "\r\n").encode()
+        size = self.client.services.get_characteristic(UART_RX_CHAR_UUID).max_write_without_response_size
+        for offset in range(0, len(data), size):
+            await self.client.write_gatt_char(UART_RX_CHAR_UUID, data[offset:offset + size], response=False)
+        await asyncio.sleep(wait)
+
+    async def until(self, marker, timeout=120):
+        """Wait for a line containing marker"""
+        async def seen():
+            while not any(marker in line for line in self.lines):
+                await asyncio.sleep(0.5)
+        await asyncio.wait_for(seen(), timeout)
+
+
+def test_spec_parsing():
+    config = SimulatorConfig.parse("")
+    assert (config.sensors, config.faults, config.speed, config.mtu) == (1, (OK,), 1.0, 247)
+    assert SimulatorConfig.parse("1") == config
+
+    config = SimulatorConfig.parse(" sensors=3, faults=ok/NO-ACK ,speed=20,mtu=23,seed=7,readings=0")
+    assert (config.sensors, config.faults, config.speed, config.mtu, config.seed, config.readings) == \
+        (3, (OK, NO_ACK), 20.0, 23, 7, 0.0)
+    assert [config.fault_for(index) for index in range(3)] == [OK, NO_ACK, OK]
+
+    for spec in ("sensors=0", "faults=broken", "faults=", "speed=0", "mtu=600", "colour=red", "sensors", "seed=x"):
+        try:
+            SimulatorConfig.parse(spec)
+            assert False, f"expected ValueError for {spec}"
+        except ValueError:
+            pass
+
+
+def test_adverts_and_gatt():
+    configure("sensors=3,others=2,seed=1,mtu=23")
+
+    async def scenario():
+        found = await BleakScanner.discover(timeout=2.0, return_adv=True)
+        assert len(found) == 5
+        sensors = [(device, adv) for device, adv in found.values() if device.name and "N6BR1" in device.name]
+        assert len(sensors) == 3
+        for device, advertisement in sensors:
+            assert re.fullmatch(r"N_01E1_N6BR1_\d{6}", device.name) and advertisement.local_name == device.name
+            assert advertisement.service_uuids == [UART_SERVICE_UUID] and -100 <= advertisement.rssi <= -30
+            assert simulation().device(device.address).imei == "351469520" + device.name[-6:]
+
+        only_uart = await BleakScanner.discover(timeout=2.0, service_uuids=[UART_SERVICE_UUID])
+        assert sorted(device.address for device in only_uart) == sorted(device.address for device, _ in sensors)
+
+        device = await BleakScanner.find_device_by_filter(lambda d, adv: "N6BR1" in (adv.local_name or ""), timeout=5)
+        session = await Session(device).connect()
+        rx = session.client.services.get_characteristic(UART_RX_CHAR_UUID)
+        assert "write-without-response" in rx.properties and rx.max_write_without_response_size == 20
+        assert "notify" in session.client.services.get_characteristic(UART_TX_CHAR_UUID).properties
+
+        # A connected sensor stops advertising - a second central cannot have it
+        assert await BleakScanner.find_device_by_address(device.address, timeout=2) is None
+        try:
+            await BleakClient(device.address, timeout=1.0).connect()
+            assert False, "expected BleakError"
+        except BleakError:
+            pass
+        other = next(device for device, _ in found.values() if "N6BR1" not in (device.name or ""))
+        try:
+            await BleakClient(other).connect()
+            assert False, "expected BleakError"
+        except BleakError:
+            pass
+        await session.client.disconnect()
+        assert not session.client.is_connected
+
+    run(scenario(), speed=100)
+
+
+def test_commands():
+    configure("mtu=23,readings=0")
+    sensor = simulation().sensors[0]
+
+    async def scenario():
+        session = await Session(sensor.address).connect()
+        await session.send("NB_SHOW")
+        assert session.lines == ["CMD_UART_LOG_MODE ENABLE.", "Server: 47.245.56.17:8080", "APN: m2mxnbiot",
+                                 "Status: Connected"]
+
+        session.lines.clear()
+        await session.send("SET_IP=203.0.113.10")
+        await session.send("SET_IP=999.1.1.1")
+        await session.send("ATI")
+        await session.send("AT+NOSUCH")
+        await session.send("HELLO")   # unknown custom command: no answer
+        assert session.lines == ["Server: 203.0.113.10:8080", "OK", "ERROR",
+                                 "ATI", "Manufacturer: NHR", "Model: M06", "Revision: V1.0.01",
+                                 f"IMEI: {sensor.imei}", "AT+NOSUCH", "ERROR"]
+
+        # ATT MTU 23: at most 20 bytes per notification, longer lines arrive in pieces
+        assert max(len(data) for data in session.notifications) == 20
+        assert len(session.notifications) > len(session.lines) + 5
+
+        command = b"SET_PORT=5000\r\n" + b" " * 10
+        try:
+            await session.client.write_gatt_char(UART_RX_CHAR_UUID, command, response=False)
+            assert False, "expected BleakError"
+        except BleakError:
+            pass
+        session.lines.clear()
+        await session.client.write_gatt_char(UART_RX_CHAR_UUID, command, response=True)
+        await asyncio.sleep(2)
+        assert session.lines == ["Server: 203.0.113.10:5000", "OK"]
+        await session.client.disconnect()
+
+    run(scenario(), speed=100)
+
+
+def test_test_packet_faults():
+    """Each fault's trace, reassembled from notifications, gets the diagnosis it stands for"""
+    configure("sensors=4,faults=ok/cereg-loop/cipsend-fail/no-ack,readings=0")
+    expected = [("HEALTHY", None), ("FAILED", "Layer 2: Registration"),
+                ("FAILED", "Layer 4: Data Transmission"), ("PARTIAL", "Layer 4: Server Response")]
+
+    async def diagnose(sensor):
+        session = await Session(sensor.address).connect()
+        if sensor.index == 0:
+            # Without log mode only the sensor's own line is forwarded, not the modem trace
+            await session.send("TEST_PACKET", wait=60)
+            assert session.lines == ["try to send 06 packet"]
+            session.lines.clear()
+        await session.send("NB_SHOW", wait=0.5)
+        await session.send("TEST_PACKET", wait=0)
+        await session.until("AT+CFUN=0")
+        await session.client.disconnect()
+        diagnostics = NetworkDiagnostics()
+        for line in session.lines:
+            diagnostics.add_log("12:00:00.000", line)
+        return diagnostics.analyze_logs(sensor.imei)
+
+    async def scenario():
+        return await asyncio.gather(*(diagnose(sensor) for sensor in simulation().sensors))
+
+    started = time.perf_counter()
+    results = run(scenario(), speed=200)
+    assert time.perf_counter() - started < 10   # over a minute of simulated sensor time
+    assert [(result.overall_status, result.failure_layer) for result in results] == expected
+    healthy = results[0]
+    assert healthy.imei == simulation().sensors[0].imei and re.fullmatch(r"06\d{48}", healthy.packet_sent)
+    assert (healthy.server_ip, healthy.server_port) == ("47.245.56.17", "8080")
+    assert healthy.rsrp is not None and healthy.snr is not None
+    assert results[1].cereg_code == "2,2"
+
+
+def test_sys_reset():
+    configure("readings=0")
+    sensor = simulation().sensors[0]
+    dropped = []
+
+    async def scenario():
+        session = await Session(sensor.address, disconnected_callback=dropped.append).connect()
+        await session.send("NB_SHOW")
+        await session.send("SYS_RESET", wait=0.5)
+        assert dropped == [session.client] and not session.client.is_connected
+        try:
+            await BleakClient(sensor.address, timeout=1.0).connect()   # still rebooting
+            assert False, "expected BleakError"
+        except BleakError:
+            pass
+        session = await Session(sensor.address, timeout=10.0).connect()
+        assert not sensor.log_mode   # NB_SHOW needed again after a reset
+        await session.client.disconnect()
+
+    run(scenario(), speed=100)
+
+
+def test_scaled_clock_and_install():
+    async def scenario():
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        await asyncio.sleep(20)
+        try:
+            await asyncio.wait_for(asyncio.Event().wait(), timeout=10)
+        except asyncio.TimeoutError:
+            pass
+        return loop.time() - started
+
+    started = time.perf_counter()
+    simulated = run(scenario(), speed=200)
+    assert simulated >= 30 and time.perf_counter() - started < 2
+
+    saved_bleak, policy = sys.modules.get("bleak"), asyncio.get_event_loop_policy()
+    try:
+        config = install("sensors=2,speed=50")
+        import bleak
+        assert bleak.BleakClient is BleakClient and bleak.BleakScanner is BleakScanner
+        assert isinstance(asyncio.get_event_loop_policy(), ScaledTimePolicy) and config.sensors == 2
+        assert len(simulation().sensors) == 2
+    finally:
+        if saved_bleak is None:
+            sys.modules.pop("bleak", None)
+        else:
+            sys.modules["bleak"] = saved_bleak
+        asyncio.set_event_loop_policy(policy)
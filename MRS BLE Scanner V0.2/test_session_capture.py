@@ -0,0 +1,156 @@
+"""
+Test Session Capture
+====================
+Records come back from the file with their kind, characteristic, payload
+and microsecond timing; an interrupted capture reads up to its last complete
+record; playback keeps the recorded pacing (scaled by speed); a replayed
+fragmented TEST_PACKET trace gives the diagnosis of the live session
+"""
+
+import sys
+import os
+import asyncio
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from SessionCapture import CaptureWriter, CaptureReader, play, RX, TX, LINK
+from LineFramer import LineFramer
+from NetworkDiagnostics import NetworkDiagnostics
+
+UART_TX = "6e400003-b5a3-f393-e0a9-e50e24dcca9e"
+UART_RX = "6e400002-b5a3-f393-e0a9-e50e24dcca9e"
+PACKET = "06" + "0123456789" * 4 + "35146952"
+TRACE = ["try to send 06 packet", "SIM Ready", "AT+CEREG?", "+CEREG: 2,1", "OK", "+NETOPEN: 0",
+         "+CIPOPEN: 1,0", "AT+CIPSEND=1,26", PACKET, "+CIPSEND: 1,26,26", "+CIPRXGET: 1 ACK", "AT+CIPCLOSE"]
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def capture_path(name):
+    return os.path.join(tempfile.mkdtemp(), name)
+
+
+def test_round_trip():
+    clock = FakeClock()
+    path = capture_path("session.cap")
+    writer = CaptureWriter(path, {"name": "N_01E1_N6BR1_162464", "imei": "351469520162464"}, clock=clock)
+    writer.link("connected", imei="351469520162464")
+    clock.now += 0.5
+    writer.tx(UART_RX, b"TEST_PACKET\r\n")
+    clock.now += 0.0123
+    writer.rx(UART_TX, b"try to send 06")
+    clock.now += 0.000001
+    writer.rx("00002a19-0000-1000-8000-00805f9b34fb", b"\x64")
+    clock.now += 3 * 3600            # longer than one record's time delta can hold
+    writer.rx(UART_TX, b" packet\r\n")
+    writer.close()
+    writer.rx(UART_TX, b"after close")   # ignored
+
+    reader = CaptureReader(path)
+    assert reader.meta["imei"] == "351469520162464" and "started" in reader.meta
+    records = list(reader)
+    assert [(r.kind, r.channel, r.data) for r in records] == [
+        (LINK, None, b'{"event": "connected", "imei": "351469520162464"}'),
+        (TX, UART_RX, b"TEST_PACKET\r\n"),
+        (RX, UART_TX, b"try to send 06"),
+        (RX, "00002a19-0000-1000-8000-00805f9b34fb", b"\x64"),
+        (RX, UART_TX, b" packet\r\n"),
+    ]
+    assert [round(r.time, 6) for r in records] == [0.0, 0.5, 0.5123, 0.512301, 10800.512301]
+    assert records[0].details == {"event": "connected", "imei": "351469520162464"}
+    assert not reader.truncated
+
+    # 8 bytes per record plus the payload; each characteristic is named once
+    stats = writer.stats()
+    assert stats["records"] == 8 and stats["channels"] == 3 and stats["closed"]
+    assert stats["bytes"] == os.path.getsize(path)
+
+
+def test_interrupted_and_invalid_files():
+    path = capture_path("cut.cap")
+    writer = CaptureWriter(path, clock=FakeClock())
+    for line in TRACE:
+        writer.rx(UART_TX, line.encode() + b"\r\n")
+    writer.close()
+    with open(path, "rb") as f:
+        data = f.read()
+    with open(path, "wb") as f:
+        f.write(data[:-5])           # killed halfway through the last record
+    reader = CaptureReader(path)
+    assert [r.data.decode().strip() for r in reader] == TRACE[:-1] and reader.truncated
+
+    with open(path, "wb") as f:
+        f.write(b"timestamp,data\n")
+    try:
+        CaptureReader(path)
+        assert False, "expected ValueError"
+    except ValueError as e:
+        assert "not a capture file" in str(e)
+
+
+def test_playback_pacing():
+    clock = FakeClock()
+    path = capture_path("paced.cap")
+    writer = CaptureWriter(path, clock=clock)
+    for delay in (0, 1.0, 0.5, 2.0):
+        clock.now += delay
+        writer.rx(UART_TX, b"x\r\n")
+    writer.close()
+
+    def paced(speed):
+        sleeps = []
+
+        async def sleep(seconds):
+            sleeps.append(round(seconds, 6))
+            clock.now += seconds
+
+        async def scenario():
+            return [record.time async for record in play(CaptureReader(path), speed, clock=clock, sleep=sleep)]
+
+        return asyncio.run(scenario()), sleeps
+
+    times, sleeps = paced(1)
+    assert times == [0.0, 1.0, 1.5, 3.5] and sleeps == [0, 1.0, 0.5, 2.0]
+    assert paced(2)[1] == [0, 0.5, 0.25, 1.0]
+    assert paced(0)[1] == [0, 0, 0, 0]   # as fast as possible, one loop pass per record
+
+
+def test_replayed_trace_diagnosis():
+    """A 20-byte fragmented session, captured and played back, is diagnosed as it was live"""
+    data = "\r\n".join(TRACE).encode() + b"\r\n"
+    notifications = [data[i:i + 20] for i in range(0, len(data), 20)]
+
+    def diagnose(feed):
+        diagnostics = NetworkDiagnostics()
+        framer = LineFramer(lambda line: diagnostics.add_log("12:00:00.000", line.decode()))
+        feed(framer)
+        framer.flush()
+        return diagnostics.analyze_logs("351469520162464")
+
+    clock = FakeClock()
+    path = capture_path("trace.cap")
+    writer = CaptureWriter(path, clock=clock)
+
+    def receive(framer):
+        for notification in notifications:
+            writer.rx(UART_TX, notification)
+            framer.feed(notification)
+            clock.now += 0.01
+
+    live = diagnose(receive)
+    writer.close()
+
+    async def replay(framer):
+        async for record in play(CaptureReader(path), speed=0):
+            framer.feed(record.data)
+
+    replayed = diagnose(lambda framer: asyncio.run(replay(framer)))
+    assert live.overall_status == replayed.overall_status == "HEALTHY"
+    assert replayed.packet_sent == PACKET and replayed.raw_logs == live.raw_logs
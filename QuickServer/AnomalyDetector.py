@@ -0,0 +1,284 @@
+"""
+STREAMING ANOMALY DETECTOR
+==========================
+Flags abnormal readings as packets arrive:
+  - fill level jumps (not explained by a collection)
+  - sudden battery voltage drops
+  - temperature spikes
+  - tilt changes that suggest a knocked-over bin
+
+Per-device state is a handful of running statistics (EWMA mean/variance
+and P-square quantile sketches) - no reading history is kept.
+"""
+
+import math
+import threading
+from collections import deque
+from typing import Dict, List, Optional
+
+
+class EwmaStats:
+    """Exponentially weighted running mean / variance"""
+
+    __slots__ = ('alpha', 'count', 'mean', 'var')
+
+    def __init__(self, alpha: float = 0.1):
+        self.alpha = alpha
+        self.count = 0
+        self.mean = 0.0
+        self.var = 0.0
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.var)
+
+    def zscore(self, value: float) -> float:
+        if self.count < 2:
+            return 0.0
+        return (value - self.mean) / max(self.std, 1e-9)
+
+    def update(self, value: float):
+        self.count += 1
+        if self.count == 1:
+            self.mean = value
+            return
+        diff = value - self.mean
+        increment = self.alpha * diff
+        self.mean += increment
+        self.var = (1 - self.alpha) * (self.var + diff * increment)
+
+
+class P2Quantile:
+    """P-square streaming quantile estimator (Jain & Chlamtac) - 5 markers"""
+
+    __slots__ = ('p', 'heights', 'positions', 'desired', 'increments')
+
+    def __init__(self, p: float = 0.95):
+        self.p = p
+        self.heights: List[float] = []
+        self.positions = [1, 2, 3, 4, 5]
+        self.desired = [1, 1 + 2 * p, 1 + 4 * p, 3 + 2 * p, 5]
+        self.increments = [0, p / 2, p, (1 + p) / 2, 1]
+
+    @property
+    def count(self) -> int:
+        return self.positions[4] if len(self.heights) == 5 else len(self.heights)
+
+    def value(self) -> Optional[float]:
+        if not self.heights:
+            return None
+        if len(self.heights) < 5:
+            ordered = sorted(self.heights)
+            return ordered[min(len(ordered) - 1, int(self.p * len(ordered)))]
+        return self.heights[2]
+
+    def update(self, x: float):
+        heights = self.heights
+        if len(heights) < 5:
+            heights.append(x)
+            if len(heights) == 5:
+                heights.sort()
+            return
+
+        # Find the cell x falls in and adjust the extreme markers
+        if x < heights[0]:
+            heights[0] = x
+            k = 0
+        elif x >= heights[4]:
+            heights[4] = x
+            k = 3
+        else:
+            k = 0
+            while x >= heights[k + 1]:
+                k += 1
+
+        for i in range(k + 1, 5):
+            self.positions[i] += 1
+        for i in range(5):
+            self.desired[i] += self.increments[i]
+
+        # Move the middle markers toward their desired positions
+        for i in range(1, 4):
+            d = self.desired[i] - self.positions[i]
+            if (d >= 1 and self.positions[i + 1] - self.positions[i] > 1) or \
+               (d <= -1 and self.positions[i - 1] - self.positions[i] < -1):
+                step = 1 if d > 0 else -1
+                height = self._parabolic(i, step)
+                if not heights[i - 1] < height < heights[i + 1]:
+                    height = self._linear(i, step)
+                heights[i] = height
+                self.positions[i] += step
+
+    def _parabolic(self, i: int, d: int) -> float:
+        q, n = self.heights, self.positions
+        return q[i] + d / (n[i + 1] - n[i - 1]) * (
+            (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i]) +
+            (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+        )
+
+    def _linear(self, i: int, d: int) -> float:
+        q, n = self.heights, self.positions
+        return q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+
+
+class DeviceStats:
+    """Constant-size running state for one device"""
+
+    __slots__ = ('fill', 'fill_jump', 'battery', 'temperature', 'tilt', 'active')
+
+    def __init__(self, alpha: float):
+        self.fill: Optional[float] = None
+        self.fill_jump = P2Quantile(0.95)  # typical |change| between reports
+        self.battery = EwmaStats(alpha)
+        self.temperature = EwmaStats(alpha)
+        self.tilt = {axis: EwmaStats(alpha) for axis in ('angle_x', 'angle_y', 'angle_z')}
+        self.active = set()  # alert types raised and not yet recovered (one alert per episode)
+
+
+class AnomalyDetector:
+    """Online detector stage for decoded sensor values"""
+
+    def __init__(self, alpha: float = 0.1, warmup: int = 5, max_alerts: int = 200):
+        self.alpha = alpha
+        self.warmup = warmup  # readings before statistical checks kick in
+
+        # Thresholds
+        self.fill_jump_min = 30.0  # % - never flag smaller jumps
+        self.fill_jump_factor = 3.0  # x typical (p95) jump
+        self.fill_empty_level = 15.0  # % - drops to below this are collections
+        self.battery_drop_min = 0.15  # V
+        self.battery_zscore = 4.0
+        self.temperature_spike_min = 10.0  # C above running mean
+        self.temperature_zscore = 4.0
+        self.temperature_max = 60.0  # C - always flagged (fire)
+        self.tilt_max_change = 45.0  # degrees from the learned resting angle
+
+        self.devices: Dict[str, DeviceStats] = {}
+        self.alerts = deque(maxlen=max_alerts)
+        self.alert_count = 0
+        self.lock = threading.Lock()
+
+    def update(self, device: str, parsed: dict, timestamp: str) -> List[dict]:
+        """Feed one decoded packet and return any alerts it raised"""
+        if not parsed:
+            return []
+
+        alerts = []
+        with self.lock:
+            stats = self.devices.get(device)
+            if stats is None:
+                stats = self.devices[device] = DeviceStats(self.alpha)
+
+            fill = self._number(parsed, 'fill_level')
+            if fill is not None:
+                self._check_fill(stats, fill, alerts)
+
+            battery = self._number(parsed, 'battery')
+            if battery is not None:
+                self._check_battery(stats, battery, alerts)
+
+            temperature = self._number(parsed, 'temperature')
+            if temperature is not None:
+                self._check_temperature(stats, temperature, alerts)
+
+            self._check_tilt(stats, parsed, alerts)
+
+            for alert in alerts:
+                alert['device'] = device
+                alert['timestamp'] = timestamp
+                self.alerts.append(alert)
+            self.alert_count += len(alerts)
+
+        return alerts
+
+    def recent_alerts(self, limit: int = 50) -> List[dict]:
+        """Most recent alerts, newest first"""
+        with self.lock:
+            return list(self.alerts)[-limit:][::-1]
+
+    def _check_fill(self, stats: DeviceStats, fill: float, alerts: list):
+        if stats.fill is not None:
+            change = fill - stats.fill
+            typical = stats.fill_jump.value()
+            threshold = self.fill_jump_min
+            if typical is not None and stats.fill_jump.count >= self.warmup:
+                threshold = max(threshold, self.fill_jump_factor * typical)
+
+            collected = change < 0 and fill <= self.fill_empty_level
+            if abs(change) > threshold and not collected:
+                alerts.append(self._alert(
+                    'fill_jump', 'warning', fill,
+                    f"Fill level {'jumped' if change > 0 else 'dropped'} {stats.fill:.0f}% -> {fill:.0f}%"
+                ))
+            elif not collected:
+                stats.fill_jump.update(abs(change))
+        stats.fill = fill
+
+    def _check_battery(self, stats: DeviceStats, battery: float, alerts: list):
+        ewma = stats.battery
+        if ewma.count >= self.warmup:
+            drop = ewma.mean - battery
+            if drop > self.battery_drop_min and -ewma.zscore(battery) > self.battery_zscore:
+                if 'battery_drop' not in stats.active:
+                    stats.active.add('battery_drop')
+                    alerts.append(self._alert(
+                        'battery_drop', 'warning', battery,
+                        f"Battery dropped {drop:.2f}V below its average ({ewma.mean:.2f}V)"
+                    ))
+            elif drop <= self.battery_drop_min:
+                # Voltage back up, or the average has settled on the new level
+                stats.active.discard('battery_drop')
+        ewma.update(battery)
+
+    def _check_temperature(self, stats: DeviceStats, temperature: float, alerts: list):
+        ewma = stats.temperature
+        if temperature >= self.temperature_max:
+            if 'fire' not in stats.active:
+                stats.active.add('fire')
+                alerts.append(self._alert(
+                    'temperature_spike', 'critical', temperature,
+                    f"Temperature {temperature:.1f}C - possible fire"
+                ))
+        else:
+            stats.active.discard('fire')  # cooled down: the next fire reading is a new episode
+            if ewma.count >= self.warmup:
+                rise = temperature - ewma.mean
+                if rise > self.temperature_spike_min and ewma.zscore(temperature) > self.temperature_zscore:
+                    alerts.append(self._alert(
+                        'temperature_spike', 'warning', temperature,
+                        f"Temperature spiked {rise:.1f}C above its average ({ewma.mean:.1f}C)"
+                    ))
+        ewma.update(temperature)
+
+    def _check_tilt(self, stats: DeviceStats, parsed: dict, alerts: list):
+        changes = {}
+        for axis, ewma in stats.tilt.items():
+            angle = self._number(parsed, axis)
+            if angle is None:
+                continue
+            if ewma.count >= self.warmup:
+                changes[axis] = abs(angle - ewma.mean)
+            if not changes.get(axis, 0) > self.tilt_max_change:
+                ewma.update(angle)
+
+        if changes:
+            axis, change = max(changes.items(), key=lambda item: item[1])
+            if change <= self.tilt_max_change:
+                stats.active.discard('knocked_over')  # upright again
+            elif 'knocked_over' not in stats.active:
+                # The resting angle is kept, so a bin left lying down alerts once
+                stats.active.add('knocked_over')
+                alerts.append(self._alert(
+                    'knocked_over', 'critical', self._number(parsed, axis),
+                    f"Tilt changed {change:.0f} degrees on {axis[-1].upper()} axis - bin may be knocked over"
+                ))
+
+    def _alert(self, kind: str, severity: str, value: float, message: str) -> dict:
+        return {'type': kind, 'severity': severity, 'value': value, 'message': message}
+
+    @staticmethod
+    def _number(parsed: dict, key: str) -> Optional[float]:
+        try:
+            return float(parsed[key])
+        except (KeyError, TypeError, ValueError):
+            return None
@@ -0,0 +1,228 @@
+"""
+SENSOR LOG IMPORTER
+===================
+Bulk-loads sensor_data_log.txt files (the format written by
+SensorDataServer.log_packet) into the QuickServer database.
+
+Large files are split on ==== record boundaries, parsed in a process
+pool and inserted one chunk per transaction. Progress is committed with
+each chunk, so an interrupted import resumes where it stopped.
+
+Usage:
+    python ImportLogs.py sensor_data_log.txt [more_logs.txt ...]
+    python ImportLogs.py logs/*.txt --db sensor_data.db --workers 8
+    python ImportLogs.py --rekey --db sensor_data.db
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from TestServer import Colors, SensorDataServer, EXPORT_FIELDS
+from SensorStore import SensorStore
+
+
+RECORD_START = b'\n' + b'=' * 80 + b'\n['
+RECORD_SPLIT_RE = re.compile(r'^={80}\n(?=\[)', re.MULTILINE)
+HEADER_RE = re.compile(r'\[(\d{4}-\d\d-\d\d \d\d:\d\d:\d\d)\] Packet #\d+')
+INT_RE = re.compile(r'-?\d+')
+FLOAT_RE = re.compile(r'-?\d+\.\d+')
+# Fields parse_sensor_data stores as numbers - everything else is kept as logged
+NUMERIC_FIELDS = set(EXPORT_FIELDS) | {'packet_length'}
+
+
+def parse_value(key: str, text: str):
+    """Undo the str() formatting of a parsed value in the log"""
+    if text == 'None':
+        return None
+    if key in NUMERIC_FIELDS:
+        if INT_RE.fullmatch(text):
+            return int(text)
+        if FLOAT_RE.fullmatch(text):
+            return float(text)
+    return text  # strings such as IMEIs or "0410" keep their leading zeros
+
+
+def device_for(source: str, hex_data: str) -> str:
+    """Device key of a stored or logged packet, the same as the live server gives it"""
+    return SensorDataServer.device_key(tuple(source.rsplit(':', 1)), hex_data)
+
+
+def parse_record(record: str):
+    """Parse one log record into a store row, or None if malformed"""
+    lines = record.split('\n')
+    header = HEADER_RE.match(lines[0])
+    if not header:
+        return None
+
+    source = hex_data = None
+    parsed = {}
+    in_parsed = False
+    for line in lines[1:]:
+        if in_parsed:
+            if line.startswith('  ') and ': ' in line:
+                key, value = line[2:].split(': ', 1)
+                parsed[key] = parse_value(key, value)
+            elif line:
+                in_parsed = False
+        elif line.startswith('Source: ') and source is None:
+            source = line[8:]
+        elif line.startswith('Hex: ') and hex_data is None:
+            hex_data = line[5:]
+        elif line == 'Parsed:':
+            in_parsed = True
+
+    if source is None or hex_data is None:
+        return None
+
+    return (device_for(source, hex_data), header.group(1), source, hex_data, json.dumps(parsed) if parsed else None)
+
+
+def parse_chunk(path: str, start: int, end: int) -> list:
+    """Worker: parse the records in file bytes [start, end)"""
+    with open(path, 'rb') as f:
+        f.seek(start)
+        text = f.read(end - start).decode('utf-8', errors='replace')
+
+    rows = []
+    for record in RECORD_SPLIT_RE.split(text):
+        row = parse_record(record)
+        if row:
+            rows.append(row)
+    return rows
+
+
+def find_record_start(f, position: int, size: int) -> int:
+    """Offset of the first record boundary at or after position (size if none)"""
+    f.seek(max(position - 1, 0))  # include the preceding newline
+    base = f.tell()
+    window = b''
+    keep = len(RECORD_START) - 1
+    while True:
+        block = f.read(64 * 1024)
+        if not block:
+            return size
+        window += block
+        found = window.find(RECORD_START)
+        if found >= 0:
+            return base + found + 1
+        base += len(window) - keep
+        window = window[-keep:]
+
+
+def chunk_offsets(path: str, start: int, size: int, chunk_size: int) -> list:
+    """Byte offsets of chunk starts (each on a record boundary), ending with size"""
+    offsets = [start]
+    with open(path, 'rb') as f:
+        while True:
+            boundary = find_record_start(f, offsets[-1] + chunk_size, size)
+            if boundary >= size:
+                break
+            offsets.append(boundary)
+    offsets.append(size)
+    return offsets
+
+
+def import_file(store: SensorStore, path: Path, workers: int, chunk_size: int, progress=None) -> int:
+    """Import one log file, resuming a previous partial import"""
+    key = str(path.resolve())
+    size = path.stat().st_size
+
+    start = records = 0
+    previous = store.import_progress(key)
+    if previous and previous['offset'] <= size:
+        start, records = previous['offset'], previous['records']
+        if start == size:
+            print(f"{Colors.CYAN}[SKIP] {path} already imported ({records:,} records){Colors.RESET}")
+            return 0
+        if start:
+            print(f"{Colors.YELLOW}[RESUME] {path} from byte {start:,} ({records:,} records done){Colors.RESET}")
+
+    offsets = chunk_offsets(str(path), start, size, chunk_size)
+    chunks = deque(zip(offsets, offsets[1:]))
+    imported = 0
+    began = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # Keep a bounded window of chunks in flight so parsed rows never pile up
+        pending = deque()
+        while chunks and len(pending) < workers * 2:
+            chunk = chunks.popleft()
+            pending.append((chunk, pool.submit(parse_chunk, str(path), *chunk)))
+
+        try:
+            while pending:
+                (chunk_start, chunk_end), future = pending.popleft()
+                rows = future.result()
+                records += len(rows)
+                imported += len(rows)
+                store.insert_many(rows, import_state=(key, size, chunk_end, records))
+
+                if chunks:
+                    chunk = chunks.popleft()
+                    pending.append((chunk, pool.submit(parse_chunk, str(path), *chunk)))
+
+                elapsed = time.perf_counter() - began
+                rate = imported / elapsed if elapsed else 0
+                print(f"\r  {path.name}: {chunk_end * 100 // max(size, 1):3d}%  "
+                      f"{records:,} records  {Colors.GREEN}{rate:,.0f} rec/s{Colors.RESET}   ", end='', flush=True)
+                if progress:
+                    progress(chunk_end, records)
+        except BaseException:
+            for _, future in pending:
+                future.cancel()
+            print()
+            raise
+
+    print()
+    return imported
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Import sensor_data_log.txt files into the QuickServer database')
+    parser.add_argument('logs', nargs='*', type=Path, help='log files to import')
+    parser.add_argument('--db', default='sensor_data.db', help='database file (default: sensor_data.db)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 2, help='parser processes')
+    parser.add_argument('--chunk-mb', type=float, default=8, help='chunk size in MB (default: 8)')
+    parser.add_argument('--rekey', action='store_true',
+                        help='recompute the device of every stored packet (after a device id change)')
+    args = parser.parse_args()
+    if not args.logs and not args.rekey:
+        parser.error('give log files to import and/or --rekey')
+
+    store = SensorStore(args.db)
+    chunk_size = max(1, int(args.chunk_mb * 1024 * 1024))
+
+    print(f"{Colors.CYAN}[IMPORT]{Colors.RESET} {len(args.logs)} file(s) -> {Colors.YELLOW}{args.db}{Colors.RESET}"
+          f" ({args.workers} workers, {args.chunk_mb:g} MB chunks)\n")
+
+    total = 0
+    began = time.perf_counter()
+    try:
+        for path in args.logs:
+            if not path.is_file():
+                print(f"{Colors.RED}[ERROR] Not found: {path}{Colors.RESET}")
+                continue
+            total += import_file(store, path, args.workers, chunk_size)
+    except KeyboardInterrupt:
+        print(f"\n{Colors.YELLOW}[INTERRUPTED] Progress saved - run the same command again to resume{Colors.RESET}")
+        sys.exit(1)
+
+    if args.rekey:
+        print(f"{Colors.CYAN}[REKEY]{Colors.RESET} {store.rekey(device_for):,} packet(s) moved to their device id")
+
+    elapsed = time.perf_counter() - began
+    print(f"\n{Colors.GREEN}[DONE] {total:,} records in {elapsed:.1f}s "
+          f"({total / elapsed if elapsed else 0:,.0f} rec/s){Colors.RESET}")
+    print(f"  Database now holds {store.count():,} packets")
+
+
+if __name__ == "__main__":
+    os.system('')  # Enable ANSI colors on Windows
+    main()
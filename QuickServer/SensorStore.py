@@ -0,0 +1,152 @@
+"""
+SENSOR DATA STORE
+=================
+Persistent SQLite store for received packets.
+Shared by the live UDP server, the dashboard API and ImportLogs.py.
+"""
+
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Callable, Iterable, Optional
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS packets (
+    id INTEGER PRIMARY KEY,
+    device TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    source TEXT,
+    hex TEXT,
+    parsed TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_packets_device_time ON packets (device, timestamp);
+CREATE INDEX IF NOT EXISTS idx_packets_time ON packets (timestamp);
+
+CREATE TABLE IF NOT EXISTS imports (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    offset INTEGER NOT NULL,
+    records INTEGER NOT NULL,
+    updated TEXT NOT NULL
+);
+"""
+
+
+class SensorStore:
+    """SQLite packet store (one connection per thread, opened on first use)"""
+
+    def __init__(self, path='sensor_data.db'):
+        self.path = Path(path)
+        self.local = threading.local()
+
+    def connection(self) -> sqlite3.Connection:
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.path), timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.executescript(SCHEMA)
+            self.local.conn = conn
+        return conn
+
+    def close(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self.local.conn = None
+
+    def insert(self, device: str, timestamp: str, source: str, hex_data: str, parsed: Optional[dict]):
+        """Store one live packet"""
+        conn = self.connection()
+        with conn:
+            conn.execute(
+                'INSERT INTO packets (device, timestamp, source, hex, parsed) VALUES (?, ?, ?, ?, ?)',
+                (device, timestamp, source, hex_data, json.dumps(parsed) if parsed else None)
+            )
+
+    def insert_many(self, rows: Iterable[tuple], import_state: tuple = None) -> int:
+        """
+        Bulk insert (device, timestamp, source, hex, parsed_json) rows in one transaction
+        import_state = (path, size, offset, records) is committed atomically with the rows
+        """
+        conn = self.connection()
+        with conn:
+            cursor = conn.executemany(
+                'INSERT INTO packets (device, timestamp, source, hex, parsed) VALUES (?, ?, ?, ?, ?)',
+                rows
+            )
+            if import_state:
+                conn.execute(
+                    "INSERT OR REPLACE INTO imports (path, size, offset, records, updated) "
+                    "VALUES (?, ?, ?, ?, datetime('now', 'localtime'))",
+                    import_state
+                )
+        return cursor.rowcount
+
+    def import_progress(self, path: str) -> Optional[dict]:
+        """Where a previous import of path stopped"""
+        row = self.connection().execute(
+            'SELECT size, offset, records, updated FROM imports WHERE path = ?', (path,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {'size': row[0], 'offset': row[1], 'records': row[2], 'updated': row[3]}
+
+    def iter_packets(self, device: str = None, start: str = None, end: str = None, batch_size: int = 500):
+        """
+        Yield batches of (timestamp, device, source, hex, parsed_json) rows
+        in time order, without loading the whole range into memory
+        """
+        conditions, args = [], []
+        if device:
+            conditions.append('device = ?')
+            args.append(device)
+        if start:
+            conditions.append('timestamp >= ?')
+            args.append(start)
+        if end:
+            conditions.append('timestamp <= ?')
+            args.append(end)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+
+        cursor = self.connection().execute(
+            f'SELECT timestamp, device, source, hex, parsed FROM packets {where} ORDER BY timestamp, id',
+            args
+        )
+        try:
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield rows
+        finally:
+            cursor.close()
+
+    def rekey(self, device_key: Callable[[str, str], str], batch_size: int = 1000) -> int:
+        """Recompute every row's device from (source, hex) - returns the number of rows changed"""
+        conn = self.connection()
+        changed = last_id = 0
+        while True:
+            rows = conn.execute(
+                'SELECT id, device, source, hex FROM packets WHERE id > ? ORDER BY id LIMIT ?', (last_id, batch_size)
+            ).fetchall()
+            if not rows:
+                return changed
+            last_id = rows[-1][0]
+            updates = []
+            for row_id, old, source, hex_data in rows:
+                device = device_key(source or '', hex_data or '')
+                if device != old:
+                    updates.append((device, row_id))
+            with conn:
+                conn.executemany('UPDATE packets SET device = ? WHERE id = ?', updates)
+            changed += len(updates)
+
+    def count(self, device: str = None) -> int:
+        if device:
+            query, args = 'SELECT COUNT(*) FROM packets WHERE device = ?', (device,)
+        else:
+            query, args = 'SELECT COUNT(*) FROM packets', ()
+        return self.connection().execute(query, args).fetchone()[0]
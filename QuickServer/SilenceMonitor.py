@@ -0,0 +1,194 @@
+"""
+SILENT DEVICE MONITOR
+=====================
+Learns each device's report interval and raises a "missing" event
+when a device has skipped N expected reports.
+
+Deadlines live in a hierarchical timing wheel, so a packet costs one
+dict delete + one dict insert no matter how many devices are tracked.
+"""
+
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+
+class TimingWheel:
+    """Hierarchical timing wheel (O(1) schedule / cancel per timer)"""
+
+    def __init__(self, tick: float = 1.0, slots: int = 64, levels: int = 4, start: float = None):
+        self.tick = tick
+        self.slots = slots
+        self.levels = levels
+        self.spans = [slots ** level for level in range(levels + 1)]
+        self.wheels = [[{} for _ in range(slots)] for _ in range(levels)]
+        self.timers: Dict[str, tuple] = {}  # key -> (level, slot)
+        self.current_tick = int((time.time() if start is None else start) / tick)
+
+    def __len__(self):
+        return len(self.timers)
+
+    def schedule(self, key: str, deadline: float):
+        """(Re)schedule key to expire at deadline (seconds since epoch)"""
+        self.cancel(key)
+        deadline_tick = max(int(-(-deadline // self.tick)), self.current_tick + 1)
+        self._place(key, deadline_tick)
+
+    def cancel(self, key: str):
+        """Remove key from the wheel if scheduled"""
+        location = self.timers.pop(key, None)
+        if location:
+            del self.wheels[location[0]][location[1]][key]
+
+    def _place(self, key: str, deadline_tick: int):
+        delta = deadline_tick - self.current_tick
+        level = 0
+        while level < self.levels - 1 and delta >= self.spans[level + 1]:
+            level += 1
+
+        # Beyond the top wheel's range: park it in the furthest slot,
+        # it gets re-placed with its real deadline when that slot cascades
+        target_tick = min(deadline_tick, self.current_tick + self.spans[self.levels] - 1)
+        slot = (target_tick // self.spans[level]) % self.slots
+
+        self.wheels[level][slot][key] = deadline_tick
+        self.timers[key] = (level, slot)
+
+    def advance(self, now: float = None) -> List[str]:
+        """Move the wheel forward to now and return the expired keys"""
+        target_tick = int((time.time() if now is None else now) / self.tick)
+        expired = []
+
+        while self.current_tick < target_tick:
+            self.current_tick += 1
+
+            # Cascade higher levels top-down when their period rolls over
+            for level in range(self.levels - 1, 0, -1):
+                if self.current_tick % self.spans[level]:
+                    continue
+                slot = (self.current_tick // self.spans[level]) % self.slots
+                bucket = self.wheels[level][slot]
+                if bucket:
+                    self.wheels[level][slot] = {}
+                    for key, deadline_tick in bucket.items():
+                        del self.timers[key]
+                        self._place(key, deadline_tick)
+
+            slot = self.current_tick % self.slots
+            bucket = self.wheels[0][slot]
+            if bucket:
+                self.wheels[0][slot] = {}
+                for key, deadline_tick in bucket.items():
+                    del self.timers[key]
+                    if deadline_tick <= self.current_tick:
+                        expired.append(key)
+                    else:
+                        self._place(key, deadline_tick)
+
+        return expired
+
+
+@dataclass
+class DeviceSchedule:
+    """Per-device reporting state"""
+    first_seen: float
+    last_seen: float
+    last_report: float  # start of the latest report burst
+    interval: Optional[float] = None  # learned report interval (seconds)
+    packets: int = 1
+    missing_since: Optional[float] = None
+
+
+class SilenceMonitor:
+    """Tracks expected report times and detects devices that went silent"""
+
+    def __init__(self, missed_intervals: int = 3, default_interval: float = 3600.0,
+                 min_interval: float = 10.0, alpha: float = 0.2, tick: float = 1.0):
+        self.missed_intervals = missed_intervals
+        self.default_interval = default_interval  # used until a device has reported twice
+        self.min_interval = min_interval  # shorter gaps are bursts/retries, not a new report
+        self.alpha = alpha
+        self.devices: Dict[str, DeviceSchedule] = {}
+        self.missing: Dict[str, DeviceSchedule] = {}
+        self.wheel = TimingWheel(tick=tick)
+        self.lock = threading.Lock()
+
+    def observe(self, device: str, now: float = None) -> Optional[dict]:
+        """
+        Record a report from device and schedule its next deadline
+        Returns a "recovered" event if the device was missing
+        """
+        now = time.time() if now is None else now
+        event = None
+
+        with self.lock:
+            schedule = self.devices.get(device)
+            if schedule is None:
+                schedule = DeviceSchedule(first_seen=now, last_seen=now, last_report=now)
+                self.devices[device] = schedule
+            else:
+                gap = now - schedule.last_report
+                if schedule.missing_since is not None:
+                    # Outage gap says nothing about the normal interval
+                    event = self._event('recovered', device, schedule, now)
+                    schedule.missing_since = None
+                    schedule.last_report = now
+                    del self.missing[device]
+                elif gap >= self.min_interval:
+                    if schedule.interval is None:
+                        schedule.interval = gap
+                    else:
+                        schedule.interval += self.alpha * (gap - schedule.interval)
+                    schedule.last_report = now
+                schedule.packets += 1
+                schedule.last_seen = now
+
+            self.wheel.schedule(device, now + self.missed_intervals * self._interval(schedule))
+
+        return event
+
+    def advance(self, now: float = None) -> List[dict]:
+        """Expire overdue deadlines and return "missing" events"""
+        now = time.time() if now is None else now
+        events = []
+
+        with self.lock:
+            for device in self.wheel.advance(now):
+                schedule = self.devices[device]
+                schedule.missing_since = now
+                self.missing[device] = schedule
+                events.append(self._event('missing', device, schedule, now))
+
+        return events
+
+    def missing_devices(self, now: float = None) -> List[dict]:
+        """Currently missing devices, longest silence first"""
+        now = time.time() if now is None else now
+        with self.lock:
+            devices = [self._event('missing', device, schedule, now)
+                       for device, schedule in self.missing.items()]
+        return sorted(devices, key=lambda d: d['silent_for'], reverse=True)
+
+    def forget(self, device: str):
+        """Stop tracking a device (e.g. decommissioned bin)"""
+        with self.lock:
+            self.wheel.cancel(device)
+            self.devices.pop(device, None)
+            self.missing.pop(device, None)
+
+    def _interval(self, schedule: DeviceSchedule) -> float:
+        return schedule.interval if schedule.interval is not None else self.default_interval
+
+    def _event(self, event: str, device: str, schedule: DeviceSchedule, now: float) -> dict:
+        interval = self._interval(schedule)
+        return {
+            'event': event,
+            'device': device,
+            'last_seen': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(schedule.last_seen)),
+            'silent_for': round(now - schedule.last_seen, 1),
+            'interval': round(interval, 1),
+            'missed_reports': int((now - schedule.last_seen) // interval),
+            'learned': schedule.interval is not None,
+            'packets': schedule.packets
+        }
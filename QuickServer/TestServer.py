@@ -7,10 +7,20 @@ Receives sensor data via UDP and serves web dashboard
 import socket
 import datetime
 import json
+import re
+import csv
+import io
+import zlib
 from pathlib import Path
 import threading
-from http.server import HTTPServer, SimpleHTTPRequestHandler
+import selectors
+import argparse
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
 import os
+from SilenceMonitor import SilenceMonitor
+from AnomalyDetector import AnomalyDetector
+from SensorStore import SensorStore
 
 class Colors:
     HEADER = '\033[95m'
@@ -34,31 +44,180 @@ class Colors:
     RESET = '\033[0m'
 
 
-# Global data storage
-sensor_data = {
-    'packets': [],
-    'latest': {},
-    'total_packets': 0
+# Text payload fields (temp:24.25 ,fill:76 ,batt:3.2 / x:0.29 ,y:-88.43 ,z=-0.01 / s1:120)
+SENSOR_FIELDS = {
+    'fill': 'fill_level',
+    'temp': 'temperature',
+    'batt': 'battery',
+    'x': 'angle_x',
+    'y': 'angle_y',
+    'z': 'angle_z',
+    's1': 'distance_s1',
+    's2': 'distance_s2',
+    'distance': 'distance_s1'
 }
+EXPORT_FIELDS = list(dict.fromkeys(SENSOR_FIELDS.values()))
+DASHBOARD_FILE = Path(__file__).resolve().parent / 'dashboard.html'
 
+# Binary reports (0x06): type byte, one header byte, then the IMEI as 15 BCD digits
+# e.g. 06 54 351469520520687 0 4100 6698...
+REPORT_TYPE = '06'
+IMEI_OFFSET = 4   # hex digits
+IMEI_DIGITS = 15
+SENSOR_FIELD_RE = re.compile(r'(?<![A-Za-z0-9_])([A-Za-z][A-Za-z0-9]*)\s*[:=]\s*(-?\d+(?:\.\d+)?)')
 
-class DashboardHandler(SimpleHTTPRequestHandler):
-    """HTTP handler for dashboard and API"""
+
+def export_time(value: str, end_of_day: bool) -> str:
+    """Normalise an export from/to value to 'YYYY-MM-DD HH:MM:SS' (None if blank)"""
+    value = value.strip().replace('T', ' ')
+    if not value:
+        return None
+    for fmt in ('%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M', '%Y-%m-%d'):
+        try:
+            parsed = datetime.datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+        if end_of_day:
+            # Inclusive upper bound for date / minute precision
+            if fmt == '%Y-%m-%d':
+                parsed = parsed.replace(hour=23, minute=59)
+            if fmt != '%Y-%m-%d %H:%M:%S':
+                parsed = parsed.replace(second=59)
+        return parsed.strftime('%Y-%m-%d %H:%M:%S')
+    raise ValueError(f"Invalid time '{value}' (use YYYY-MM-DD or YYYY-MM-DD HH:MM:SS)")
+
+
+class Tenant:
+    """One customer / council: its own ports, packet store, monitors and stats"""
+    
+    def __init__(self, name: str = 'default', udp_port: int = 8081, http_port: int = 5000,
+                 data_dir='.', missed_intervals: int = 3):
+        self.name = name
+        self.udp_port = udp_port
+        self.http_port = http_port
+        self.data_dir = Path(data_dir)
+        self.log_file = self.data_dir / 'sensor_data_log.txt'
+        self.started = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        self.bytes_received = 0
+        
+        # Recent packets / latest values for the dashboard
+        self.sensor_data = {
+            'packets': [],
+            'latest': {},
+            'total_packets': 0
+        }
+        
+        # Persistent packet store (also filled by ImportLogs.py)
+        self.store = SensorStore(self.data_dir / 'sensor_data.db')
+        
+        # Devices that stopped reporting (fires after N missed report intervals)
+        self.silence_monitor = SilenceMonitor(missed_intervals=missed_intervals)
+        
+        # Fill jumps, battery drops, temperature spikes, knocked-over bins
+        self.anomaly_detector = AnomalyDetector()
+    
+    def stats(self) -> dict:
+        """Per-tenant counters for /api/stats"""
+        return {
+            'tenant': self.name,
+            'udp_port': self.udp_port,
+            'http_port': self.http_port,
+            'started': self.started,
+            'packets': self.sensor_data['total_packets'],
+            'bytes': self.bytes_received,
+            'devices': len(self.silence_monitor.devices),
+            'missing': len(self.silence_monitor.missing),
+            'alerts': self.anomaly_detector.alert_count
+        }
+
+
+def load_tenants(config_path) -> tuple:
+    """
+    Read a tenants config file - returns (host, [Tenant, ...])
+    See tenants.example.json for the format
+    """
+    with open(config_path, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+    
+    tenants = []
+    ports = set()
+    for entry in config.get('tenants', []):
+        name = str(entry['name'])
+        if not re.fullmatch(r'[\w.-]+', name):
+            raise ValueError(f"Invalid tenant name '{name}' (letters, digits, - _ . only)")
+        # Convert first - "9000" and 9000 are the same port
+        udp_port, http_port = int(entry['udp_port']), int(entry['http_port'])
+        for port in (udp_port, http_port):
+            if port in ports:
+                raise ValueError(f"Port {port} is used twice (tenant '{name}')")
+            ports.add(port)
+        
+        data_dir = Path(entry.get('data_dir', Path('data') / name))
+        data_dir.mkdir(parents=True, exist_ok=True)
+        tenants.append(Tenant(
+            name=name,
+            udp_port=udp_port,
+            http_port=http_port,
+            data_dir=data_dir,
+            missed_intervals=int(entry.get('missed_intervals', 3))
+        ))
+    
+    if not tenants:
+        raise ValueError(f"No tenants defined in {config_path}")
+    return config.get('host', '0.0.0.0'), tenants
+
+
+# Single-tenant mode (no config file): ports 8081 / 5000, files in the current folder
+default_tenant = Tenant()
+
+
+class DashboardHandler(BaseHTTPRequestHandler):
+    """HTTP handler for dashboard and API (no other files are served)"""
+    
+    # HTTP/1.1 for chunked export streams - every response needs a Content-Length
+    protocol_version = 'HTTP/1.1'
+    
+    @property
+    def tenant(self) -> Tenant:
+        return getattr(self.server, 'tenant', default_tenant)
     
     def do_GET(self):
-        if self.path == '/':
-            self.path = '/dashboard.html'
-            return SimpleHTTPRequestHandler.do_GET(self)
-        
-        elif self.path == '/api/latest':
-            self.send_response(200)
-            self.send_header('Content-type', 'application/json')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
-            self.wfile.write(json.dumps(sensor_data).encode())
+        url = urlparse(self.path)
+        tenant = self.tenant
+        
+        if url.path in ('/', '/dashboard.html'):
+            self.send_dashboard()
+            return
+        
+        elif url.path == '/api/latest':
+            self.send_json(tenant.sensor_data)
+            return
+        
+        elif url.path == '/api/missing':
+            # Read-only: the UDP loop advances the wheel and prints the [MISSING] events
+            self.send_json({
+                'missing': tenant.silence_monitor.missing_devices(),
+                'tracked': len(tenant.silence_monitor.devices),
+                'missed_intervals': tenant.silence_monitor.missed_intervals
+            })
+            return
+        
+        elif url.path == '/api/alerts':
+            self.send_json({
+                'alerts': tenant.anomaly_detector.recent_alerts(),
+                'total_alerts': tenant.anomaly_detector.alert_count
+            })
+            return
+        
+        elif url.path == '/api/stats':
+            self.send_json(tenant.stats())
+            return
+        
+        elif url.path == '/api/export':
+            self.send_export(parse_qs(url.query))
             return
         
-        elif self.path == '/api/config':
+        elif url.path == '/api/config':
             # Get local IP
             try:
                 s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
@@ -70,17 +229,113 @@ class DashboardHandler(SimpleHTTPRequestHandler):
             
             config = {
                 'ip': local_ip,
-                'port': 8080
+                'port': tenant.udp_port,
+                'tenant': tenant.name
             }
-            self.send_response(200)
-            self.send_header('Content-type', 'application/json')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
-            self.wfile.write(json.dumps(config).encode())
+            self.send_json(config)
             return
         
         else:
-            return SimpleHTTPRequestHandler.do_GET(self)
+            # Tenants' data folders are under the working folder - never serve files from it
+            self.send_json({'error': 'Not found'}, status=404)
+    
+    def send_dashboard(self):
+        """Send dashboard.html from the server's own folder"""
+        try:
+            body = DASHBOARD_FILE.read_bytes()
+        except OSError:
+            self.send_json({'error': 'dashboard.html not found'}, status=404)
+            return
+        self.send_response(200)
+        self.send_header('Content-type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def send_json(self, data, status: int = 200):
+        """Send a JSON response"""
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header('Content-type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def send_export(self, query: dict):
+        """
+        Stream stored packets as CSV or NDJSON with chunked transfer encoding
+        /api/export?device=&from=&to=&format=csv|ndjson[&gzip=0]
+        """
+        device = query.get('device', [''])[0] or None
+        export_format = query.get('format', ['csv'])[0].lower()
+        try:
+            start = export_time(query.get('from', [''])[0], end_of_day=False)
+            end = export_time(query.get('to', [''])[0], end_of_day=True)
+        except ValueError as e:
+            self.send_json({'error': str(e)}, status=400)
+            return
+        if export_format not in ('csv', 'ndjson'):
+            self.send_json({'error': "format must be 'csv' or 'ndjson'"}, status=400)
+            return
+        
+        # gzip when the client accepts it, unless turned off with gzip=0
+        use_gzip = ('gzip' in self.headers.get('Accept-Encoding', '') and
+                    query.get('gzip', ['1'])[0] != '0')
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if use_gzip else None
+        
+        filename = f"export_{device or 'all'}.{export_format}"
+        self.send_response(200)
+        self.send_header('Content-type', 'text/csv' if export_format == 'csv' else 'application/x-ndjson')
+        self.send_header('Content-Disposition', f'attachment; filename="{filename}"')
+        self.send_header('Transfer-Encoding', 'chunked')
+        if use_gzip:
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+        
+        def write_chunk(data: bytes):
+            if compressor:
+                data = compressor.compress(data)
+            if data:
+                self.wfile.write(b'%x\r\n%s\r\n' % (len(data), data))
+        
+        try:
+            if export_format == 'csv':
+                buffer = io.StringIO()
+                writer = csv.writer(buffer)
+                writer.writerow(['timestamp', 'device', 'source', 'hex'] + EXPORT_FIELDS)
+                for batch in self.tenant.store.iter_packets(device, start, end):
+                    for timestamp, dev, source, hex_data, parsed in batch:
+                        values = json.loads(parsed) if parsed else {}
+                        writer.writerow([timestamp, dev, source, hex_data] +
+                                        [values.get(field, '') for field in EXPORT_FIELDS])
+                    write_chunk(buffer.getvalue().encode())
+                    buffer.seek(0)
+                    buffer.truncate()
+                write_chunk(buffer.getvalue().encode())
+            else:
+                for batch in self.tenant.store.iter_packets(device, start, end):
+                    lines = []
+                    for timestamp, dev, source, hex_data, parsed in batch:
+                        lines.append(json.dumps({
+                            'timestamp': timestamp,
+                            'device': dev,
+                            'source': source,
+                            'hex': hex_data,
+                            'parsed': json.loads(parsed) if parsed else None
+                        }))
+                    write_chunk(('\n'.join(lines) + '\n').encode())
+            
+            if compressor:
+                tail = compressor.flush()
+                self.wfile.write(b'%x\r\n%s\r\n' % (len(tail), tail))
+            self.wfile.write(b'0\r\n\r\n')
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+        finally:
+            # Request threads are short-lived - don't leave their connection behind
+            self.tenant.store.close()
     
     def log_message(self, format, *args):
         # Suppress HTTP server logs
@@ -88,12 +343,15 @@ class DashboardHandler(SimpleHTTPRequestHandler):
 
 
 class SensorDataServer:
-    def __init__(self, host='0.0.0.0', port=8080):
+    def __init__(self, host='0.0.0.0', port=8080, tenant: Tenant = None):
         self.host = host
         self.port = port
         self.sock = None
         self.packet_count = 0
-        self.log_file = Path('sensor_data_log.txt')
+        self.tenant = tenant or default_tenant
+        self.log_file = self.tenant.log_file
+        # Tag console output with the tenant name when serving several
+        self.tag = f" [{self.tenant.name}]" if tenant else ""
         
     def start(self):
         """Start UDP server"""
@@ -110,6 +368,7 @@ class SensorDataServer:
         print(f"  Listening on: {Colors.YELLOW}{self.host}:{self.port}{Colors.RESET}")
         print(f"  Protocol: {Colors.YELLOW}UDP{Colors.RESET}")
         print(f"  Log file: {Colors.YELLOW}{self.log_file}{Colors.RESET}")
+        print(f"  Database: {Colors.YELLOW}{self.tenant.store.path}{Colors.RESET}")
         
         # Get local IP
         try:
@@ -135,25 +394,32 @@ class SensorDataServer:
         
         print(f"{Colors.CYAN}[WAITING FOR DATA...]{Colors.RESET}\n")
         
-        # Receive loop
+        # Receive loop (wakes every second to check for silent devices)
+        self.sock.settimeout(1.0)
         try:
             while True:
-                data, addr = self.sock.recvfrom(4096)
-                self.handle_packet(data, addr)
+                try:
+                    data, addr = self.sock.recvfrom(4096)
+                    self.handle_packet(data, addr)
+                except socket.timeout:
+                    pass
+                self.check_silent_devices()
         except KeyboardInterrupt:
             print(f"\n\n{Colors.YELLOW}[SHUTDOWN] Server stopped{Colors.RESET}")
             self.sock.close()
     
     def handle_packet(self, data: bytes, addr: tuple):
         """Handle received packet"""
-        global sensor_data
+        tenant = self.tenant
+        sensor_data = tenant.sensor_data
         
         self.packet_count += 1
+        tenant.bytes_received += len(data)
         timestamp = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         
         # Print header
         print(f"{Colors.GREEN}{'='*80}{Colors.RESET}")
-        print(f"{Colors.BOLD}[PACKET #{self.packet_count}] {timestamp}{Colors.RESET}")
+        print(f"{Colors.BOLD}[PACKET #{self.packet_count}] {timestamp}{self.tag}{Colors.RESET}")
         print(f"{Colors.GREEN}{'='*80}{Colors.RESET}")
         
         # Print source
@@ -183,9 +449,22 @@ class SensorDataServer:
         
         print(f"\n{Colors.GREEN}{'='*80}{Colors.RESET}\n")
         
-        # Store in global data
+        # Track report interval
+        device = self.device_key(addr, data.hex())
+        recovered = tenant.silence_monitor.observe(device)
+        if recovered:
+            print(f"{Colors.GREEN}[RECOVERED]{self.tag} {device} reporting again after {recovered['silent_for']:.0f}s "
+                  f"({recovered['missed_reports']} missed reports){Colors.RESET}\n")
+        
+        # Anomaly detection
+        for alert in tenant.anomaly_detector.update(device, parsed, timestamp):
+            color = Colors.RED if alert['severity'] == 'critical' else Colors.YELLOW
+            print(f"{color}{Colors.BOLD}[ALERT]{self.tag} {device}{Colors.RESET}{color} {alert['message']}{Colors.RESET}\n")
+        
+        # Store in tenant data
         packet_info = {
             'timestamp': timestamp,
+            'device': device,
             'source': f"{addr[0]}:{addr[1]}",
             'hex': data.hex(),
             'parsed': parsed
@@ -207,6 +486,29 @@ class SensorDataServer:
         
         # Log to file
         self.log_packet(timestamp, addr, data, parsed)
+        
+        # Persist
+        try:
+            tenant.store.insert(device, timestamp, packet_info['source'], packet_info['hex'], parsed)
+        except Exception as e:
+            print(f"{Colors.RED}[ERROR] Failed to store packet: {e}{Colors.RESET}")
+    
+    @staticmethod
+    def device_key(addr: tuple, hex_data: str) -> str:
+        """Identify the reporting device (IMEI from the report header, else source IP)"""
+        # Fixed offset only - the readings after the header change from report to report
+        imei = hex_data[IMEI_OFFSET:IMEI_OFFSET + IMEI_DIGITS]
+        if hex_data.startswith(REPORT_TYPE) and len(imei) == IMEI_DIGITS and imei.isdigit():
+            return imei
+        # NB-IoT NAT changes the source port between reports, so use IP only
+        return addr[0]
+    
+    def check_silent_devices(self):
+        """Fire missing events for devices that skipped their reports"""
+        for event in self.tenant.silence_monitor.advance():
+            print(f"{Colors.RED}{Colors.BOLD}[MISSING]{self.tag} {event['device']}{Colors.RESET}"
+                  f"{Colors.RED} - no report for {event['silent_for']:.0f}s "
+                  f"(expected every {event['interval']:.0f}s, last seen {event['last_seen']}){Colors.RESET}")
     
     def parse_sensor_data(self, data: bytes) -> dict:
         """Try to parse sensor data"""
@@ -232,6 +534,13 @@ class SensorDataServer:
                     except:
                         pass
             
+            # Text payloads: key:value sensor readings
+            text = data.decode('utf-8', errors='ignore')
+            for key, value in SENSOR_FIELD_RE.findall(text):
+                field = SENSOR_FIELDS.get(key.lower())
+                if field and field not in parsed:
+                    parsed[field] = float(value) if '.' in value else int(value)
+            
             # Length
             parsed['packet_length'] = len(data)
             parsed['hex_data'] = hex_str
@@ -269,15 +578,104 @@ class SensorDataServer:
             print(f"{Colors.RED}[ERROR] Failed to log: {e}{Colors.RESET}")
 
 
+class MultiTenantServer:
+    """Serves every tenant's UDP port and dashboard from one event loop"""
+    
+    def __init__(self, tenants: list, host: str = '0.0.0.0'):
+        self.tenants = tenants
+        self.host = host
+        self.udp_servers = []
+        self.http_servers = []
+        self.selector = selectors.DefaultSelector()
+        self.stopped = threading.Event()
+    
+    def start(self):
+        """Bind all ports and run the event loop"""
+        for tenant in self.tenants:
+            udp = SensorDataServer(host=self.host, port=tenant.udp_port, tenant=tenant)
+            udp.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            udp.sock.bind((self.host, tenant.udp_port))
+            udp.sock.setblocking(False)
+            self.selector.register(udp.sock, selectors.EVENT_READ, udp)
+            self.udp_servers.append(udp)
+            
+            # Accepts happen on the loop; each request is handled in its own thread
+            http = ThreadingHTTPServer((self.host, tenant.http_port), DashboardHandler)
+            http.tenant = tenant
+            http.timeout = 0
+            http.daemon_threads = True
+            self.selector.register(http, selectors.EVENT_READ, http)
+            self.http_servers.append(http)
+        
+        print(f"{Colors.GREEN}{Colors.BOLD}")
+        print("╔═══════════════════════════════════════════════════════════════════════════════╗")
+        print("║                 MULTI-TENANT SENSOR DATA SERVER RUNNING                       ║")
+        print("╚═══════════════════════════════════════════════════════════════════════════════╝")
+        print(f"{Colors.RESET}\n")
+        
+        print(f"{Colors.CYAN}[TENANTS]{Colors.RESET}")
+        print(f"  {'Name':<20} {'UDP':>6} {'Dashboard':<26} Data")
+        for tenant in self.tenants:
+            print(f"  {Colors.YELLOW}{tenant.name:<20}{Colors.RESET} {tenant.udp_port:>6} "
+                  f"http://localhost:{tenant.http_port:<9} {tenant.data_dir}")
+        print(f"\n{Colors.CYAN}[WAITING FOR DATA...]{Colors.RESET}\n")
+        
+        try:
+            while not self.stopped.is_set():
+                # Wake at least every second to check for silent devices
+                for key, _ in self.selector.select(timeout=1.0):
+                    target = key.data
+                    if isinstance(target, SensorDataServer):
+                        try:
+                            data, addr = target.sock.recvfrom(4096)
+                        except (BlockingIOError, ConnectionResetError):
+                            continue
+                        target.handle_packet(data, addr)
+                    else:
+                        target.handle_request()
+                
+                for udp in self.udp_servers:
+                    udp.check_silent_devices()
+        except KeyboardInterrupt:
+            print(f"\n\n{Colors.YELLOW}[SHUTDOWN] Server stopped{Colors.RESET}")
+        finally:
+            for udp in self.udp_servers:
+                udp.sock.close()
+            for http in self.http_servers:
+                http.server_close()
+            self.selector.close()
+    
+    def stop(self):
+        """Leave the event loop from another thread (within a second) and close all ports"""
+        self.stopped.set()
+
+
 if __name__ == "__main__":
     import os
     os.system('')  # Enable ANSI colors on Windows
     
+    parser = argparse.ArgumentParser(description='Sensor data server with web dashboard')
+    parser.add_argument('--config', help='tenants config file (serves many ports from one process)')
+    args = parser.parse_args()
+    
+    if args.config:
+        try:
+            host, tenants = load_tenants(args.config)
+        except KeyError as e:
+            print(f"{Colors.RED}[ERROR] Bad config {args.config}: tenant is missing {e}{Colors.RESET}")
+            raise SystemExit(1)
+        except (OSError, ValueError) as e:
+            print(f"{Colors.RED}[ERROR] Bad config {args.config}: {e}{Colors.RESET}")
+            raise SystemExit(1)
+        print(f"\n{Colors.YELLOW}[CONFIG] Starting {len(tenants)} tenant(s) from {args.config}...{Colors.RESET}\n")
+        MultiTenantServer(tenants, host).start()
+        raise SystemExit(0)
+    
     print(f"\n{Colors.YELLOW}[CONFIG] Starting servers...{Colors.RESET}\n")
     
     # Start HTTP server in background thread
     def start_web_server():
-        http_server = HTTPServer(('0.0.0.0', 5000), DashboardHandler)
+        http_server = ThreadingHTTPServer(('0.0.0.0', 5000), DashboardHandler)
         print(f"{Colors.GREEN}[WEB] Dashboard running at http://localhost:5000{Colors.RESET}")
         print(f"{Colors.GREEN}[WEB] Open your browser and visit: http://localhost:5000{Colors.RESET}\n")
         http_server.serve_forever()
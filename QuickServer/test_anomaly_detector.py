@@ -0,0 +1,139 @@
+"""
+Test Streaming Anomaly Detection
+================================
+Feeds synthetic sensor readings through the detector stage and checks
+which alerts fire, once per episode, on one set of statistics per sensor
+"""
+
+import sys
+import os
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from AnomalyDetector import AnomalyDetector, EwmaStats, P2Quantile
+from TestServer import SensorDataServer
+
+
+def feed(detector, readings, device="bin-1"):
+    alerts = []
+    for i, reading in enumerate(readings):
+        alerts += detector.update(device, reading, f"2026-02-13 17:{i // 60:02d}:{i % 60:02d}")
+    return [alert['type'] for alert in alerts]
+
+
+def test_p2_quantile_tracks_percentile():
+    random.seed(1)
+    sketch = P2Quantile(0.95)
+    values = [random.uniform(0, 100) for _ in range(20000)]
+    for value in values:
+        sketch.update(value)
+    exact = sorted(values)[int(0.95 * len(values))]
+    assert abs(sketch.value() - exact) < 1.5, (sketch.value(), exact)
+
+
+def test_ewma_stats():
+    stats = EwmaStats(alpha=0.1)
+    for _ in range(200):
+        stats.update(3.6)
+    assert abs(stats.mean - 3.6) < 1e-9
+    assert stats.std < 1e-6
+
+
+def test_fill_jump_but_not_collection():
+    detector = AnomalyDetector()
+    fills = [10, 14, 18, 22, 25, 29, 33, 36]
+    readings = [{'fill_level': f} for f in fills]
+    readings.append({'fill_level': 5})    # emptied by the truck - normal
+    readings.append({'fill_level': 9})
+    readings.append({'fill_level': 95})   # +86% in one report
+    assert feed(detector, readings) == ['fill_jump']
+
+
+def test_battery_drop():
+    detector = AnomalyDetector()
+    readings = [{'battery': 3.60 + random.uniform(-0.01, 0.01)} for _ in range(20)]
+    readings.append({'battery': 3.10})
+    assert feed(detector, readings) == ['battery_drop']
+
+
+def test_lasting_battery_drop_alerts_once():
+    """A permanent step down alerts once, then re-arms when the average has caught up"""
+    detector = AnomalyDetector()
+    readings = [{'battery': 3.60} for _ in range(20)] + [{'battery': 3.10} for _ in range(50)]
+    assert feed(detector, readings) == ['battery_drop']
+    assert 'battery_drop' not in detector.devices["bin-1"].active
+    assert abs(detector.devices["bin-1"].battery.mean - 3.10) < 0.01
+
+    # Settled on the new level: a further drop is a new episode
+    readings = [{'battery': 3.10} for _ in range(50)] + [{'battery': 2.60}]
+    assert feed(detector, readings) == ['battery_drop']
+
+
+def test_temperature_spike_and_fire():
+    detector = AnomalyDetector()
+    readings = [{'temperature': 24 + random.uniform(-0.5, 0.5)} for _ in range(20)]
+    readings.append({'temperature': 41.0})
+    readings.append({'temperature': 75.0})
+    assert feed(detector, readings) == ['temperature_spike', 'temperature_spike']
+    newest = detector.recent_alerts()[0]
+    assert newest['severity'] == 'critical' and newest['value'] == 75.0
+
+
+def test_fire_alerts_once_per_episode():
+    detector = AnomalyDetector()
+    readings = [{'temperature': 24.0} for _ in range(10)] + [{'temperature': 70.0 + i} for i in range(10)]
+    assert feed(detector, readings) == ['temperature_spike']
+
+    # Cooled down below the fire limit, then hot again: a new episode
+    readings = [{'temperature': 30.0} for _ in range(5)] + [{'temperature': 65.0}]
+    assert feed(detector, readings) == ['temperature_spike']
+    assert [alert['severity'] for alert in detector.recent_alerts()] == ['critical', 'critical']
+
+
+def test_stats_follow_the_sensor():
+    """Reports with different readings from one sensor warm up one set of statistics"""
+    detector = AnomalyDetector()
+    server = SensorDataServer()
+    for i in range(20):
+        data = bytes.fromhex(f'0654351469520520687041{i:02X}6698') + f" ,batt:{3.6 - i * 0.001:.3f}".encode()
+        device = server.device_key(('10.0.0.7', 40000 + i), data.hex())
+        detector.update(device, server.parse_sensor_data(data), f"2026-02-13 17:00:{i:02d}")
+    assert list(detector.devices) == ['351469520520687']
+    assert detector.devices['351469520520687'].battery.count == 20
+
+
+def test_knocked_over():
+    detector = AnomalyDetector()
+    upright = [{'angle_x': 0.3, 'angle_y': -88.4 + random.uniform(-1, 1), 'angle_z': -0.01}
+               for _ in range(10)]
+    fallen = [{'angle_x': 0.5, 'angle_y': -2.0, 'angle_z': 87.0}]
+    assert feed(detector, upright + fallen) == ['knocked_over']
+
+
+def test_bin_left_lying_alerts_once():
+    detector = AnomalyDetector()
+    upright = [{'angle_x': 0.3, 'angle_y': -88.4, 'angle_z': -0.01} for _ in range(10)]
+    fallen = [{'angle_x': 0.5, 'angle_y': -2.0, 'angle_z': 87.0} for _ in range(50)]
+    assert feed(detector, upright + fallen) == ['knocked_over']
+
+    # Stood back up, then knocked over again
+    assert feed(detector, upright[:3] + fallen[:3]) == ['knocked_over']
+
+
+def test_normal_readings_stay_quiet():
+    random.seed(7)
+    detector = AnomalyDetector()
+    readings = []
+    fill = 0
+    for _ in range(500):
+        fill = 3 if fill > 90 else fill + random.randint(0, 6)
+        readings.append({
+            'fill_level': fill,
+            'battery': 3.6 - random.uniform(0, 0.02),
+            'temperature': 25 + random.uniform(-2, 2),
+            'angle_x': random.uniform(-1, 1),
+            'angle_y': -88 + random.uniform(-2, 2),
+            'angle_z': random.uniform(-1, 1)
+        })
+    assert feed(detector, readings) == []
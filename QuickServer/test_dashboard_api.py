@@ -0,0 +1,169 @@
+"""
+Test Dashboard API
+==================
+Runs DashboardHandler on a local port for a tenant in a temp folder and
+checks what the /api routes return - including the chunked, optionally
+gzipped CSV/NDJSON export stream
+"""
+
+import sys
+import os
+import io
+import csv
+import gzip
+import json
+import socket
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from contextlib import contextmanager, redirect_stdout
+from http.server import ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from TestServer import Tenant, DashboardHandler, SensorDataServer
+from SilenceMonitor import TimingWheel
+
+
+@contextmanager
+def dashboard(tenant: Tenant):
+    """Serve tenant's dashboard on a free local port - yields the base URL"""
+    http = ThreadingHTTPServer(('127.0.0.1', 0), DashboardHandler)
+    http.tenant = tenant
+    http.daemon_threads = True
+    thread = threading.Thread(target=http.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{http.server_address[1]}"
+    finally:
+        http.shutdown()
+        http.server_close()
+        tenant.store.close()
+
+
+def get_json(url: str):
+    with urllib.request.urlopen(url, timeout=5) as response:
+        return json.loads(response.read())
+
+
+def get_raw(base: str, path: str, headers: str = '') -> tuple:
+    """GET over a plain socket - returns (status line, headers dict, list of chunks)"""
+    host, port = base[len('http://'):].split(':')
+    with socket.create_connection((host, int(port)), timeout=5) as sock:
+        sock.sendall(f"GET {path} HTTP/1.1\r\nHost: {host}\r\n{headers}Connection: close\r\n\r\n".encode())
+        raw = b''
+        while True:
+            data = sock.recv(65536)
+            if not data:
+                break
+            raw += data
+
+    head, body = raw.split(b'\r\n\r\n', 1)
+    status, *lines = head.decode().split('\r\n')
+    response_headers = dict(line.split(': ', 1) for line in lines)
+    assert response_headers.get('Transfer-Encoding') == 'chunked'
+
+    chunks = []
+    while True:
+        size_line, body = body.split(b'\r\n', 1)
+        size = int(size_line, 16)
+        chunk, body = body[:size], body[size:]
+        assert body[:2] == b'\r\n'
+        body = body[2:]
+        if size == 0:
+            break
+        chunks.append(chunk)
+    assert body == b''
+    return status, response_headers, chunks
+
+
+def store_packets(tenant: Tenant, count: int):
+    """count packets alternating between bin-1 and bin-2, one second apart"""
+    tenant.store.insert_many(
+        (f"bin-{i % 2 + 1}", f"2026-02-13 {17 + i // 3600:02d}:{i // 60 % 60:02d}:{i % 60:02d}",
+         f"10.0.0.{i % 2 + 1}:40000", '0654', json.dumps({'fill_level': i % 100, 'battery': 3.6}))
+        for i in range(count)
+    )
+
+
+def test_missing_endpoint_does_not_consume_events():
+    """Polling /api/missing leaves the missing events to the UDP loop"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tenant = Tenant(data_dir=tmp)
+        reported = time.time() - 4 * 3600   # 3 x 1h reports missed since
+        tenant.silence_monitor.wheel = TimingWheel(tick=1.0, start=reported)
+        tenant.silence_monitor.observe("bin-1", now=reported)
+
+        with dashboard(tenant) as base:
+            for _ in range(3):
+                assert get_json(f"{base}/api/missing")['missing'] == []
+
+            out = io.StringIO()
+            with redirect_stdout(out):
+                SensorDataServer(tenant=tenant).check_silent_devices()
+            assert "[MISSING]" in out.getvalue() and "bin-1" in out.getvalue()
+
+            missing = get_json(f"{base}/api/missing")
+            assert [d['device'] for d in missing['missing']] == ["bin-1"]
+            assert missing['tracked'] == 1
+
+
+def test_export_csv_streams_in_chunks():
+    with tempfile.TemporaryDirectory() as tmp:
+        tenant = Tenant(data_dir=tmp)
+        store_packets(tenant, 1200)
+
+        with dashboard(tenant) as base:
+            status, headers, chunks = get_raw(base, '/api/export?format=csv')
+            assert status.endswith('200 OK') and headers['Content-type'] == 'text/csv'
+            assert 'Content-Encoding' not in headers and 'Content-Length' not in headers
+            assert len(chunks) >= 3   # one per 500-row store batch
+            rows = list(csv.reader(io.StringIO(b''.join(chunks).decode())))
+            assert rows[0][:4] == ['timestamp', 'device', 'source', 'hex'] and len(rows) == 1201
+            header = rows[0]
+            assert rows[6][header.index('fill_level')] == '5' and rows[6][header.index('battery')] == '3.6'
+            assert rows[1][0] <= rows[600][0] <= rows[1200][0]
+
+            # Device and inclusive minute range (17:00:00 - 17:01:59 = 120 packets, 60 per device)
+            _, headers, chunks = get_raw(base, '/api/export?device=bin-2&from=2026-02-13+17:00&to=2026-02-13T17:01')
+            assert headers['Content-Disposition'] == 'attachment; filename="export_bin-2.csv"'
+            rows = list(csv.reader(io.StringIO(b''.join(chunks).decode())))[1:]
+            assert len(rows) == 60 and {row[1] for row in rows} == {'bin-2'}
+
+
+def test_export_gzip_round_trip():
+    with tempfile.TemporaryDirectory() as tmp:
+        tenant = Tenant(data_dir=tmp)
+        store_packets(tenant, 1200)
+
+        with dashboard(tenant) as base:
+            path = '/api/export?format=ndjson&device=bin-1'
+            status, headers, chunks = get_raw(base, path, 'Accept-Encoding: gzip, deflate\r\n')
+            assert headers['Content-Encoding'] == 'gzip' and headers['Content-type'] == 'application/x-ndjson'
+            assert len(chunks) >= 2
+            records = [json.loads(line) for line in gzip.decompress(b''.join(chunks)).decode().splitlines()]
+            assert len(records) == 600 and {r['device'] for r in records} == {'bin-1'}
+            assert records[3] == {'timestamp': '2026-02-13 17:00:06', 'device': 'bin-1', 'source': '10.0.0.1:40000',
+                                  'hex': '0654', 'parsed': {'fill_level': 6, 'battery': 3.6}}
+
+            # gzip=0 turns compression off even when the client accepts it
+            _, headers, plain = get_raw(base, path + '&gzip=0', 'Accept-Encoding: gzip\r\n')
+            assert 'Content-Encoding' not in headers
+            assert b''.join(plain) == gzip.decompress(b''.join(chunks))
+
+
+def test_export_rejects_bad_parameters():
+    with tempfile.TemporaryDirectory() as tmp:
+        tenant = Tenant(data_dir=tmp)
+        store_packets(tenant, 10)
+
+        with dashboard(tenant) as base:
+            for query in ('format=xml', 'from=yesterday', 'to=2026-13-01', 'from=2026-02-13+25:00'):
+                try:
+                    urllib.request.urlopen(f"{base}/api/export?{query}", timeout=5)
+                    assert False, f"expected 400 for {query}"
+                except urllib.error.HTTPError as e:
+                    assert e.code == 400, query
+                    assert json.loads(e.read())['error']
@@ -0,0 +1,128 @@
+"""
+Test Log Importer
+=================
+Writes a sensor_data_log.txt with SensorDataServer.log_packet, imports it
+in small chunks through the process pool and checks interrupt / resume,
+the device ids and field types of imported rows, and re-keying a database
+"""
+
+import sys
+import os
+import json
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from TestServer import SensorDataServer
+from SensorStore import SensorStore
+from ImportLogs import import_file, chunk_offsets, device_for
+
+
+def write_log(path: Path, packets: int):
+    server = SensorDataServer()
+    server.log_file = path
+    for i in range(packets):
+        data = f"temp:{20 + i % 10}.5 ,fill:{i % 100} ,batt:3.6\nline two".encode()
+        if i % 3 == 0:
+            data = bytes.fromhex('0654351469520520687041006698')  # binary packet
+        server.packet_count = i + 1
+        parsed = server.parse_sensor_data(data)
+        server.log_packet(f"2026-02-13 17:{i // 60 % 60:02d}:{i % 60:02d}",
+                          (f"10.0.0.{i % 5}", 40000 + i), data, parsed)
+
+
+def test_chunks_align_to_records():
+    with tempfile.TemporaryDirectory() as tmp:
+        log = Path(tmp) / 'sensor_data_log.txt'
+        write_log(log, 200)
+        raw = log.read_bytes()
+        offsets = chunk_offsets(str(log), 0, len(raw), 2000)
+        assert len(offsets) > 5
+        for offset in offsets[1:-1]:
+            assert raw[offset - 1:offset + 81] == b'\n' + b'=' * 80 + b'\n'
+            assert raw[offset + 81:offset + 82] == b'['
+
+
+def test_import_matches_log():
+    with tempfile.TemporaryDirectory() as tmp:
+        log = Path(tmp) / 'sensor_data_log.txt'
+        write_log(log, 500)
+        store = SensorStore(Path(tmp) / 'test.db')
+
+        assert import_file(store, log, workers=2, chunk_size=4096) == 500
+        assert store.count() == 500
+
+        rows = store.connection().execute(
+            'SELECT device, timestamp, source, parsed FROM packets ORDER BY id'
+        ).fetchall()
+        assert rows[1][0] == '10.0.0.1'
+        assert rows[1][1] == '2026-02-13 17:00:01'
+        assert rows[1][2] == '10.0.0.1:40001'
+        parsed = json.loads(rows[1][3])
+        assert parsed['fill_level'] == 1 and parsed['temperature'] == 21.5
+
+        # Second run is a no-op
+        assert import_file(store, log, workers=2, chunk_size=4096) == 0
+        assert store.count() == 500
+        store.close()
+
+
+def test_resume_after_interrupt():
+    with tempfile.TemporaryDirectory() as tmp:
+        log = Path(tmp) / 'sensor_data_log.txt'
+        write_log(log, 500)
+        store = SensorStore(Path(tmp) / 'test.db')
+
+        def interrupt(offset, records):
+            raise KeyboardInterrupt
+
+        try:
+            import_file(store, log, workers=2, chunk_size=4096, progress=interrupt)
+            assert False, "import should have been interrupted"
+        except KeyboardInterrupt:
+            pass
+
+        done = store.count()
+        assert 0 < done < 500
+        assert store.import_progress(str(log.resolve()))['records'] == done
+
+        assert import_file(store, log, workers=2, chunk_size=4096) == 500 - done
+        assert store.count() == 500
+        store.close()
+
+
+def test_imported_keys_and_values():
+    """Reports from one sensor import under its IMEI; only numeric fields become numbers"""
+    with tempfile.TemporaryDirectory() as tmp:
+        log = Path(tmp) / 'sensor_data_log.txt'
+        server = SensorDataServer()
+        server.log_file = log
+        for i, reading in enumerate(('6698123', '6699123', 'FFAB9D6')):
+            data = bytes.fromhex(f'0654351469520520687041{reading}000000000')
+            parsed = dict(server.parse_sensor_data(data) or {}, dIndex='0410', fill_level=7, battery=3.0)
+            server.log_packet(f"2026-02-13 17:00:0{i}", ('10.0.0.7', 40000 + i), data, parsed)
+
+        store = SensorStore(Path(tmp) / 'test.db')
+        assert import_file(store, log, workers=1, chunk_size=4096) == 3
+        rows = store.connection().execute('SELECT device, parsed FROM packets ORDER BY id').fetchall()
+        store.close()
+        assert [row[0] for row in rows] == ['351469520520687'] * 3
+        parsed = json.loads(rows[0][1])
+        assert parsed['dIndex'] == '0410' and parsed['possible_imei'].startswith('0654')
+        assert parsed['fill_level'] == 7 and parsed['battery'] == 3.0 and parsed['packet_length'] == 19
+
+
+def test_rekey_store():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SensorStore(Path(tmp) / 'test.db')
+        store.insert_many([
+            ('065435146952052068704100669812', '2026-02-13 17:00:00', '10.0.0.7:40000',
+             '065435146952052068704100669812', None),   # keyed on the old digit window
+            ('10.0.0.7', '2026-02-13 17:00:01', '10.0.0.7:40001', '0654351469520520687041FFAB', None),
+            ('10.0.0.8', '2026-02-13 17:00:02', '10.0.0.8:40002', '74656d70', None),
+        ])
+        assert store.rekey(device_for, batch_size=2) == 2
+        assert store.count('351469520520687') == 2 and store.count('10.0.0.8') == 1
+        assert store.rekey(device_for) == 0
+        store.close()
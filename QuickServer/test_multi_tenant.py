@@ -0,0 +1,142 @@
+"""
+Test Multi-Tenant Server
+========================
+Loads tenant configs, runs MultiTenantServer on free local ports and checks
+that each tenant's UDP packets, API and files stay with that tenant
+"""
+
+import sys
+import os
+import io
+import json
+import socket
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from contextlib import contextmanager, redirect_stdout
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from TestServer import load_tenants, MultiTenantServer
+
+
+def free_port(kind: int) -> int:
+    with socket.socket(socket.AF_INET, kind) as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+@contextmanager
+def working_folder(path):
+    previous = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
+
+
+def write_config(folder, tenants: list, host: str = '127.0.0.1') -> Path:
+    path = Path(folder) / 'tenants.json'
+    path.write_text(json.dumps({'host': host, 'tenants': tenants}), encoding='utf-8')
+    return path
+
+
+def get(url: str) -> tuple:
+    """(status, body) - error statuses included"""
+    try:
+        with urllib.request.urlopen(url, timeout=5) as response:
+            return response.status, response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.read()
+
+
+def test_load_tenants():
+    with tempfile.TemporaryDirectory() as tmp, working_folder(tmp):
+        path = write_config(tmp, [
+            {'name': 'council-north', 'udp_port': 8081, 'http_port': 5001},
+            {'name': 'acme', 'udp_port': 9000, 'http_port': 5010, 'data_dir': 'custom/acme', 'missed_intervals': 5}
+        ], host='0.0.0.0')
+        host, tenants = load_tenants(path)
+
+        assert host == '0.0.0.0'
+        north, acme = tenants
+        assert (north.name, north.udp_port, north.http_port) == ('council-north', 8081, 5001)
+        assert north.data_dir == Path('data') / 'council-north' and north.data_dir.is_dir()
+        assert north.log_file == north.data_dir / 'sensor_data_log.txt'
+        assert acme.data_dir == Path('custom/acme') and acme.silence_monitor.missed_intervals == 5
+        assert north.store is not acme.store
+
+
+def test_load_tenants_rejects_bad_config():
+    with tempfile.TemporaryDirectory() as tmp, working_folder(tmp):
+        bad = {
+            ValueError: [
+                [],
+                [{'name': '../other', 'udp_port': 8081, 'http_port': 5001}],
+                [{'name': 'a', 'udp_port': 8081, 'http_port': 5001},
+                 {'name': 'b', 'udp_port': 8082, 'http_port': 8081}],
+                [{'name': 'a', 'udp_port': '9000', 'http_port': 5001},
+                 {'name': 'b', 'udp_port': 9000, 'http_port': 5002}],
+                [{'name': 'a', 'udp_port': 8081, 'http_port': ' 8081'}]
+            ],
+            KeyError: [[{'name': 'a', 'udp_port': 8081}]]
+        }
+        for error, configs in bad.items():
+            for tenants in configs:
+                try:
+                    load_tenants(write_config(tmp, tenants))
+                    assert False, f"expected {error.__name__} for {tenants}"
+                except error:
+                    pass
+        assert not (Path(tmp) / 'data' / '..' / 'other').exists()
+
+
+def test_tenants_are_isolated():
+    """Packets land in their own tenant only and no port serves another tenant's files"""
+    with tempfile.TemporaryDirectory() as tmp, working_folder(tmp), redirect_stdout(io.StringIO()):
+        ports = {name: (free_port(socket.SOCK_DGRAM), free_port(socket.SOCK_STREAM)) for name in ('a', 'b')}
+        host, tenants = load_tenants(write_config(tmp, [
+            {'name': name, 'udp_port': udp, 'http_port': http} for name, (udp, http) in ports.items()
+        ]))
+        server = MultiTenantServer(tenants, host=host)
+        thread = threading.Thread(target=server.start, daemon=True)
+        thread.start()
+        try:
+            a, b = (f"http://127.0.0.1:{ports[name][1]}" for name in ('a', 'b'))
+            deadline = time.time() + 5
+            while len(server.http_servers) < 2 and time.time() < deadline:
+                time.sleep(0.01)
+
+            with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+                sock.sendto(b"temp:24.25 ,fill:76 ,batt:3.2", ('127.0.0.1', ports['b'][0]))
+            while json.loads(get(f"{b}/api/stats")[1])['packets'] < 1:
+                assert time.time() < deadline, "packet not received"
+                time.sleep(0.05)
+
+            assert json.loads(get(f"{a}/api/stats")[1])['packets'] == 0
+            assert json.loads(get(f"{b}/api/latest")[1])['latest']['fill_level'] == 76
+            assert json.loads(get(f"{a}/api/config")[1])['tenant'] == 'a'
+            assert Path('data/b/sensor_data_log.txt').is_file() and Path('data/b/sensor_data.db').is_file()
+
+            status, body = get(f"{a}/")
+            assert status == 200 and b'/api/latest' in body
+            for path in ('/data/b/sensor_data_log.txt', '/data/b/sensor_data.db', '/data/a/sensor_data.db',
+                         '/tenants.json', '/data/', '/../TestServer.py'):
+                for base in (a, b):
+                    assert get(base + path)[0] == 404, (base, path)
+            request = urllib.request.Request(f"{a}/data/b/sensor_data_log.txt", method='HEAD')
+            try:
+                urllib.request.urlopen(request, timeout=5)
+                assert False, "HEAD should not serve files"
+            except urllib.error.HTTPError as e:
+                assert e.code != 200
+        finally:
+            server.stop()
+            thread.join(5)
+            for tenant in tenants:
+                tenant.store.close()
+        assert not thread.is_alive()
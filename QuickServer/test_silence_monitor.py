@@ -0,0 +1,107 @@
+"""
+Test Silent Device Detection
+============================
+Simulates report timelines to check interval learning, missing and
+recovered events, per-packet cost with 100k devices, and that one sensor
+keeps one device key whatever its readings are
+"""
+
+import sys
+import os
+import random
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from SilenceMonitor import SilenceMonitor, TimingWheel
+from TestServer import SensorDataServer
+
+
+def test_timing_wheel_fires_on_deadline():
+    """Timers on every wheel level fire on their exact tick"""
+    wheel = TimingWheel(tick=1.0, slots=8, levels=3, start=0)
+    deadlines = {f"t{d}": d for d in (1, 7, 8, 9, 63, 64, 65, 100, 511, 600)}
+    for key, deadline in deadlines.items():
+        wheel.schedule(key, deadline)
+
+    fired = {}
+    for now in range(1, 700):
+        for key in wheel.advance(now):
+            fired[key] = now
+
+    assert fired == deadlines, fired
+    assert len(wheel) == 0
+
+
+def test_timing_wheel_reschedule_and_cancel():
+    wheel = TimingWheel(tick=1.0, start=0)
+    wheel.schedule("a", 10)
+    wheel.schedule("a", 20)  # reschedule replaces the first deadline
+    wheel.schedule("b", 15)
+    wheel.cancel("b")
+    assert wheel.advance(19) == []
+    assert wheel.advance(20) == ["a"]
+
+
+def test_missing_after_n_intervals():
+    monitor = SilenceMonitor(missed_intervals=3, min_interval=1)
+    monitor.wheel = TimingWheel(tick=1.0, start=0)
+
+    # Device reports every 60s
+    for t in range(0, 601, 60):
+        assert monitor.observe("bin-1", now=t) is None
+    assert abs(monitor.devices["bin-1"].interval - 60) < 0.01
+
+    # Silent: nothing until 3 intervals have passed
+    assert monitor.advance(now=600 + 179) == []
+    events = monitor.advance(now=600 + 180)
+    assert [e['device'] for e in events] == ["bin-1"]
+    assert events[0]['missed_reports'] == 3
+    assert [d['device'] for d in monitor.missing_devices(now=800)] == ["bin-1"]
+
+    # Comes back: recovered event, interval unchanged by the outage gap
+    recovered = monitor.observe("bin-1", now=2000)
+    assert recovered and recovered['event'] == 'recovered'
+    assert monitor.missing_devices(now=2000) == []
+    assert abs(monitor.devices["bin-1"].interval - 60) < 0.01
+
+
+def test_bursts_do_not_shrink_interval():
+    monitor = SilenceMonitor(missed_intervals=2, min_interval=10)
+    monitor.wheel = TimingWheel(tick=1.0, start=0)
+    for t in (0, 300, 301, 302, 600):
+        monitor.observe("bin-2", now=t)
+    assert abs(monitor.devices["bin-2"].interval - 300) < 0.01
+
+
+def test_per_packet_cost_100k_devices():
+    """Per-packet cost stays flat at 100k devices"""
+    monitor = SilenceMonitor(missed_intervals=3, default_interval=3600)
+    devices = [f"35146952{i:07d}" for i in range(100_000)]
+    now = time.time()
+
+    start = time.perf_counter()
+    for device in devices:
+        monitor.observe(device, now=now + random.random() * 60)
+    for device in devices:
+        monitor.observe(device, now=now + 900 + random.random() * 60)
+    elapsed = time.perf_counter() - start
+
+    per_packet_us = elapsed / (2 * len(devices)) * 1e6
+    print(f"  {len(devices)} devices: {per_packet_us:.2f} us/packet")
+    assert len(monitor.wheel) == len(devices)
+    assert per_packet_us < 100
+
+
+def test_device_key_ignores_readings():
+    """Reports from one sensor map to one device, so it is not split into phantoms that go missing"""
+    addr = ('10.0.0.7', 40001)
+    reports = ['0654351469520520687041006698123', '0654351469520520687041006699123',
+               '0654351469520520687041FFAB9D6C7659']   # A-F in the readings
+    keys = {SensorDataServer.device_key((addr[0], 40000 + i), report) for i, report in enumerate(reports)}
+    assert keys == {'351469520520687'}
+
+    text = 'temp:24.25 ,fill:76 ,batt:3.2'.encode().hex()
+    assert SensorDataServer.device_key(addr, text) == '10.0.0.7'
+    assert SensorDataServer.device_key(addr, '1234567812345678123456781234') == '10.0.0.7'   # digits, not a report
+    assert SensorDataServer.device_key(addr, '0654ab1469520520687041') == '10.0.0.7'